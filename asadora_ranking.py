@@ -41,6 +41,11 @@ except ImportError:
         concatenate_videoclips, concatenate_audioclips
     )
 from PIL import Image, ImageDraw, ImageFont
+from asset_cache import load_font
+from drive_cache import get_drive_cache
+from fish_audio_client import get_fish_audio_client
+from gemini_key_pool import GeminiKeyManager, is_rate_limit_error
+from pcm_audio import decode_audio_bytes, write_wav
 import numpy as np
 from gtts import gTTS
 import logging
@@ -64,7 +69,6 @@ RANKING_COUNT = 3 if TEST_MODE else 10  # テスト時はTOP3、本番はTOP10
 # ===== Fish Audio TTS設定 =====
 # Fish Audio API
 FISH_AUDIO_API_KEY = os.environ.get("FISH_AUDIO_API_KEY", "")
-FISH_AUDIO_API_URL = "https://api.fish.audio/v1/tts"
 
 # キャラクター設定を共通ファイルからインポート
 from character_settings import (
@@ -81,69 +85,6 @@ from character_settings import (
 )
 
 
-class GeminiKeyManager:
-    """複数のGemini APIキーを管理（429エラー時のフォールバック対応）"""
-
-    def __init__(self):
-        self.keys = []
-        self.key_names = []  # デバッグ用にキー名を保持
-
-        # GEMINI_API_KEY, GEMINI_API_KEY_1, _2, _3... を収集
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-            self.key_names.append("GEMINI_API_KEY")
-
-        for i in range(1, 43):  # GEMINI_API_KEY_1〜42に対応
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-                self.key_names.append(f"GEMINI_API_KEY_{i}")
-
-        if not self.keys:
-            raise ValueError("GEMINI_API_KEY が設定されていません")
-
-        self.current_index = 0
-        self.failed_keys = set()  # 失敗したキーのインデックス
-
-        print(f"\n{'='*50}")
-        print(f"Gemini APIキー: {len(self.keys)}個 検出")
-        print(f"{'='*50}")
-        for i, name in enumerate(self.key_names):
-            print(f"  [{i+1}] {name}: ✓")
-        print(f"フォールバック順: {' → '.join(self.key_names)}")
-        print(f"{'='*50}\n")
-
-    def get_key(self):
-        """次のAPIキーを取得（ラウンドロビン）"""
-        key = self.keys[self.current_index]
-        name = self.key_names[self.current_index]
-        self.current_index = (self.current_index + 1) % len(self.keys)
-        return key, name
-
-    def get_random_key(self):
-        """ランダムなAPIキーを取得"""
-        idx = random.randint(0, len(self.keys) - 1)
-        return self.keys[idx], self.key_names[idx]
-
-    def mark_failed(self, key_name: str):
-        """キーを失敗としてマーク"""
-        if key_name in self.key_names:
-            idx = self.key_names.index(key_name)
-            self.failed_keys.add(idx)
-            print(f"  [!] {key_name} をスキップ対象に追加")
-
-    def get_working_key(self):
-        """動作するキーを取得（失敗したキーをスキップ）"""
-        for i in range(len(self.keys)):
-            if i not in self.failed_keys:
-                return self.keys[i], self.key_names[i]
-        # 全て失敗している場合はリセットして最初から
-        print("  [!] 全キーが失敗。リセットして再試行...")
-        self.failed_keys.clear()
-        return self.keys[0], self.key_names[0]
-
-
 def call_gemini_with_retry(func, key_manager: GeminiKeyManager, max_retries: int = None):
     """Gemini APIを呼び出し、429エラー時は別のキーでリトライ"""
     if max_retries is None:
@@ -162,12 +103,11 @@ def call_gemini_with_retry(func, key_manager: GeminiKeyManager, max_retries: int
             return result
 
         except Exception as e:
-            error_str = str(e)
             last_error = e
 
-            if "429" in error_str or "quota" in error_str.lower():
+            if is_rate_limit_error(e):
                 print(f"  [✗] {key_name}: クォータエラー (429)")
-                key_manager.mark_failed(key_name)
+                key_manager.mark_429_error(api_key, e)
 
                 # 残りのキー数を表示
                 remaining = len(key_manager.keys) - len(key_manager.failed_keys)
@@ -512,6 +452,8 @@ def generate_fish_audio_tts(text: str, reference_id: str, output_path: str, max_
     """
     Fish Audio APIで音声を生成
 
+    共有クライアント（keep-alive セッション・ボイス別レート制限・TTSキャッシュ）経由で1セリフを合成する。
+
     Args:
         text: 読み上げるテキスト
         reference_id: Fish AudioのボイスモデルID
@@ -526,52 +468,25 @@ def generate_fish_audio_tts(text: str, reference_id: str, output_path: str, max_
         print("    [Fish Audio] エラー: FISH_AUDIO_API_KEY が設定されていません")
         return False
 
-    headers = {
-        "Authorization": f"Bearer {FISH_AUDIO_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "text": text,
-        "reference_id": reference_id,
-        "format": "wav"
-    }
-
-    last_error = None
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                FISH_AUDIO_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=timeout
-            )
-
-            if response.status_code == 200:
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
-                return True
-            elif response.status_code == 429:
-                print(f"      [試行 {attempt + 1}] レート制限 (429)")
-            else:
-                print(f"      [試行 {attempt + 1}] エラー: {response.status_code} - {response.text[:100]}")
-                last_error = f"HTTP {response.status_code}"
-
-        except requests.Timeout:
-            print(f"      [試行 {attempt + 1}] タイムアウト")
-            last_error = "Timeout"
-        except Exception as e:
-            print(f"      [試行 {attempt + 1}] エラー: {str(e)[:100]}")
-            last_error = str(e)
+    client = get_fish_audio_client(FISH_AUDIO_API_KEY)
+    audio = client.synthesize(text, reference_id, max_retries=max_retries, timeout=timeout)
+    if audio is None:
+        return False
+    with open(output_path, 'wb') as f:
+        f.write(audio)
+    return True
 
-        if attempt < max_retries - 1:
-            wait_time = (attempt + 1) * 2
-            print(f"      {wait_time}秒後にリトライ...")
-            time.sleep(wait_time)
 
-    print(f"    [Fish Audio] ✗ 全リトライ失敗: {last_error}")
-    return False
+def generate_gtts_wav(text: str, output_path: str) -> bool:
+    """gTTSで音声を生成してWAV（24kHz モノラル）で保存（MP3は一時ファイルを経由せずメモリ上でデコード）"""
+    try:
+        buffer = BytesIO()
+        gTTS(text=text, lang='ja').write_to_fp(buffer)
+        write_wav(output_path, decode_audio_bytes(buffer.getvalue(), 24000))
+        return True
+    except Exception as e:
+        print(f"    gTTS生成エラー: {e}")
+        return False
 
 
 def generate_silence(output_path: str, duration: float = 0.5, sample_rate: int = 24000) -> bool:
@@ -751,8 +666,11 @@ def generate_fish_audio_dialogue(dialogue: list, channel: str, output_path: str,
     print(f"    カツミ={get_voice_name(katsumi_voice)}, ヒロシ={get_voice_name(hiroshi_voice)}")
     print(f"    セリフ数: {len(dialogue)}件")
 
-    audio_files = []
+    if not FISH_AUDIO_API_KEY:
+        print("    [Fish Audio] エラー: FISH_AUDIO_API_KEY が設定されていません")
 
+    texts = []
+    jobs = []
     for idx, line in enumerate(dialogue):
         speaker = line["speaker"]
         text = apply_reading_dict(line["text"])  # 読み方辞書を適用
@@ -762,38 +680,34 @@ def generate_fish_audio_dialogue(dialogue: list, channel: str, output_path: str,
 
         # 感情タグを追加
         emotion_tag = detect_emotion_tag(speaker, text)
-        tagged_text = emotion_tag + text
-
-        # 一時ファイルパス
-        temp_audio = str(temp_dir / f"line_{idx:03d}.wav")
+        texts.append(text)
+        jobs.append((emotion_tag + text, voice_id))
 
         print(f"      [{idx + 1}/{len(dialogue)}] {speaker}: {text[:30]}...")
         if emotion_tag:
             print(f"        感情タグ: {emotion_tag.strip()}")
 
-        # Fish Audio APIで生成
-        if generate_fish_audio_tts(tagged_text, voice_id, temp_audio, max_retries):
+    # Fish Audio APIで並列生成（結果は台本の順番）
+    results = [None] * len(jobs)
+    if FISH_AUDIO_API_KEY:
+        client = get_fish_audio_client(FISH_AUDIO_API_KEY)
+        print(f"    [Fish Audio] {client.max_workers}並列で生成中...")
+        results = client.map(jobs, max_retries=max_retries)
+
+    audio_files = []
+    for idx, audio in enumerate(results):
+        temp_audio = str(temp_dir / f"line_{idx:03d}.wav")
+        if audio is not None:
+            with open(temp_audio, 'wb') as f:
+                f.write(audio)
             audio_files.append(temp_audio)
         else:
             print(f"      ✗ セリフ {idx + 1} の生成に失敗")
             # 失敗してもフォールバック（gTTSで単一セリフ）
-            try:
-                from gtts import gTTS
-                tts = gTTS(text=text, lang='ja')
-                temp_mp3 = temp_audio.replace('.wav', '.mp3')
-                tts.save(temp_mp3)
-
-                # WAVに変換
-                cmd = ['ffmpeg', '-y', '-i', temp_mp3, '-acodec', 'pcm_s16le', '-ar', '24000', '-ac', '1', temp_audio]
-                subprocess.run(cmd, capture_output=True)
-
-                if os.path.exists(temp_mp3):
-                    os.remove(temp_mp3)
-
-                if os.path.exists(temp_audio):
-                    audio_files.append(temp_audio)
-            except Exception as e:
-                print(f"        フォールバックも失敗: {e}")
+            if generate_gtts_wav(texts[idx], temp_audio):
+                audio_files.append(temp_audio)
+            else:
+                print(f"        フォールバックも失敗")
 
     if not audio_files:
         print("    [Fish Audio] ✗ 音声ファイルが生成されませんでした")
@@ -816,31 +730,9 @@ def generate_fish_audio_dialogue(dialogue: list, channel: str, output_path: str,
 
 def generate_gtts_dialogue(dialogue: list, output_path: str) -> bool:
     """gTTSで対話音声を生成（フォールバック用、WAV出力）"""
-    try:
-        # 全テキストを結合
-        full_text = " ".join([line["text"] for line in dialogue])
-        tts = gTTS(text=full_text, lang='ja')
-
-        # 一時MP3ファイルに保存
-        temp_mp3 = output_path.replace('.wav', '_temp.mp3')
-        tts.save(temp_mp3)
-
-        # MP3をWAVに変換
-        cmd = [
-            'ffmpeg', '-y', '-i', temp_mp3,
-            '-acodec', 'pcm_s16le', '-ar', '24000', '-ac', '1',
-            output_path
-        ]
-        subprocess.run(cmd, capture_output=True, check=True)
-
-        # 一時ファイル削除
-        if os.path.exists(temp_mp3):
-            os.remove(temp_mp3)
-
-        return True
-    except Exception as e:
-        print(f"    gTTS生成エラー: {e}")
-        return False
+    # 全テキストを結合
+    full_text = " ".join([line["text"] for line in dialogue])
+    return generate_gtts_wav(full_text, output_path)
 
 
 def generate_dialogue_audio(dialogue: list, output_path: str, key_manager, channel: str = "27") -> tuple:
@@ -1049,9 +941,9 @@ def generate_gradient_background(output_path: str, rank: int = 0,
     if video_title or rank or work_title:
         font_path = get_font_path()
         try:
-            font_large = ImageFont.truetype(font_path, 80) if font_path else ImageFont.load_default()
-            font_xlarge = ImageFont.truetype(font_path, 120) if font_path else ImageFont.load_default()
-            font_medium = ImageFont.truetype(font_path, 60) if font_path else ImageFont.load_default()
+            font_large = load_font(font_path, 80) if font_path else ImageFont.load_default()
+            font_xlarge = load_font(font_path, 120) if font_path else ImageFont.load_default()
+            font_medium = load_font(font_path, 60) if font_path else ImageFont.load_default()
         except:
             font_large = ImageFont.load_default()
             font_xlarge = ImageFont.load_default()
@@ -1119,9 +1011,9 @@ def generate_ranking_table_image(
     # フォント設定
     font_path = get_font_path()
     try:
-        font_title = ImageFont.truetype(font_path, 56) if font_path else ImageFont.load_default()
-        font_rank = ImageFont.truetype(font_path, 44) if font_path else ImageFont.load_default()
-        font_item = ImageFont.truetype(font_path, 36) if font_path else ImageFont.load_default()
+        font_title = load_font(font_path, 56) if font_path else ImageFont.load_default()
+        font_rank = load_font(font_path, 44) if font_path else ImageFont.load_default()
+        font_item = load_font(font_path, 36) if font_path else ImageFont.load_default()
     except:
         font_title = ImageFont.load_default()
         font_rank = ImageFont.load_default()
@@ -1308,6 +1200,10 @@ def get_font_path():
 
 import subprocess
 
+# 1パス描画（スライド・オーバーレイ・BGM・字幕を1つのフィルタグラフで処理し、エンコードは1回だけ）
+# false にすると従来の2段階処理（動画作成→字幕焼き込みで再エンコード）
+FFMPEG_SINGLE_PASS = os.environ.get("FFMPEG_SINGLE_PASS", "true").lower() == "true"
+
 
 def combine_audio_ffmpeg(audio_files: list, output_path: str, gap_duration: float = 0.5) -> bool:
     """FFmpegで音声ファイルを結合（WAV→MP3変換対応、無音ギャップ挿入）
@@ -1500,7 +1396,7 @@ def add_overlay_to_image(image_path: str, output_path: str, rank: int = None,
     if rank:
         # 順位バッジを描画
         try:
-            badge_font = ImageFont.truetype(font_path, 80) if font_path else ImageFont.load_default()
+            badge_font = load_font(font_path, 80) if font_path else ImageFont.load_default()
         except:
             badge_font = ImageFont.load_default()
 
@@ -1514,7 +1410,7 @@ def add_overlay_to_image(image_path: str, output_path: str, rank: int = None,
         # 作品情報を描画
         if work_title:
             try:
-                info_font = ImageFont.truetype(font_path, 48) if font_path else ImageFont.load_default()
+                info_font = load_font(font_path, 48) if font_path else ImageFont.load_default()
             except:
                 info_font = ImageFont.load_default()
 
@@ -1531,22 +1427,16 @@ def add_overlay_to_image(image_path: str, output_path: str, rank: int = None,
 
 
 def download_bgm_from_drive(temp_dir: Path) -> str:
-    """Google DriveからBGMをダウンロード"""
+    """Google DriveからBGMをダウンロード（drive_cache 経由、前回と同じ曲ならダウンロードしない）"""
     bgm_folder_id = os.environ.get("BGM_FOLDER_ID")
     if not bgm_folder_id:
         return None
 
     try:
-        from googleapiclient.http import MediaIoBaseDownload
-        service = get_drive_service()
-
-        # フォルダ内のファイル一覧を取得
-        results = service.files().list(
-            q=f"'{bgm_folder_id}' in parents and mimeType contains 'audio/'",
-            fields="files(id, name)"
-        ).execute()
+        drive = get_drive_cache()
 
-        files = results.get('files', [])
+        # フォルダ内のファイル一覧を取得（md5 もここで取れるので、キャッシュの確認に追加の呼び出しは不要）
+        files = drive.list_folder(bgm_folder_id, mime_contains="audio/")
         if not files:
             return None
 
@@ -1554,25 +1444,189 @@ def download_bgm_from_drive(temp_dir: Path) -> str:
         selected = random.choice(files)
         print(f"  BGM選択: {selected['name']}")
 
-        # ダウンロード
-        bgm_path = str(temp_dir / "bgm.mp3")
-        request = service.files().get_media(fileId=selected['id'])
-
-        with open(bgm_path, 'wb') as f:
-            downloader = MediaIoBaseDownload(f, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-
-        return bgm_path
+        return drive.fetch(selected['id'], str(temp_dir / "bgm.mp3"), label="BGM")
 
     except Exception as e:
         print(f"  BGMダウンロードエラー: {e}")
         return None
 
 
+def build_overlay_filters(section: dict, font_path: str, text_prefix: str) -> list:
+    """add_overlay_to_image と同じ順位バッジ・作品情報を drawtext フィルタで作る
+
+    テキストはファイル経由で渡す（日本語や記号のエスケープ不要）。
+    """
+    if not section.get('rank') or not font_path:
+        return []
+
+    rank = section['rank']
+    items = [(f"第{rank}位", 80, 50, 50, '0xFFD700' if rank <= 3 else 'white')]
+    if section.get('work_title'):
+        items.append((f"『{section['work_title']}』（{section.get('year')}年）", 48, 100, 150, 'white'))
+        if section.get('cast'):
+            items.append((f"主演: {section['cast']}", 48, 100, 210, 'white'))
+
+    filters = []
+    for j, (text, size, x, y, color) in enumerate(items):
+        text_file = f"{text_prefix}_{j}.txt"
+        with open(text_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        filters.append(
+            f"drawtext=fontfile='{font_path}':textfile='{text_file}':expansion=none:"
+            f"fontsize={size}:fontcolor={color}:x={x}:y={y}:"
+            f"shadowcolor=black:shadowx=2:shadowy=2"
+        )
+    return filters
+
+
+def build_single_pass_command(slides: list, bgm_path: str, ass_path: str, output_path: str,
+                              gap_duration: float = 0.5, tail_padding: float = 0.5) -> list:
+    """1パス描画用の ffmpeg コマンドを組み立てる
+
+    入力: スライド画像 × N、セクション音声 × N、BGM（任意）
+    映像: 画像ごとに scale → drawtext → concat → ass
+    音声: セクション音声の後ろに無音を足して concat（combine_audio_ffmpeg と同じ間隔）→ BGMとamix
+
+    Args:
+        slides: {'image', 'audio', 'duration', 'overlays'} のリスト
+        ass_path: None なら字幕なし
+    """
+    inputs = []
+    filters = []
+    n = len(slides)
+
+    for i, slide in enumerate(slides):
+        # 各スライドは「音声 + 次までの間隔」だけ表示（最後は末尾パディング分）
+        pad = gap_duration if i < n - 1 else tail_padding
+        slide['length'] = slide['duration'] + pad
+        inputs += ['-loop', '1', '-framerate', str(FPS), '-t', f"{slide['length']:.3f}", '-i', slide['image']]
+
+    for slide in slides:
+        inputs += ['-i', slide['audio']]
+
+    for i, slide in enumerate(slides):
+        chain = [f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}", "setsar=1", "format=yuv420p"] + slide.get('overlays', [])
+        filters.append(f"[{i}:v]{','.join(chain)}[v{i}]")
+        filters.append(
+            f"[{n + i}:a]aformat=sample_fmts=fltp:sample_rates=24000:channel_layouts=mono,"
+            f"apad,atrim=0:{slide['length']:.3f}[a{i}]"
+        )
+
+    video_chain = f"concat=n={n}:v=1:a=0"
+    if ass_path:
+        video_chain += f",ass={ass_path}"
+    filters.append(''.join(f"[v{i}]" for i in range(n)) + f"{video_chain}[v]")
+
+    voice_inputs = ''.join(f"[a{i}]" for i in range(n))
+    if bgm_path:
+        inputs += ['-i', bgm_path]
+        filters.append(f"{voice_inputs}concat=n={n}:v=0:a=1[voice]")
+        filters.append(f"[{2 * n}:a]volume=0.12,aloop=loop=-1:size=2e+09[bgm_loop]")
+        filters.append("[voice][bgm_loop]amix=inputs=2:duration=first:dropout_transition=2[a]")
+    else:
+        filters.append(f"{voice_inputs}concat=n={n}:v=0:a=1[a]")
+
+    return [
+        'ffmpeg', '-y',
+        *inputs,
+        '-filter_complex', ';'.join(filters),
+        '-map', '[v]', '-map', '[a]',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23',
+        '-c:a', 'aac', '-b:a', '192k',
+        '-pix_fmt', 'yuv420p',
+        '-movflags', '+faststart',
+        output_path
+    ]
+
+
+def create_video_ffmpeg_single_pass(sections: list, all_segments: list, temp_dir: Path) -> tuple:
+    """FFmpegで動画を生成（1パス：スライド・オーバーレイ・BGM・字幕を1回のエンコードで）"""
+    print("\n" + "=" * 50)
+    print("[FFmpeg] 動画生成開始（1パス）")
+    print("=" * 50)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    start_time = time.time()
+
+    # 1. セクションの長さを取得（音声は結合・再エンコードせずそのまま入力にする）
+    print("\n[1/4] セクションを準備中...")
+    font_path = get_font_path()
+    slides = []
+    for i, section in enumerate(sections):
+        if not section.get('audio') or not os.path.exists(section['audio']):
+            continue
+
+        duration = get_audio_duration_ffprobe(section['audio'])
+        if duration <= 0:
+            continue
+
+        slides.append({
+            'image': section['image'],
+            'audio': section['audio'],
+            'duration': duration,
+            'overlays': build_overlay_filters(section, font_path, str(temp_dir / f"overlay_{i:03d}")),
+        })
+        print(f"  [{i+1}/{len(sections)}] {duration:.1f}秒")
+
+    if not slides:
+        raise ValueError("有効な音声がありません")
+
+    # 2. BGMをダウンロード（オプション）
+    print("\n[2/4] BGMを取得中...")
+    bgm_path = download_bgm_from_drive(temp_dir)
+    if bgm_path and os.path.exists(bgm_path):
+        print(f"  BGM: {bgm_path}")
+    else:
+        bgm_path = None
+        print("  BGMなし（音声のみ）")
+
+    # 3. ASS字幕ファイルを生成（話者別位置指定）
+    print("\n[3/4] ASS字幕ファイルを生成中...")
+    ass_path = str(temp_dir / f"asadora_ranking_{timestamp}.ass")
+    srt_path = str(temp_dir / f"asadora_ranking_{timestamp}.srt")  # 互換性のため
+    generate_ass_subtitles_positioned(all_segments, ass_path, VIDEO_WIDTH, VIDEO_HEIGHT)
+    generate_srt(all_segments, srt_path)  # SRTも生成（アーティファクト用）
+    print(f"  字幕数: {len(all_segments)}件")
+
+    # 4. 1回のエンコードで書き出し
+    print("\n[4/4] 動画をエンコード中（1パス）...")
+    output_path = str(temp_dir / f"asadora_ranking_{timestamp}.mp4")
+    cmd = build_single_pass_command(slides, bgm_path, ass_path, output_path)
+
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"FFmpegエラー（字幕あり）: {e.stderr[-500:] if e.stderr else 'unknown'}")
+
+        # フォールバック: 字幕なしで同じグラフを再実行
+        print("\n[フォールバック] 字幕なしで出力...")
+        cmd = build_single_pass_command(slides, bgm_path, None, output_path)
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"FFmpegエラー: {e.stderr[-500:] if e.stderr else 'unknown'}")
+            raise
+        print("  字幕なしで完了")
+
+    total_duration = sum(slide['length'] for slide in slides)
+    elapsed = time.time() - start_time
+    print(f"\n✓ 動画生成完了!")
+    print(f"  処理時間: {elapsed:.1f}秒")
+    print(f"  動画長: {total_duration:.1f}秒")
+    print(f"  速度比: {total_duration/elapsed:.1f}x リアルタイム")
+    print(f"  出力: {output_path}")
+
+    return output_path, srt_path
+
+
 def create_video_ffmpeg(sections: list, all_segments: list, temp_dir: Path) -> tuple:
-    """FFmpegで動画を生成（2段階処理：動画作成→字幕オーバーレイ）"""
+    """FFmpegで動画を生成（2段階処理：動画作成→字幕オーバーレイ）
+
+    FFMPEG_SINGLE_PASS=true（デフォルト）なら create_video_ffmpeg_single_pass を使う。
+    """
+    if FFMPEG_SINGLE_PASS:
+        return create_video_ffmpeg_single_pass(sections, all_segments, temp_dir)
+
     print("\n" + "=" * 50)
     print("[FFmpeg] 動画生成開始（2段階処理）")
     print("=" * 50)
@@ -2309,7 +2363,7 @@ def main():
     print()
 
     try:
-        key_manager = GeminiKeyManager()
+        key_manager = GeminiKeyManager(required=True)
         print(f"Gemini APIキー: {len(key_manager.keys)}個")
 
         # テストモードの場合は固定テーマを使用（スプレッドシート不要）
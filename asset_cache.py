@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フォント・画像アセットのキャッシュ（全レンダラー共通）
+
+- フォント: (パス, サイズ, インデックス) をキーにしたLRU。候補パスの探索結果もメモ化
+- 画像: デコード済みPNG/JPEGと、リサイズ済みスプライト（キャラ画像・QRコード等）をLRU
+
+フレーム関数から毎回呼んでもファイルI/O・デコード・リサイズは初回のみ。
+返す画像はキャッシュと共有されるため、直接描画する場合は .copy() してから使うこと。
+
+使い方:
+    from asset_cache import find_font, load_sprite
+    font = find_font(FONT_PATHS, 48)
+    katsumi = load_sprite(ASSETS_DIR / "katsumi.png", 200)
+"""
+
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageFont
+
+
+# 日本語フォント候補（Linux / GitHub Actions → macOS の順）
+JP_FONT_PATHS = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+    "/System/Library/Fonts/Hiragino Sans GB.ttc",
+)
+
+FONT_CACHE_SIZE = 256
+IMAGE_CACHE_SIZE = 64
+SPRITE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def load_font(path, size, index=0):
+    """フォントを読み込み（読み込めなければ OSError）"""
+    return ImageFont.truetype(str(path), int(size), index=index)
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _find_font(font_paths, size, index):
+    for path in font_paths:
+        try:
+            return load_font(path, size, index)
+        except (OSError, ValueError):
+            continue
+    return ImageFont.load_default()
+
+
+def find_font(font_paths=JP_FONT_PATHS, size=48, index=0):
+    """候補パスを順に試し、最初に読み込めたフォントを返す
+
+    どれも読み込めない場合は ImageFont.load_default()。
+    探索結果はサイズごとにメモ化するので、2回目以降はファイル探索しない。
+    """
+    return _find_font(tuple(str(p) for p in font_paths), int(size), index)
+
+
+def find_font_path(font_paths=JP_FONT_PATHS):
+    """候補パスのうち最初に存在するものを返す（なければ None）"""
+    return _find_font_path(tuple(str(p) for p in font_paths))
+
+
+@lru_cache(maxsize=32)
+def _find_font_path(font_paths):
+    for path in font_paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _load_image(path, mode):
+    img = Image.open(path)
+    img.load()
+    if mode and img.mode != mode:
+        img = img.convert(mode)
+    return img
+
+
+def load_image(path, mode='RGBA'):
+    """画像を読み込み（デコード結果を共有キャッシュ、ファイルがなければ None）
+
+    Args:
+        path: 画像パス
+        mode: 変換後のモード（None なら元のまま）
+    """
+    path = str(path)
+    if not os.path.exists(path):
+        return None
+    return _load_image(path, mode)
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _load_sprite(path, size, mode, resample):
+    return _load_image(path, mode).resize(size, resample)
+
+
+def load_sprite(path, size, mode='RGBA', resample=Image.Resampling.LANCZOS):
+    """リサイズ済みの画像を取得（キャラ画像・アイコン等、ファイルがなければ None）
+
+    Args:
+        path: 画像パス
+        size: 一辺のピクセル数（正方形）または (幅, 高さ)
+        mode: 変換後のモード（None なら元のまま）
+        resample: リサイズ方式
+    """
+    path = str(path)
+    if not os.path.exists(path):
+        return None
+    if isinstance(size, int):
+        size = (size, size)
+    return _load_sprite(path, (int(size[0]), int(size[1])), mode, resample)
+
+
+def clear_asset_cache():
+    """全キャッシュをクリア"""
+    for cached in (load_font, _find_font, _find_font_path, _load_image, _load_sprite):
+        cached.cache_clear()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文節分割（janome の Tokenizer をプロセスで1つだけ使い、分割結果をメモ化）
+
+janome の Tokenizer は辞書の読み込みに数秒かかるのに、video_generator と video_generator_v2 が
+それぞれ別に作り、wrap_text が呼ばれるたび（レイアウトのやり直しを含む）に同じ行を形態素解析していた。
+- Tokenizer はプロセスで1つ（preload() で裏で読み込みを始めておける。スレッドから呼んでもよい）
+- テキスト → 文節のリストを LRU でメモ化（同じ行の2回目以降は形態素解析しない）
+- segment_script() で台本全体を1回で分割（同じ行は1回だけ解析）してメモを温めておく
+
+使い方:
+    from bunsetsu_segmenter import preload, segment_script, tokenize_to_bunsetsu
+    preload()                                           # 音声の読み込みなどと並行して辞書を読む
+    segment_script([item["line"] for item in lines])    # 台本全体を先に分割
+    bunsetsu = tokenize_to_bunsetsu(text)               # 以降はメモから返る
+
+ベンチマーク:
+    python bunsetsu_segmenter.py --bench
+"""
+
+import argparse
+import threading
+import time
+from functools import lru_cache
+from typing import List
+
+
+BUNSETSU_CACHE_SIZE = 8192
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_preload_thread = None
+
+
+def get_tokenizer():
+    """形態素解析器を取得（プロセスで1つ。初回だけ辞書を読み込む）"""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                from janome.tokenizer import Tokenizer
+                _tokenizer = Tokenizer()
+    return _tokenizer
+
+
+def preload():
+    """辞書の読み込みを裏のスレッドで始める（読み込み済み・読み込み中なら何もしない）"""
+    global _preload_thread
+    if _tokenizer is None and _preload_thread is None:
+        _preload_thread = threading.Thread(target=get_tokenizer, daemon=True)
+        _preload_thread.start()
+
+
+def is_dependent_pos(part_of_speech: str) -> bool:
+    """
+    付属語（前の語にくっつけるべき品詞）かどうか判定
+
+    Args:
+        part_of_speech: 品詞情報（カンマ区切り）
+
+    Returns:
+        付属語ならTrue
+    """
+    pos_parts = part_of_speech.split(',')
+    main_pos = pos_parts[0]
+    sub_pos = pos_parts[1] if len(pos_parts) > 1 else ''
+
+    # 付属語: 助詞、助動詞、接尾辞、非自立（動詞・名詞）、記号
+    if main_pos in ['助詞', '助動詞']:
+        return True
+    if main_pos == '動詞' and sub_pos == '非自立':
+        return True
+    if main_pos == '名詞' and sub_pos in ['非自立', '接尾']:
+        return True
+    if main_pos == '記号':
+        return True
+
+    return False
+
+
+def _segment(tokenizer, text: str) -> List[str]:
+    bunsetsu_list = []
+    current = ""
+
+    for token in tokenizer.tokenize(text):
+        if is_dependent_pos(token.part_of_speech):
+            # 付属語は現在の文節に追加
+            current += token.surface
+        else:
+            # 自立語の場合、前の文節を保存して新しい文節を開始
+            if current:
+                bunsetsu_list.append(current)
+            current = token.surface
+
+    if current:
+        bunsetsu_list.append(current)
+
+    return bunsetsu_list
+
+
+@lru_cache(maxsize=BUNSETSU_CACHE_SIZE)
+def _cached_bunsetsu(text: str) -> tuple:
+    return tuple(_segment(get_tokenizer(), text))
+
+
+def tokenize_to_bunsetsu(text: str) -> List[str]:
+    """
+    テキストを文節単位に分割（結果はメモ化。返すリストは呼び出し側で書き換えてよい）
+
+    Args:
+        text: 分割するテキスト
+
+    Returns:
+        文節のリスト
+    """
+    return list(_cached_bunsetsu(text))
+
+
+def segment_script(texts) -> List[List[str]]:
+    """
+    台本の全行をまとめて文節に分割（同じ行は1回だけ解析し、メモに入れておく）
+
+    Args:
+        texts: 行のリスト
+
+    Returns:
+        行ごとの文節のリスト（texts と同じ順）
+    """
+    texts = list(texts)
+    segmented = {text: _cached_bunsetsu(text) for text in dict.fromkeys(texts)}
+    return [list(segmented[text]) for text in texts]
+
+
+def clear_cache():
+    """メモを消す（ベンチマーク用）"""
+    _cached_bunsetsu.cache_clear()
+
+
+def run_benchmark(lines: int = 240, layout_passes: int = 3):
+    """行ごとに Tokenizer を作って毎回解析する従来の方法と比較
+
+    従来: video_generator / video_generator_v2 がそれぞれ Tokenizer を作り、wrap_text のたびに解析
+    """
+    from janome.tokenizer import Tokenizer
+
+    samples = [
+        "今日は本当にありがとうございます。実は、最近ちょっと悩んでいることがありまして。",
+        "どうされましたか？何かあったんですか？ゆっくりお話しください。",
+        "ええ、実は夫との関係がうまくいっていなくて、毎日がつらいんです。",
+        "それは大変でしたね。お気持ちよく分かります。いつ頃からそうなったんですか？",
+        "夫との関係に葛藤があって、どうしても躊躇してしまうんです。",
+    ]
+    script = [f"{samples[i % len(samples)]}（{i // len(samples) + 1}回目）" for i in range(lines)]
+
+    # 従来: モジュールごとに Tokenizer を作り、レイアウトのたびに解析
+    start = time.perf_counter()
+    old_results = []
+    for _module in range(2):
+        tokenizer = Tokenizer()
+        for _ in range(layout_passes):
+            old_results = [_segment(tokenizer, text) for text in script]
+    old_time = time.perf_counter() - start
+
+    # 共有 Tokenizer + メモ
+    clear_cache()
+    start = time.perf_counter()
+    segment_script(script)
+    first = time.perf_counter() - start
+    for _module in range(2):
+        for _ in range(layout_passes):
+            new_results = [tokenize_to_bunsetsu(text) for text in script]
+    new_time = time.perf_counter() - start
+
+    print(f"{lines}行 × {layout_passes}回のレイアウト × 2モジュール")
+    print(f"従来（モジュールごとの Tokenizer、毎回解析）: {old_time:.2f}秒")
+    print(f"共有 Tokenizer + メモ: {new_time:.2f}秒（うち segment_script {first:.2f}秒）, "
+          f"結果一致: {old_results == new_results}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="文節分割")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（行ごとの解析と比較）")
+    parser.add_argument("--lines", type=int, default=240)
+    parser.add_argument("text", nargs="?", help="分割するテキスト")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines)
+    elif args.text:
+        print(" / ".join(tokenize_to_bunsetsu(args.text)))
+    else:
+        parser.print_help()
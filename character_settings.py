@@ -13,6 +13,8 @@
 import os
 import re
 
+from reading_normalizer import compile_reading_dict
+
 
 # ===== キャラクターアイコン =====
 KATSUMI_ICON = "assets/icons/katsumi_icon.png"
@@ -98,6 +100,17 @@ READING_DICT = {
 }
 
 
+_reading_normalizer = None
+
+
+def _get_reading_normalizer():
+    """READING_DICT をコンパイルした置換器（初回のみ作成）"""
+    global _reading_normalizer
+    if _reading_normalizer is None:
+        _reading_normalizer = compile_reading_dict(READING_DICT)
+    return _reading_normalizer
+
+
 def apply_reading_dict(text: str, custom_dict: dict = None) -> str:
     """
     読み方辞書でテキストを変換（TTS用）
@@ -112,18 +125,11 @@ def apply_reading_dict(text: str, custom_dict: dict = None) -> str:
     if not text:
         return text
 
-    # 基本辞書を使用
-    reading_dict = READING_DICT.copy()
-
-    # カスタム辞書があればマージ
+    # コンパイル済みの置換器で1回の走査で変換
+    # 同じ位置から始まるキーは最長一致（部分一致を避けるため）
     if custom_dict:
-        reading_dict.update(custom_dict)
-
-    # 長いキーから順に置換（部分一致を避けるため）
-    for key in sorted(reading_dict.keys(), key=len, reverse=True):
-        text = text.replace(key, reading_dict[key])
-
-    return text
+        return compile_reading_dict(READING_DICT, custom_dict).normalize(text)
+    return _get_reading_normalizer().normalize(text)
 
 # ===== Fish Audio ボイスID =====
 # カツミ（女性）: 女性アナウンサー（ベテラン）- 信頼感ある落ち着いた進行役
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YouTube コメントの差分同期（処理済みIDのローカル索引 + 動画ごとのウォーターマーク）
+
+毎時のコメントジョブが、最新10動画それぞれの commentThreads を100件ずつ1本ずつ取り直し、
+処理済みシートのID列を丸ごと読んで集合を作っていたため、シートが育つほど遅く・クォータを食っていた。
+- 処理済みコメントIDと返信フラグはローカルの索引（JSON）に持つ（返信件数も索引から数える）
+- 動画ごとに「前回までに見た最新コメントの publishedAt」（ウォーターマーク）と commentCount を覚える
+- videos.list（statistics）1回で commentCount が変わった動画だけを取りに行く
+- commentThreads は新しい順に nextPageToken をたどり、ウォーターマーク以前に届いたら止める
+- 動画ごとの取得はスレッドで並列（API クライアントはスレッドごとに作る）
+
+ウォーターマークはジョブの最後に commit() したときだけ進む。途中で落ちた実行の
+新着コメントは次の実行でもう一度拾う（処理済みIDは1件ごとに索引へ保存するので二重通知しない）。
+
+環境変数:
+    COMMENT_INDEX_DIR=...        索引の保存先
+    COMMENT_SYNC_WORKERS=4       同時に取得する動画数
+    COMMENT_SYNC_MAX_PAGES=10    1動画あたりの最大ページ数
+    COMMENT_INDEX_DAYS=90        処理済みIDを索引に残す日数
+
+使い方:
+    index = CommentIndex.load("nenkin_comments")
+    sync = CommentSync(lambda: build("youtube", "v3", credentials=creds), index)
+    comments = sync.fetch(videos)               # ウォーターマークより新しいコメントだけ
+    index.mark_processed(comment_id, replied=False)
+    index.commit(keep_videos=[v["id"] for v in videos])  # ウォーターマークを進めて保存（外れた動画は削除）
+
+ベンチマーク:
+    python comment_sync.py --bench
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+
+COMMENT_SYNC_WORKERS = int(os.environ.get("COMMENT_SYNC_WORKERS", "4"))
+COMMENT_SYNC_MAX_PAGES = int(os.environ.get("COMMENT_SYNC_MAX_PAGES", "10"))
+COMMENT_INDEX_DAYS = int(os.environ.get("COMMENT_INDEX_DAYS", "90"))
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_INDEX_DIR = Path.home() / ".cache" / "comment-index"
+LOCAL_INDEX_DIR = Path.home() / ".cache" / "jinsei-soudan" / "comments"
+
+
+def default_index_dir() -> Path:
+    root = os.environ.get("COMMENT_INDEX_DIR")
+    if root:
+        return Path(root)
+    return GITHUB_ACTIONS_INDEX_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_INDEX_DIR
+
+
+class CommentIndex:
+    """処理済みコメントと動画ごとのウォーターマークの索引
+
+    Args:
+        path: 索引ファイル（JSON）
+        data: 読み込んだ内容
+    """
+
+    def __init__(self, path: Path, data: dict = None):
+        self.path = Path(path)
+        data = data or {}
+        self.processed = data.get("processed", {})  # comment_id → {"at": 処理日時, "replied": bool}
+        self.videos = data.get("videos", {})  # video_id → {"watermark": publishedAt, "comment_count": int}
+        self._pending_videos = {}  # commit() で反映する動画の状態
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, name: str, root=None) -> "CommentIndex":
+        path = Path(root or default_index_dir()) / f"{name}.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = None
+        return cls(path, data)
+
+    def is_empty(self) -> bool:
+        return not self.processed and not self.videos
+
+    def seed(self, comment_ids):
+        """既存の処理済みID（シートから読んだもの）で索引を初期化"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            for comment_id in comment_ids:
+                self.processed.setdefault(comment_id, {"at": now, "replied": False})
+        self.save()
+
+    def is_processed(self, comment_id: str) -> bool:
+        return comment_id in self.processed
+
+    def processed_ids(self) -> set:
+        return set(self.processed)
+
+    def mark_processed(self, comment_id: str, replied: bool = False):
+        """処理済みとして記録（すぐ保存する）"""
+        with self._lock:
+            self.processed[comment_id] = {
+                "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "replied": bool(replied),
+            }
+        self.save()
+
+    def reply_count(self, day: date = None) -> int:
+        """その日に返信済みにしたコメント数"""
+        day_str = (day or date.today()).strftime("%Y-%m-%d")
+        with self._lock:
+            return sum(1 for entry in self.processed.values()
+                       if entry.get("replied") and entry.get("at", "").startswith(day_str))
+
+    def watermark(self, video_id: str) -> str:
+        return self.videos.get(video_id, {}).get("watermark", "")
+
+    def comment_count(self, video_id: str):
+        return self.videos.get(video_id, {}).get("comment_count")
+
+    def stage_video(self, video_id: str, watermark: str = None, comment_count: int = None):
+        """動画の新しい状態を commit() まで保留"""
+        with self._lock:
+            state = self._pending_videos.setdefault(video_id, dict(self.videos.get(video_id, {})))
+            if watermark and watermark > state.get("watermark", ""):
+                state["watermark"] = watermark
+            if comment_count is not None:
+                state["comment_count"] = comment_count
+
+    def commit(self, keep_videos=None):
+        """保留中のウォーターマークを反映して保存（keep_videos 以外の動画と古い処理済みIDは削除）"""
+        cutoff = (datetime.now() - timedelta(days=COMMENT_INDEX_DAYS)).strftime("%Y-%m-%d")
+        with self._lock:
+            self.videos.update(self._pending_videos)
+            self._pending_videos = {}
+            if keep_videos is not None:
+                keep = set(keep_videos)
+                self.videos = {video_id: state for video_id, state in self.videos.items() if video_id in keep}
+            # ウォーターマーク以前のコメントは取りに行かないので、古い処理済みIDは捨ててよい
+            self.processed = {comment_id: entry for comment_id, entry in self.processed.items()
+                              if entry.get("at", "") >= cutoff}
+        self.save()
+
+    def save(self):
+        with self._lock:
+            data = {"processed": self.processed, "videos": self.videos}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+
+def parse_comment_thread(item: dict, video_id: str, video_title: str) -> dict:
+    """commentThreads の1件 → コメント情報"""
+    snippet = item["snippet"]["topLevelComment"]["snippet"]
+    return {
+        "id": item["id"],
+        "comment_id": item["snippet"]["topLevelComment"]["id"],
+        "video_id": video_id,
+        "video_title": video_title,
+        "author": snippet["authorDisplayName"],
+        "author_channel_id": snippet.get("authorChannelId", {}).get("value", ""),
+        "text": snippet["textDisplay"],
+        "published_at": snippet["publishedAt"],
+        "like_count": snippet.get("likeCount", 0)
+    }
+
+
+class CommentSync:
+    """動画のコメントを差分で取得
+
+    Args:
+        client_factory: YouTube API クライアントを作る関数（スレッドごとに呼ぶ）
+        index: CommentIndex
+        max_workers: 同時に取得する動画数
+        max_pages: 1動画あたりの最大ページ数
+    """
+
+    def __init__(self, client_factory, index: CommentIndex, max_workers: int = COMMENT_SYNC_WORKERS,
+                 max_pages: int = COMMENT_SYNC_MAX_PAGES, verbose: bool = True):
+        self.client_factory = client_factory
+        self.index = index
+        self.max_workers = max(1, max_workers)
+        self.max_pages = max(1, max_pages)
+        self.verbose = verbose
+        self._local = threading.local()
+
+    def _client(self):
+        # googleapiclient のクライアントはスレッドセーフではないのでスレッドごとに作る
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client_factory()
+        return client
+
+    def changed_videos(self, videos: list) -> list:
+        """commentCount が前回から変わった動画（videos.list 1回で判定）"""
+        if not videos:
+            return []
+        try:
+            response = self._client().videos().list(
+                part="statistics",
+                id=",".join(v["id"] for v in videos),
+                maxResults=50
+            ).execute()
+        except Exception as e:
+            print(f"  ⚠ コメント数の取得エラー（全動画を確認）: {e}")
+            return list(videos)
+
+        counts = {}
+        for item in response.get("items", []):
+            count = item.get("statistics", {}).get("commentCount")
+            counts[item["id"]] = int(count) if count is not None else None
+
+        changed = []
+        for video in videos:
+            count = counts.get(video["id"])
+            if count is not None and count == self.index.comment_count(video["id"]):
+                continue
+            changed.append(video)
+            self.index.stage_video(video["id"], comment_count=count)
+        return changed
+
+    def fetch_video(self, video: dict) -> list:
+        """1動画の新着コメント（ウォーターマークに届くまでページをたどる）"""
+        video_id = video["id"]
+        watermark = self.index.watermark(video_id)
+        comments = []
+        newest = watermark
+        page_token = None
+        pages = 0
+
+        while pages < self.max_pages:
+            params = {"part": "snippet", "videoId": video_id, "maxResults": 100, "order": "time"}
+            if page_token:
+                params["pageToken"] = page_token
+            response = self._client().commentThreads().list(**params).execute()
+            pages += 1
+
+            reached = False
+            for item in response.get("items", []):
+                comment = parse_comment_thread(item, video_id, video["title"])
+                published_at = comment["published_at"]
+                if watermark and published_at <= watermark:
+                    reached = True
+                    continue
+                newest = max(newest, published_at)
+                if self.index.is_processed(comment["comment_id"]):
+                    reached = True
+                    continue
+                comments.append(comment)
+
+            page_token = response.get("nextPageToken")
+            if reached or not page_token:
+                break
+
+        self.index.stage_video(video_id, watermark=newest)
+        if self.verbose:
+            print(f"  [同期] 動画 {video_id}: 新着{len(comments)}件（{pages}ページ）")
+        return comments
+
+    def fetch(self, videos: list) -> list:
+        """変わった動画だけを並列に取得して、新着コメントを動画の順番で返す"""
+        changed = self.changed_videos(videos)
+        if self.verbose:
+            print(f"  [同期] コメント数が変わった動画: {len(changed)}/{len(videos)}本")
+
+        def fetch_one(video):
+            try:
+                return self.fetch_video(video)
+            except Exception as e:
+                print(f"  ⚠ 動画 {video['id']} のコメント取得エラー: {e}")
+                # 取れなかった動画は次の実行で取り直す
+                self.index.stage_video(video["id"], comment_count=-1)
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(fetch_one, changed))
+        return [comment for comments in results for comment in comments]
+
+
+class FakeYouTube:
+    """YouTube Data API（videos.list / commentThreads.list）の代用"""
+
+    def __init__(self, comments_per_video: dict, latency: float = 0.0, page_size: int = 100):
+        # video_id → [(comment_id, publishedAt), ...]（新しい順）
+        self.comments = comments_per_video
+        self.latency = latency
+        self.page_size = page_size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self, result):
+        fake = self
+
+        class Request:
+            def execute(self):
+                with fake._lock:
+                    fake.calls += 1
+                time.sleep(fake.latency)
+                return result()
+        return Request()
+
+    def videos(self):
+        return self
+
+    def commentThreads(self):
+        fake = self
+
+        class Threads:
+            def list(self, part, videoId, maxResults=100, order="time", pageToken=None):
+                def result():
+                    items = fake.comments.get(videoId, [])
+                    start = int(pageToken or 0)
+                    page = items[start:start + min(maxResults, fake.page_size)]
+                    response = {"items": [{
+                        "id": comment_id,
+                        "snippet": {"topLevelComment": {"id": comment_id, "snippet": {
+                            "authorDisplayName": "視聴者", "textDisplay": f"コメント {comment_id}",
+                            "publishedAt": published_at, "likeCount": 0,
+                        }}},
+                    } for comment_id, published_at in page]}
+                    if start + len(page) < len(items):
+                        response["nextPageToken"] = str(start + len(page))
+                    return response
+                return fake._request(result)
+        return Threads()
+
+    def list(self, part, id, maxResults=50):
+        def result():
+            return {"items": [{"id": video_id, "statistics": {"commentCount": str(len(self.comments.get(video_id, [])))}}
+                              for video_id in id.split(",")]}
+        return self._request(result)
+
+
+def run_benchmark(videos: int = 10, comments: int = 250, hours: int = 5, latency: float = 0.05):
+    """毎時ジョブ相当で、従来方式（全動画の先頭100件）と API 呼び出し回数・時間を比較"""
+    base = datetime(2025, 1, 1)
+    video_list = [{"id": f"v{i}", "title": f"動画{i}"} for i in range(videos)]
+    data = {v["id"]: [] for v in video_list}
+
+    def add_comments(hour, count):
+        # 毎時、最新の2本にだけコメントが増える
+        for k in range(count):
+            video_id = f"v{k % 2}"
+            published_at = (base + timedelta(hours=hour, seconds=k)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            data[video_id].insert(0, (f"{video_id}-{hour}-{k}", published_at))
+
+    add_comments(0, comments)
+    fake = FakeYouTube(data, latency=latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = CommentIndex.load("bench", root=tmp)
+        sync = CommentSync(lambda: fake, index, verbose=False)
+        baseline_calls = 0
+        baseline_time = 0.0
+        sync_time = 0.0
+        for hour in range(hours):
+            if hour:
+                add_comments(hour, 6)
+
+            # 従来: 全動画の先頭100件を1本ずつ
+            start = time.perf_counter()
+            before = fake.calls
+            for video in video_list:
+                fake.commentThreads().list(part="snippet", videoId=video["id"], maxResults=100).execute()
+            baseline_calls += fake.calls - before
+            baseline_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            new_comments = sync.fetch(video_list)
+            for comment in new_comments:
+                index.mark_processed(comment["comment_id"])
+            index.commit(keep_videos=[v["id"] for v in video_list])
+            sync_time += time.perf_counter() - start
+            print(f"  {hour + 1}回目: 新着{len(new_comments)}件")
+
+        sync_calls = fake.calls - baseline_calls
+        total = sum(len(items) for items in data.values())
+        print(f"従来: API {baseline_calls}回, {baseline_time:.2f}秒（100件を超えたコメントは取りこぼし）")
+        print(f"差分同期: API {sync_calls}回, {sync_time:.2f}秒（処理済み {len(index.processed)}/{total}件）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YouTube コメントの差分同期")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（ローカルの代用APIで比較）")
+    parser.add_argument("--latency", type=float, default=0.05, help="代用APIの1呼び出しの遅延（秒）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(latency=args.latency)
+    else:
+        parser.print_help()
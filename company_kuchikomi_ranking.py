@@ -13,7 +13,6 @@ import random
 import tempfile
 import subprocess
 import time
-import threading
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -26,6 +25,11 @@ from moviepy import (
     CompositeVideoClip, TextClip
 )
 
+from asset_cache import find_font, find_font_path, load_font, load_sprite
+from gradient_background import get_gradient_image, get_gradient_strip
+from gemini_key_pool import GeminiKeyManager, is_rate_limit_error
+from layered_frame import LayeredFrameRenderer
+
 # ========== 設定 ==========
 BASE_DIR = Path(__file__).parent
 ASSETS_DIR = BASE_DIR / "assets"
@@ -66,6 +70,18 @@ DESIGN = {
     "line_height": 1.5,         # 行間倍率
 }
 
+# ランキング背景グラデーション（135度）
+RANK_BG_GRADIENT = [
+    (255, 248, 220),  # #FFF8DC - コーンシルク
+    (255, 228, 181),  # #FFE4B5 - モカシン
+    (255, 215, 0),    # #FFD700 - ゴールド
+    (218, 165, 32),   # #DAA520 - ゴールデンロッド
+    (245, 222, 179),  # #F5DEB3 - 小麦
+]
+
+# 支持率バーのグラデーション（#FF6B00 → #FFB800 → #7FD858）
+RANK_BAR_GRADIENT = [(255, 107, 0), (255, 184, 0), (127, 216, 88)]
+
 # Gemini TTS 音声設定
 VOICE_CONFIG = {
     "katsumi": "Kore",   # 女性声
@@ -77,49 +93,6 @@ TEST_MODE = os.environ.get("TEST_MODE", "false").lower() == "true"
 TEST_COUNT = 5  # テスト時の口コミ件数
 
 
-class GeminiKeyManager:
-    """Gemini APIキー管理（TTS用レート制限対策）"""
-    def __init__(self):
-        self.keys = []
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-        # GEMINI_API_KEY_1 〜 GEMINI_API_KEY_42
-        for i in range(1, 43):
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-        self.current_index = 0
-        self.lock = threading.Lock()
-        self.key_429_counts = {}
-        print(f"  [KeyManager] {len(self.keys)}個のAPIキーを読み込みました")
-
-    def get_next_key(self):
-        """ラウンドロビンで次のキーを取得"""
-        with self.lock:
-            if not self.keys:
-                return None, "KEY_NONE"
-            key = self.keys[self.current_index]
-            key_name = f"KEY_{self.current_index}"
-            self.current_index = (self.current_index + 1) % len(self.keys)
-            return key, key_name
-
-    def get_key_by_index(self, index: int):
-        """インデックスでキーを取得"""
-        if not self.keys:
-            return None
-        return self.keys[index % len(self.keys)]
-
-    def mark_429_error(self, api_key: str):
-        """429エラーを記録"""
-        with self.lock:
-            self.key_429_counts[api_key] = self.key_429_counts.get(api_key, 0) + 1
-
-    def get_key_count(self):
-        """キー数を取得"""
-        return len(self.keys)
-
-
 # グローバルKeyManager
 _key_manager = None
 
@@ -160,57 +133,30 @@ def draw_text_with_effects(draw, pos, text, font, fill, outline_color=None, shad
     draw.text((x, y), text, font=font, fill=fill_rgb)
 
 
-def get_font(size=48, bold=False):
-    """日本語フォントを取得（日本語専用フォントを優先）"""
-    # 日本語専用フォントを最優先
-    font_paths_jp = [
-        # Linux (GitHub Actions) - Noto Sans JP (日本語専用)
-        "/usr/share/fonts/opentype/noto/NotoSansJP-Bold.otf",
-        "/usr/share/fonts/truetype/noto/NotoSansJP-Bold.ttf",
-        "/usr/share/fonts/opentype/noto/NotoSansJP-Regular.otf",
-        "/usr/share/fonts/truetype/noto/NotoSansJP-Regular.ttf",
-        # macOS - ヒラギノ（日本語専用）
-        "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
-        "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
-    ]
-
-    # 日本語専用フォントを試す
-    for path in font_paths_jp:
-        if os.path.exists(path):
-            try:
-                return ImageFont.truetype(path, size)
-            except:
-                continue
-
-    # CJKフォント（日本語インデックス=0を明示的に指定）
-    font_paths_cjk = [
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc",
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-    ]
-
-    for path in font_paths_cjk:
-        if os.path.exists(path):
-            try:
-                # インデックス0は日本語フォント
-                return ImageFont.truetype(path, size, index=0)
-            except:
-                continue
-
+# 日本語フォント候補（日本語専用フォント → CJKフォント → フォールバックの順）
+FONT_PATHS = [
+    # Linux (GitHub Actions) - Noto Sans JP (日本語専用)
+    "/usr/share/fonts/opentype/noto/NotoSansJP-Bold.otf",
+    "/usr/share/fonts/truetype/noto/NotoSansJP-Bold.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansJP-Regular.otf",
+    "/usr/share/fonts/truetype/noto/NotoSansJP-Regular.ttf",
+    # macOS - ヒラギノ（日本語専用）
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+    # CJKフォント（インデックス0は日本語フォント）
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
     # フォールバック
-    fallback_paths = [
-        "/Library/Fonts/Arial Unicode.ttf",
-        "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
-    ]
-    for path in fallback_paths:
-        if os.path.exists(path):
-            try:
-                return ImageFont.truetype(path, size)
-            except:
-                continue
+    "/Library/Fonts/Arial Unicode.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+]
+
 
-    return ImageFont.load_default()
+def get_font(size=48, bold=False):
+    """日本語フォントを取得（日本語専用フォントを優先、サイズごとにキャッシュ）"""
+    return find_font(FONT_PATHS, size, index=0)
 
 
 def create_number_card(num, rating, theme_title):
@@ -275,38 +221,12 @@ def create_number_card(num, rating, theme_title):
     return img
 
 
-def create_gradient_background(width, height):
-    """グラデーション背景を作成（黄色/ゴールド/ベージュ系）"""
-    img = Image.new('RGB', (width, height))
-    pixels = img.load()
-
-    # グラデーションカラー定義
-    colors = [
-        (255, 248, 220),  # #FFF8DC - コーンシルク
-        (255, 228, 181),  # #FFE4B5 - モカシン
-        (255, 215, 0),    # #FFD700 - ゴールド
-        (218, 165, 32),   # #DAA520 - ゴールデンロッド
-        (245, 222, 179),  # #F5DEB3 - 小麦
-    ]
-
-    for y in range(height):
-        for x in range(width):
-            # 135度グラデーション
-            t = (x + y) / (width + height)
-
-            # 5色間の補間
-            segment = t * (len(colors) - 1)
-            idx = int(segment)
-            idx = min(idx, len(colors) - 2)
-            local_t = segment - idx
-
-            r = int(colors[idx][0] * (1 - local_t) + colors[idx + 1][0] * local_t)
-            g = int(colors[idx][1] * (1 - local_t) + colors[idx + 1][1] * local_t)
-            b = int(colors[idx][2] * (1 - local_t) + colors[idx + 1][2] * local_t)
+def create_gradient_background(width, height, mode='RGB'):
+    """グラデーション背景を作成（黄色/ゴールド/ベージュ系）
 
-            pixels[x, y] = (r, g, b)
-
-    return img
+    NumPyで一括計算した背景をメモ化しているため、毎フレーム呼んでもコピーのみ
+    """
+    return get_gradient_image(width, height, RANK_BG_GRADIENT, angle=135, mode=mode)
 
 
 def create_rank_card(rank, percent, topic=""):
@@ -318,7 +238,7 @@ def create_rank_card(rank, percent, topic=""):
     - カツミ・ヒロシ下部配置
     """
     # グラデーション背景
-    img = create_gradient_background(WIDTH, HEIGHT).convert('RGBA')
+    img = create_gradient_background(WIDTH, HEIGHT, mode='RGBA')
     draw = ImageDraw.Draw(img)
 
     # カラー定義
@@ -368,23 +288,7 @@ def create_rank_card(rank, percent, topic=""):
     # バー実体（オレンジ→イエロー→グリーン グラデーション）
     bar_width = int(bar_max_width * percent / 100)
     if bar_width > 0:
-        bar_img = Image.new('RGBA', (bar_width, bar_height), (0, 0, 0, 0))
-        bar_pixels = bar_img.load()
-        for bx in range(bar_width):
-            t = bx / bar_width
-            # #FF6B00 → #FFB800 → #7FD858
-            if t < 0.5:
-                t2 = t * 2
-                r = int(255)
-                g = int(107 + (184 - 107) * t2)
-                b = int(0)
-            else:
-                t2 = (t - 0.5) * 2
-                r = int(255 - (255 - 127) * t2)
-                g = int(184 + (216 - 184) * t2)
-                b = int(0 + 88 * t2)
-            for by in range(bar_height):
-                bar_pixels[bx, by] = (r, g, b, 255)
+        bar_img = get_gradient_strip(bar_width, bar_height, RANK_BAR_GRADIENT, angle=90)
 
         # 角丸マスク
         mask = Image.new('L', (bar_width, bar_height), 0)
@@ -452,18 +356,14 @@ def create_rank_card(rank, percent, topic=""):
 
     # カツミ（左下）
     katsumi_x = 100
-    katsumi_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_path.exists():
-        katsumi_img = Image.open(katsumi_path).convert('RGBA')
-        katsumi_img = katsumi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
+    katsumi_img = load_sprite(ASSETS_DIR / "katsumi.png", char_size)
+    if katsumi_img is not None:
         img.paste(katsumi_img, (katsumi_x, char_y), katsumi_img)
 
     # ヒロシ（右下）
     hiroshi_x = WIDTH - char_size - 100
-    hiroshi_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_path.exists():
-        hiroshi_img = Image.open(hiroshi_path).convert('RGBA')
-        hiroshi_img = hiroshi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
+    hiroshi_img = load_sprite(ASSETS_DIR / "hiroshi.png", char_size)
+    if hiroshi_img is not None:
         img.paste(hiroshi_img, (hiroshi_x, char_y), hiroshi_img)
 
     return img.convert('RGB')
@@ -504,7 +404,7 @@ def create_animated_rank_card_frame(rank, percent, topic, t):
     - 1.8-2.0s: トピック表示
     - 2.0-3.0s: ホールド
     """
-    img = create_gradient_background(WIDTH, HEIGHT).convert('RGBA')
+    img = create_gradient_background(WIDTH, HEIGHT, mode='RGBA')
     draw = ImageDraw.Draw(img)
 
     text_brown = (139, 115, 85)
@@ -575,20 +475,7 @@ def create_animated_rank_card_frame(rank, percent, topic, t):
     current_percent = percent * bar_progress
     bar_width = int(bar_max_width * current_percent / 100)
     if bar_width > 5:
-        bar_img = Image.new('RGBA', (bar_width, bar_height), (0, 0, 0, 0))
-        bar_pixels = bar_img.load()
-        for bx in range(bar_width):
-            t_bar = bx / max(bar_width, 1)
-            if t_bar < 0.5:
-                t2 = t_bar * 2
-                r, g, b = 255, int(107 + 77 * t2), 0
-            else:
-                t2 = (t_bar - 0.5) * 2
-                r = int(255 - 128 * t2)
-                g = int(184 + 32 * t2)
-                b = int(88 * t2)
-            for by in range(bar_height):
-                bar_pixels[bx, by] = (r, g, b, 255)
+        bar_img = get_gradient_strip(bar_width, bar_height, RANK_BAR_GRADIENT, angle=90)
         mask = Image.new('L', (bar_width, bar_height), 0)
         mask_draw = ImageDraw.Draw(mask)
         mask_draw.rounded_rectangle([0, 0, bar_width, bar_height], radius=25, fill=255)
@@ -685,680 +572,648 @@ def create_animated_rank_card_clip(rank, percent, topic, duration=3.0, fps=30):
     return clip
 
 
-def create_animated_kuchikomi_frame(num, text, speaker, theme_title, subtitle, t, total_duration):
-    """
-    アニメーション付き口コミ読み上げ画面のフレームを生成
+def _load_character_sprite(name, size):
+    """キャラ画像をリサイズ済みで取得（キャッシュ共有、画像がなければ None）"""
+    return load_sprite(ASSETS_DIR / f"{name}.png", size)
 
-    アニメーションタイムライン:
-    - 0.0-0.2s: 待機
-    - 0.2-1.0s: タイトルバーが左(-600px)→左端(0px)へスライド
-    - 0.8s〜: 口コミテキストが1文字50msでタイピング表示
-    - 1.0-1.3s: カツミが下(-200px)→下部へバウンド
-    - 1.2-1.5s: ヒロシが下(-200px)→下部へバウンド
-    - 話し手のキャラは上下に揺れる
-    """
-    import math
 
-    img = Image.new('RGBA', (WIDTH, HEIGHT), hex_to_rgb(DESIGN["bg"]) + (255,))
-    draw = ImageDraw.Draw(img)
+def _draw_subtitle_band(draw, subtitle_y):
+    """字幕帯（下部）を描画（上端に薄い影）"""
+    for offset in range(1, 3):
+        alpha = 20 - offset * 6
+        draw.rectangle([0, subtitle_y - offset - 1, WIDTH, subtitle_y - offset],
+                       fill=(0, 0, 0, max(alpha, 0)))
+    draw.rectangle([0, subtitle_y, WIDTH, HEIGHT], fill=hex_to_rgb(DESIGN["subtitle_bg"]))
+
+
+def _animated_kuchikomi_renderer(num, text, speaker, theme_title):
+    """
+    口コミ読み上げ画面のレイヤー構成
 
+    - 静的: 背景、字幕帯
+    - 時間変化: タイトルバーのスライド、タイピング文字、キャラのバウンド
+    """
     # フォント
     title_font = get_font(DESIGN["title_size"])
     text_font = get_font(DESIGN["text_size"])
-    subtitle_font = get_font(DESIGN["subtitle_size"])
-    name_font = get_font(24)
 
     title_height = DESIGN["title_height"]
     subtitle_height = DESIGN["subtitle_height"]
+    subtitle_y = HEIGHT - subtitle_height
     char_size = 200  # キャラサイズを大きく
 
-    # === アニメーション計算 ===
-    # タイトルバー: 0.2-1.0秒でスライド
-    if t < 0.2:
-        title_offset_x = -600
-    elif t < 1.0:
-        progress = (t - 0.2) / 0.8
-        progress = ease_out_quad(progress)
-        title_offset_x = int(-600 * (1 - progress))
-    else:
-        title_offset_x = 0
-
-    # テキストタイピング: 0.8秒から開始、1文字50ms
-    typing_start = 0.8
-    chars_per_second = 20  # 1文字50ms = 20文字/秒
-    if t < typing_start:
-        visible_chars = 0
-    else:
-        visible_chars = int((t - typing_start) * chars_per_second)
-    visible_chars = min(visible_chars, len(text))
-
-    # カーソル点滅（500ms周期）
-    cursor_visible = (int(t * 4) % 2 == 0) if visible_chars < len(text) else False
-
-    # カツミ: 1.0-1.3秒でバウンド
-    katsumi_start_y = HEIGHT + 50  # 画面外下
-    katsumi_end_y = HEIGHT - subtitle_height - char_size + 20
-    if t < 1.0:
-        katsumi_y = katsumi_start_y
-    elif t < 1.3:
-        progress = (t - 1.0) / 0.3
-        progress = ease_out_back(progress)
-        katsumi_y = int(katsumi_start_y + (katsumi_end_y - katsumi_start_y) * progress)
-    else:
-        katsumi_y = katsumi_end_y
-
-    # ヒロシ: 1.2-1.5秒でバウンド
-    hiroshi_start_y = HEIGHT + 50
-    hiroshi_end_y = HEIGHT - subtitle_height - char_size + 20
-    if t < 1.2:
-        hiroshi_y = hiroshi_start_y
-    elif t < 1.5:
-        progress = (t - 1.2) / 0.3
-        progress = ease_out_back(progress)
-        hiroshi_y = int(hiroshi_start_y + (hiroshi_end_y - hiroshi_start_y) * progress)
-    else:
-        hiroshi_y = hiroshi_end_y
-
-    # 話し手キャラの揺れ → 全部なし（チャンク音声の一貫性維持）
-    speaker_wobble = 0
-
-    # === タイトルバー（上部）===
-    # 薄い影
-    for offset in range(1, 4):
-        alpha = 30 - offset * 8
-        draw.rectangle([title_offset_x, title_height + offset,
-                       WIDTH + title_offset_x, title_height + offset + 1],
-                       fill=(0, 0, 0, max(alpha, 0)))
-    draw.rectangle([title_offset_x, 0, WIDTH + title_offset_x, title_height],
-                  fill=hex_to_rgb(DESIGN["title_bg"]))
-
-    # タイトルテキスト
     header_text = f"{theme_title} - 口コミ{num}"
-    bbox = draw.textbbox((0, 0), header_text, font=title_font)
-    title_text_x = title_offset_x + (WIDTH - (bbox[2] - bbox[0])) // 2
-    title_text_y = (title_height - (bbox[3] - bbox[1])) // 2
-    if title_offset_x > -WIDTH:  # 画面内にある場合のみ描画
-        draw_text_with_effects(draw, (title_text_x, title_text_y), header_text, title_font,
-                               DESIGN["title_text"], None, shadow=True,
-                               shadow_strength=2, shadow_alpha=30)
-
-    # === 口コミテキスト（タイピング表示）===
     kuchikomi_y = title_height + 60
     max_text_width = WIDTH - 160
-
-    # 表示する文字列
-    display_text = text[:visible_chars]
-    if cursor_visible:
-        display_text += "｜"
-
-    # 折り返し処理
-    lines = wrap_text(display_text, text_font, max_text_width, draw)
     line_spacing = int(DESIGN["text_size"] * 1.5)
 
-    for i, line in enumerate(lines):
-        draw_text_with_effects(draw, (80, kuchikomi_y + i * line_spacing), line, text_font,
-                               DESIGN["text_color"], None, shadow=True,
-                               shadow_strength=1, shadow_alpha=25)
-
-    # === 字幕エリア（下部）→ 帯のみ、字幕は削除（上のトピックと重複するため）===
-    subtitle_y = HEIGHT - subtitle_height
-    for offset in range(1, 3):
-        alpha = 20 - offset * 6
-        draw.rectangle([0, subtitle_y - offset - 1, WIDTH, subtitle_y - offset],
-                       fill=(0, 0, 0, max(alpha, 0)))
-    draw.rectangle([0, subtitle_y, WIDTH, HEIGHT], fill=hex_to_rgb(DESIGN["subtitle_bg"]))
-
-    # 字幕テキストは表示しない（削除）
+    # テキストタイピング: 0.8秒から開始、1文字50ms
+    typing_start = 0.8
+    chars_per_second = 20  # 1文字50ms = 20文字/秒
 
-    # === キャラクター（新しい画像を使用）===
     katsumi_x = 30
     hiroshi_x = WIDTH - char_size - 30
-
-    # 話し手に揺れを適用
-    if speaker == "katsumi":
-        katsumi_y += speaker_wobble
-    elif speaker == "hiroshi":
-        hiroshi_y += speaker_wobble
-
-    # カツミ
-    katsumi_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_path.exists() and katsumi_y < HEIGHT:
-        katsumi_img = Image.open(katsumi_path).convert('RGBA')
-        katsumi_img = katsumi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-
-        # 話し手なら少し大きく・明るく
-        if speaker == "katsumi":
-            # 少し拡大
-            scale = 1.1
-            new_size = int(char_size * scale)
-            katsumi_img = katsumi_img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-            paste_x = katsumi_x - (new_size - char_size) // 2
-            paste_y = katsumi_y - (new_size - char_size)
+    char_start_y = HEIGHT + 50  # 画面外下
+    char_end_y = HEIGHT - subtitle_height - char_size + 20
+
+    # キャラ画像（話し手なら少し大きく）
+    sprites = {}
+    for name in ("katsumi", "hiroshi"):
+        sprite = _load_character_sprite(name, char_size)
+        if sprite is not None and speaker == name:
+            new_size = int(char_size * 1.1)
+            sprite = sprite.resize((new_size, new_size), Image.Resampling.LANCZOS)
+        sprites[name] = sprite
+
+    # 全文を1回だけ折り返し（貪欲法なので表示途中の折り返しは全文の先頭部分と一致）
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    full_lines = wrap_text(text, text_font, max_text_width, measure)
+
+    def typed_lines(visible_chars, cursor_visible):
+        lines = []
+        remaining = visible_chars
+        for line in full_lines:
+            if remaining <= 0:
+                break
+            lines.append(line[:remaining])
+            remaining -= len(line)
+        if cursor_visible:
+            if lines:
+                bbox = measure.textbbox((0, 0), lines[-1] + "｜", font=text_font)
+                if bbox[2] - bbox[0] <= max_text_width:
+                    lines[-1] += "｜"
+                    return lines
+            lines.append("｜")
+        return lines
+
+    def bounce_y(t, start):
+        if t < start:
+            return char_start_y
+        if t < start + 0.3:
+            progress = ease_out_back((t - start) / 0.3)
+            return int(char_start_y + (char_end_y - char_start_y) * progress)
+        return char_end_y
+
+    def build_base():
+        img = Image.new('RGBA', (WIDTH, HEIGHT), hex_to_rgb(DESIGN["bg"]) + (255,))
+        # === 字幕エリア（下部）→ 帯のみ、字幕は削除（上のトピックと重複するため）===
+        _draw_subtitle_band(ImageDraw.Draw(img), subtitle_y)
+        return img
+
+    def frame_state(t):
+        # タイトルバー: 0.2-1.0秒でスライド
+        if t < 0.2:
+            title_offset_x = -600
+        elif t < 1.0:
+            progress = ease_out_quad((t - 0.2) / 0.8)
+            title_offset_x = int(-600 * (1 - progress))
         else:
-            paste_x = katsumi_x
-            paste_y = katsumi_y
-
-        if paste_y + katsumi_img.height > 0:  # 画面内にある場合
-            img.paste(katsumi_img, (paste_x, paste_y), katsumi_img)
-            # 名前は表示しない（create_kuchikomi_talk_frameと統一）
-
-    # ヒロシ
-    hiroshi_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_path.exists() and hiroshi_y < HEIGHT:
-        hiroshi_img = Image.open(hiroshi_path).convert('RGBA')
-        hiroshi_img = hiroshi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-
-        if speaker == "hiroshi":
-            scale = 1.1
-            new_size = int(char_size * scale)
-            hiroshi_img = hiroshi_img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-            paste_x = hiroshi_x - (new_size - char_size) // 2
-            paste_y = hiroshi_y - (new_size - char_size)
+            title_offset_x = 0
+
+        if t < typing_start:
+            visible_chars = 0
         else:
-            paste_x = hiroshi_x
-            paste_y = hiroshi_y
+            visible_chars = int((t - typing_start) * chars_per_second)
+        visible_chars = min(visible_chars, len(text))
+
+        # カーソル点滅（500ms周期）
+        cursor_visible = (int(t * 4) % 2 == 0) if visible_chars < len(text) else False
+
+        # カツミ: 1.0-1.3秒、ヒロシ: 1.2-1.5秒でバウンド
+        # 話し手キャラの揺れ → 全部なし（チャンク音声の一貫性維持）
+        return (title_offset_x, visible_chars, cursor_visible,
+                bounce_y(t, 1.0), bounce_y(t, 1.2))
+
+    def paint_dynamic(img, draw, state):
+        title_offset_x, visible_chars, cursor_visible, katsumi_y, hiroshi_y = state
+
+        # === タイトルバー（上部）===
+        # 薄い影
+        for offset in range(1, 4):
+            alpha = 30 - offset * 8
+            draw.rectangle([title_offset_x, title_height + offset,
+                           WIDTH + title_offset_x, title_height + offset + 1],
+                           fill=(0, 0, 0, max(alpha, 0)))
+        draw.rectangle([title_offset_x, 0, WIDTH + title_offset_x, title_height],
+                      fill=hex_to_rgb(DESIGN["title_bg"]))
+
+        # タイトルテキスト
+        bbox = draw.textbbox((0, 0), header_text, font=title_font)
+        title_text_x = title_offset_x + (WIDTH - (bbox[2] - bbox[0])) // 2
+        title_text_y = (title_height - (bbox[3] - bbox[1])) // 2
+        if title_offset_x > -WIDTH:  # 画面内にある場合のみ描画
+            draw_text_with_effects(draw, (title_text_x, title_text_y), header_text, title_font,
+                                   DESIGN["title_text"], None, shadow=True,
+                                   shadow_strength=2, shadow_alpha=30)
+
+        # === 口コミテキスト（タイピング表示）===
+        for i, line in enumerate(typed_lines(visible_chars, cursor_visible)):
+            draw_text_with_effects(draw, (80, kuchikomi_y + i * line_spacing), line, text_font,
+                                   DESIGN["text_color"], None, shadow=True,
+                                   shadow_strength=1, shadow_alpha=25)
 
-        if paste_y + hiroshi_img.height > 0:
-            img.paste(hiroshi_img, (paste_x, paste_y), hiroshi_img)
-            # 名前は表示しない（create_kuchikomi_talk_frameと統一）
+        # 字幕帯はテキストより手前（長文がはみ出しても帯が上に来る）
+        renderer.restore(img, (0, subtitle_y - 3, WIDTH, HEIGHT))
 
-    return img.convert('RGB')
+        # === キャラクター ===
+        for name, x, y in (("katsumi", katsumi_x, katsumi_y), ("hiroshi", hiroshi_x, hiroshi_y)):
+            sprite = sprites[name]
+            if sprite is None or y >= HEIGHT:
+                continue
+            paste_x = x - (sprite.width - char_size) // 2
+            paste_y = y - (sprite.height - char_size)
+            if paste_y + sprite.height > 0:  # 画面内にある場合
+                img.paste(sprite, (paste_x, paste_y), sprite)
+                # 名前は表示しない（create_kuchikomi_talk_frameと統一）
+
+    renderer = LayeredFrameRenderer(build_base, paint_dynamic, frame_state)
+    return renderer
+
+
+def create_animated_kuchikomi_frame(num, text, speaker, theme_title, subtitle, t, total_duration):
+    """
+    アニメーション付き口コミ読み上げ画面のフレームを生成
+
+    アニメーションタイムライン:
+    - 0.0-0.2s: 待機
+    - 0.2-1.0s: タイトルバーが左(-600px)→左端(0px)へスライド
+    - 0.8s〜: 口コミテキストが1文字50msでタイピング表示
+    - 1.0-1.3s: カツミが下(-200px)→下部へバウンド
+    - 1.2-1.5s: ヒロシが下(-200px)→下部へバウンド
+    - 話し手のキャラは上下に揺れる
+    """
+    return _animated_kuchikomi_renderer(num, text, speaker, theme_title).render(t)
 
 
 def create_animated_kuchikomi_clip(num, text, speaker, theme_title, subtitle, duration, fps=24):
-    """アニメーション付き口コミ読み上げ画面のVideoClipを生成"""
-    import numpy as np
+    """アニメーション付き口コミ読み上げ画面のVideoClipを生成（静的レイヤーは1回だけ描画）"""
     from moviepy import VideoClip
 
-    def make_frame(t):
-        img = create_animated_kuchikomi_frame(num, text, speaker, theme_title, subtitle, t, duration)
-        return np.array(img)
-
-    clip = VideoClip(make_frame, duration=duration)
+    renderer = _animated_kuchikomi_renderer(num, text, speaker, theme_title)
+    clip = VideoClip(renderer.make_frame, duration=duration)
     return clip
 
 
-def create_kuchikomi_talk_frame(num, kuchikomi_text, theme_title, speaker, talk_subtitle, t):
+def _kuchikomi_talk_renderer(num, kuchikomi_text, theme_title, speaker, talk_subtitle):
     """
-    口コミ画面ベースのトーク画面（画面切り替えなし）
-    - 背景: 口コミ読み上げ画面と同じ
-    - 口コミテキストは表示したまま
-    - 下部に字幕帯を追加してトークを表示
-    - キャラクターは字幕帯の左右に配置
+    口コミ画面ベースのトーク画面のレイヤー構成
+
+    - 静的: 背景、タイトルバー、口コミ全文、字幕帯＋トーク字幕、聞き手キャラ
+    - 時間変化: 話し手キャラの揺れ
     """
     import math
 
-    img = Image.new('RGBA', (WIDTH, HEIGHT), hex_to_rgb(DESIGN["bg"]) + (255,))
-    draw = ImageDraw.Draw(img)
-
-    # フォント
-    title_font = get_font(DESIGN["title_size"])
-    text_font = get_font(DESIGN["text_size"])
-    subtitle_font = get_font(DESIGN["subtitle_size"])
-    name_font = get_font(24)
-
     title_height = DESIGN["title_height"]
     subtitle_height = DESIGN["subtitle_height"]
+    subtitle_y = HEIGHT - subtitle_height
     char_size = 200
 
-    # === タイトルバー（上部）===
-    for offset in range(1, 4):
-        alpha = 30 - offset * 8
-        draw.rectangle([0, title_height + offset, WIDTH, title_height + offset + 1],
-                       fill=(0, 0, 0, max(alpha, 0)))
-    draw.rectangle([0, 0, WIDTH, title_height], fill=hex_to_rgb(DESIGN["title_bg"]))
+    # === キャラクター（create_animated_kuchikomi_frameと同じ位置に統一）===
+    # 固定位置（口コミ読み上げ画面と同じ）
+    katsumi_x = 30
+    hiroshi_x = WIDTH - char_size - 30
+    char_y = HEIGHT - subtitle_height - char_size + 20
 
-    # タイトルテキスト
-    header_text = f"{theme_title} - 口コミ{num}"
-    bbox = draw.textbbox((0, 0), header_text, font=title_font)
-    title_text_x = (WIDTH - (bbox[2] - bbox[0])) // 2
-    title_text_y = (title_height - (bbox[3] - bbox[1])) // 2
-    draw_text_with_effects(draw, (title_text_x, title_text_y), header_text, title_font,
-                           DESIGN["title_text"], None, shadow=True,
-                           shadow_strength=2, shadow_alpha=30)
+    # 話し手なら少し大きく＋揺れる
+    speaker_size = int(char_size * 1.1)
+    positions = {"katsumi": katsumi_x, "hiroshi": hiroshi_x}
+    sprites = {
+        name: _load_character_sprite(name, speaker_size if speaker == name else char_size)
+        for name in positions
+    }
 
-    # === 口コミテキスト（全文表示、静的）===
-    kuchikomi_y = title_height + 60
-    max_text_width = WIDTH - 160
+    def build_base():
+        img = Image.new('RGBA', (WIDTH, HEIGHT), hex_to_rgb(DESIGN["bg"]) + (255,))
+        draw = ImageDraw.Draw(img)
+
+        # フォント
+        title_font = get_font(DESIGN["title_size"])
+        text_font = get_font(DESIGN["text_size"])
+
+        # === タイトルバー（上部）===
+        for offset in range(1, 4):
+            alpha = 30 - offset * 8
+            draw.rectangle([0, title_height + offset, WIDTH, title_height + offset + 1],
+                           fill=(0, 0, 0, max(alpha, 0)))
+        draw.rectangle([0, 0, WIDTH, title_height], fill=hex_to_rgb(DESIGN["title_bg"]))
+
+        # タイトルテキスト
+        header_text = f"{theme_title} - 口コミ{num}"
+        bbox = draw.textbbox((0, 0), header_text, font=title_font)
+        title_text_x = (WIDTH - (bbox[2] - bbox[0])) // 2
+        title_text_y = (title_height - (bbox[3] - bbox[1])) // 2
+        draw_text_with_effects(draw, (title_text_x, title_text_y), header_text, title_font,
+                               DESIGN["title_text"], None, shadow=True,
+                               shadow_strength=2, shadow_alpha=30)
 
-    lines = wrap_text(kuchikomi_text, text_font, max_text_width, draw)
-    line_spacing = int(DESIGN["text_size"] * 1.5)
+        # === 口コミテキスト（全文表示、静的）===
+        kuchikomi_y = title_height + 60
+        max_text_width = WIDTH - 160
 
-    for i, line in enumerate(lines):
-        draw_text_with_effects(draw, (80, kuchikomi_y + i * line_spacing), line, text_font,
-                               DESIGN["text_color"], None, shadow=True,
-                               shadow_strength=1, shadow_alpha=25)
+        lines = wrap_text(kuchikomi_text, text_font, max_text_width, draw)
+        line_spacing = int(DESIGN["text_size"] * 1.5)
 
-    # === 字幕エリア（下部）===
-    subtitle_y = HEIGHT - subtitle_height
-    for offset in range(1, 3):
-        alpha = 20 - offset * 6
-        draw.rectangle([0, subtitle_y - offset - 1, WIDTH, subtitle_y - offset],
-                       fill=(0, 0, 0, max(alpha, 0)))
-    draw.rectangle([0, subtitle_y, WIDTH, HEIGHT], fill=hex_to_rgb(DESIGN["subtitle_bg"]))
-
-    # === トーク字幕を表示 ===
-    if talk_subtitle:
-        talk_font = get_font(48)
-        speaker_name = "カツミ" if speaker == "katsumi" else "ヒロシ"
+        for i, line in enumerate(lines):
+            draw_text_with_effects(draw, (80, kuchikomi_y + i * line_spacing), line, text_font,
+                                   DESIGN["text_color"], None, shadow=True,
+                                   shadow_strength=1, shadow_alpha=25)
 
-        # 話者名の色
-        name_color = (233, 30, 99) if speaker == "katsumi" else (33, 150, 243)  # カツミ=ピンク、ヒロシ=水色
-        body_color = (255, 255, 255)  # 本文は白
+        # === 字幕エリア（下部）===
+        _draw_subtitle_band(draw, subtitle_y)
 
-        # 折り返し処理（キャラ分の余白を確保）
-        sub_max_width = WIDTH - char_size * 2 - 100
-        full_text = f"{speaker_name}：{talk_subtitle}"
-        sub_lines = wrap_text(full_text, talk_font, sub_max_width, draw)
-        total_sub_height = len(sub_lines) * int(48 * 1.3)
-        sub_start_y = subtitle_y + (subtitle_height - total_sub_height) // 2
-
-        for i, line in enumerate(sub_lines):
-            sub_x = 50
-            sub_y = sub_start_y + i * int(48 * 1.3)
-
-            # 最初の行は話者名と本文を分けて描画
-            if i == 0 and "：" in line:
-                parts = line.split("：", 1)
-                # 話者名部分（影付き）
-                for offset in range(1, 2):
-                    draw.text((sub_x + offset, sub_y + offset), parts[0] + "：", font=talk_font, fill=(0, 0, 0, 25))
-                draw.text((sub_x, sub_y), parts[0] + "：", fill=name_color, font=talk_font)
-
-                # 本文部分の開始位置を計算
-                name_bbox = draw.textbbox((0, 0), parts[0] + "：", font=talk_font)
-                body_x = sub_x + (name_bbox[2] - name_bbox[0])
-
-                # 本文部分（影付き）
-                for offset in range(1, 2):
-                    draw.text((body_x + offset, sub_y + offset), parts[1], font=talk_font, fill=(0, 0, 0, 25))
-                draw.text((body_x, sub_y), parts[1], fill=body_color, font=talk_font)
-            else:
-                # 2行目以降は本文のみ（白）
-                for offset in range(1, 2):
-                    draw.text((sub_x + offset, sub_y + offset), line, font=talk_font, fill=(0, 0, 0, 25))
-                draw.text((sub_x, sub_y), line, fill=body_color, font=talk_font)
+        # === トーク字幕を表示 ===
+        if talk_subtitle:
+            talk_font = get_font(48)
+            speaker_name = "カツミ" if speaker == "katsumi" else "ヒロシ"
 
-    # === キャラクター（create_animated_kuchikomi_frameと同じ位置に統一）===
-    # 固定位置（口コミ読み上げ画面と同じ）
-    katsumi_x = 30
-    hiroshi_x = WIDTH - char_size - 30
-    char_y = HEIGHT - subtitle_height - char_size + 20
+            # 話者名の色
+            name_color = (233, 30, 99) if speaker == "katsumi" else (33, 150, 243)  # カツミ=ピンク、ヒロシ=水色
+            body_color = (255, 255, 255)  # 本文は白
+
+            # 折り返し処理（キャラ分の余白を確保）
+            sub_max_width = WIDTH - char_size * 2 - 100
+            full_text = f"{speaker_name}：{talk_subtitle}"
+            sub_lines = wrap_text(full_text, talk_font, sub_max_width, draw)
+            total_sub_height = len(sub_lines) * int(48 * 1.3)
+            sub_start_y = subtitle_y + (subtitle_height - total_sub_height) // 2
+
+            for i, line in enumerate(sub_lines):
+                sub_x = 50
+                sub_y = sub_start_y + i * int(48 * 1.3)
+
+                # 最初の行は話者名と本文を分けて描画
+                if i == 0 and "：" in line:
+                    parts = line.split("：", 1)
+                    # 話者名部分（影付き）
+                    for offset in range(1, 2):
+                        draw.text((sub_x + offset, sub_y + offset), parts[0] + "：", font=talk_font, fill=(0, 0, 0, 25))
+                    draw.text((sub_x, sub_y), parts[0] + "：", fill=name_color, font=talk_font)
+
+                    # 本文部分の開始位置を計算
+                    name_bbox = draw.textbbox((0, 0), parts[0] + "：", font=talk_font)
+                    body_x = sub_x + (name_bbox[2] - name_bbox[0])
+
+                    # 本文部分（影付き）
+                    for offset in range(1, 2):
+                        draw.text((body_x + offset, sub_y + offset), parts[1], font=talk_font, fill=(0, 0, 0, 25))
+                    draw.text((body_x, sub_y), parts[1], fill=body_color, font=talk_font)
+                else:
+                    # 2行目以降は本文のみ（白）
+                    for offset in range(1, 2):
+                        draw.text((sub_x + offset, sub_y + offset), line, font=talk_font, fill=(0, 0, 0, 25))
+                    draw.text((sub_x, sub_y), line, fill=body_color, font=talk_font)
+
+        # 聞き手キャラ（動かない）
+        for name, x in positions.items():
+            sprite = sprites[name]
+            if sprite is not None and name != speaker:
+                img.paste(sprite, (x, char_y), sprite)
+        return img
+
+    def frame_state(t):
+        # 話し手の揺れアニメーション（軽い上下動き）
+        return int(math.sin(t * 8) * 5)  # 8Hzで±5px揺れ
+
+    def paint_dynamic(img, draw, speaker_wobble):
+        sprite = sprites.get(speaker)
+        if sprite is None:
+            return
+        paste_x = positions[speaker] - (sprite.width - char_size) // 2
+        paste_y = char_y - (sprite.height - char_size) + speaker_wobble
+        img.paste(sprite, (paste_x, paste_y), sprite)
+
+    if speaker not in positions:
+        return LayeredFrameRenderer(build_base)
+    return LayeredFrameRenderer(build_base, paint_dynamic, frame_state)
 
-    # 話し手の揺れアニメーション（軽い上下動き）
-    speaker_wobble = int(math.sin(t * 8) * 5)  # 8Hzで±5px揺れ
-
-    # カツミ（左）
-    katsumi_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_path.exists():
-        katsumi_img = Image.open(katsumi_path).convert('RGBA')
-        # 話し手なら少し大きく＋揺れる
-        if speaker == "katsumi":
-            scale = 1.1
-            new_size = int(char_size * scale)
-            katsumi_img = katsumi_img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-            paste_x = katsumi_x - (new_size - char_size) // 2
-            paste_y = char_y - (new_size - char_size) + speaker_wobble
-        else:
-            katsumi_img = katsumi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-            paste_x = katsumi_x
-            paste_y = char_y
-        img.paste(katsumi_img, (paste_x, paste_y), katsumi_img)
-
-    # ヒロシ（右）
-    hiroshi_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_path.exists():
-        hiroshi_img = Image.open(hiroshi_path).convert('RGBA')
-        if speaker == "hiroshi":
-            scale = 1.1
-            new_size = int(char_size * scale)
-            hiroshi_img = hiroshi_img.resize((new_size, new_size), Image.Resampling.LANCZOS)
-            paste_x = hiroshi_x - (new_size - char_size) // 2
-            paste_y = char_y - (new_size - char_size) + speaker_wobble
-        else:
-            hiroshi_img = hiroshi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-            paste_x = hiroshi_x
-            paste_y = char_y
-        img.paste(hiroshi_img, (paste_x, paste_y), hiroshi_img)
 
-    return img.convert('RGB')
+def create_kuchikomi_talk_frame(num, kuchikomi_text, theme_title, speaker, talk_subtitle, t):
+    """
+    口コミ画面ベースのトーク画面（画面切り替えなし）
+    - 背景: 口コミ読み上げ画面と同じ
+    - 口コミテキストは表示したまま
+    - 下部に字幕帯を追加してトークを表示
+    - キャラクターは字幕帯の左右に配置
+    """
+    return _kuchikomi_talk_renderer(num, kuchikomi_text, theme_title, speaker, talk_subtitle).render(t)
 
 
 def create_kuchikomi_talk_clip(num, kuchikomi_text, theme_title, speaker, talk_subtitle, duration, fps=24):
-    """口コミ画面ベースのトーク画面のVideoClipを生成"""
-    import numpy as np
+    """口コミ画面ベースのトーク画面のVideoClipを生成（静的レイヤーは1回だけ描画）"""
     from moviepy import VideoClip
 
-    def make_frame(t):
-        img = create_kuchikomi_talk_frame(num, kuchikomi_text, theme_title, speaker, talk_subtitle, t)
-        return np.array(img)
-
-    clip = VideoClip(make_frame, duration=duration)
+    renderer = _kuchikomi_talk_renderer(num, kuchikomi_text, theme_title, speaker, talk_subtitle)
+    clip = VideoClip(renderer.make_frame, duration=duration)
     return clip
 
 
-def create_greenroom_frame(speaker, speech_text, theme_title, t, total_duration):
+def _greenroom_renderer(speaker, speech_text, theme_title):
     """
-    控室トーク画面（オフレコ雰囲気）のフレームを生成
+    控室トーク画面のレイヤー構成
 
-    アニメーション:
-    - 0-0.3s: フェードイン
-    - 話し手キャラが上下に揺れる
+    - 静的: 背景、タイトル、聞き手キャラ＋名前
+    - 時間変化: 話し手キャラ＋名前＋吹き出しの揺れ、フェードイン
     """
     import math
 
     # 暗めのベージュ/セピア系背景
     bg_color = (221, 213, 199)  # #DDD5C7
-    img = Image.new('RGBA', (WIDTH, HEIGHT), bg_color + (255,))
-    draw = ImageDraw.Draw(img)
-
-    # フェードイン計算
-    if t < 0.3:
-        fade_alpha = t / 0.3
-    else:
-        fade_alpha = 1.0
-
-    # 話し手の揺れ
-    speaker_wobble = int(math.sin(t * 6) * 10) if t > 0.3 else 0
 
     # フォント
     title_font = get_font(36)
     speech_font = get_font(42)
     name_font = get_font(28)
 
-    # === 上部タイトル（控えめ）===
-    title_text = f"【控室トーク】{theme_title}"
-    bbox = draw.textbbox((0, 0), title_text, font=title_font)
-    title_x = (WIDTH - (bbox[2] - bbox[0])) // 2
-    title_y = 30
-    draw.text((title_x, title_y), title_text, fill=(100, 90, 80), font=title_font)
-
     # === キャラクター配置（中央寄り、大きめ）===
     char_size = 280
-
-    # カツミ位置（左寄り）
-    katsumi_x = WIDTH // 2 - char_size - 100
-    katsumi_y = HEIGHT // 2 - char_size // 2 + 50
-
-    # ヒロシ位置（右寄り）
-    hiroshi_x = WIDTH // 2 + 100
-    hiroshi_y = HEIGHT // 2 - char_size // 2 + 50
-
-    # 話し手の揺れを適用
-    if speaker == "katsumi":
-        katsumi_y += speaker_wobble
-    else:
-        hiroshi_y += speaker_wobble
-
-    # カツミを描画
-    katsumi_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_path.exists():
-        katsumi_img = Image.open(katsumi_path).convert('RGBA')
-        katsumi_img = katsumi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-        img.paste(katsumi_img, (katsumi_x, katsumi_y), katsumi_img)
-        # 名前
-        name_bbox = draw.textbbox((0, 0), "カツミ", font=name_font)
-        name_x = katsumi_x + (char_size - (name_bbox[2] - name_bbox[0])) // 2
-        draw.text((name_x, katsumi_y + char_size + 10), "カツミ", fill=(80, 70, 60), font=name_font)
-
-    # ヒロシを描画
-    hiroshi_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_path.exists():
-        hiroshi_img = Image.open(hiroshi_path).convert('RGBA')
-        hiroshi_img = hiroshi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-        img.paste(hiroshi_img, (hiroshi_x, hiroshi_y), hiroshi_img)
-        # 名前
-        name_bbox = draw.textbbox((0, 0), "ヒロシ", font=name_font)
-        name_x = hiroshi_x + (char_size - (name_bbox[2] - name_bbox[0])) // 2
-        draw.text((name_x, hiroshi_y + char_size + 10), "ヒロシ", fill=(80, 70, 60), font=name_font)
+    char_y = HEIGHT // 2 - char_size // 2 + 50
+    characters = [
+        ("katsumi", "カツミ", WIDTH // 2 - char_size - 100),  # 左寄り
+        ("hiroshi", "ヒロシ", WIDTH // 2 + 100),              # 右寄り
+    ]
+    sprites = {name: _load_character_sprite(name, char_size) for name, _, _ in characters}
+    talker = "katsumi" if speaker == "katsumi" else "hiroshi"
 
     # === 吹き出し（話し手側に表示）===
     bubble_width = 500
     bubble_height = 150
     bubble_radius = 20
 
-    if speaker == "katsumi":
-        # カツミの上に吹き出し
-        bubble_x = katsumi_x + char_size // 2 - bubble_width // 2
-        bubble_y = katsumi_y - bubble_height - 30
-    else:
-        # ヒロシの上に吹き出し
-        bubble_x = hiroshi_x + char_size // 2 - bubble_width // 2
-        bubble_y = hiroshi_y - bubble_height - 30
-
-    # 吹き出し背景（白、角丸）
-    draw.rounded_rectangle(
-        [bubble_x, bubble_y, bubble_x + bubble_width, bubble_y + bubble_height],
-        radius=bubble_radius,
-        fill=(255, 255, 255),
-        outline=(180, 170, 160),
-        width=2
-    )
-
-    # 吹き出しの尻尾（三角形）
-    tail_x = bubble_x + bubble_width // 2
-    tail_y = bubble_y + bubble_height
-    draw.polygon([
-        (tail_x - 15, tail_y),
-        (tail_x + 15, tail_y),
-        (tail_x, tail_y + 20)
-    ], fill=(255, 255, 255), outline=(180, 170, 160))
-    # 尻尾の内側を白で塗りつぶし（境界線を消す）
-    draw.polygon([
-        (tail_x - 12, tail_y),
-        (tail_x + 12, tail_y),
-        (tail_x, tail_y + 15)
-    ], fill=(255, 255, 255))
-
     # セリフテキスト（折り返し対応）
-    lines = wrap_text(speech_text, speech_font, bubble_width - 40, draw)
-    total_text_height = len(lines) * 50
-    text_start_y = bubble_y + (bubble_height - total_text_height) // 2
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    speech_lines = wrap_text(speech_text, speech_font, bubble_width - 40, measure)
+
+    def draw_character(img, draw, name, label, x, y):
+        sprite = sprites[name]
+        if sprite is None:
+            return
+        img.paste(sprite, (x, y), sprite)
+        # 名前
+        name_bbox = draw.textbbox((0, 0), label, font=name_font)
+        name_x = x + (char_size - (name_bbox[2] - name_bbox[0])) // 2
+        draw.text((name_x, y + char_size + 10), label, fill=(80, 70, 60), font=name_font)
+
+    def build_base():
+        img = Image.new('RGBA', (WIDTH, HEIGHT), bg_color + (255,))
+        draw = ImageDraw.Draw(img)
+
+        # === 上部タイトル（控えめ）===
+        title_text = f"【控室トーク】{theme_title}"
+        bbox = draw.textbbox((0, 0), title_text, font=title_font)
+        title_x = (WIDTH - (bbox[2] - bbox[0])) // 2
+        title_y = 30
+        draw.text((title_x, title_y), title_text, fill=(100, 90, 80), font=title_font)
+
+        # 聞き手キャラ（動かない）
+        for name, label, x in characters:
+            if name != talker:
+                draw_character(img, draw, name, label, x, char_y)
+        return img
+
+    def frame_state(t):
+        # 話し手の揺れ
+        speaker_wobble = int(math.sin(t * 6) * 10) if t > 0.3 else 0
+        # フェードイン（0-0.3s）: 黒オーバーレイの不透明度
+        fade_overlay = int(255 * (1 - t / 0.3)) if t < 0.3 else None
+        return speaker_wobble, fade_overlay
+
+    def paint_dynamic(img, draw, state):
+        speaker_wobble, fade_overlay = state
+
+        # 話し手キャラ（揺れを適用）
+        for name, label, x in characters:
+            if name == talker:
+                talker_x = x
+                talker_y = char_y + speaker_wobble
+                draw_character(img, draw, name, label, talker_x, talker_y)
+
+        # 話し手の上に吹き出し
+        bubble_x = talker_x + char_size // 2 - bubble_width // 2
+        bubble_y = talker_y - bubble_height - 30
+
+        # 吹き出し背景（白、角丸）
+        draw.rounded_rectangle(
+            [bubble_x, bubble_y, bubble_x + bubble_width, bubble_y + bubble_height],
+            radius=bubble_radius,
+            fill=(255, 255, 255),
+            outline=(180, 170, 160),
+            width=2
+        )
 
-    for i, line in enumerate(lines):
-        bbox = draw.textbbox((0, 0), line, font=speech_font)
-        text_x = bubble_x + (bubble_width - (bbox[2] - bbox[0])) // 2
-        text_y = text_start_y + i * 50
-        draw.text((text_x, text_y), line, fill=(60, 50, 40), font=speech_font)
+        # 吹き出しの尻尾（三角形）
+        tail_x = bubble_x + bubble_width // 2
+        tail_y = bubble_y + bubble_height
+        draw.polygon([
+            (tail_x - 15, tail_y),
+            (tail_x + 15, tail_y),
+            (tail_x, tail_y + 20)
+        ], fill=(255, 255, 255), outline=(180, 170, 160))
+        # 尻尾の内側を白で塗りつぶし（境界線を消す）
+        draw.polygon([
+            (tail_x - 12, tail_y),
+            (tail_x + 12, tail_y),
+            (tail_x, tail_y + 15)
+        ], fill=(255, 255, 255))
+
+        total_text_height = len(speech_lines) * 50
+        text_start_y = bubble_y + (bubble_height - total_text_height) // 2
+
+        for i, line in enumerate(speech_lines):
+            bbox = draw.textbbox((0, 0), line, font=speech_font)
+            text_x = bubble_x + (bubble_width - (bbox[2] - bbox[0])) // 2
+            text_y = text_start_y + i * 50
+            draw.text((text_x, text_y), line, fill=(60, 50, 40), font=speech_font)
+
+        # === フェードイン処理 ===
+        if fade_overlay is not None:
+            # 半透明の黒オーバーレイでフェード効果
+            overlay = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, fade_overlay))
+            img.alpha_composite(overlay)
+
+    return LayeredFrameRenderer(build_base, paint_dynamic, frame_state)
 
-    # === フェードイン処理 ===
-    if fade_alpha < 1.0:
-        # 半透明の黒オーバーレイでフェード効果
-        overlay = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, int(255 * (1 - fade_alpha))))
-        img = Image.alpha_composite(img, overlay)
 
-    return img.convert('RGB')
+def create_greenroom_frame(speaker, speech_text, theme_title, t, total_duration):
+    """
+    控室トーク画面（オフレコ雰囲気）のフレームを生成
+
+    アニメーション:
+    - 0-0.3s: フェードイン
+    - 話し手キャラが上下に揺れる
+    """
+    return _greenroom_renderer(speaker, speech_text, theme_title).render(t)
 
 
 def create_greenroom_clip(speaker, speech_text, theme_title, duration, fps=24):
-    """控室トーク画面のVideoClipを生成"""
-    import numpy as np
+    """控室トーク画面のVideoClipを生成（静的レイヤーは1回だけ描画）"""
     from moviepy import VideoClip
 
-    def make_frame(t):
-        img = create_greenroom_frame(speaker, speech_text, theme_title, t, duration)
-        return np.array(img)
-
-    clip = VideoClip(make_frame, duration=duration)
+    renderer = _greenroom_renderer(speaker, speech_text, theme_title)
+    clip = VideoClip(renderer.make_frame, duration=duration)
     return clip
 
 
-def create_talk_with_topic_frame(rank, percent, topic, speaker, subtitle_text, t):
-    """
-    トピック背景＋字幕でトークを表示するフレームを生成
-    - 背景: ランキングカード（静的）
-    - 字幕: 下部に表示
-    - キャラ: 喋ってる方だけ揺れる
+def _talk_with_topic_renderer(rank, percent, topic, speaker, subtitle_text):
     """
-    import math
-
-    img = create_gradient_background(WIDTH, HEIGHT).convert('RGBA')
-    draw = ImageDraw.Draw(img)
-
-    text_brown = (139, 115, 85)
-    orange_red = (255, 107, 53)
-
-    # === 静的な背景（完成状態のランキングカード）===
-    # 第X位
-    title_font = get_font(150)
-    title_text = f"第{rank}位"
-    bbox = draw.textbbox((0, 0), title_text, font=title_font)
-    title_w = bbox[2] - bbox[0]
-    title_x = (WIDTH - title_w) // 2
-    title_y = 50
-
-    for ox, oy, color in [(10, 10, (0, 0, 0)), (6, 6, (205, 133, 63)), (3, 3, (255, 215, 0))]:
-        draw.text((title_x + ox, title_y + oy), title_text, fill=color, font=title_font)
-    draw.text((title_x, title_y), title_text, fill=text_brown, font=title_font)
-
-    # 支持率ラベル
-    label_font = get_font(28)
-    label_text = "支持率"
-    label_bbox = draw.textbbox((0, 0), label_text, font=label_font)
-    label_x = (WIDTH - (label_bbox[2] - label_bbox[0])) // 2
-    label_y = 250
-    draw.text((label_x, label_y), label_text, fill=text_brown, font=label_font)
+    トピック背景＋字幕トーク画面のレイヤー構成
 
-    # グラフバー（100%表示）
-    bar_max_width = int(WIDTH * 0.8)
-    bar_height = 50
-    bar_x = (WIDTH - bar_max_width) // 2
-    bar_y = 300
-
-    draw.rounded_rectangle([bar_x, bar_y, bar_x + bar_max_width, bar_y + bar_height],
-                          radius=25, fill=(200, 200, 200, 100))
+    時間で変化する要素がないため、全体を静的レイヤーとして1回だけ描画
+    """
+    def build_base():
+        img = create_gradient_background(WIDTH, HEIGHT, mode='RGBA')
+        draw = ImageDraw.Draw(img)
+
+        text_brown = (139, 115, 85)
+        orange_red = (255, 107, 53)
+
+        # === 静的な背景（完成状態のランキングカード）===
+        # 第X位
+        title_font = get_font(150)
+        title_text = f"第{rank}位"
+        bbox = draw.textbbox((0, 0), title_text, font=title_font)
+        title_w = bbox[2] - bbox[0]
+        title_x = (WIDTH - title_w) // 2
+        title_y = 50
+
+        for ox, oy, color in [(10, 10, (0, 0, 0)), (6, 6, (205, 133, 63)), (3, 3, (255, 215, 0))]:
+            draw.text((title_x + ox, title_y + oy), title_text, fill=color, font=title_font)
+        draw.text((title_x, title_y), title_text, fill=text_brown, font=title_font)
+
+        # 支持率ラベル
+        label_font = get_font(28)
+        label_text = "支持率"
+        label_bbox = draw.textbbox((0, 0), label_text, font=label_font)
+        label_x = (WIDTH - (label_bbox[2] - label_bbox[0])) // 2
+        label_y = 250
+        draw.text((label_x, label_y), label_text, fill=text_brown, font=label_font)
 
-    bar_width = int(bar_max_width * percent / 100)
-    if bar_width > 5:
-        bar_img = Image.new('RGBA', (bar_width, bar_height), (0, 0, 0, 0))
-        bar_pixels = bar_img.load()
-        for bx in range(bar_width):
-            t_bar = bx / max(bar_width, 1)
-            if t_bar < 0.5:
-                t2 = t_bar * 2
-                r, g, b = 255, int(107 + 77 * t2), 0
-            else:
-                t2 = (t_bar - 0.5) * 2
-                r = int(255 - 128 * t2)
-                g = int(184 + 32 * t2)
-                b = int(88 * t2)
-            for by in range(bar_height):
-                bar_pixels[bx, by] = (r, g, b, 255)
-        mask = Image.new('L', (bar_width, bar_height), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.rounded_rectangle([0, 0, bar_width, bar_height], radius=25, fill=255)
-        bar_img.putalpha(mask)
-        img.paste(bar_img, (bar_x, bar_y), bar_img)
+        # グラフバー（100%表示）
+        bar_max_width = int(WIDTH * 0.8)
+        bar_height = 50
+        bar_x = (WIDTH - bar_max_width) // 2
+        bar_y = 300
+
+        draw.rounded_rectangle([bar_x, bar_y, bar_x + bar_max_width, bar_y + bar_height],
+                              radius=25, fill=(200, 200, 200, 100))
+
+        bar_width = int(bar_max_width * percent / 100)
+        if bar_width > 5:
+            bar_img = get_gradient_strip(bar_width, bar_height, RANK_BAR_GRADIENT, angle=90)
+            mask = Image.new('L', (bar_width, bar_height), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            mask_draw.rounded_rectangle([0, 0, bar_width, bar_height], radius=25, fill=255)
+            bar_img.putalpha(mask)
+            img.paste(bar_img, (bar_x, bar_y), bar_img)
+
+        # パーセント
+        percent_font = get_font(100)
+        percent_text = f"{percent}%"
+        percent_bbox = draw.textbbox((0, 0), percent_text, font=percent_font)
+        percent_x = (WIDTH - (percent_bbox[2] - percent_bbox[0])) // 2
+        percent_y = bar_y + bar_height + 20
 
-    # パーセント
-    percent_font = get_font(100)
-    percent_text = f"{percent}%"
-    percent_bbox = draw.textbbox((0, 0), percent_text, font=percent_font)
-    percent_x = (WIDTH - (percent_bbox[2] - percent_bbox[0])) // 2
-    percent_y = bar_y + bar_height + 20
+        for ox in range(-3, 4):
+            for oy in range(-3, 4):
+                if ox != 0 or oy != 0:
+                    draw.text((percent_x + ox, percent_y + oy), percent_text, fill=(255, 255, 255), font=percent_font)
+        draw.text((percent_x, percent_y), percent_text, fill=orange_red, font=percent_font)
 
-    for ox in range(-3, 4):
-        for oy in range(-3, 4):
-            if ox != 0 or oy != 0:
-                draw.text((percent_x + ox, percent_y + oy), percent_text, fill=(255, 255, 255), font=percent_font)
-    draw.text((percent_x, percent_y), percent_text, fill=orange_red, font=percent_font)
+        # トピック名
+        topic_font = get_font(96)
+        topic_text_display = f"「{topic}」"
+        topic_bbox = draw.textbbox((0, 0), topic_text_display, font=topic_font)
+        topic_x = (WIDTH - (topic_bbox[2] - topic_bbox[0])) // 2
+        topic_y = 450
+
+        for i in range(6, 0, -1):
+            draw.text((topic_x + i, topic_y + i), topic_text_display, fill=(0, 0, 0), font=topic_font)
+        for ox in range(-4, 5):
+            for oy in range(-4, 5):
+                if ox != 0 or oy != 0:
+                    draw.text((topic_x + ox, topic_y + oy), topic_text_display, fill=(255, 255, 255), font=topic_font)
+        draw.text((topic_x, topic_y), topic_text_display, fill=(255, 69, 0), font=topic_font)
 
-    # トピック名
-    topic_font = get_font(96)
-    topic_text_display = f"「{topic}」"
-    topic_bbox = draw.textbbox((0, 0), topic_text_display, font=topic_font)
-    topic_x = (WIDTH - (topic_bbox[2] - topic_bbox[0])) // 2
-    topic_y = 450
-
-    for i in range(6, 0, -1):
-        draw.text((topic_x + i, topic_y + i), topic_text_display, fill=(0, 0, 0), font=topic_font)
-    for ox in range(-4, 5):
-        for oy in range(-4, 5):
-            if ox != 0 or oy != 0:
-                draw.text((topic_x + ox, topic_y + oy), topic_text_display, fill=(255, 255, 255), font=topic_font)
-    draw.text((topic_x, topic_y), topic_text_display, fill=(255, 69, 0), font=topic_font)
+        # === 字幕エリア（下部）===
+        subtitle_height = 180
+        subtitle_y = HEIGHT - subtitle_height
 
-    # === 字幕エリア（下部）===
-    subtitle_height = 180
-    subtitle_y = HEIGHT - subtitle_height
+        # 薄いピンクベージュ背景 rgba(255, 228, 225, 0.9)
+        subtitle_bg = Image.new('RGBA', (WIDTH, subtitle_height), (255, 228, 225, 230))  # 0.9 * 255 ≈ 230
+        img.paste(subtitle_bg, (0, subtitle_y), subtitle_bg)
 
-    # 薄いピンクベージュ背景 rgba(255, 228, 225, 0.9)
-    subtitle_bg = Image.new('RGBA', (WIDTH, subtitle_height), (255, 228, 225, 230))  # 0.9 * 255 ≈ 230
-    img.paste(subtitle_bg, (0, subtitle_y), subtitle_bg)
+        # 字幕テキスト
+        if subtitle_text:
+            subtitle_font = get_font(48)
+            # 話者名＋テキスト
+            speaker_name = "カツミ" if speaker == "katsumi" else "ヒロシ"
 
-    # 字幕テキスト
-    if subtitle_text:
-        subtitle_font = get_font(48)
-        # 話者名＋テキスト
-        speaker_name = "カツミ" if speaker == "katsumi" else "ヒロシ"
+            # 話者名の色: カツミ=ピンク #FF69B4、ヒロシ=青 #0066CC
+            name_color = (255, 105, 180) if speaker == "katsumi" else (0, 102, 204)
+            body_color = (139, 69, 19)  # メインテキスト: 茶色 #8B4513
 
-        # 話者名の色: カツミ=ピンク #FF69B4、ヒロシ=青 #0066CC
-        name_color = (255, 105, 180) if speaker == "katsumi" else (0, 102, 204)
-        body_color = (139, 69, 19)  # メインテキスト: 茶色 #8B4513
+            # 折り返し処理
+            max_text_width = WIDTH - 100
+            full_text = f"{speaker_name}：{subtitle_text}"
+            lines = wrap_text(full_text, subtitle_font, max_text_width, draw)
+            line_spacing = int(48 * 1.3)
+            total_height = len(lines) * line_spacing
+            start_y = subtitle_y + (subtitle_height - total_height) // 2
 
-        # 折り返し処理
-        max_text_width = WIDTH - 100
-        full_text = f"{speaker_name}：{subtitle_text}"
-        lines = wrap_text(full_text, subtitle_font, max_text_width, draw)
-        line_spacing = int(48 * 1.3)
-        total_height = len(lines) * line_spacing
-        start_y = subtitle_y + (subtitle_height - total_height) // 2
+            for i, line in enumerate(lines):
+                line_x = 50
+                line_y = start_y + i * line_spacing
 
-        for i, line in enumerate(lines):
-            line_x = 50
-            line_y = start_y + i * line_spacing
+                # 最初の行は話者名と本文を分けて描画
+                if i == 0 and "：" in line:
+                    parts = line.split("：", 1)
+                    # 話者名部分（縁取りなし）
+                    draw.text((line_x, line_y), parts[0] + "：", fill=name_color, font=subtitle_font)
 
-            # 最初の行は話者名と本文を分けて描画
-            if i == 0 and "：" in line:
-                parts = line.split("：", 1)
-                # 話者名部分（縁取りなし）
-                draw.text((line_x, line_y), parts[0] + "：", fill=name_color, font=subtitle_font)
+                    # 本文部分の開始位置を計算
+                    name_bbox = draw.textbbox((0, 0), parts[0] + "：", font=subtitle_font)
+                    body_x = line_x + (name_bbox[2] - name_bbox[0])
 
-                # 本文部分の開始位置を計算
-                name_bbox = draw.textbbox((0, 0), parts[0] + "：", font=subtitle_font)
-                body_x = line_x + (name_bbox[2] - name_bbox[0])
+                    # 本文部分（縁取りなし）
+                    draw.text((body_x, line_y), parts[1], fill=body_color, font=subtitle_font)
+                else:
+                    # 2行目以降は本文のみ（縁取りなし）
+                    draw.text((line_x, line_y), line, fill=body_color, font=subtitle_font)
 
-                # 本文部分（縁取りなし）
-                draw.text((body_x, line_y), parts[1], fill=body_color, font=subtitle_font)
-            else:
-                # 2行目以降は本文のみ（縁取りなし）
-                draw.text((line_x, line_y), line, fill=body_color, font=subtitle_font)
+        # === キャラクター（揺れなし）===
+        char_size = 160
+        char_y = subtitle_y - char_size + 20
 
-    # === キャラクター（揺れなし）===
-    char_size = 160
-    char_y = subtitle_y - char_size + 20
+        # カツミ（左）
+        katsumi_img = _load_character_sprite("katsumi", char_size)
+        if katsumi_img is not None:
+            img.paste(katsumi_img, (100, char_y), katsumi_img)
 
-    # カツミ（左）
-    katsumi_y = char_y
+        # ヒロシ（右）
+        hiroshi_img = _load_character_sprite("hiroshi", char_size)
+        if hiroshi_img is not None:
+            img.paste(hiroshi_img, (WIDTH - char_size - 100, char_y), hiroshi_img)
 
-    katsumi_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_path.exists():
-        katsumi_img = Image.open(katsumi_path).convert('RGBA')
-        katsumi_img = katsumi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-        img.paste(katsumi_img, (100, katsumi_y), katsumi_img)
+        return img
 
-    # ヒロシ（右）
-    hiroshi_y = char_y
+    return LayeredFrameRenderer(build_base)
 
-    hiroshi_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_path.exists():
-        hiroshi_img = Image.open(hiroshi_path).convert('RGBA')
-        hiroshi_img = hiroshi_img.resize((char_size, char_size), Image.Resampling.LANCZOS)
-        img.paste(hiroshi_img, (WIDTH - char_size - 100, hiroshi_y), hiroshi_img)
 
-    return img.convert('RGB')
+def create_talk_with_topic_frame(rank, percent, topic, speaker, subtitle_text, t):
+    """
+    トピック背景＋字幕でトークを表示するフレームを生成
+    - 背景: ランキングカード（静的）
+    - 字幕: 下部に表示
+    - キャラ: 喋ってる方だけ揺れる
+    """
+    return _talk_with_topic_renderer(rank, percent, topic, speaker, subtitle_text).render(t)
 
 
 def create_talk_with_topic_clip(rank, percent, topic, speaker, subtitle_text, duration, fps=24):
-    """トピック背景＋字幕でトークを表示するVideoClipを生成"""
-    import numpy as np
+    """トピック背景＋字幕でトークを表示するVideoClipを生成（全体を1回だけ描画）"""
     from moviepy import VideoClip
 
-    def make_frame(t):
-        img = create_talk_with_topic_frame(rank, percent, topic, speaker, subtitle_text, t)
-        return np.array(img)
-
-    clip = VideoClip(make_frame, duration=duration)
+    renderer = _talk_with_topic_renderer(rank, percent, topic, speaker, subtitle_text)
+    clip = VideoClip(renderer.make_frame, duration=duration)
     return clip
 
 
@@ -1525,10 +1380,8 @@ def create_talk_frame(katsumi_text, hiroshi_text, theme_title):
     draw.text((30, 15), f"【トーク】{theme_title}", fill=hex_to_rgb(COLORS["black"]), font=font_header)
 
     # カツミ（左側）
-    katsumi_img_path = ASSETS_DIR / "katsumi.png"
-    if katsumi_img_path.exists():
-        katsumi_img = Image.open(katsumi_img_path).convert('RGBA')
-        katsumi_img = katsumi_img.resize((200, 200), Image.Resampling.LANCZOS)
+    katsumi_img = load_sprite(ASSETS_DIR / "katsumi.png", 200)
+    if katsumi_img is not None:
         img.paste(katsumi_img, (50, HEIGHT - 280), katsumi_img)
 
     # カツミの吹き出し
@@ -1547,10 +1400,8 @@ def create_talk_frame(katsumi_text, hiroshi_text, theme_title):
         draw.text((bubble_x + 20, bubble_y + 20 + i * 45), line, fill=hex_to_rgb(COLORS["black"]), font=font_bubble)
 
     # ヒロシ（右側）
-    hiroshi_img_path = ASSETS_DIR / "hiroshi.png"
-    if hiroshi_img_path.exists():
-        hiroshi_img = Image.open(hiroshi_img_path).convert('RGBA')
-        hiroshi_img = hiroshi_img.resize((200, 200), Image.Resampling.LANCZOS)
+    hiroshi_img = load_sprite(ASSETS_DIR / "hiroshi.png", 200)
+    if hiroshi_img is not None:
         img.paste(hiroshi_img, (WIDTH - 250, HEIGHT - 280), hiroshi_img)
 
     # ヒロシの吹き出し
@@ -1805,10 +1656,10 @@ def generate_tts_audio(text, voice, output_path, api_key=None, max_retries=3):
 
         except Exception as e:
             error_str = str(e)
-            is_429 = "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+            is_429 = is_rate_limit_error(e)
 
             if is_429:
-                key_manager.mark_429_error(current_key)
+                key_manager.mark_429_error(current_key, e)
                 # 429エラーは別のキーでリトライ
                 if attempt < max_retries - 1:
                     wait_time = 2 + attempt * 2  # 2, 4, 6秒
@@ -2228,17 +2079,11 @@ def generate_thumbnail(bg_image_path: str, title: str, output_path: str) -> bool
             "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc",
         ]
 
-        font = None
-        font_size = 72
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                    break
-                except:
-                    continue
-
-        if font is None:
+        font_path = find_font_path(font_paths)
+        if font_path:
+            font_size = 72
+            font = load_font(font_path, font_size)
+        else:
             font = ImageFont.load_default()
             font_size = 40
 
@@ -2260,14 +2105,7 @@ def generate_thumbnail(bg_image_path: str, title: str, output_path: str) -> bool
         # 日付を小さく追加
         date_text = datetime.now().strftime('%Y/%m/%d')
         date_font_size = 36
-        date_font = None
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    date_font = ImageFont.truetype(font_path, date_font_size)
-                    break
-                except:
-                    continue
+        date_font = load_font(font_path, date_font_size) if font_path else None
 
         if date_font:
             date_bbox = draw.textbbox((0, 0), date_text, font=date_font)
@@ -1,18 +1,18 @@
 #!/usr/bin/env python3
 """
 YouTube競合チャンネル監視システム
-- 指定チャンネルの新着動画を監視
-- JSONファイルで動画リストを管理
+- 指定チャンネルの新着動画を監視（並列・差分スキャン、competitor_scanner.py）
+- 追記専用の JSON Lines で動画リストを管理
 - 新着動画をSlackに通知
 """
 
-import json
 import os
-import subprocess
 from datetime import datetime
 from pathlib import Path
 import requests
 
+from competitor_scanner import ChannelScanner, VideoStore
+
 # 監視対象チャンネル
 COMPETITOR_CHANNELS = {
     "moraeru_okane": {
@@ -30,89 +30,21 @@ COMPETITOR_CHANNELS = {
 }
 
 # データファイル
-DATA_FILE = Path(__file__).parent / "competitor_videos.json"
+DATA_FILE = Path(__file__).parent / "competitor_videos.jsonl"  # 動画（追記専用）
+STATE_FILE = Path(__file__).parent / "competitor_channels.json"  # チャンネルごとの ETag・最終確認動画
+LEGACY_DATA_FILE = Path(__file__).parent / "competitor_videos.json"  # 旧形式
 
 # 取得する動画数（チャンネルあたり）
 MAX_VIDEOS_PER_CHANNEL = 20
 
 
-def load_data() -> dict:
-    """保存済みデータを読み込み"""
-    if DATA_FILE.exists():
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {
-        "channels": {},
-        "last_checked": None
-    }
-
-
-def save_data(data: dict):
-    """データを保存"""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"✓ データ保存: {DATA_FILE}")
-
-
-def get_channel_videos(channel_url: str, max_videos: int = MAX_VIDEOS_PER_CHANNEL) -> list:
-    """yt-dlpでチャンネルの動画リストを取得"""
-    try:
-        # yt-dlpコマンドを実行（python -m yt_dlp を使用）
-        import sys
-        cmd = [
-            sys.executable, "-m", "yt_dlp",
-            "--flat-playlist",
-            "--no-download",
-            "-J",  # JSON出力
-            f"--playlist-end={max_videos}",
-            f"{channel_url}/videos"
-        ]
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-
-        if result.returncode != 0:
-            print(f"  ⚠ yt-dlpエラー: {result.stderr[:200]}")
-            return []
-
-        data = json.loads(result.stdout)
-        videos = []
-
-        entries = data.get("entries", [])
-        for entry in entries:
-            if entry:
-                video = {
-                    "video_id": entry.get("id", ""),
-                    "title": entry.get("title", ""),
-                    "url": entry.get("url", f"https://www.youtube.com/watch?v={entry.get('id', '')}"),
-                    "upload_date": entry.get("upload_date", ""),  # YYYYMMDD形式
-                    "duration": entry.get("duration", 0),
-                    "view_count": entry.get("view_count", 0),
-                }
-                videos.append(video)
-
-        return videos
-
-    except subprocess.TimeoutExpired:
-        print(f"  ⚠ タイムアウト")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"  ⚠ JSON解析エラー: {e}")
-        return []
-    except Exception as e:
-        print(f"  ⚠ エラー: {e}")
-        return []
-
-
-def find_new_videos(existing_videos: list, fetched_videos: list) -> list:
-    """新着動画を検出"""
-    existing_ids = {v["video_id"] for v in existing_videos}
-    new_videos = [v for v in fetched_videos if v["video_id"] not in existing_ids]
-    return new_videos
+def get_video_store() -> VideoStore:
+    """動画ストア（旧形式のデータがあれば初回に取り込む）"""
+    store = VideoStore(DATA_FILE)
+    if not DATA_FILE.exists() and LEGACY_DATA_FILE.exists():
+        count = store.import_legacy(LEGACY_DATA_FILE)
+        print(f"✓ 旧形式のデータを取り込みました: {count}件")
+    return store
 
 
 def send_slack_notification(new_videos_by_channel: dict):
@@ -172,77 +104,25 @@ def check_all_channels():
     print(f"チェック日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
 
-    # 既存データを読み込み
-    data = load_data()
-
-    new_videos_by_channel = {}
-    total_new = 0
+    # 全チャンネルを並列に確認（変化のないチャンネルはフィード1回で終わり）
+    scanner = ChannelScanner(get_video_store(), STATE_FILE, max_videos=MAX_VIDEOS_PER_CHANNEL)
+    new_videos_by_channel = scanner.scan(COMPETITOR_CHANNELS)
 
     for channel_key, channel_info in COMPETITOR_CHANNELS.items():
-        channel_name = channel_info["name"]
-        channel_url = channel_info["url"]
-
-        print(f"[{channel_name}]")
-        print(f"  URL: {channel_url}")
-
-        # 動画リストを取得
-        print(f"  動画リストを取得中...")
-        fetched_videos = get_channel_videos(channel_url)
-        print(f"  取得件数: {len(fetched_videos)}件")
-
-        if not fetched_videos:
-            print(f"  ⚠ 動画を取得できませんでした")
-            continue
-
-        # 既存の動画リストと比較
-        existing_data = data.get("channels", {}).get(channel_key, {})
-        existing_videos = existing_data.get("videos", [])
-
-        # 新着動画を検出
-        new_videos = find_new_videos(existing_videos, fetched_videos)
-
+        print(f"[{channel_info['name']}]")
+        new_videos = new_videos_by_channel.get(channel_key, [])
         if new_videos:
             print(f"  🆕 新着: {len(new_videos)}件")
             for v in new_videos:
                 print(f"    • {v['title'][:40]}...")
-            new_videos_by_channel[channel_key] = new_videos
-            total_new += len(new_videos)
         else:
             print(f"  新着なし")
 
-        # データを更新（usedフラグを保持しながらマージ）
-        existing_ids = {v["video_id"]: v for v in existing_videos}
-        updated_videos = []
-
-        for video in fetched_videos:
-            vid = video["video_id"]
-            if vid in existing_ids:
-                # 既存動画: usedフラグを保持
-                existing_video = existing_ids[vid]
-                video["used"] = existing_video.get("used", False)
-            else:
-                # 新規動画
-                video["used"] = False
-            updated_videos.append(video)
-
-        # チャンネルデータを更新
-        if "channels" not in data:
-            data["channels"] = {}
-
-        data["channels"][channel_key] = {
-            "channel_url": channel_url,
-            "channel_name": channel_name,
-            "videos": updated_videos,
-            "last_updated": datetime.now().isoformat()
-        }
-
-        print()
-
-    # 最終チェック日時を更新
-    data["last_checked"] = datetime.now().isoformat()
-
-    # データを保存
-    save_data(data)
+    total_new = sum(len(videos) for videos in new_videos_by_channel.values())
+    stats = scanner.stats
+    print(f"\n変化なし: {stats['unchanged']}ch / フィードで更新: {stats['feed']}ch / "
+          f"yt-dlpで取得: {stats['playlist']}ch / 失敗: {stats['failed']}ch")
+    print(f"✓ データ保存: {DATA_FILE}")
 
     # 新着があればSlack通知
     if new_videos_by_channel:
@@ -260,17 +140,9 @@ def check_all_channels():
 
 def mark_video_as_used(channel_key: str, video_id: str):
     """動画を使用済みにマーク"""
-    data = load_data()
-
-    channel_data = data.get("channels", {}).get(channel_key, {})
-    videos = channel_data.get("videos", [])
-
-    for video in videos:
-        if video["video_id"] == video_id:
-            video["used"] = True
-            save_data(data)
-            print(f"✓ {video_id} を使用済みにマークしました")
-            return True
+    if get_video_store().mark_used(video_id, channel_key):
+        print(f"✓ {video_id} を使用済みにマークしました")
+        return True
 
     print(f"⚠ {video_id} が見つかりませんでした")
     return False
@@ -278,16 +150,14 @@ def mark_video_as_used(channel_key: str, video_id: str):
 
 def list_unused_videos():
     """未使用の動画一覧を表示"""
-    data = load_data()
+    unused_by_channel = get_video_store().unused_videos()
 
     print("=" * 50)
     print("未使用動画一覧")
     print("=" * 50)
 
-    for channel_key, channel_data in data.get("channels", {}).items():
-        channel_name = channel_data.get("channel_name", channel_key)
-        videos = channel_data.get("videos", [])
-        unused = [v for v in videos if not v.get("used", False)]
+    for channel_key, unused in unused_by_channel.items():
+        channel_name = COMPETITOR_CHANNELS.get(channel_key, {}).get("name", channel_key)
 
         if unused:
             print(f"\n📺 {channel_name} ({len(unused)}件)")
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+競合チャンネルの並列・差分スキャン
+
+チャンネルごとに yt-dlp --flat-playlist（最大120秒）を1本ずつ順番に回し、
+毎回 competitor_videos.json を丸ごと書き直していたため、監視チャンネルを増やすと線形に遅くなっていた。
+- チャンネルは並列に確認（COMPETITOR_SCAN_WORKERS）
+- まず YouTube の RSS フィード（軽いGET 1回）を ETag つきで取得。304 か、先頭の動画が
+  前回見た動画（last_seen_id）と同じなら「変化なし」でそのチャンネルは終わり。
+  フィードに混ざるショートは除いてから比べる（yt-dlp の /videos と同じ動画だけを見る）
+- 新着がフィードに収まらないとき・チャンネルIDが未解決のときだけ yt-dlp で取り直す
+- 動画は追記専用の JSON Lines（competitor_videos.jsonl）に保存。使用済みも1行追記するだけ。
+  動画ID → (ファイル上の位置, チャンネル, 使用済み) の索引だけをメモリに持ち、動画の中身は
+  必要な行だけ seek して読む（索引は追記された分だけ差分で更新）
+- チャンネルごとの状態（チャンネルID・ETag・last_seen_id）は competitor_channels.json
+
+オフライン検証用に、ローカルで動くフィードの代用サーバー（FakeFeedServer）を同梱。
+
+環境変数:
+    COMPETITOR_SCAN_WORKERS=8   同時に確認するチャンネル数
+
+ベンチマーク:
+    python competitor_scanner.py --bench
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+COMPETITOR_SCAN_WORKERS = int(os.environ.get("COMPETITOR_SCAN_WORKERS", "8"))
+YOUTUBE_FEED_URL = "https://www.youtube.com/feeds/videos.xml"
+
+_FEED_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "media": "http://search.yahoo.com/mrss/",
+}
+
+
+def fetch_channel_playlist(channel_url: str, max_videos: int, timeout: int = 120) -> tuple:
+    """yt-dlpでチャンネルの動画リストを取得 → (チャンネルID, 動画リスト)（失敗時は (None, [])）"""
+    try:
+        cmd = [
+            sys.executable, "-m", "yt_dlp",
+            "--flat-playlist",
+            "--no-download",
+            "-J",  # JSON出力
+            f"--playlist-end={max_videos}",
+            f"{channel_url}/videos"
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
+        if result.returncode != 0:
+            print(f"  ⚠ yt-dlpエラー: {result.stderr[:200]}")
+            return None, []
+
+        data = json.loads(result.stdout)
+        videos = []
+        for entry in data.get("entries", []):
+            if entry:
+                videos.append({
+                    "video_id": entry.get("id", ""),
+                    "title": entry.get("title", ""),
+                    "url": entry.get("url", f"https://www.youtube.com/watch?v={entry.get('id', '')}"),
+                    "upload_date": entry.get("upload_date", ""),  # YYYYMMDD形式
+                    "duration": entry.get("duration", 0),
+                    "view_count": entry.get("view_count", 0),
+                })
+        return data.get("channel_id"), videos
+
+    except subprocess.TimeoutExpired:
+        print(f"  ⚠ タイムアウト")
+        return None, []
+    except json.JSONDecodeError as e:
+        print(f"  ⚠ JSON解析エラー: {e}")
+        return None, []
+    except Exception as e:
+        print(f"  ⚠ エラー: {e}")
+        return None, []
+
+
+def parse_feed(xml_text: str) -> list:
+    """チャンネルの RSS フィード → 動画リスト（新しい順、ショートは除く）"""
+    root = ET.fromstring(xml_text)
+    videos = []
+    for entry in root.findall("atom:entry", _FEED_NS):
+        # フィードにはショートも混ざる。yt-dlp の /videos と揃えるため除く
+        link = entry.find("atom:link[@rel='alternate']", _FEED_NS)
+        if link is not None and "/shorts/" in link.get("href", ""):
+            continue
+        video_id = entry.findtext("yt:videoId", default="", namespaces=_FEED_NS)
+        published = entry.findtext("atom:published", default="", namespaces=_FEED_NS)
+        stats = entry.find("media:group/media:community/media:statistics", _FEED_NS)
+        videos.append({
+            "video_id": video_id,
+            "title": entry.findtext("atom:title", default="", namespaces=_FEED_NS),
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "upload_date": published[:10].replace("-", ""),  # YYYYMMDD形式
+            "duration": 0,
+            "view_count": int(stats.get("views", 0)) if stats is not None else 0,
+        })
+    return videos
+
+
+class VideoStore:
+    """追記専用の動画ストア（JSON Lines + 動画IDの索引）
+
+    1行1イベント:
+        {"op": "video", "channel": ..., "video_id": ..., ...}   動画を追加
+        {"op": "used", "video_id": ..., "at": ...}              使用済みにする
+    ファイルは古い順（追記順）。一覧は新しい順に返す。
+
+    索引は 動画ID → [動画の行の位置, チャンネル, 使用済みか]。初回に1回だけファイルを通して作り、
+    以降は前回の末尾から追記された行だけを読んで更新する。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._index = {}  # video_id → [offset, channel, used]（ファイル順）
+        self._indexed_size = 0
+
+    def _refresh_index(self):
+        """前回の続きから読んで索引を更新（ロックを持った状態で呼ぶ）"""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_size)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    # 書きかけの行は次回に読む
+                    break
+                self._indexed_size = f.tell()
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                video_id = event.get("video_id")
+                if event.get("op") == "video" and video_id not in self._index:
+                    self._index[video_id] = [offset, event.get("channel", ""), False]
+                elif event.get("op") == "used" and video_id in self._index:
+                    self._index[video_id][2] = True
+
+    def _read_at(self, f, offset: int) -> dict:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def _append(self, events: list):
+        if not events:
+            return
+        with self._lock:
+            self._refresh_index()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self._refresh_index()
+
+    def known_ids(self) -> set:
+        """保存済みの動画ID"""
+        with self._lock:
+            self._refresh_index()
+            return set(self._index)
+
+    def add_videos(self, channel_key: str, videos: list, known_ids: set = None) -> list:
+        """未保存の動画だけ追記（videos は新しい順）。追記した動画を返す"""
+        known = self.known_ids() if known_ids is None else known_ids
+        new_videos = [v for v in videos if v.get("video_id") and v["video_id"] not in known]
+        now = datetime.now().isoformat(timespec="seconds")
+        # ファイルは古い順にする
+        self._append([{"op": "video", "channel": channel_key, **v, "seen_at": now} for v in reversed(new_videos)])
+        known.update(v["video_id"] for v in new_videos)
+        return new_videos
+
+    def find(self, video_id: str) -> dict:
+        """動画を1件探す（索引から該当行だけ読む。used は見ない）"""
+        with self._lock:
+            self._refresh_index()
+            entry = self._index.get(video_id)
+            if entry is None:
+                return None
+            with open(self.path, "rb") as f:
+                return self._read_at(f, entry[0])
+
+    def mark_used(self, video_id: str, channel_key: str = None) -> bool:
+        """使用済みにする（1行追記）。動画がなければ False"""
+        with self._lock:
+            self._refresh_index()
+            entry = self._index.get(video_id)
+        if entry is None or (channel_key and entry[1] != channel_key):
+            return False
+        self._append([{"op": "used", "video_id": video_id, "at": datetime.now().isoformat(timespec="seconds")}])
+        return True
+
+    def unused_videos(self, limit_per_channel: int = None) -> dict:
+        """未使用の動画 {チャンネル: [動画, ...]}（新しい順。返す動画の行だけ読む）"""
+        with self._lock:
+            self._refresh_index()
+            offsets = {}
+            for offset, channel, used in self._index.values():
+                channel_offsets = offsets.setdefault(channel, [])
+                if not used:
+                    channel_offsets.append(offset)
+            result = {}
+            if not offsets:
+                return result
+            with open(self.path, "rb") as f:
+                for channel, channel_offsets in offsets.items():
+                    newest = channel_offsets[::-1]
+                    if limit_per_channel:
+                        newest = newest[:limit_per_channel]
+                    result[channel] = [self._read_at(f, offset) for offset in newest]
+            return result
+
+    def import_legacy(self, legacy_path: Path) -> int:
+        """旧形式（competitor_videos.json）を取り込む。取り込んだ動画数を返す"""
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        count = 0
+        known = self.known_ids()
+        for channel_key, channel_data in legacy.get("channels", {}).items():
+            videos = channel_data.get("videos", [])
+            added = self.add_videos(channel_key, [{k: v for k, v in video.items() if k != "used"} for video in videos],
+                                    known_ids=known)
+            count += len(added)
+            self._append([{"op": "used", "video_id": v["video_id"], "at": channel_data.get("last_updated", "")}
+                          for v in reversed(videos) if v.get("used")])
+        return count
+
+
+class ChannelScanner:
+    """競合チャンネルを並列・差分でスキャン
+
+    Args:
+        store: VideoStore
+        state_path: チャンネルごとの状態ファイル（チャンネルID・ETag・last_seen_id）
+        max_videos: yt-dlp で取り直すときの動画数
+        max_workers: 同時に確認するチャンネル数
+        feed_url: フィードのURL（ベンチマークではローカルの代用サーバー）
+        playlist_fetcher: (channel_url, max_videos) -> (チャンネルID, 動画リスト)
+    """
+
+    def __init__(self, store: VideoStore, state_path: Path, max_videos: int = 20,
+                 max_workers: int = COMPETITOR_SCAN_WORKERS, feed_url: str = YOUTUBE_FEED_URL,
+                 playlist_fetcher=fetch_channel_playlist, timeout: int = 30):
+        self.store = store
+        self.state_path = Path(state_path)
+        self.max_videos = max_videos
+        self.max_workers = max(1, max_workers)
+        self.feed_url = feed_url
+        self.playlist_fetcher = playlist_fetcher
+        self.timeout = timeout
+        self.stats = {"unchanged": 0, "feed": 0, "playlist": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        try:
+            self.state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.state = {"channels": {}, "last_checked": None}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _fetch_feed(self, channel_id: str, state: dict):
+        """フィードを取得 → 動画リスト（304 なら None）"""
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        response = self.session.get(self.feed_url, params={"channel_id": channel_id},
+                                    headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        state["etag"] = response.headers.get("ETag", "")
+        state["last_modified"] = response.headers.get("Last-Modified", "")
+        return parse_feed(response.text)
+
+    def scan_channel(self, channel_key: str, channel_info: dict, known_ids: set) -> dict:
+        """1チャンネルを確認 → {"status": ..., "new_videos": [...], "state": {...}}"""
+        state = dict(self.state.get("channels", {}).get(channel_key, {}))
+        state["channel_url"] = channel_info["url"]
+        state["channel_name"] = channel_info["name"]
+        last_seen_id = state.get("last_seen_id")
+
+        fetched = None
+        if state.get("channel_id"):
+            try:
+                feed_videos = self._fetch_feed(state["channel_id"], state)
+                if feed_videos is None or (feed_videos and feed_videos[0]["video_id"] == last_seen_id):
+                    self._count("unchanged")
+                    return {"status": "unchanged", "new_videos": [], "state": state}
+                feed_ids = [v["video_id"] for v in feed_videos]
+                # 前回の先頭がフィード内にあれば、フィードだけで新着がわかる
+                if last_seen_id in feed_ids:
+                    fetched = feed_videos
+                    self._count("feed")
+            except (requests.RequestException, ET.ParseError) as e:
+                print(f"  ⚠ {channel_info['name']}: フィード取得エラー（yt-dlpで取得）: {e}")
+
+        if fetched is None:
+            channel_id, fetched = self.playlist_fetcher(channel_info["url"], self.max_videos)
+            if not fetched:
+                self._count("failed")
+                return {"status": "failed", "new_videos": [], "state": state}
+            if channel_id:
+                state["channel_id"] = channel_id
+            # 次回のフィード取得は ETag なしでやり直す（先頭IDで比較できるように）
+            state.pop("etag", None)
+            state.pop("last_modified", None)
+            self._count("playlist")
+
+        new_videos = [v for v in fetched if v["video_id"] not in known_ids]
+        state["last_seen_id"] = fetched[0]["video_id"]
+        state["last_updated"] = datetime.now().isoformat()
+        return {"status": "updated", "new_videos": new_videos, "fetched": fetched, "state": state}
+
+    def scan(self, channels: dict) -> dict:
+        """全チャンネルを並列に確認して新着を保存 → {チャンネル: 新着動画リスト}"""
+        known_ids = self.store.known_ids()
+
+        def scan_one(item):
+            channel_key, channel_info = item
+            try:
+                return channel_key, self.scan_channel(channel_key, channel_info, known_ids)
+            except Exception as e:
+                print(f"  ⚠ {channel_info['name']}: エラー: {e}")
+                self._count("failed")
+                return channel_key, {"status": "failed", "new_videos": [], "state": None}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(scan_one, channels.items()))
+
+        new_videos_by_channel = {}
+        for channel_key, result in results:
+            if result["state"] is not None:
+                self.state.setdefault("channels", {})[channel_key] = result["state"]
+            if result["status"] == "updated":
+                added = self.store.add_videos(channel_key, result["fetched"], known_ids=known_ids)
+                if added:
+                    new_videos_by_channel[channel_key] = added
+
+        self.state["last_checked"] = datetime.now().isoformat()
+        self.save_state()
+        return new_videos_by_channel
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.state_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+
+
+def build_feed_xml(channel_id: str, videos: list) -> str:
+    """動画リスト（新しい順）→ YouTube 形式の RSS フィード"""
+    entries = []
+    for v in videos:
+        href = f"https://www.youtube.com/shorts/{v['video_id']}" if v.get("short") \
+            else f"https://www.youtube.com/watch?v={v['video_id']}"
+        entries.append(
+            "<entry>"
+            f"<yt:videoId>{v['video_id']}</yt:videoId>"
+            f"<link rel=\"alternate\" href=\"{href}\"/>"
+            f"<title>{v['title']}</title>"
+            f"<published>{v['published']}</published>"
+            "<media:group><media:community>"
+            f"<media:statistics views=\"{v.get('view_count', 0)}\"/>"
+            "</media:community></media:group>"
+            "</entry>"
+        )
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+            'xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">'
+            f"<yt:channelId>{channel_id}</yt:channelId>" + "".join(entries) + "</feed>")
+
+
+class FakeFeedServer:
+    """YouTube チャンネルフィードの代用（ローカルHTTP、ETag / 304 対応）
+
+    channels: channel_id → 動画リスト（新しい順、{"video_id", "title", "published"}。ショートは "short": True）
+    """
+
+    def __init__(self, channels: dict, latency: float = 0.05, feed_size: int = 15):
+        self.channels = channels
+        self.latency = latency
+        self.feed_size = feed_size
+        self.requests = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                channel_id = parse_qs(urlparse(self.path).query).get("channel_id", [""])[0]
+                time.sleep(server.latency)
+                with server._lock:
+                    server.requests += 1
+                    videos = list(server.channels.get(channel_id, []))[:server.feed_size]
+                etag = f'"{channel_id}-{videos[0]["video_id"] if videos else ""}"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = build_feed_xml(channel_id, videos).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/feeds/videos.xml"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_benchmark(channels: int = 100, days: int = 3, playlist_latency: float = 0.5):
+    """毎日のチェック相当で、従来方式（全チャンネル yt-dlp を順番に）と比較"""
+    data = {f"UC{i:04d}": [] for i in range(channels)}
+
+    def publish(day, channel_id, count):
+        for k in range(count):
+            data[channel_id].insert(0, {"video_id": f"{channel_id}-{day}-{k}", "title": f"動画 {day}-{k}",
+                                        "published": f"2025-01-{day + 1:02d}T{k:02d}:00:00+00:00"})
+
+    for channel_id in data:
+        publish(0, channel_id, 20)
+
+    playlist_calls = {"count": 0}
+
+    def fake_playlist(channel_url, max_videos):
+        # yt-dlp 相当（遅い）
+        playlist_calls["count"] += 1
+        time.sleep(playlist_latency)
+        channel_id = channel_url.rsplit("/", 1)[-1]
+        return channel_id, [{"video_id": v["video_id"], "title": v["title"],
+                             "url": f"https://www.youtube.com/watch?v={v['video_id']}",
+                             "upload_date": v["published"][:10].replace("-", ""), "duration": 0, "view_count": 0}
+                            for v in data[channel_id][:max_videos]]
+
+    watch_list = {channel_id: {"name": channel_id, "url": f"https://www.youtube.com/{channel_id}"}
+                  for channel_id in data}
+    server = FakeFeedServer(data)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = VideoStore(Path(tmp) / "videos.jsonl")
+            for day in range(days):
+                if day:
+                    # 1日ごとに1割のチャンネルだけ新着
+                    for channel_id in list(data)[::10]:
+                        publish(day, channel_id, 2)
+                # 毎日の実行と同じく、状態ファイルから読み直す
+                scanner = ChannelScanner(store, Path(tmp) / "channels.json", feed_url=server.url,
+                                         playlist_fetcher=fake_playlist)
+                start = time.perf_counter()
+                new_videos = scanner.scan(watch_list)
+                elapsed = time.perf_counter() - start
+                print(f"  {day + 1}日目: {elapsed:.2f}秒, 新着 {sum(len(v) for v in new_videos.values())}件 {scanner.stats}")
+
+            sequential = channels * days * playlist_latency
+            print(f"従来（yt-dlp を順番に {channels}ch × {days}日）: 約{sequential:.0f}秒")
+            print(f"差分スキャン: yt-dlp {playlist_calls['count']}回, フィード {server.requests}回"
+                  f"（304: {server.not_modified}回）")
+            unused = store.unused_videos()
+            first = next(iter(unused))
+            store.mark_used(unused[first][0]["video_id"])
+            print(f"未使用: {sum(len(v) for v in store.unused_videos().values())}件（1件を使用済みにした後）")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="競合チャンネルの並列・差分スキャン")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（ローカルの代用フィードで比較）")
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--playlist-latency", type=float, default=0.5, help="yt-dlp 相当の1回の時間（秒）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(channels=args.channels, playlist_latency=args.playlist_latency)
+    else:
+        parser.print_help()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google Drive アセットのローカルキャッシュ（ジングル・BGM・背景画像）
+
+毎回の実行で同じジングル・BGM・背景画像を Drive からダウンロードし直していて、
+しかも1ファイルずつ新しいクライアントを作って順番に取っていた。
+- ファイルIDをキーに保存し、Drive の md5Checksum / modifiedTime と比べて変わっていなければ
+  ダウンロードしない（確認はメタデータ取得1回だけ）
+- パイプラインが使うファイルを最初にまとめて prefetch() すると、並列で取得を始める
+  （あとで fetch() したときは取得中のものを待つだけ）
+- クライアントはスレッドごとに1つ作って使い回す
+- 保存先は GitHub Actions では actions/cache で復元・保存するパス（実行をまたいで使う）
+
+サービスアカウントがない場合（公開リンクを gdown で取るパイプライン）は md5 を確認できないので、
+取得から DRIVE_CACHE_MAX_AGE_HOURS 以内ならそのまま使う。
+
+環境変数:
+    DRIVE_CACHE=false              キャッシュを無効化（毎回ダウンロード）
+    DRIVE_CACHE_DIR=...            保存先
+    DRIVE_CACHE_MAX_AGE_HOURS=168  md5 で確認できない場合にそのまま使う期間
+    DRIVE_PREFETCH_WORKERS=4       並列ダウンロード数
+
+使い方:
+    drive = get_drive_cache()
+    drive.prefetch([NORMAL_JINGLE_ID, GREEN_ROOM_JINGLE_ID])
+    drive.fetch(NORMAL_JINGLE_ID, "temp/normal_jingle.mp3")
+
+ベンチマーク:
+    python drive_cache.py --bench
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from google.oauth2.service_account import Credentials
+    from googleapiclient.discovery import build
+except ImportError:
+    Credentials = None
+    build = None
+
+
+DRIVE_CACHE_ENABLED = os.environ.get("DRIVE_CACHE", "true").lower() == "true"
+DRIVE_CACHE_MAX_AGE_HOURS = float(os.environ.get("DRIVE_CACHE_MAX_AGE_HOURS", "168"))
+DRIVE_PREFETCH_WORKERS = int(os.environ.get("DRIVE_PREFETCH_WORKERS", "4"))
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+DRIVE_FIELDS = "id,name,mimeType,md5Checksum,modifiedTime,size"
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_CACHE_DIR = Path.home() / ".cache" / "drive-assets"
+LOCAL_CACHE_DIR = Path.home() / ".cache" / "jinsei-soudan" / "drive"
+
+
+def default_drive_cache_dir() -> Path:
+    root = os.environ.get("DRIVE_CACHE_DIR")
+    if root:
+        return Path(root)
+    return GITHUB_ACTIONS_CACHE_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_CACHE_DIR
+
+
+def gdown_download(file_id: str, output_path: str):
+    """公開リンクからダウンロード（サービスアカウントなし）"""
+    import gdown
+    gdown.download(f"https://drive.google.com/uc?id={file_id}", output_path, quiet=True)
+    if not os.path.exists(output_path):
+        raise RuntimeError(f"ダウンロードできませんでした: {file_id}")
+
+
+class DriveAssetCache:
+    """ファイルIDをキーにした Drive アセットのキャッシュ
+
+    Args:
+        root: 保存先ディレクトリ
+        service_factory: Drive v3 サービスを作る関数（スレッドごとに1回呼ぶ）。
+            None なら public_download で取得し、md5 の確認はしない
+        public_download: public_download(file_id, output_path)（既定は gdown）
+        max_workers: prefetch の並列数
+        max_age_hours: md5 で確認できない場合にキャッシュをそのまま使う期間
+        enabled: False なら毎回ダウンロード（保存先は一時ディレクトリ）
+    """
+
+    def __init__(self, root=None, service_factory=None, public_download=None,
+                 max_workers: int = DRIVE_PREFETCH_WORKERS, max_age_hours: float = DRIVE_CACHE_MAX_AGE_HOURS,
+                 enabled: bool = DRIVE_CACHE_ENABLED):
+        if not enabled:
+            root = tempfile.mkdtemp(prefix="drive-assets-")
+        self.root = Path(root or default_drive_cache_dir())
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.service_factory = service_factory
+        self.public_download = public_download or gdown_download
+        self.max_workers = max(1, max_workers)
+        self.max_age = max_age_hours * 3600
+        self.hits = 0
+        self.downloads = 0
+        self._index_path = self.root / "index.json"
+        self._index = self._load_index()
+        self._metadata = {}  # この実行で取得済みのメタデータ（list_folder の結果も入る）
+        self._futures = {}  # file_id → Future（取得中・取得済み）
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # 呼び出し側で self._lock を取っていること
+        tmp = self._index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._index_path)
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    def _blob_path(self, file_id: str) -> Path:
+        return self.root / file_id
+
+    def metadata(self, file_id: str) -> dict:
+        """Drive のメタデータ（この実行で1回だけ取得）"""
+        meta = self._metadata.get(file_id)
+        if meta is None:
+            meta = self._service().files().get(fileId=file_id, fields=DRIVE_FIELDS).execute()
+            self._metadata[file_id] = meta
+        return meta
+
+    def list_folder(self, folder_id: str, mime_contains: str = None) -> list:
+        """フォルダ内のファイル一覧（メタデータも覚えておくので、あとの fetch で確認の呼び出しが不要）"""
+        query = f"'{folder_id}' in parents and trashed = false"
+        if mime_contains:
+            query += f" and mimeType contains '{mime_contains}'"
+        files = []
+        page_token = None
+        while True:
+            response = self._service().files().list(
+                q=query, fields=f"nextPageToken, files({DRIVE_FIELDS})", pageToken=page_token
+            ).execute()
+            files.extend(response.get("files", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        for meta in files:
+            self._metadata[meta["id"]] = meta
+        return files
+
+    @staticmethod
+    def _is_current(entry: dict, meta: dict) -> bool:
+        if entry.get("md5") and meta.get("md5Checksum"):
+            return entry["md5"] == meta["md5Checksum"]
+        return bool(entry.get("modified")) and entry.get("modified") == meta.get("modifiedTime")
+
+    def _download(self, file_id: str, dest: Path):
+        tmp = dest.with_name(dest.name + f".{threading.get_ident()}.part")
+        try:
+            if self.service_factory is None:
+                self.public_download(file_id, str(tmp))
+            else:
+                data = self._service().files().get_media(fileId=file_id).execute()
+                with open(tmp, "wb") as f:
+                    f.write(data)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _get(self, file_id: str) -> Path:
+        """キャッシュを確認し、古ければダウンロードしてローカルのパスを返す"""
+        blob = self._blob_path(file_id)
+        entry = self._index.get(file_id) if blob.exists() else None
+
+        if self.service_factory is not None:
+            try:
+                meta = self.metadata(file_id)
+            except Exception as e:
+                if entry:
+                    print(f"    ⚠ Drive確認エラー（キャッシュを使用）: {file_id[:10]}...: {e}")
+                    self.hits += 1
+                    return blob
+                raise
+            if entry and self._is_current(entry, meta):
+                self.hits += 1
+                return blob
+            self._download(file_id, blob)
+            entry = {"name": meta.get("name", ""), "md5": meta.get("md5Checksum", ""),
+                     "modified": meta.get("modifiedTime", "")}
+        else:
+            if entry and time.time() - entry.get("fetched_at", 0) < self.max_age:
+                self.hits += 1
+                return blob
+            self._download(file_id, blob)
+            entry = {}
+
+        entry["fetched_at"] = time.time()
+        entry["size"] = blob.stat().st_size
+        with self._lock:
+            self.downloads += 1
+            self._index[file_id] = entry
+            self._save_index()
+        return blob
+
+    def _future(self, file_id: str):
+        with self._lock:
+            future = self._futures.get(file_id)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="drive-cache")
+                future = self._futures[file_id] = self._executor.submit(self._get, file_id)
+            return future
+
+    def prefetch(self, file_ids):
+        """使うファイルをまとめて並列で取得開始（待たない。空のIDは無視）"""
+        for file_id in file_ids:
+            if file_id:
+                self._future(file_id)
+
+    def fetch(self, file_id: str, output_path: str = None, label: str = "ファイル"):
+        """ファイルを取得してパスを返す（output_path を指定するとそこへコピー）。失敗時は None"""
+        future = self._future(file_id)
+        try:
+            blob = future.result()
+        except Exception as e:
+            with self._lock:
+                if self._futures.get(file_id) is future:
+                    del self._futures[file_id]  # 次の fetch で取り直す
+            print(f"    ⚠ {label}ダウンロードエラー: {e}")
+            return None
+
+        if output_path is None:
+            return str(blob)
+        try:
+            shutil.copyfile(blob, output_path)
+        except OSError as e:
+            print(f"    ⚠ {label}のコピーに失敗: {e}")
+            return None
+        return output_path
+
+    def summary(self) -> str:
+        return f"キャッシュ使用 {self.hits}件 / ダウンロード {self.downloads}件"
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _drive_service_factory(key_json: str):
+    creds = Credentials.from_service_account_info(json.loads(key_json), scopes=DRIVE_SCOPES)
+    return lambda: build("drive", "v3", credentials=creds, cache_discovery=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_drive_cache() -> DriveAssetCache:
+    """プロセス共通のキャッシュ（GOOGLE_SERVICE_ACCOUNT_KEY があれば API で md5 を確認、なければ gdown）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            key_json = os.environ.get("GOOGLE_SERVICE_ACCOUNT_KEY")
+            factory = _drive_service_factory(key_json) if key_json and build is not None else None
+            _cache = DriveAssetCache(service_factory=factory)
+            atexit.register(_cache.close)
+        return _cache
+
+
+class _Request:
+    def __init__(self, func):
+        self._func = func
+
+    def execute(self):
+        return self._func()
+
+
+class FakeDriveService:
+    """Drive API の代用（files().get / get_media / list、呼び出し回数とダウンロード量を数える）"""
+
+    def __init__(self, files: dict, latency: float = 0.0, bytes_per_second: float = 0.0):
+        self.files_data = files  # file_id → bytes
+        self.revisions = {file_id: 1 for file_id in files}
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.calls = 0
+        self.downloaded = 0
+        self._lock = threading.Lock()
+
+    def touch(self, file_id: str, data: bytes):
+        """ファイルを差し替える（md5 と modifiedTime が変わる）"""
+        self.files_data[file_id] = data
+        self.revisions[file_id] += 1
+
+    def _meta(self, file_id: str) -> dict:
+        data = self.files_data[file_id]
+        return {"id": file_id, "name": f"{file_id}.mp3", "mimeType": "audio/mpeg",
+                "md5Checksum": hashlib.md5(data).hexdigest(),
+                "modifiedTime": f"2026-01-{self.revisions[file_id]:02d}T00:00:00Z", "size": str(len(data))}
+
+    def _call(self, func, size: int = 0):
+        def run():
+            with self._lock:
+                self.calls += 1
+                self.downloaded += size
+            time.sleep(self.latency + (size / self.bytes_per_second if self.bytes_per_second else 0))
+            return func()
+        return _Request(run)
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields=None):
+        return self._call(lambda: self._meta(fileId))
+
+    def get_media(self, fileId):
+        return self._call(lambda: self.files_data[fileId], len(self.files_data[fileId]))
+
+    def list(self, q, fields=None, pageToken=None):
+        folder_files = [self._meta(file_id) for file_id in self.files_data]
+        return self._call(lambda: {"files": folder_files})
+
+
+def run_benchmark(assets: int = 6, size_kb: int = 800, latency: float = 0.15, kbps: float = 8000):
+    """代用 Drive で、毎回1ファイルずつダウンロードする方式と比較"""
+    files = {f"asset{i}": os.urandom(size_kb * 1024) for i in range(assets)}
+    service = FakeDriveService(files, latency=latency, bytes_per_second=kbps * 1024)
+    file_ids = list(files)
+
+    # 従来: 1ファイルずつ メタデータ取得 → ダウンロード
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        for file_id in file_ids:
+            service.files().get(fileId=file_id, fields="name,mimeType").execute()
+            data = service.files().get_media(fileId=file_id).execute()
+            with open(os.path.join(out, file_id), "wb") as f:
+                f.write(data)
+        baseline = time.perf_counter() - start
+    print(f"従来（順番に毎回ダウンロード）: {baseline:.2f}秒, API {service.calls}回, "
+          f"{service.downloaded / 1024 / 1024:.1f}MB")
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as out:
+        for label, change in (("1回目（キャッシュなし・並列）", False), ("2回目（キャッシュあり）", False),
+                              ("3回目（1ファイル差し替え）", True)):
+            if change:
+                service.touch(file_ids[0], os.urandom(size_kb * 1024))
+            service.calls = service.downloaded = 0
+            cache = DriveAssetCache(root, service_factory=lambda: service)  # 実行ごとに新しいプロセスの想定
+            start = time.perf_counter()
+            cache.prefetch(file_ids)
+            ok = all(cache.fetch(file_id, os.path.join(out, file_id)) for file_id in file_ids)
+            elapsed = time.perf_counter() - start
+            cache.close()
+            same = all(open(os.path.join(out, i), "rb").read() == service.files_data[i] for i in file_ids)
+            print(f"{label}: {elapsed:.2f}秒, API {service.calls}回, "
+                  f"{service.downloaded / 1024 / 1024:.1f}MB, {cache.summary()} {'✓' if ok and same else '✗'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google Drive アセットのキャッシュ")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（代用 Drive で比較）")
+    parser.add_argument("--clear", action="store_true", help="キャッシュを削除")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark()
+    elif args.clear:
+        root = default_drive_cache_dir()
+        if root.exists():
+            shutil.rmtree(root)
+        print(f"削除しました: {root}")
+    else:
+        parser.print_help()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ファクトチェックの並列実行エンジン
+
+Gemini自己チェック・Web検索の裏取り・Claudeクロスチェックは互いに独立しているので、
+1つずつ順番に待たずに同時に投げて、結果をチェッカーの順番でまとめる。
+- チェッカーごとにタイムアウト。遅いプロバイダがあっても他の結果で先に進む（タイムアウトはスキップ扱い）
+- 結果は「チェッカーが見る入力」のハッシュで覚えておき、fix_script_errors のあとで
+  入力が変わっていないチェッカーは再実行しない（例: 数字が直っていなければWeb検索は前回の結果）
+
+環境変数:
+    FACT_CHECK_TIMEOUT=180   チェッカー1つあたりのタイムアウト（秒）
+
+使い方:
+    checkers = [
+        FactChecker("Gemini", lambda s: gemini_fact_check(s, news_data, key_manager)),
+        FactChecker("Web検索", lambda s: web_search_fact_check(s, key_manager),
+                    inputs=lambda s: extract_facts_from_script(s)[:5]),
+        FactChecker("Claude", lambda s: claude_fact_check(s, news_data)),
+    ]
+    script = run_fact_check_rounds(script, checkers, lambda s, errors: fix_script_errors(s, errors, key_manager))
+
+ベンチマーク:
+    python fact_check_engine.py --bench
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+FACT_CHECK_TIMEOUT = float(os.environ.get("FACT_CHECK_TIMEOUT", "180"))
+
+
+def _inputs_hash(value) -> str:
+    blob = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def checker_errors(result: dict) -> list:
+    """チェック結果からエラー一覧を取り出す（has_error が False なら空）"""
+    if not result or not result.get("has_error", True):
+        return []
+    return result.get("errors", []) or []
+
+
+class FactChecker:
+    """ファクトチェッカー1つ分
+
+    Args:
+        name: 表示名（"Gemini" など）
+        check: check(script) -> {"has_error": bool, "errors": [...]}
+        inputs: inputs(script) -> チェッカーが実際に見る値（省略時は台本全体）。変わらなければ再実行しない
+        timeout: タイムアウト秒数
+    """
+
+    def __init__(self, name: str, check, inputs=None, timeout: float = None):
+        self.name = name
+        self.check = check
+        self.inputs = inputs or (lambda script: script)
+        self.timeout = FACT_CHECK_TIMEOUT if timeout is None else timeout
+
+
+class FactCheckEngine:
+    """チェッカーを同時に実行し、入力が同じなら前回の結果を使い回す
+
+    Args:
+        checkers: FactChecker のリスト
+        verbose: チェッカーごとの結果を表示する
+    """
+
+    def __init__(self, checkers: list, verbose: bool = True):
+        self.checkers = list(checkers)
+        self.verbose = verbose
+        self._results = {}  # (チェッカー名, 入力ハッシュ) → 結果
+        self._pending = {}  # タイムアウトしてまだ走っているチェック（同じ入力なら投げ直さず待つ）
+        # タイムアウトしたスレッドが残っていても次の回を投げられるように多めに確保
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.checkers) * 2),
+                                            thread_name_prefix="fact-check")
+
+    def run(self, script) -> dict:
+        """全チェッカーを実行して {チェッカー名: 結果} を返す（チェッカーの順番）"""
+        start = time.time()
+        keys = {}
+        futures = {}
+        for checker in self.checkers:
+            keys[checker.name] = (checker.name, _inputs_hash(checker.inputs(script)))
+            key = keys[checker.name]
+            if key in self._results:
+                continue
+            future = self._pending.pop(key, None)
+            if future is None:
+                future = self._executor.submit(checker.check, script)
+            futures[checker.name] = future
+
+        results = {}
+        for checker in self.checkers:
+            key = keys[checker.name]
+            future = futures.get(checker.name)
+            if future is None:
+                results[checker.name] = self._results[key]
+                if self.verbose:
+                    print(f"    ↺ {checker.name}: 入力が変わっていないので前回の結果を使用")
+                continue
+
+            remaining = max(0.0, start + checker.timeout - time.time())
+            try:
+                result = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                self._pending[key] = future
+                print(f"    ⚠ {checker.name}: {checker.timeout:.0f}秒でタイムアウト（スキップ）")
+                results[checker.name] = {"has_error": False, "errors": [], "unchecked": True,
+                                         "message": "タイムアウト（スキップ）"}
+                continue
+            except Exception as e:
+                print(f"    ⚠ {checker.name}: チェックエラー（スキップ）: {e}")
+                results[checker.name] = {"has_error": False, "errors": [], "unchecked": True,
+                                         "message": f"エラー: {e}"}
+                continue
+
+            result = result or {"has_error": False, "errors": []}
+            self._results[key] = result
+            results[checker.name] = result
+            if self.verbose:
+                self._print_result(checker.name, result)
+
+        if self.verbose:
+            print(f"    （{len(futures)}件を並列実行: {time.time() - start:.1f}秒）")
+        return results
+
+    @staticmethod
+    def _print_result(name: str, result: dict):
+        errors = checker_errors(result)
+        if errors:
+            print(f"    ❌ {name}: {len(errors)}件のエラー")
+            for err in errors[:3]:
+                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
+        else:
+            print(f"    ✅ {name}: OK")
+
+    def close(self):
+        # タイムアウトしたチェッカーの終了は待たない
+        self._executor.shutdown(wait=False)
+
+
+def run_fact_check_rounds(script, checkers: list, fix, max_rounds: int = 3):
+    """ファクトチェック → 修正 を最大 max_rounds 回繰り返す
+
+    Args:
+        script: 台本
+        checkers: FactChecker のリスト
+        fix: fix(script, errors) -> 修正後の台本
+        max_rounds: 最大回数
+
+    Returns:
+        チェック済み（最後の回でエラーが残っていればそのまま）の台本
+    """
+    engine = FactCheckEngine(checkers)
+    try:
+        for attempt in range(max_rounds):
+            print(f"\n  === ファクトチェック {attempt + 1}回目 ===")
+            results = engine.run(script)
+
+            all_errors = []
+            for checker in checkers:
+                all_errors.extend(checker_errors(results[checker.name]))
+            # タイムアウト・エラーでチェックできなかったもの（OK には数えない）
+            unchecked = [checker.name for checker in checkers if results[checker.name].get("unchecked")]
+
+            if not all_errors:
+                # 全チェックOKなら終了
+                if not unchecked:
+                    print(f"  🎉 {len(checkers)}重ファクトチェック全てOK！")
+                    return script
+                if attempt < max_rounds - 1:
+                    print(f"  ⚠️ 未チェック: {', '.join(unchecked)}（もう一度待ちます）")
+                    continue
+                checked = len(checkers) - len(unchecked)
+                print(f"  ⚠️ {checked}/{len(checkers)}件のチェックはOK、未チェック: {', '.join(unchecked)}（続行します）")
+                return script
+
+            # 最後の試行でもエラーがあれば警告して続行
+            if attempt == max_rounds - 1:
+                print(f"  ⚠️ {len(all_errors)}件のエラーが残っていますが、続行します")
+                return script
+
+            # エラーがあれば修正
+            print(f"  ⚠️ {len(all_errors)}件のエラーを修正中...")
+            script = fix(script, all_errors)
+    finally:
+        engine.close()
+
+    return script
+
+
+def run_benchmark(latency: float = 1.0, rounds: int = 3):
+    """遅延を入れた偽チェッカーで順次実行と比較"""
+    calls = {"count": 0}
+
+    def fake_checker(name, delay, error_until_round):
+        def check(script):
+            calls["count"] += 1
+            time.sleep(delay)
+            if script["round"] < error_until_round:
+                return {"has_error": True, "errors": [{"箇所": name, "問題": "数字が違う"}]}
+            return {"has_error": False, "errors": []}
+        return check
+
+    def make_checkers(timeout=None):
+        return [
+            FactChecker("Gemini", fake_checker("Gemini", latency, 1), timeout=timeout),
+            # Web検索は数字だけを見る（修正で数字が変わらなければ再実行しない）
+            FactChecker("Web検索", fake_checker("Web検索", latency * 2, 0),
+                        inputs=lambda s: s["numbers"], timeout=timeout),
+            FactChecker("Claude", fake_checker("Claude", latency * 1.5, 2), timeout=timeout),
+        ]
+
+    def fix(script, errors):
+        return dict(script, round=script["round"] + 1)
+
+    script = {"round": 0, "numbers": [65, 2.7]}
+
+    start = time.time()
+    sequential_calls = 0
+    current = script
+    for attempt in range(rounds):
+        errors = []
+        for checker in make_checkers():
+            sequential_calls += 1
+            errors.extend(checker_errors(checker.check(current)))
+        if not errors or attempt == rounds - 1:
+            break
+        current = fix(current, errors)
+    sequential = time.time() - start
+    print(f"順次実行: {sequential:.1f}秒（{sequential_calls}回呼び出し）")
+
+    calls["count"] = 0
+    start = time.time()
+    run_fact_check_rounds(script, make_checkers(), fix, max_rounds=rounds)
+    print(f"並列エンジン: {time.time() - start:.1f}秒（{calls['count']}回呼び出し）")
+
+    # 1つが極端に遅くてもタイムアウトで先に進む
+    slow = make_checkers(timeout=latency * 3)
+    slow[1] = FactChecker("Web検索", fake_checker("Web検索", latency * 30, 0), timeout=latency * 3)
+    start = time.time()
+    run_fact_check_rounds(script, slow, fix, max_rounds=rounds)
+    print(f"遅いチェッカーあり（タイムアウト {latency * 3:.0f}秒）: {time.time() - start:.1f}秒")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ファクトチェックの並列実行エンジン")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク")
+    parser.add_argument("--latency", type=float, default=1.0, help="偽チェッカーの遅延（秒）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(latency=args.latency)
+    else:
+        parser.print_help()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fish Audio TTS クライアント（同時実行数つき並列合成 + keep-alive セッション）
+
+セリフを1件ずつ requests.post すると、毎回TCP/TLS接続を張り直したうえで
+前のセリフの合成が終わるまで次を投げられない。
+- requests.Session をプールして使い回す（keep-alive で接続を張り直さない）
+- ボイスごとのトークンバケットでレート制限（429 を受けたボイスだけ待たせる）
+- 同時実行数を max_workers に制限して並列に合成し、結果は台本の順番通りに返す
+- 同じテキスト・ボイスの音声は TTS キャッシュから返す
+
+オフライン検証用に、ローカルで動く Fish Audio の代用サーバー（FakeFishAudioServer）を同梱。
+
+環境変数:
+    FISH_AUDIO_MAX_WORKERS=4        同時に合成するセリフ数
+    FISH_AUDIO_RPM_PER_VOICE=60     1ボイスあたりのRPM
+
+使い方:
+    client = get_fish_audio_client(FISH_AUDIO_API_KEY)
+    results = client.map([(text, voice_id) for ...])  # bytes（失敗時は None）のリスト
+
+ベンチマーク:
+    python fish_audio_client.py --bench
+"""
+
+import argparse
+import io
+import os
+import queue
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tts_cache import get_tts_cache, tts_cache_key
+
+
+FISH_AUDIO_API_URL = "https://api.fish.audio/v1/tts"
+FISH_AUDIO_MAX_WORKERS = int(os.environ.get("FISH_AUDIO_MAX_WORKERS", "4"))
+FISH_AUDIO_RPM_PER_VOICE = float(os.environ.get("FISH_AUDIO_RPM_PER_VOICE", "60"))
+DEFAULT_BURST = 2  # 1ボイスで連続して投げられる数
+
+
+def _retry_after(response) -> float:
+    """Retry-After ヘッダー（秒）を取得（なければ None）"""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """トークンバケット（予約型: 先にトークンを引き、使える時刻を返す）
+
+    Args:
+        rate: 1秒あたりの補充トークン数
+        burst: バケット容量
+    """
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """次のトークンが使える時刻"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """トークンを1つ予約し、使ってよい時刻を返す"""
+        ready = self.ready_at(now)
+        self.tokens -= 1
+        return ready
+
+    def drain(self, now: float):
+        """残りトークンを捨てる（429を受けたとき）"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class FishAudioClient:
+    """Fish Audio TTS クライアント
+
+    Args:
+        api_key: Fish Audio APIキー
+        api_url: エンドポイント（ベンチマークではローカルの代用サーバー）
+        max_workers: 同時に合成するセリフ数
+        requests_per_minute: 1ボイスあたりのRPM
+        burst: 1ボイスで連続して投げられる数
+        timeout: 1リクエストのタイムアウト秒数
+        max_retries: 1セリフあたりの最大試行回数
+        cache: TTSCache（None ならプロセス共通のキャッシュ）
+    """
+
+    def __init__(self, api_key: str, api_url: str = FISH_AUDIO_API_URL,
+                 max_workers: int = FISH_AUDIO_MAX_WORKERS,
+                 requests_per_minute: float = FISH_AUDIO_RPM_PER_VOICE, burst: int = DEFAULT_BURST,
+                 timeout: int = 60, max_retries: int = 3, cache=None,
+                 clock=time.monotonic, sleep=time.sleep, verbose: bool = True):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.max_workers = max(1, max_workers)
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache if cache is not None else get_tts_cache()
+        self.clock = clock
+        self.sleep = sleep
+        self.verbose = verbose
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._pool = queue.LifoQueue()  # 空いているセッション
+        self._sessions = []
+        self.requests = 0
+        self.rate_limited = 0
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _acquire_session(self) -> requests.Session:
+        """プールから keep-alive セッションを借りる（空きがなければ作る）"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def _post(self, payload: dict, timeout: int):
+        session = self._acquire_session()
+        try:
+            return session.post(self.api_url, json=payload, timeout=timeout)
+        finally:
+            self._pool.put(session)
+
+    def _wait_for_voice(self, reference_id: str):
+        """ボイスのトークンを予約し、使える時刻まで待つ"""
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(reference_id)
+            if bucket is None:
+                bucket = self._buckets[reference_id] = TokenBucket(self.rate, self.burst, now)
+            start = bucket.reserve(now)
+            self.requests += 1
+        wait = start - self.clock()
+        if wait > 0:
+            self.sleep(wait)
+
+    def _penalize(self, reference_id: str, delay: float):
+        """429を返したボイスのトークンを捨て、delay 秒後まで次を投げない"""
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets[reference_id]
+            bucket.drain(now)
+            bucket.tokens -= delay * self.rate
+            self.rate_limited += 1
+
+    def synthesize(self, text: str, reference_id: str, label: str = "",
+                   max_retries: int = None, timeout: int = None) -> bytes:
+        """1セリフを合成してWAVのバイト列を返す（全リトライ失敗で None）
+
+        max_retries / timeout はこの呼び出しだけの上書き（None ならクライアントの設定）
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        timeout = self.timeout if timeout is None else timeout
+        cache_key = tts_cache_key("fish", reference_id, text, output="wav")
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        payload = {"text": text, "reference_id": reference_id, "format": "wav"}
+        last_error = None
+
+        for attempt in range(max_retries):
+            self._wait_for_voice(reference_id)
+            wait_time = (attempt + 1) * 2
+            try:
+                response = self._post(payload, timeout)
+                if response.status_code == 200:
+                    self.cache.put(cache_key, response.content)
+                    return response.content
+                if response.status_code == 429:
+                    self._log(f"      {label}[試行 {attempt + 1}] レート制限 (429)")
+                    wait_time = _retry_after(response) or wait_time
+                    self._penalize(reference_id, wait_time)
+                    last_error = "HTTP 429"
+                    continue
+                self._log(f"      {label}[試行 {attempt + 1}] エラー: {response.status_code} - {response.text[:100]}")
+                last_error = f"HTTP {response.status_code}"
+            except requests.Timeout:
+                self._log(f"      {label}[試行 {attempt + 1}] タイムアウト")
+                last_error = "Timeout"
+            except Exception as e:
+                self._log(f"      {label}[試行 {attempt + 1}] エラー: {str(e)[:100]}")
+                last_error = str(e)
+
+            if attempt < max_retries - 1:
+                self.sleep(wait_time)
+
+        self._log(f"    [Fish Audio] ✗ {label}全リトライ失敗: {last_error}")
+        return None
+
+    def map(self, jobs: list, on_result=None, max_retries: int = None, timeout: int = None) -> list:
+        """(テキスト, ボイスID) のリストを並列に合成し、台本の順番で結果を返す
+
+        Args:
+            jobs: [(text, reference_id), ...]
+            on_result: 1件終わるごとに on_result(index, audio) を呼ぶ（完了順）
+            max_retries, timeout: この呼び出しだけの上書き（None ならクライアントの設定）
+
+        Returns:
+            list: 各セリフのWAVバイト列（失敗したものは None）
+        """
+        results = [None] * len(jobs)
+
+        def run(index):
+            text, reference_id = jobs[index]
+            audio = self.synthesize(text, reference_id, label=f"セリフ{index + 1} ",
+                                    max_retries=max_retries, timeout=timeout)
+            results[index] = audio
+            if on_result:
+                on_result(index, audio)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in [executor.submit(run, i) for i in range(len(jobs))]:
+                future.result()
+        return results
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._pool = queue.LifoQueue()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_fish_audio_client(api_key: str) -> FishAudioClient:
+    """プロセス共通のクライアント（APIキーごと。セッションとレート制限の状態を共有）
+
+    設定は環境変数（FISH_AUDIO_MAX_WORKERS / FISH_AUDIO_RPM_PER_VOICE）の1か所だけ。
+    呼び出しごとに変えたい max_retries / timeout は synthesize() / map() に渡す。
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = FishAudioClient(api_key)
+        return client
+
+
+# ===== オフライン検証用の代用サーバー =====
+
+def _silence_wav(seconds: float, sample_rate: int = 24000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+class FakeFishAudioServer:
+    """Fish Audio API の代用（ローカルHTTP）
+
+    - 1リクエストあたり latency 秒かけて、テキスト長に比例した無音WAVを返す
+    - ボイスごとに period 秒あたり quota 件を超えると 429（Retry-After つき）
+    - 張られたTCP接続数を数える（keep-alive の効果確認用）
+    """
+
+    def __init__(self, latency: float = 0.2, quota: int = 1000, period: float = 60.0, handshake: float = 0.05):
+        self.latency = latency
+        self.quota = quota
+        self.period = period
+        self.handshake = handshake
+        self.connections = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self._history = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+                time.sleep(server.handshake)  # TLSハンドシェイク相当
+
+            def do_POST(self):
+                import json
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                voice = body.get("reference_id", "")
+                now = time.monotonic()
+                with server._lock:
+                    server.requests += 1
+                    history = [t for t in server._history.get(voice, []) if now - t < server.period]
+                    limited = len(history) >= server.quota
+                    if limited:
+                        server.rate_limited += 1
+                    else:
+                        history.append(now)
+                    server._history[voice] = history
+                if limited:
+                    self._send(429, b"rate limited", {"Retry-After": f"{server.period / server.quota:.2f}"})
+                    return
+                time.sleep(server.latency)
+                self._send(200, _silence_wav(len(body.get("text", "")) * 0.01), {"Content-Type": "audio/wav"})
+
+            def _send(self, status, data, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/tts"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_benchmark(lines: int = 100, workers: int = FISH_AUDIO_MAX_WORKERS, latency: float = 0.2):
+    """代用サーバーで旧順次処理（毎回 requests.post）とクライアントを比較"""
+    from tts_cache import TTSCache
+
+    voices = ["voice-katsumi", "voice-hiroshi"]
+    jobs = [(f"セリフ{i}です。" * 3, voices[i % 2]) for i in range(lines)]
+
+    with FakeFishAudioServer(latency=latency) as server:
+        start = time.perf_counter()
+        ok = 0
+        for text, voice in jobs:
+            response = requests.post(server.url, json={"text": text, "reference_id": voice, "format": "wav"},
+                                     headers={"Authorization": "Bearer fake"}, timeout=10)
+            ok += response.status_code == 200
+        baseline_time = time.perf_counter() - start
+        print(f"順次処理（毎回接続）: {baseline_time:.1f}秒  成功 {ok}/{lines}  接続 {server.connections}回")
+
+    # サーバー側の制限（1ボイス 10秒あたり60件）をボイスごとのトークンバケット（毎分300件）で守る
+    with FakeFishAudioServer(latency=latency, quota=60, period=10.0) as server:
+        client = FishAudioClient("fake", api_url=server.url, max_workers=workers,
+                                 requests_per_minute=300, burst=DEFAULT_BURST, cache=TTSCache(), verbose=False)
+        start = time.perf_counter()
+        results = client.map(jobs)
+        elapsed = time.perf_counter() - start
+        client.close()
+        ok = sum(r is not None for r in results)
+        print(f"クライアント（{workers}並列）: {elapsed:.1f}秒  成功 {ok}/{lines}  接続 {server.connections}回  "
+              f"429={server.rate_limited}回")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fish Audio TTS クライアント")
+    parser.add_argument("--bench", action="store_true", help="代用サーバーでベンチマーク")
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=FISH_AUDIO_MAX_WORKERS)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines, workers=args.workers)
+    else:
+        parser.print_help()
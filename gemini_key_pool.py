@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemini APIキープール（全パイプライン共通）
+
+GEMINI_API_KEY / GEMINI_API_KEY_1〜42 を1つのプールで管理する。
+- キーごとに直近60秒のリクエスト数・トークン数をスライディングウィンドウで集計
+- RPM/TPM の上限に達したキー、429を返したキーはクールダウンして選ばない
+- 空いているキーの中から一番負荷の低いキーを選ぶ（同率ならパイプラインごとに異なる順番）
+- 同期（acquire / lease）と asyncio（acquire_async / lease_async）の両方に対応
+- GEMINI_KEY_STATE_FILE を指定すると、同じマシンで動く別プロセスと429クールダウンを共有
+
+同時刻に複数のパイプラインが起動しても、同率時の優先順がパイプライン名で
+ずれるため、全員が同じ先頭キーに集中して429を出すことがない。
+
+GEMINI_KEY_STATE_FILE で共有できるのは同じマシン上のプロセスだけ（ローカルで複数スクリプトを
+同時に動かすとき）。GitHub Actions はジョブごとに別のランナーで動き、workflow でも設定していないので、
+パイプライン間の調整は上のパイプライン名による順番のずらしだけになる
+（クールダウンは数分で切れるため、actions/cache で次の実行に持ち越しても意味がない）。
+
+使い方:
+    pool = GeminiKeyPool()
+    with pool.lease(tokens=2000) as lease:
+        client = genai.Client(api_key=lease.api_key)
+        ...
+
+    async with pool.lease_async() as lease:
+        ...
+
+既存コード向けに GeminiKeyManager（get_key / next_key / get_working_key など）も提供。
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+
+# ===== 設定 =====
+MAX_KEY_INDEX = 42  # GEMINI_API_KEY_1〜42
+WINDOW_SECONDS = 60.0
+REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_RPM_PER_KEY", "10"))
+TOKENS_PER_MINUTE = int(os.environ.get("GEMINI_TPM_PER_KEY", "250000"))
+COOLDOWN_SECONDS = 60.0  # 429後の初回クールダウン（連続するたびに倍）
+MAX_COOLDOWN_SECONDS = 300.0
+STATE_FILE = os.environ.get("GEMINI_KEY_STATE_FILE", "")
+
+
+class KeyPoolTimeout(TimeoutError):
+    """タイムアウトまでに使えるキーがなかった"""
+
+
+def load_gemini_keys(max_index: int = MAX_KEY_INDEX) -> list:
+    """環境変数からAPIキーを読み込み [(api_key, key_name), ...] を返す"""
+    keys = []
+    seen = set()
+    main_key = os.environ.get("GEMINI_API_KEY")
+    if main_key:
+        keys.append((main_key, "MAIN"))
+        seen.add(main_key)
+    for i in range(1, max_index + 1):
+        key = os.environ.get(f"GEMINI_API_KEY_{i}")
+        if key and key not in seen:
+            keys.append((key, f"KEY_{i}"))
+            seen.add(key)
+    return keys
+
+
+# メッセージ中のステータスとしての 429（"429 RESOURCE_EXHAUSTED" / "HTTP 429" など。IDや数値の一部は除く）
+_STATUS_429 = re.compile(r"(?<![\w.\-/])429(?![\w\-/]|\.\d)")
+
+
+def is_rate_limit_error(error) -> bool:
+    """429（クォータ超過）エラーかどうか
+
+    ステータスコードか RESOURCE_EXHAUSTED で判定する。"quota" を含むだけのエラー
+    （課金・quota project の設定ミスの 400 など）はキーを替えても直らないので含めない。
+    """
+    response = getattr(error, "response", None)
+    for code in (getattr(error, "code", None), getattr(error, "status_code", None),
+                 getattr(response, "status_code", None)):
+        if isinstance(code, int):
+            return code == 429
+    message = str(error)
+    return "RESOURCE_EXHAUSTED" in message or bool(_STATUS_429.search(message))
+
+
+def retry_after_seconds(error):
+    """エラーメッセージからサーバー指定の待機秒数を取得（なければ None）"""
+    match = re.search(r"retry(?:Delay)?['\"]?\s*(?:in|:)\s*['\"]?([\d.]+)s", str(error), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def _default_pipeline() -> str:
+    return os.environ.get("GITHUB_WORKFLOW") or os.path.basename(sys.argv[0] or "") or "default"
+
+
+class _KeyState:
+    """APIキー1個分の集計"""
+
+    def __init__(self, api_key: str, key_name: str, index: int, order: int):
+        self.api_key = api_key
+        self.key_name = key_name
+        self.index = index
+        self.order = order  # 同率時の優先順（パイプラインごとに異なる）
+        self.fingerprint = hashlib.sha1(api_key.encode()).hexdigest()[:12]
+        self.requests = deque()  # リクエスト時刻
+        self.tokens = deque()  # (時刻, トークン数)
+        self.token_total = 0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.strikes = 0  # 連続429回数
+        self.count_429 = 0
+        self.count_requests = 0
+
+    def prune(self, now: float, window: float):
+        while self.requests and now - self.requests[0] >= window:
+            self.requests.popleft()
+        while self.tokens and now - self.tokens[0][0] >= window:
+            self.token_total -= self.tokens.popleft()[1]
+
+
+class KeyLease:
+    """acquire() で借りたキー（api_key, key_name にアンパック可能）"""
+
+    def __init__(self, pool, state: _KeyState, tokens: int):
+        self.pool = pool
+        self.api_key = state.api_key
+        self.key_name = state.key_name
+        self._state = state
+        self._tokens = tokens
+        self._released = False
+
+    def __iter__(self):
+        return iter((self.api_key, self.key_name))
+
+    def release(self, tokens_used: int = None):
+        """返却（tokens_used を渡すと見積もりを実績で置き換える）"""
+        if not self._released:
+            self._released = True
+            self.pool._release(self._state, self._tokens, tokens_used)
+
+    def report_429(self, error=None):
+        """このキーが429を返した"""
+        self.pool.report_429(self.api_key, error)
+
+
+class GeminiKeyPool:
+    """キーごとのRPM/TPM・クールダウンを管理し、一番空いているキーを貸し出す
+
+    Args:
+        keys: [(api_key, key_name), ...]（None なら環境変数から読み込み）
+        requests_per_minute: 1キーあたりのRPM上限
+        tokens_per_minute: 1キーあたりのTPM上限
+        pipeline: パイプライン名（同率時の優先順に使う。None なら GITHUB_WORKFLOW かスクリプト名）
+        state_file: 429クールダウンを別プロセスと共有するJSONファイル
+        required: キーがなければ ValueError
+        clock: 現在時刻を返す関数（テストで仮想時計に差し替えるとき以外は time.time）
+        sleep: 空きを待つ関数（仮想時計を進めるとき用。None なら実時間で待つ）
+    """
+
+    def __init__(self, keys=None, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, window=WINDOW_SECONDS,
+                 cooldown=COOLDOWN_SECONDS, max_cooldown=MAX_COOLDOWN_SECONDS,
+                 pipeline=None, state_file=STATE_FILE, required=False, verbose=True,
+                 clock=time.time, sleep=None):
+        keys = load_gemini_keys() if keys is None else list(keys)
+        if required and not keys:
+            raise ValueError("GEMINI_API_KEY が設定されていません")
+
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.pipeline = pipeline or _default_pipeline()
+        self.state_file = state_file
+        self.verbose = verbose
+        self.clock = clock
+        self._sleep = sleep
+        self._state_mtime = None
+
+        # パイプライン名から決まる順番で同率時の優先順をずらす
+        offset = int(hashlib.sha1(self.pipeline.encode()).hexdigest(), 16) % len(keys) if keys else 0
+        self._states = [
+            _KeyState(api_key, key_name, i, (i - offset) % len(keys))
+            for i, (api_key, key_name) in enumerate(keys)
+        ]
+        self._by_key = {s.api_key: s for s in self._states}
+        self._by_name = {s.key_name: s for s in self._states}
+        self._cond = threading.Condition()
+
+        if verbose:
+            if keys:
+                print(f"  [APIキー] {len(keys)}個のキーを読み込みました")
+            else:
+                print("  ⚠ Gemini APIキーが見つかりません")
+
+    # ===== 基本情報 =====
+
+    @property
+    def keys(self) -> list:
+        return [s.api_key for s in self._states]
+
+    @property
+    def key_names(self) -> list:
+        return [s.key_name for s in self._states]
+
+    def __len__(self):
+        return len(self._states)
+
+    def _lookup(self, key_or_name):
+        return self._by_key.get(key_or_name) or self._by_name.get(key_or_name)
+
+    # ===== 選択 =====
+
+    def _available_at(self, state: _KeyState, now: float, tokens: int) -> float:
+        """キーが使えるようになる時刻"""
+        state.prune(now, self.window)
+        ready = state.cooldown_until
+        if self.requests_per_minute and len(state.requests) >= self.requests_per_minute:
+            ready = max(ready, state.requests[-self.requests_per_minute] + self.window)
+        if self.tokens_per_minute and state.tokens and state.token_total + tokens > self.tokens_per_minute:
+            # 古いものから期限切れになるまで待つ
+            total = state.token_total
+            for t, n in state.tokens:
+                total -= n
+                if total + tokens <= self.tokens_per_minute:
+                    ready = max(ready, t + self.window)
+                    break
+        return ready
+
+    def _load(self, state: _KeyState):
+        return (state.in_flight, len(state.requests), state.token_total, state.strikes, state.order)
+
+    def _select(self, now: float, tokens: int, exclude):
+        """(一番空いているキー, 使える時刻) を返す"""
+        candidates = [s for s in self._states if s.api_key not in exclude and s.key_name not in exclude]
+        if not candidates:
+            candidates = self._states
+        timed = [(self._available_at(s, now, tokens), s) for s in candidates]
+        ready = [s for at, s in timed if at <= now]
+        if ready:
+            return min(ready, key=self._load), now
+        at, state = min(timed, key=lambda x: (x[0], self._load(x[1])))
+        return state, at
+
+    def _take(self, state: _KeyState, now: float, tokens: int) -> KeyLease:
+        state.requests.append(now)
+        if tokens:
+            state.tokens.append((now, tokens))
+            state.token_total += tokens
+        state.in_flight += 1
+        state.count_requests += 1
+        return KeyLease(self, state, tokens)
+
+    def try_acquire(self, tokens: int = 0, exclude=()):
+        """今すぐ使えるキーを借りる（なければ None）"""
+        if not self._states:
+            return None
+        self._merge_shared_state()
+        with self._cond:
+            now = self.clock()
+            state, at = self._select(now, tokens, exclude)
+            if at > now:
+                return None
+            return self._take(state, now, tokens)
+
+    def next_available_in(self, tokens: int = 0, exclude=()) -> float:
+        """次にキーが使えるまでの秒数"""
+        with self._cond:
+            now = self.clock()
+            _, at = self._select(now, tokens, exclude)
+            return max(0.0, at - now)
+
+    def acquire(self, tokens: int = 0, exclude=(), timeout: float = None, force: bool = False) -> KeyLease:
+        """キーを借りる（空くまで待つ）
+
+        Args:
+            tokens: このリクエストの見積もりトークン数
+            exclude: 除外するキー（値または名前）
+            timeout: 最大待機秒数（None なら無制限）
+            force: タイムアウト時に一番早く空くキーを上限超過のまま返す（False なら KeyPoolTimeout）
+        """
+        if not self._states:
+            raise ValueError("APIキーがありません")
+        deadline = None if timeout is None else self.clock() + timeout
+        self._merge_shared_state()
+        with self._cond:
+            while True:
+                now = self.clock()
+                state, at = self._select(now, tokens, exclude)
+                if at <= now:
+                    return self._take(state, now, tokens)
+                if deadline is not None and now >= deadline:
+                    if force:
+                        return self._take(state, now, tokens)
+                    raise KeyPoolTimeout(f"{timeout}秒以内に使えるAPIキーがありません")
+                wait = at - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                if self._sleep is not None:
+                    self._sleep(wait)
+                else:
+                    self._cond.wait(wait)
+
+    async def acquire_async(self, tokens: int = 0, exclude=(), timeout: float = None,
+                            force: bool = False) -> KeyLease:
+        """acquire() の asyncio 版（待機中もイベントループを止めない）"""
+        if not self._states:
+            raise ValueError("APIキーがありません")
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            lease = self.try_acquire(tokens, exclude)
+            if lease is not None:
+                return lease
+            now = self.clock()
+            if deadline is not None and now >= deadline:
+                if force:
+                    with self._cond:
+                        state, _ = self._select(now, tokens, exclude)
+                        return self._take(state, now, tokens)
+                raise KeyPoolTimeout(f"{timeout}秒以内に使えるAPIキーがありません")
+            wait = self.next_available_in(tokens, exclude)
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            if self._sleep is not None:
+                self._sleep(wait)
+                continue
+            # 他スレッドの release で早く空くこともあるので最大1秒ごとに見直す
+            await asyncio.sleep(min(max(wait, 0.01), 1.0))
+
+    @contextlib.contextmanager
+    def lease(self, tokens: int = 0, exclude=(), timeout: float = None):
+        """with pool.lease() as lease: で借りて自動返却（429例外は自動でクールダウン）"""
+        lease = self.acquire(tokens, exclude, timeout)
+        try:
+            yield lease
+        except Exception as e:
+            if is_rate_limit_error(e):
+                lease.report_429(e)
+            raise
+        finally:
+            lease.release()
+
+    @contextlib.asynccontextmanager
+    async def lease_async(self, tokens: int = 0, exclude=(), timeout: float = None):
+        """async with pool.lease_async() as lease: で借りて自動返却"""
+        lease = await self.acquire_async(tokens, exclude, timeout)
+        try:
+            yield lease
+        except Exception as e:
+            if is_rate_limit_error(e):
+                lease.report_429(e)
+            raise
+        finally:
+            lease.release()
+
+    def _release(self, state: _KeyState, estimated: int, tokens_used):
+        with self._cond:
+            state.in_flight = max(0, state.in_flight - 1)
+            if tokens_used is not None and tokens_used != estimated:
+                now = self.clock()
+                state.tokens.append((now, tokens_used - estimated))
+                state.token_total += tokens_used - estimated
+            self._cond.notify_all()
+
+    # ===== 結果の報告 =====
+
+    def report_success(self, key_or_name):
+        """成功（連続429カウントをリセット）"""
+        with self._cond:
+            state = self._lookup(key_or_name)
+            if state:
+                state.strikes = 0
+
+    def report_429(self, key_or_name, error=None):
+        """429を返したキーだけをクールダウン"""
+        with self._cond:
+            state = self._lookup(key_or_name)
+            if not state:
+                return
+            state.strikes += 1
+            state.count_429 += 1
+            delay = retry_after_seconds(error) if error is not None else None
+            if delay is None:
+                delay = min(self.cooldown * (2 ** (state.strikes - 1)), self.max_cooldown)
+            state.cooldown_until = max(state.cooldown_until, self.clock() + delay)
+            self._cond.notify_all()
+        if self.verbose:
+            print(f"        [429] {state.key_name} {delay:.0f}秒クールダウン（429回数: {state.count_429}）")
+        self._write_shared_state(state)
+
+    def report_failure(self, key_or_name, cooldown: float = None):
+        """429以外の理由でキーをしばらく使わない"""
+        with self._cond:
+            state = self._lookup(key_or_name)
+            if not state:
+                return
+            state.cooldown_until = max(state.cooldown_until, self.clock() + (cooldown or self.cooldown))
+            self._cond.notify_all()
+
+    def cooling_keys(self) -> set:
+        """クールダウン中のキー"""
+        now = self.clock()
+        return {s.api_key for s in self._states if s.cooldown_until > now}
+
+    def stats(self) -> dict:
+        """キーごとの集計"""
+        with self._cond:
+            now = self.clock()
+            result = {}
+            for s in self._states:
+                s.prune(now, self.window)
+                result[s.key_name] = {
+                    "requests": s.count_requests,
+                    "window_requests": len(s.requests),
+                    "window_tokens": s.token_total,
+                    "rate_limited": s.count_429,
+                    "cooldown": max(0.0, s.cooldown_until - now),
+                }
+            return result
+
+    def error_summary(self) -> str:
+        """429回数のサマリー"""
+        summary = [f"{s.key_name}: 429x{s.count_429}" for s in self._states if s.count_429 > 0]
+        return ", ".join(summary) if summary else "エラーなし"
+
+    # ===== 別プロセスとの共有（任意） =====
+
+    def _merge_shared_state(self):
+        """状態ファイルから他プロセスの429クールダウンを取り込む"""
+        if not self.state_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.state_file)
+        except OSError:
+            return
+        if mtime == self._state_mtime:
+            return
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._state_mtime = mtime
+        with self._cond:
+            for s in self._states:
+                until = shared.get(s.fingerprint, {}).get("cooldown_until", 0.0)
+                s.cooldown_until = max(s.cooldown_until, until)
+
+    def _write_shared_state(self, state: _KeyState):
+        """自分が受けた429クールダウンを状態ファイルに書き込む"""
+        if not self.state_file:
+            return
+        try:
+            import fcntl
+        except ImportError:
+            return
+        try:
+            with open(self.state_file, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    shared = json.loads(f.read() or "{}")
+                except ValueError:
+                    shared = {}
+                now = self.clock()
+                shared = {fp: v for fp, v in shared.items() if v.get("cooldown_until", 0) > now}
+                shared[state.fingerprint] = {"cooldown_until": state.cooldown_until}
+                f.seek(0)
+                f.truncate()
+                json.dump(shared, f)
+        except OSError as e:
+            if self.verbose:
+                print(f"  ⚠ キー状態ファイル書き込み失敗: {e}")
+
+
+class GeminiKeyManager(GeminiKeyPool):
+    """既存パイプライン向けの互換API
+
+    get_key() は現在のキーを返し、next_key() / get_working_key() などは
+    プールから一番空いているキーを選び直す（ラウンドロビンではない）。
+    選んだ時点で1リクエストとして集計する。
+    """
+
+    def __init__(self, keys=None, required=False, **kwargs):
+        super().__init__(keys=keys, required=required, **kwargs)
+        self.current_index = 0
+        if self._states:
+            self.current_index = self._pick().index
+
+    def _pick(self, exclude=()) -> _KeyState:
+        # 旧APIは待たずに返していたので、空きがなければ一番早く空くキーをそのまま返す
+        lease = self.acquire(exclude=exclude, timeout=0, force=True)
+        lease.release()
+        return lease._state
+
+    @property
+    def failed_keys(self) -> set:
+        """クールダウン中のキー"""
+        return self.cooling_keys()
+
+    def get_key_count(self) -> int:
+        return len(self._states)
+
+    def get_key(self) -> str:
+        """現在のAPIキーを取得"""
+        if not self._states:
+            return ""
+        return self._states[self.current_index].api_key
+
+    def get_key_name(self) -> str:
+        if not self._states:
+            return ""
+        return self._states[self.current_index].key_name
+
+    def next_key(self) -> str:
+        """現在のキーを外して一番空いているキーに切り替え"""
+        if len(self._states) > 1:
+            current = self._states[self.current_index]
+            self.current_index = self._pick(exclude=(current.api_key,)).index
+            if self.verbose:
+                print(f"  [APIキー] {self._states[self.current_index].key_name}に切り替え")
+        return self.get_key()
+
+    def get_working_key(self) -> tuple:
+        """一番空いているキーを (api_key, key_name) で取得"""
+        if not self._states:
+            return None, "NONE"
+        state = self._pick()
+        return state.api_key, state.key_name
+
+    get_next_key = get_working_key
+    get_random_key = get_working_key
+
+    def get_key_with_least_failures(self, exclude_keys: set = None) -> tuple:
+        """除外キー以外で一番空いているキーを取得"""
+        if not self._states:
+            return None, "NONE"
+        state = self._pick(exclude=exclude_keys or ())
+        return state.api_key, state.key_name
+
+    def get_key_by_index(self, index: int):
+        """インデックスでキーを取得（並列処理で固定割り当てする場合）"""
+        if not self._states:
+            return None
+        return self._states[index % len(self._states)].api_key
+
+    def get_key_for_index(self, index: int) -> tuple:
+        """インデックスで (api_key, key_name) を取得"""
+        state = self._states[index % len(self._states)]
+        return state.api_key, state.key_name
+
+    def get_all_keys(self) -> list:
+        """全APIキー"""
+        return self.keys
+
+    def get_named_keys(self) -> list:
+        """全APIキーを [(api_key, key_name), ...] で取得"""
+        return [(s.api_key, s.key_name) for s in self._states]
+
+    def mark_failed(self, key_or_name):
+        """キーをしばらく使わない"""
+        self.report_failure(key_or_name)
+
+    def mark_429_error(self, api_key: str, error=None):
+        """429エラーを記録してクールダウン"""
+        self.report_429(api_key, error)
+
+    def get_error_summary(self) -> str:
+        return self.error_summary()
+
+
+if __name__ == "__main__":
+    # キーの読み込み状況と選択順を確認
+    manager = GeminiKeyManager(keys=load_gemini_keys() or [(f"dummy-{i}", f"KEY_{i}") for i in range(5)])
+    for _ in range(min(10, len(manager) * 2)):
+        print(manager.get_working_key()[1])
+    print(manager.stats())
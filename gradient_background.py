@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+グラデーション背景エンジン（ランキング動画共通）
+
+- 多色グラデーションをNumPy配列で一括計算（1ピクセルずつのPythonループを廃止）
+- 完成した背景を (サイズ, 色, 角度, モード) でメモ化し、フレームごとはコピーのみ
+- 既存の135度グラデーション（t = (x + y) / (width + height)）とバイト単位で一致
+
+使い方:
+    from gradient_background import get_gradient_image
+    img = get_gradient_image(1920, 1080, [(255, 248, 220), (255, 215, 0)], angle=135)
+
+ベンチマーク:
+    python gradient_background.py --bench
+"""
+
+import math
+import time
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+
+# 背景キャッシュの上限（フルHD RGBA 1枚 ≒ 8MB）
+BACKGROUND_CACHE_SIZE = 32
+# バーなど小さいグラデーションのキャッシュ上限（アニメーション中は幅が毎フレーム変わる）
+STRIP_CACHE_SIZE = 512
+
+
+def _direction(angle):
+    """CSS互換の角度（0=上, 90=右, 135=右下, 180=下）を方向ベクトルに変換
+
+    大きい方の成分が1になるよう正規化し、浮動小数の誤差を丸める。
+    135度なら (1, 1) となり、既存実装の x + y と完全に一致する。
+    """
+    rad = math.radians(angle)
+    dx, dy = math.sin(rad), -math.cos(rad)
+    scale = max(abs(dx), abs(dy))
+    return round(dx / scale, 12), round(dy / scale, 12)
+
+
+def gradient_array(width, height, stops, angle=135.0):
+    """多色グラデーションを (height, width, 3) の uint8 配列で計算
+
+    Args:
+        width, height: 画像サイズ
+        stops: 等間隔に並べる色 [(r, g, b), ...]（2色以上）
+        angle: グラデーションの向き（CSS互換、度）
+
+    Returns:
+        np.ndarray (height, width, 3) uint8
+    """
+    colors = np.asarray(stops, dtype=np.float64)
+    if colors.ndim != 2 or len(colors) < 2:
+        raise ValueError("stops には2色以上を指定してください")
+
+    dx, dy = _direction(angle)
+    xs = np.arange(width, dtype=np.float64) * dx
+    ys = np.arange(height, dtype=np.float64) * dy
+    proj = ys[:, None] + xs[None, :]
+
+    # 画像の四隅（ピクセル端）で射影の範囲を決める
+    corners = [0.0, width * dx, height * dy, width * dx + height * dy]
+    p_min, p_max = min(corners), max(corners)
+    span = (p_max - p_min) or 1.0
+    t = (proj - p_min) / span
+
+    # 隣り合う2色の線形補間（既存ループと同じ演算順序）
+    n = len(colors)
+    segment = t * (n - 1)
+    idx = np.minimum(segment.astype(np.int64), n - 2)
+    local_t = (segment - idx)[..., None]
+    blended = colors[idx] * (1 - local_t) + colors[idx + 1] * local_t
+
+    # int() と同じく0方向への切り捨て
+    return blended.astype(np.uint8)
+
+
+def _render_gradient(width, height, stops, angle, mode):
+    """グラデーション配列をPIL画像に変換"""
+    img = Image.fromarray(gradient_array(width, height, stops, angle))
+    if mode != 'RGB':
+        img = img.convert(mode)
+    return img
+
+
+@lru_cache(maxsize=BACKGROUND_CACHE_SIZE)
+def _cached_gradient(width, height, stops, angle, mode):
+    """完成した背景画像をキャッシュ（呼び出し側には必ずコピーを渡す）"""
+    return _render_gradient(width, height, stops, angle, mode)
+
+
+@lru_cache(maxsize=STRIP_CACHE_SIZE)
+def _cached_strip(width, height, stops, angle, mode):
+    """バー用の小さいグラデーション画像をキャッシュ"""
+    return _render_gradient(width, height, stops, angle, mode)
+
+
+def _normalize_stops(stops):
+    """色リストをキャッシュキーに使えるタプルに変換"""
+    return tuple(tuple(int(c) for c in color[:3]) for color in stops)
+
+
+def get_gradient_image(width, height, stops, angle=135.0, mode='RGB'):
+    """メモ化済みのグラデーション背景を取得（毎回コピーを返す）
+
+    Args:
+        width, height: 画像サイズ
+        stops: 色リスト [(r, g, b), ...]
+        angle: グラデーションの向き（CSS互換、度）
+        mode: 'RGB' または 'RGBA'
+
+    Returns:
+        PIL.Image（呼び出し側で自由に描画してよい）
+    """
+    key = (int(width), int(height), _normalize_stops(stops), float(angle), mode)
+    return _cached_gradient(*key).copy()
+
+
+def get_gradient_strip(width, height, stops, angle=90.0, mode='RGBA'):
+    """バー等の小さいグラデーション画像を取得（毎回コピーを返す）"""
+    key = (int(width), int(height), _normalize_stops(stops), float(angle), mode)
+    return _cached_strip(*key).copy()
+
+
+def clear_gradient_cache():
+    """グラデーションキャッシュをクリア"""
+    _cached_gradient.cache_clear()
+    _cached_strip.cache_clear()
+
+
+# ========== ベンチマーク ==========
+
+def _legacy_gradient(width, height, stops):
+    """旧実装（1ピクセルずつ計算）- ベンチマーク比較用"""
+    img = Image.new('RGB', (width, height))
+    pixels = img.load()
+    for y in range(height):
+        for x in range(width):
+            t = (x + y) / (width + height)
+            segment = t * (len(stops) - 1)
+            idx = int(segment)
+            idx = min(idx, len(stops) - 2)
+            local_t = segment - idx
+            r = int(stops[idx][0] * (1 - local_t) + stops[idx + 1][0] * local_t)
+            g = int(stops[idx][1] * (1 - local_t) + stops[idx + 1][1] * local_t)
+            b = int(stops[idx][2] * (1 - local_t) + stops[idx + 1][2] * local_t)
+            pixels[x, y] = (r, g, b)
+    return img
+
+
+def run_benchmark(width=1920, height=1080, frames=30):
+    """旧実装と新実装の背景生成フレームレートを比較"""
+    stops = [
+        (255, 248, 220), (255, 228, 181), (255, 215, 0),
+        (218, 165, 32), (245, 222, 179),
+    ]
+
+    print(f"=== グラデーション背景ベンチマーク ({width}x{height}) ===")
+
+    # 旧実装は遅いので1フレームだけ計測
+    start = time.perf_counter()
+    legacy = _legacy_gradient(width, height, stops)
+    legacy_sec = time.perf_counter() - start
+    print(f"  旧実装（ピクセルループ）: {1 / legacy_sec:8.2f} fps ({legacy_sec:.2f}秒/フレーム)")
+
+    clear_gradient_cache()
+    start = time.perf_counter()
+    fresh = Image.fromarray(gradient_array(width, height, stops))
+    vector_sec = time.perf_counter() - start
+    print(f"  NumPy一括計算（初回）  : {1 / vector_sec:8.2f} fps ({vector_sec * 1000:.1f}ms/フレーム)")
+
+    get_gradient_image(width, height, stops, mode='RGBA')
+    start = time.perf_counter()
+    for _ in range(frames):
+        get_gradient_image(width, height, stops, mode='RGBA')
+    cached_sec = (time.perf_counter() - start) / frames
+    print(f"  キャッシュ済みコピー   : {1 / cached_sec:8.2f} fps ({cached_sec * 1000:.2f}ms/フレーム)")
+
+    identical = legacy.tobytes() == fresh.tobytes()
+    print(f"  出力一致: {'OK' if identical else 'NG'}")
+    return identical
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="グラデーション背景エンジン")
+    parser.add_argument("--bench", action="store_true", help="ベンチマークを実行")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(args.width, args.height)
+    else:
+        parser.print_help()
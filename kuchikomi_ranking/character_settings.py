@@ -12,6 +12,8 @@ import os
 import re
 from pathlib import Path
 
+from reading_normalizer import compile_reading_dict
+
 # ===== パス設定 =====
 BASE_DIR = Path(__file__).parent
 ASSETS_DIR = BASE_DIR / "assets"
@@ -68,19 +70,25 @@ READING_DICT = {
 }
 
 
+_reading_normalizer = None
+
+
+def _get_reading_normalizer():
+    """READING_DICT をコンパイルした置換器（初回のみ作成）"""
+    global _reading_normalizer
+    if _reading_normalizer is None:
+        _reading_normalizer = compile_reading_dict(READING_DICT)
+    return _reading_normalizer
+
+
 def apply_reading_dict(text: str, custom_dict: dict = None) -> str:
     """読み方辞書でテキストを変換（TTS用）"""
     if not text:
         return text
 
-    reading_dict = READING_DICT.copy()
     if custom_dict:
-        reading_dict.update(custom_dict)
-
-    for key in sorted(reading_dict.keys(), key=len, reverse=True):
-        text = text.replace(key, reading_dict[key])
-
-    return text
+        return compile_reading_dict(READING_DICT, custom_dict).normalize(text)
+    return _get_reading_normalizer().normalize(text)
 
 
 # ===== メインキャラクター設定 =====
@@ -5,8 +5,12 @@ YouTube動画から字幕を取得
 """
 
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from transcript_cache import get_transcript_service
 
 
 def extract_video_id(url: str) -> str:
@@ -51,57 +55,23 @@ def fetch_transcript(video_url: str, languages: list = None) -> dict:
     print(f"📺 動画ID: {video_id}")
     print(f"🔍 字幕を取得中...")
 
-    try:
-        # YouTubeTranscriptApi インスタンスを作成（v1.x 新API）
-        api = YouTubeTranscriptApi()
-
-        # 字幕リストを取得
-        transcript_list = api.list(video_id)
-
-        # 手動字幕を優先、なければ自動生成を使用
-        transcript = None
-        for lang in languages:
-            try:
-                transcript = transcript_list.find_transcript([lang])
-                print(f"✓ 字幕を発見: {lang} ({'手動' if not transcript.is_generated else '自動生成'})")
-                break
-            except NoTranscriptFound:
-                continue
-
-        if transcript is None:
-            # 自動生成字幕を取得
-            try:
-                transcript = transcript_list.find_generated_transcript(languages)
-                print(f"✓ 自動生成字幕を使用")
-            except NoTranscriptFound:
-                raise NoTranscriptFound(video_id, languages, transcript_list)
-
-        # 字幕データを取得
-        transcript_data = transcript.fetch()
-
-        # FetchedTranscriptをリストに変換
-        transcript_items = [
-            {"text": item.text, "start": item.start, "duration": item.duration}
-            for item in transcript_data
-        ]
-
-        # 結果を整形
-        full_text = " ".join([item['text'] for item in transcript_items])
-        total_duration = sum([item['duration'] for item in transcript_items])
-
-        print(f"✅ 字幕取得完了: {len(transcript_items)}件, {total_duration:.1f}秒")
-
-        return {
-            "video_id": video_id,
-            "transcript": transcript_items,
-            "full_text": full_text,
-            "total_duration": total_duration
-        }
+    # 取得済みの字幕・字幕なしの記録はキャッシュから
+    transcript_items = get_transcript_service().get(video_id, languages)
+    if transcript_items is None:
+        raise Exception(f"この動画には字幕がありません（または無効）: {video_id}")
+
+    # 結果を整形
+    full_text = " ".join([item['text'] for item in transcript_items])
+    total_duration = sum([item['duration'] for item in transcript_items])
+
+    print(f"✅ 字幕取得完了: {len(transcript_items)}件, {total_duration:.1f}秒")
 
-    except TranscriptsDisabled:
-        raise Exception(f"この動画は字幕が無効になっています: {video_id}")
-    except NoTranscriptFound:
-        raise Exception(f"この動画には字幕がありません: {video_id}")
+    return {
+        "video_id": video_id,
+        "transcript": transcript_items,
+        "full_text": full_text,
+        "total_duration": total_duration
+    }
 
 
 def format_transcript_for_script(transcript_data: list, max_chars: int = 5000) -> str:
@@ -4,13 +4,11 @@
 Gemini TTSで音声生成、ffmpegで動画合成
 """
 
-import os
 import sys
 import json
 import wave
 import struct
 import tempfile
-import subprocess
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -24,6 +22,8 @@ load_dotenv(Path(__file__).parent.parent.parent / ".env")
 from google import genai
 from google.genai import types
 from PIL import Image, ImageDraw, ImageFont
+from gemini_key_pool import GeminiKeyManager, is_rate_limit_error
+from still_video import StillSegment, render_stills
 
 # キャラクター設定をインポート
 try:
@@ -44,34 +44,6 @@ SAMPLE_RATE = 24000
 TTS_MODEL = "gemini-2.5-flash-preview-tts"
 
 
-class GeminiKeyManager:
-    """複数のGemini APIキーを管理"""
-
-    def __init__(self):
-        self.keys = []
-        # 基本キー
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-        # 番号付きキー
-        for i in range(1, 43):
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-
-        if not self.keys:
-            raise ValueError("GEMINI_API_KEY が設定されていません")
-
-        print(f"✓ Gemini APIキー: {len(self.keys)}個")
-        self.current_index = 0
-
-    def get_key(self) -> str:
-        """次のキーを取得"""
-        key = self.keys[self.current_index]
-        self.current_index = (self.current_index + 1) % len(self.keys)
-        return key
-
-
 import time
 
 def generate_tts_single(text: str, voice: str, api_key: str, output_path: str, max_retries: int = 3) -> bool:
@@ -123,8 +95,7 @@ def generate_tts_single(text: str, voice: str, api_key: str, output_path: str, m
             return True
 
         except Exception as e:
-            error_str = str(e)
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+            if is_rate_limit_error(e):
                 # レート制限: 待機してリトライ
                 wait_time = 20 * (attempt + 1)  # 20秒, 40秒, 60秒
                 print(f"    ⏳ レート制限 - {wait_time}秒待機中...")
@@ -157,7 +128,7 @@ def generate_all_audio(dialogue: list, temp_dir: Path, key_manager: GeminiKeyMan
         voice = get_voice_for_speaker(speaker)
 
         output_path = str(temp_dir / f"audio_{i:03d}.wav")
-        api_key = key_manager.get_key()
+        api_key, _ = key_manager.get_working_key()
 
         print(f"  [{i+1}/{len(dialogue)}] {speaker}: {text[:20]}...")
 
@@ -376,7 +347,7 @@ def generate_video(script: dict, output_path: str, temp_dir: Path = None) -> boo
     hiroshi_icon = str(base_dir / "assets" / "characters" / "hiroshi_icon.png")
 
     # 1. 音声生成
-    key_manager = GeminiKeyManager()
+    key_manager = GeminiKeyManager(required=True)
     audio_files = generate_all_audio(dialogue, temp_dir, key_manager)
 
     if not audio_files:
@@ -387,56 +358,27 @@ def generate_video(script: dict, output_path: str, temp_dir: Path = None) -> boo
     combined_audio = str(temp_dir / "combined_audio.wav")
     total_duration = concat_audio_files(audio_files, combined_audio)
 
-    # 3. フレーム生成
+    # 3. フレーム生成（セリフごとに1枚、表示時間つき）
     print("🖼️ フレームを生成中...")
     frames_dir = temp_dir / "frames"
     frames_dir.mkdir(exist_ok=True)
 
     # 各セリフに対応するフレームを生成
-    frame_index = 0
     fps = 30
-    gap_seconds = 0.3  # セリフ間の間隔
+    gap_seconds = 0.3  # セリフ間の間隔（concat_audio_files の gap_ms と同じ）
+    segments = []
 
     for audio in sorted(audio_files, key=lambda x: x["index"]):
-        speaker = audio["speaker"]
-        text = audio["text"]
-        duration = audio["duration"]
-
-        # このセリフに必要なフレーム数
-        num_frames = int((duration + gap_seconds) * fps)
-
-        # フレームを生成
-        frame = create_frame(title, speaker, text, katsumi_icon, hiroshi_icon)
+        frame = create_frame(title, audio["speaker"], audio["text"], katsumi_icon, hiroshi_icon)
+        segments.append(StillSegment(frame, audio["duration"] + gap_seconds))
 
-        for _ in range(num_frames):
-            frame_path = frames_dir / f"frame_{frame_index:05d}.png"
-            frame.save(frame_path)
-            frame_index += 1
+    print(f"✅ フレーム生成完了: {len(segments)}枚")
 
-    print(f"✅ フレーム生成完了: {frame_index}枚")
-
-    # 4. 動画エンコード
+    # 4. 動画エンコード（同じ絵を何枚も保存せず、表示時間を指定して1回でエンコード）
     print("🎥 動画をエンコード中...")
 
-    ffmpeg_cmd = [
-        "ffmpeg", "-y",
-        "-framerate", str(fps),
-        "-i", str(frames_dir / "frame_%05d.png"),
-        "-i", combined_audio,
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",
-        "-c:a", "aac",
-        "-b:a", "192k",
-        "-pix_fmt", "yuv420p",
-        "-shortest",
-        output_path
-    ]
-
     try:
-        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"❌ ffmpegエラー: {result.stderr[:500]}")
+        if not render_stills(segments, output_path, fps=fps, audio_path=combined_audio, work_dir=frames_dir):
             return False
     except Exception as e:
         print(f"❌ ffmpeg実行エラー: {e}")
@@ -8,17 +8,15 @@
 import os
 import json
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-# YouTube Data API
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# YouTube Data API（IDをまとめて問い合わせ・ハンドルと統計はキャッシュ）
+from youtube_metadata import get_youtube_metadata, limit_channels
 
-# YouTube字幕取得
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+# YouTube字幕取得（取得済み・字幕なしはキャッシュ、複数の動画は並列に取得）
+from transcript_cache import get_transcript_service, transcript_text
 
 # Gemini API
 import google.generativeai as genai
@@ -48,141 +46,28 @@ def load_channels() -> list:
     return channels
 
 
-def get_youtube_service():
-    """YouTube Data API サービスを取得"""
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY が設定されていません")
-    return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-
-
 def get_channel_id_from_handle(handle: str) -> Optional[str]:
-    """ハンドル（@username）からチャンネルIDを取得"""
-    youtube = get_youtube_service()
-
-    # @を除去
-    handle_clean = handle.lstrip("@")
-
-    try:
-        # forHandle パラメータでチャンネルを検索
-        response = youtube.channels().list(
-            part="id,snippet",
-            forHandle=handle_clean
-        ).execute()
-
-        if response.get("items"):
-            channel_id = response["items"][0]["id"]
-            channel_title = response["items"][0]["snippet"]["title"]
-            print(f"   ✓ チャンネルID取得: {channel_id} ({channel_title})")
-            return channel_id
-
-        # forHandleが効かない場合、検索で試す
-        search_response = youtube.search().list(
-            part="snippet",
-            q=handle_clean,
-            type="channel",
-            maxResults=1
-        ).execute()
-
-        if search_response.get("items"):
-            channel_id = search_response["items"][0]["snippet"]["channelId"]
-            print(f"   ✓ チャンネルID取得（検索）: {channel_id}")
-            return channel_id
-
-    except HttpError as e:
-        print(f"   ⚠ チャンネルID取得エラー: {e}")
-
-    return None
+    """ハンドル（@username）からチャンネルIDを取得（前回までに解決済みならAPIを呼ばない）"""
+    return get_youtube_metadata(YOUTUBE_API_KEY).channel_id_for_handle(handle)
 
 
 def get_popular_videos(channel_id: str, max_results: int = 10) -> list:
-    """チャンネルの人気動画を取得"""
-    youtube = get_youtube_service()
-
-    try:
-        # チャンネルの動画を検索（再生回数順）
-        search_response = youtube.search().list(
-            part="id,snippet",
-            channelId=channel_id,
-            type="video",
-            order="viewCount",
-            maxResults=max_results,
-            publishedAfter=(datetime.now() - timedelta(days=365)).isoformat() + "Z"
-        ).execute()
-
-        videos = []
-        for item in search_response.get("items", []):
-            video_id = item["id"]["videoId"]
-            snippet = item["snippet"]
-
-            # 動画の詳細情報を取得
-            video_response = youtube.videos().list(
-                part="statistics,contentDetails",
-                id=video_id
-            ).execute()
-
-            if video_response["items"]:
-                stats = video_response["items"][0].get("statistics", {})
-                videos.append({
-                    "video_id": video_id,
-                    "title": snippet["title"],
-                    "channel_title": snippet["channelTitle"],
-                    "published_at": snippet["publishedAt"],
-                    "view_count": int(stats.get("viewCount", 0)),
-                    "like_count": int(stats.get("likeCount", 0)),
-                })
-
-        # 再生回数順にソート
-        videos.sort(key=lambda x: x["view_count"], reverse=True)
-        return videos
-
-    except HttpError as e:
-        print(f"❌ YouTube API エラー: {e}")
-        return []
+    """チャンネルの人気動画を取得（動画の統計はまとめて1回で取得）"""
+    return get_youtube_metadata(YOUTUBE_API_KEY).popular_videos(channel_id, max_results=max_results)
 
 
 def get_video_transcript(video_id: str) -> Optional[str]:
-    """動画の字幕を取得（youtube-transcript-api v1.2.x対応）"""
-    api = YouTubeTranscriptApi()
-
+    """動画の字幕を取得（取得済みの字幕・字幕なしの記録はキャッシュから）"""
     try:
-        # 字幕リストを取得
-        transcript_list = api.list(video_id)
-
-        # 日本語字幕を探す
-        transcript = None
-        for t in transcript_list:
-            if t.language_code in ['ja', 'ja-JP']:
-                transcript = t
-                break
-
-        # なければ自動生成を探す
-        if not transcript:
-            for t in transcript_list:
-                if t.is_generated and t.language_code in ['ja', 'ja-JP']:
-                    transcript = t
-                    break
-
-        # なければ英語
-        if not transcript:
-            for t in transcript_list:
-                if t.language_code == 'en':
-                    transcript = t
-                    break
-
-        if transcript:
-            # 字幕をフェッチ
-            fetched = transcript.fetch()
-            text = " ".join([snippet.text for snippet in fetched])
-            return text
-
-    except (TranscriptsDisabled, NoTranscriptFound):
-        print(f"  ⚠ 字幕なし: {video_id}")
-        return None
+        items = get_transcript_service().get(video_id)
     except Exception as e:
         print(f"  ⚠ 字幕取得エラー: {e}")
         return None
 
-    return None
+    if items is None:
+        print(f"  ⚠ 字幕なし: {video_id}")
+        return None
+    return transcript_text(items) or None
 
 
 def rewrite_with_gemini(original_text: str, video_title: str) -> Optional[dict]:
@@ -279,7 +164,9 @@ def process_channel(channel: dict) -> Optional[dict]:
     print(f"   📹 {len(videos)}本の動画を取得")
 
     # 最も人気の動画から字幕を取得
-    for video in videos:
+    # 候補の順に字幕を取り、次の1本だけ先読みする（最初の動画で決まれば残りは取得しない）
+    for i, video in enumerate(videos):
+        get_transcript_service().prefetch(v["video_id"] for v in videos[i + 1:i + 2])
         print(f"   🎬 {video['title'][:40]}...")
         print(f"      再生回数: {video['view_count']:,}")
 
@@ -316,13 +203,17 @@ def main():
     # 出力ディレクトリ作成
     OUTPUT_DIR.mkdir(exist_ok=True)
 
-    # 各チャンネルを処理
+    # 各チャンネルを並列に処理（上限は KUCHIKOMI_MAX_CHANNELS、0 なら全部）
+    metadata = get_youtube_metadata(YOUTUBE_API_KEY)
     scripts = []
-    for channel in channels[:3]:  # テスト用に3チャンネルまで
-        script = process_channel(channel)
-        if script:
-            scripts.append(script)
-            print(f"   ✅ 台本生成成功: {script.get('theme', 'Unknown')}")
+    try:
+        for script in metadata.map_channels(process_channel, limit_channels(channels)):
+            if script:
+                scripts.append(script)
+                print(f"   ✅ 台本生成成功: {script.get('theme', 'Unknown')}")
+    finally:
+        metadata.save()
+    print(f"   YouTube API: {dict(metadata.calls)}（クォータ {metadata.quota_used}）")
 
     if not scripts:
         print("\n❌ 台本を生成できませんでした")
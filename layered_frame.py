@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+レイヤー合成レンダラー（MoviePyのアニメーション画面用）
+
+画面を「静的レイヤー」と「時間変化レイヤー」に分け、
+- 静的レイヤー（背景・タイトル帯・字幕帯・動かないキャラなど）はクリップごとに1回だけ描画
+- フレームごとは静的レイヤーのコピーに、変化する部分（タイピング文字・スライド・揺れるキャラ）だけを描画
+- 見た目を決める状態（frame_state(t) の戻り値）が前フレームと同じならフレームを再利用
+
+使い方:
+    renderer = LayeredFrameRenderer(build_base, paint_dynamic, frame_state)
+    clip = VideoClip(renderer.make_frame, duration=duration)
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+# 静的レイヤーを保持しておくレンダラー数の上限
+# （フルHD RGBA 1枚 ≒ 8MB。MoviePyはクリップを時系列順に描画するので数枚で十分）
+MAX_RESIDENT_RENDERERS = 4
+
+_resident = OrderedDict()
+
+
+def _touch(renderer):
+    """レンダラーを使用中として登録し、古いものの静的レイヤーを解放"""
+    _resident[renderer] = None
+    _resident.move_to_end(renderer)
+    while len(_resident) > MAX_RESIDENT_RENDERERS:
+        old, _ = _resident.popitem(last=False)
+        old.release()
+
+
+class LayeredFrameRenderer:
+    """静的レイヤー＋時間変化レイヤーの合成レンダラー
+
+    Args:
+        build_base: 静的レイヤーを描画して RGBA 画像を返す関数（1クリップ1回）
+        paint_dynamic: paint_dynamic(img, draw, state) で静的レイヤーのコピーに描画する関数
+                       （None なら完全に静的な画面）
+        frame_state: frame_state(t) で見た目を決める値（ハッシュ可能）を返す関数
+                     （None なら静的画面として全フレーム同じ）
+    """
+
+    def __init__(self, build_base, paint_dynamic=None, frame_state=None):
+        self.build_base = build_base
+        self.paint_dynamic = paint_dynamic
+        self.frame_state = frame_state
+        self._base = None
+        self._last_state = None
+        self._last_frame = None
+
+    def __hash__(self):
+        return id(self)
+
+    def __eq__(self, other):
+        return self is other
+
+    @property
+    def base(self):
+        """静的レイヤー（初回アクセス時に描画）"""
+        if self._base is None:
+            self._base = self.build_base()
+        return self._base
+
+    def release(self):
+        """静的レイヤーと直前フレームを解放（次回描画時に再生成される）"""
+        self._base = None
+        self._last_state = None
+        self._last_frame = None
+
+    def restore(self, img, box):
+        """静的レイヤーの指定領域を貼り直す
+
+        時間変化レイヤーより手前にある静的要素（字幕帯など）の重なり順を保つために使う。
+        """
+        img.paste(self.base.crop(box), box[:2])
+
+    def _state(self, t):
+        return self.frame_state(t) if self.frame_state else ()
+
+    def make_frame(self, t):
+        """MoviePy用: 時刻 t のフレームを RGB の numpy 配列で返す"""
+        _touch(self)
+        state = self._state(t)
+        if self._last_frame is not None and state == self._last_state:
+            return self._last_frame
+
+        if self.paint_dynamic is None:
+            img = self.base
+        else:
+            img = self.base.copy()
+            self.paint_dynamic(img, ImageDraw.Draw(img), state)
+
+        frame = np.array(img.convert('RGB'))
+        self._last_state = state
+        self._last_frame = frame
+        return frame
+
+    def render(self, t):
+        """時刻 t のフレームを PIL 画像（RGB）で返す"""
+        return Image.fromarray(self.make_frame(t))
@@ -8,14 +8,15 @@
 
 import os
 import sys
-import json
 import time
 import requests
 from datetime import datetime, date
 
 import google.generativeai as genai
-from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
+from comment_sync import CommentIndex, CommentSync
+from gemini_key_pool import GeminiKeyManager
+from sheets_gateway import get_sheets_gateway
 
 # ===== 定数 =====
 CHANNEL_ID = "TOKEN_23"  # チャンネル識別子
@@ -26,34 +27,8 @@ SPREADSHEET_ID = "15_ixYlyRp9sOlS0tdklhz6wQmwRxWlOL9cPndFWwOFo"
 PROCESSED_SHEET_NAME = "コメント処理ログ"
 
 
-class GeminiKeyManager:
-    """Gemini APIキー管理"""
-    def __init__(self):
-        self.keys = []
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-        for i in range(1, 10):
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-        self.failed_keys = set()
-
-    def get_working_key(self):
-        for key in self.keys:
-            if key not in self.failed_keys:
-                return key, f"KEY_{self.keys.index(key)}"
-        self.failed_keys.clear()
-        return self.keys[0] if self.keys else None, "KEY_0"
-
-    def mark_failed(self, key_name):
-        idx = int(key_name.split("_")[1]) if "_" in key_name else 0
-        if idx < len(self.keys):
-            self.failed_keys.add(self.keys[idx])
-
-
-def get_youtube_client():
-    """YouTube API クライアントを取得"""
+def get_youtube_credentials():
+    """YouTube API の認証情報を取得"""
     client_id = os.environ.get("YOUTUBE_CLIENT_ID")
     client_secret = os.environ.get("YOUTUBE_CLIENT_SECRET")
     refresh_token = os.environ.get("YOUTUBE_REFRESH_TOKEN_23")
@@ -78,20 +53,17 @@ def get_youtube_client():
         client_secret=client_secret,
         token_uri="https://oauth2.googleapis.com/token"
     )
-    return build("youtube", "v3", credentials=creds)
+    return creds
+
+
+def get_youtube_client(creds=None):
+    """YouTube API クライアントを取得"""
+    return build("youtube", "v3", credentials=creds or get_youtube_credentials())
 
 
 def get_sheets_client():
-    """Google Sheets クライアントを取得"""
-    key_json = os.environ.get("GOOGLE_SERVICE_ACCOUNT_KEY")
-    if not key_json:
-        raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY が設定されていません")
-    key_data = json.loads(key_json)
-    creds = Credentials.from_service_account_info(
-        key_data,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    return build("sheets", "v4", credentials=creds)
+    """Google Sheets クライアントを取得（読み取りキャッシュ + 書き込みまとめ）"""
+    return get_sheets_gateway()
 
 
 def get_channel_id(youtube) -> str:
@@ -109,41 +81,13 @@ def get_channel_id(youtube) -> str:
 def get_processed_comment_ids(sheets) -> set:
     """処理済みコメントIDを取得"""
     try:
-        # シートが存在するか確認
-        spreadsheet = sheets.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
-        sheet_names = [s["properties"]["title"] for s in spreadsheet.get("sheets", [])]
-
-        if PROCESSED_SHEET_NAME not in sheet_names:
-            # シートを作成
-            sheets.spreadsheets().batchUpdate(
-                spreadsheetId=SPREADSHEET_ID,
-                body={
-                    "requests": [{
-                        "addSheet": {
-                            "properties": {"title": PROCESSED_SHEET_NAME}
-                        }
-                    }]
-                }
-            ).execute()
-
-            # ヘッダーを追加
-            sheets.spreadsheets().values().update(
-                spreadsheetId=SPREADSHEET_ID,
-                range=f"{PROCESSED_SHEET_NAME}!A1:E1",
-                valueInputOption="RAW",
-                body={
-                    "values": [["コメントID", "処理日時", "投稿者", "いいね済み", "返信通知済み"]]
-                }
-            ).execute()
+        # シートがなければ作成
+        headers = ["コメントID", "処理日時", "投稿者", "いいね済み", "返信通知済み"]
+        if sheets.ensure_sheet(SPREADSHEET_ID, PROCESSED_SHEET_NAME, headers=headers):
             return set()
 
         # 既存のIDを取得
-        result = sheets.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{PROCESSED_SHEET_NAME}!A:A"
-        ).execute()
-
-        values = result.get("values", [])
+        values = sheets.get_values(SPREADSHEET_ID, f"{PROCESSED_SHEET_NAME}!A:A")
         return set(row[0] for row in values[1:] if row)  # ヘッダーをスキップ
 
     except Exception as e:
@@ -151,31 +95,26 @@ def get_processed_comment_ids(sheets) -> set:
         return set()
 
 
-def mark_comment_processed(sheets, comment_id: str, author: str, replied: bool, reply_text: str = ""):
-    """コメントを処理済みとして記録"""
+def mark_comment_processed(sheets, comment_id: str, author: str, replied: bool, reply_text: str = "",
+                           index: CommentIndex = None):
+    """コメントを処理済みとして記録（シートへは main の最後にまとめて送信、索引にはすぐ保存）"""
+    if index is not None:
+        index.mark_processed(comment_id, replied)
     try:
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheets.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{PROCESSED_SHEET_NAME}!A:E",
-            valueInputOption="RAW",
-            body={
-                "values": [[comment_id, now, author, "○" if replied else "", reply_text[:100] if reply_text else ""]]
-            }
-        ).execute()
+        sheets.append_rows(SPREADSHEET_ID, PROCESSED_SHEET_NAME, [
+            [comment_id, now, author, "○" if replied else "", reply_text[:100] if reply_text else ""]
+        ])
     except Exception as e:
         print(f"  ⚠ 処理済み記録エラー: {e}")
 
 
-def get_today_reply_count(sheets) -> int:
-    """今日の返信件数を取得"""
+def get_today_reply_count(sheets, index: CommentIndex = None) -> int:
+    """今日の返信件数を取得（索引があれば索引から数える）"""
+    if index is not None:
+        return index.reply_count()
     try:
-        result = sheets.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"{PROCESSED_SHEET_NAME}!A:D"
-        ).execute()
-
-        values = result.get("values", [])
+        values = sheets.get_values(SPREADSHEET_ID, f"{PROCESSED_SHEET_NAME}!A:D")
         today_str = date.today().strftime("%Y-%m-%d")
         count = 0
 
@@ -303,49 +242,20 @@ def get_channel_videos(youtube, channel_id: str) -> list:
     return videos
 
 
-def get_all_comments(youtube, channel_id: str) -> list:
-    """チャンネルの全動画からコメントを取得"""
-    comments = []
-
-    # アップロードプレイリストから動画を取得
-    videos = get_channel_videos(youtube, channel_id)
+def get_all_comments(youtube, videos: list, index: CommentIndex, client_factory=None) -> list:
+    """チャンネルの最新動画から新着コメントを取得（前回の続きから差分だけ）
 
-    # video_id -> title のマッピングを作成
-    video_titles = {v["id"]: v["title"] for v in videos}
-
-    for video in videos:
-        video_id = video["id"]
-        video_title = video["title"]
-        try:
-            # 動画のコメントを取得
-            comments_response = youtube.commentThreads().list(
-                part="snippet",
-                videoId=video_id,
-                maxResults=100,
-                order="time"
-            ).execute()
-
-            comment_count = len(comments_response.get("items", []))
-            print(f"  [デバッグ] 動画 {video_id}: {comment_count}件のコメント取得")
-
-            for item in comments_response.get("items", []):
-                snippet = item["snippet"]["topLevelComment"]["snippet"]
-                comments.append({
-                    "id": item["id"],
-                    "comment_id": item["snippet"]["topLevelComment"]["id"],
-                    "video_id": video_id,
-                    "video_title": video_title,
-                    "author": snippet["authorDisplayName"],
-                    "author_channel_id": snippet.get("authorChannelId", {}).get("value", ""),
-                    "text": snippet["textDisplay"],
-                    "published_at": snippet["publishedAt"],
-                    "like_count": snippet.get("likeCount", 0)
-                })
-
-        except Exception as e:
-            print(f"  ⚠ 動画 {video_id} のコメント取得エラー: {e}")
-
-    return comments
+    Args:
+        youtube: YouTube API クライアント
+        videos: 確認する動画（get_channel_videos の結果）
+        index: 処理済みコメントの索引（動画ごとのウォーターマークつき）
+        client_factory: 並列取得用のクライアントを作る関数（省略時は youtube を1スレッドで使う）
+    """
+    if client_factory is None:
+        sync = CommentSync(lambda: youtube, index, max_workers=1)
+    else:
+        sync = CommentSync(client_factory, index)
+    return sync.fetch(videos)
 
 
 def like_comment(youtube, comment_id: str) -> bool:
@@ -588,7 +498,8 @@ def main():
 
     # クライアント初期化
     print("\n[1/4] API初期化中...")
-    youtube = get_youtube_client()
+    youtube_creds = get_youtube_credentials()
+    youtube = get_youtube_client(youtube_creds)
     sheets = get_sheets_client()
     print("  ✓ YouTube API 接続完了")
     print("  ✓ Google Sheets 接続完了")
@@ -598,26 +509,35 @@ def main():
     channel_id = get_channel_id(youtube)
     print(f"  ✓ チャンネルID: {channel_id}")
 
-    # 処理済みコメントID取得
+    # 処理済みコメントの索引（初回・キャッシュ消失時だけシートから作る）
     print("\n[3/4] 処理済みコメント確認中...")
-    processed_ids = get_processed_comment_ids(sheets)
-    print(f"  ✓ 処理済みコメント数: {len(processed_ids)}")
+    index = CommentIndex.load("nenkin_comments")
+    if index.is_empty():
+        print("  索引がないため処理済みシートから作成")
+        index.seed(get_processed_comment_ids(sheets))
+    print(f"  ✓ 処理済みコメント数: {len(index.processed)}")
 
-    # コメント取得
+    # コメント取得（前回以降の新着だけ）
     print("\n[4/4] コメント取得中...")
-    all_comments = get_all_comments(youtube, channel_id)
-    print(f"  ✓ 取得コメント数: {len(all_comments)}")
+    # アップロードプレイリストから動画を取得
+    videos = get_channel_videos(youtube, channel_id)
+    # 索引には今回確認した動画の状態だけ残す（取得に失敗して空なら消さない）
+    scanned_video_ids = [v["id"] for v in videos] or None
+    all_comments = get_all_comments(youtube, videos, index,
+                                    client_factory=lambda: get_youtube_client(youtube_creds))
+    print(f"  ✓ 新着コメント数: {len(all_comments)}")
 
     # 新しいコメントをフィルタ（自分のコメントを除外）
     new_comments = [
         c for c in all_comments
-        if c["comment_id"] not in processed_ids
+        if not index.is_processed(c["comment_id"])
         and c["author_channel_id"] != channel_id  # カツミ（チャンネルオーナー）のコメントを除外
     ]
     print(f"  ✓ 新規コメント数（自分除く）: {len(new_comments)}")
 
     if not new_comments:
         print("\n新しいコメントはありません")
+        index.commit(keep_videos=scanned_video_ids)
         return
 
     # 各コメントを処理
@@ -637,7 +557,7 @@ def main():
 
         if not ai_reply:
             print("  ⚠ 返信生成に失敗")
-            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, "生成失敗")
+            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, "生成失敗", index=index)
             continue
 
         print(f"  返信案: {ai_reply[:50]}...")
@@ -648,14 +568,18 @@ def main():
         if send_slack_comment_notification(comment, ai_reply, video_title):
             notified_count += 1
             # 処理済みとして記録（返信はまだ=False）
-            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, ai_reply)
+            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, ai_reply, index=index)
         else:
             print("  ⚠ Slack通知送信に失敗")
-            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, ai_reply)
+            mark_comment_processed(sheets, comment["comment_id"], comment["author"], False, ai_reply, index=index)
 
         # API制限対策
         time.sleep(2)
 
+    # 処理済み記録を batchUpdate 1回で送信し、ウォーターマークを進める
+    sheets.close()
+    index.commit(keep_videos=scanned_video_ids)
+
     print("\n" + "=" * 50)
     print(f"処理完了! Slack通知: {notified_count}件")
     print("（手動で返信してください）")
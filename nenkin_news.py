@@ -27,6 +27,16 @@ from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from PIL import Image, ImageDraw, ImageFont
+from asset_cache import find_font, find_font_path, load_font, load_sprite
+from drive_cache import get_drive_cache
+from fact_check_engine import FactChecker, run_fact_check_rounds
+from gemini_key_pool import GeminiKeyManager, is_rate_limit_error
+from reading_normalizer import ReadingNormalizer
+from run_checkpoint import RunCheckpoint
+from sheets_gateway import flush_sheets, get_sheets_gateway
+from pcm_audio import PCMTrack, load_clip, pcm_to_array, read_wav, samples_duration
+from tts_cache import get_tts_cache, tts_cache_key
+from whisper_align import align_lines, transcribe_words, words_from_segments
 from gtts import gTTS
 from google.cloud import texttospeech
 import anthropic  # Claude API for fact-checking
@@ -51,6 +61,11 @@ TTS_MODE = os.environ.get("TTS_MODE", "gemini").lower()
 # USE_MODAL_GPU=false → ローカル CPU (遅い)
 USE_MODAL_GPU = os.environ.get("USE_MODAL_GPU", "true").lower() == "true"
 
+# Google Drive のアセット（起動時にまとめて prefetch、drive_cache でキャッシュ）
+NORMAL_JINGLE_ID = "18JF1p4Maea9SPcZ6y0wCHnxI1FMAfyfT"
+GREEN_ROOM_JINGLE_ID = "1zaJf-Oq7gzR26k33y2ccTS0yO_n5gY83"
+BACKROOM_BGM_FILE_ID = "1wP6bp0a0PlaaqM55b8zdwozxT0XTOvab"
+
 # ===== チャンネル情報 =====
 CHANNEL_NAME = "毎日届く！得する年金ニュース速報"
 CHANNEL_DESCRIPTION = "毎日11時、年金に関する最新ニュースをお届けします"
@@ -223,19 +238,7 @@ def load_reading_dict_from_spreadsheet() -> dict:
             _reading_dict_cache = DEFAULT_READING_DICT.copy()
             return _reading_dict_cache
 
-        key_data = json.loads(key_json)
-        creds = Credentials.from_service_account_info(
-            key_data,
-            scopes=['https://www.googleapis.com/auth/spreadsheets.readonly']
-        )
-        service = build('sheets', 'v4', credentials=creds)
-
-        result = service.spreadsheets().values().get(
-            spreadsheetId=READING_DICT_SPREADSHEET_ID,
-            range=f"{READING_DICT_SHEET_NAME}!A2:B1000"
-        ).execute()
-
-        values = result.get('values', [])
+        values = get_sheets_gateway().get_values(READING_DICT_SPREADSHEET_ID, f"{READING_DICT_SHEET_NAME}!A2:B1000")
         reading_dict = DEFAULT_READING_DICT.copy()
 
         for row in values:
@@ -282,85 +285,29 @@ def _convert_date_to_reading(text: str) -> str:
     return text
 
 
+_reading_normalizer = None
+
+
+def get_reading_normalizer() -> ReadingNormalizer:
+    """読み方辞書（デフォルト + スプレッドシート）をコンパイルした置換器（初回のみ作成）"""
+    global _reading_normalizer
+    if _reading_normalizer is None:
+        _reading_normalizer = ReadingNormalizer(load_reading_dict_from_spreadsheet())
+    return _reading_normalizer
+
+
 def fix_reading(text: str) -> str:
     """読み方辞書でテキストを変換（TTS用）"""
     # まず日付パターンを変換
     text = _convert_date_to_reading(text)
 
-    # 次に辞書ベースの置換
-    reading_dict = load_reading_dict_from_spreadsheet()
-    for word, reading in reading_dict.items():
-        text = text.replace(word, reading)
-    return text
+    # 次に辞書ベースの置換（左から1回の走査、同じ位置なら最長一致）
+    return get_reading_normalizer().normalize(text)
 
 
-class GeminiKeyManager:
-    """Gemini APIキー管理（TTS用にも使用）"""
-    def __init__(self):
-        self.keys = []
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-        for i in range(1, 43):  # GEMINI_API_KEY_1 〜 GEMINI_API_KEY_42
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-        self.failed_keys = set()
-        self.current_index = 0
-        # 429エラー対策: キーごとの失敗回数を記録
-        self.key_failure_counts = {}
-        self.key_429_counts = {}
-
-    def get_working_key(self):
-        for key in self.keys:
-            if key not in self.failed_keys:
-                return key, f"KEY_{self.keys.index(key)}"
-        self.failed_keys.clear()
-        return self.keys[0] if self.keys else None, "KEY_0"
-
-    def get_key_by_index(self, index: int):
-        """インデックスでキーを取得（パラレル処理用）"""
-        if not self.keys:
-            return None
-        return self.keys[index % len(self.keys)]
-
-    def get_all_keys(self):
-        """全キーを取得"""
-        return self.keys.copy()
-
-    def get_key_with_least_failures(self, exclude_keys: set = None) -> tuple:
-        """失敗回数が最も少ないキーを取得（429対策）"""
-        exclude_keys = exclude_keys or set()
-        available_keys = [k for k in self.keys if k not in exclude_keys]
-
-        if not available_keys:
-            # 除外キーをクリアして全キーから選択
-            available_keys = self.keys.copy()
-
-        # 429エラー回数が最も少ないキーを選択
-        best_key = min(available_keys, key=lambda k: self.key_429_counts.get(k, 0))
-        key_index = self.keys.index(best_key)
-        return best_key, f"KEY_{key_index}"
-
-    def mark_failed(self, key_name):
-        idx = int(key_name.split("_")[1]) if "_" in key_name else 0
-        if idx < len(self.keys):
-            self.failed_keys.add(self.keys[idx])
-
-    def mark_429_error(self, api_key: str):
-        """429エラーを記録"""
-        self.key_429_counts[api_key] = self.key_429_counts.get(api_key, 0) + 1
-        key_index = self.keys.index(api_key) if api_key in self.keys else "?"
-        print(f"        [429] KEY_{key_index} 429エラー回数: {self.key_429_counts[api_key]}")
-
-    def get_error_summary(self) -> str:
-        """エラーサマリーを取得"""
-        summary = []
-        for i, key in enumerate(self.keys):
-            count_429 = self.key_429_counts.get(key, 0)
-            if count_429 > 0:
-                summary.append(f"KEY_{i}: 429x{count_429}")
-        return ", ".join(summary) if summary else "エラーなし"
+def fix_readings(texts: list) -> list:
+    """台本のセリフをまとめて fix_reading"""
+    return get_reading_normalizer().normalize_many([_convert_date_to_reading(text) for text in texts])
 
 
 def get_google_credentials():
@@ -397,50 +344,19 @@ def log_to_spreadsheet(status: str, title: str = "", url: str = "", news_count:
         error_message: エラー内容
     """
     try:
-        creds = get_google_credentials()
-        service = build('sheets', 'v4', credentials=creds)
-
-        # シートが存在するか確認、なければ作成
-        spreadsheet = service.spreadsheets().get(spreadsheetId=LOG_SPREADSHEET_ID).execute()
-        existing_sheets = [s['properties']['title'] for s in spreadsheet['sheets']]
-
-        if LOG_SHEET_NAME not in existing_sheets:
-            # シート作成
-            request = {
-                "requests": [{
-                    "addSheet": {
-                        "properties": {"title": LOG_SHEET_NAME}
-                    }
-                }]
-            }
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                body=request
-            ).execute()
-
-            # ヘッダー追加
-            headers = ["日時", "ステータス", "動画タイトル", "動画URL", "ニュースソース数", "生成時間(秒)", "エラー内容"]
-            service.spreadsheets().values().update(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                range=f"{LOG_SHEET_NAME}!A1:G1",
-                valueInputOption="RAW",
-                body={"values": [headers]}
-            ).execute()
+        sheets = get_sheets_gateway()
+
+        # シートがなければ作成（シート一覧は1回だけ取得）
+        headers = ["日時", "ステータス", "動画タイトル", "動画URL", "ニュースソース数", "生成時間(秒)", "エラー内容"]
+        if sheets.ensure_sheet(LOG_SPREADSHEET_ID, LOG_SHEET_NAME, headers=headers):
             print(f"  [ログ] シート '{LOG_SHEET_NAME}' を作成しました")
 
-        # ログデータを追加
+        # ログデータを追加（書き込みはまとめて送信）
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         row = [now, status, title, url, news_count, round(processing_time, 1), error_message]
-
-        service.spreadsheets().values().append(
-            spreadsheetId=LOG_SPREADSHEET_ID,
-            range=f"{LOG_SHEET_NAME}!A:G",
-            valueInputOption="RAW",
-            insertDataOption="INSERT_ROWS",
-            body={"values": [row]}
-        ).execute()
-
-        print(f"  [ログ] 記録完了: {status}")
+        # 「記録完了」は batchUpdate で実際に送信できてから表示する
+        sheets.append_rows(LOG_SPREADSHEET_ID, LOG_SHEET_NAME, [row],
+                           on_flushed=lambda: print(f"  [ログ] 記録完了: {status}"))
 
     except Exception as e:
         print(f"  ⚠ ログ記録エラー: {e}")
@@ -460,24 +376,15 @@ def get_used_news_titles(days: int = 7) -> list:
         使用済みニュースタイトルのリスト
     """
     try:
-        creds = get_google_credentials()
-        service = build('sheets', 'v4', credentials=creds)
+        sheets = get_sheets_gateway()
 
         # シートが存在するか確認
-        spreadsheet = service.spreadsheets().get(spreadsheetId=LOG_SPREADSHEET_ID).execute()
-        existing_sheets = [s['properties']['title'] for s in spreadsheet['sheets']]
-
-        if USED_NEWS_SHEET_NAME not in existing_sheets:
+        if not sheets.has_sheet(LOG_SPREADSHEET_ID, USED_NEWS_SHEET_NAME):
             print(f"  [重複チェック] シート '{USED_NEWS_SHEET_NAME}' が存在しません（新規作成予定）")
             return []
 
         # データ取得
-        result = service.spreadsheets().values().get(
-            spreadsheetId=LOG_SPREADSHEET_ID,
-            range=f"{USED_NEWS_SHEET_NAME}!A2:B1000"
-        ).execute()
-
-        values = result.get('values', [])
+        values = sheets.get_values(LOG_SPREADSHEET_ID, f"{USED_NEWS_SHEET_NAME}!A2:B1000")
         if not values:
             return []
 
@@ -515,50 +422,18 @@ def save_used_news_titles(news_titles: list):
         return
 
     try:
-        creds = get_google_credentials()
-        service = build('sheets', 'v4', credentials=creds)
-
-        # シートが存在するか確認、なければ作成
-        spreadsheet = service.spreadsheets().get(spreadsheetId=LOG_SPREADSHEET_ID).execute()
-        existing_sheets = [s['properties']['title'] for s in spreadsheet['sheets']]
-
-        if USED_NEWS_SHEET_NAME not in existing_sheets:
-            # シート作成
-            request = {
-                "requests": [{
-                    "addSheet": {
-                        "properties": {"title": USED_NEWS_SHEET_NAME}
-                    }
-                }]
-            }
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                body=request
-            ).execute()
-
-            # ヘッダー追加
-            headers = ["日時", "ニュースタイトル"]
-            service.spreadsheets().values().update(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                range=f"{USED_NEWS_SHEET_NAME}!A1:B1",
-                valueInputOption="RAW",
-                body={"values": [headers]}
-            ).execute()
+        sheets = get_sheets_gateway()
+
+        # シートがなければ作成
+        if sheets.ensure_sheet(LOG_SPREADSHEET_ID, USED_NEWS_SHEET_NAME, headers=["日時", "ニュースタイトル"]):
             print(f"  [重複チェック] シート '{USED_NEWS_SHEET_NAME}' を作成しました")
 
         # データ追加
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         rows = [[now, title] for title in news_titles]
-
-        service.spreadsheets().values().append(
-            spreadsheetId=LOG_SPREADSHEET_ID,
-            range=f"{USED_NEWS_SHEET_NAME}!A:B",
-            valueInputOption="RAW",
-            insertDataOption="INSERT_ROWS",
-            body={"values": rows}
-        ).execute()
-
-        print(f"  [重複チェック] {len(news_titles)}件のニュースタイトルを保存")
+        # 「保存」は batchUpdate で実際に送信できてから表示する
+        sheets.append_rows(LOG_SPREADSHEET_ID, USED_NEWS_SHEET_NAME, rows,
+                           on_flushed=lambda: print(f"  [重複チェック] {len(news_titles)}件のニュースタイトルを保存"))
 
     except Exception as e:
         print(f"  ⚠ 使用済みニュース保存エラー: {e}")
@@ -575,47 +450,19 @@ def save_green_room_content(green_room: list, title: str = ""):
         return
 
     try:
-        from datetime import datetime
-        creds = get_google_credentials()
-        service = build("sheets", "v4", credentials=creds)
+        sheets = get_sheets_gateway()
 
-        # シートが存在するか確認
-        spreadsheet = service.spreadsheets().get(spreadsheetId=LOG_SPREADSHEET_ID).execute()
-        sheet_names = [s["properties"]["title"] for s in spreadsheet.get("sheets", [])]
-
-        if GREEN_ROOM_SHEET_NAME not in sheet_names:
-            # シートを作成
-            service.spreadsheets().batchUpdate(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                body={
-                    "requests": [{
-                        "addSheet": {
-                            "properties": {"title": GREEN_ROOM_SHEET_NAME}
-                        }
-                    }]
-                }
-            ).execute()
-            # ヘッダーを追加
-            service.spreadsheets().values().update(
-                spreadsheetId=LOG_SPREADSHEET_ID,
-                range=f"{GREEN_ROOM_SHEET_NAME}!A1:D1",
-                valueInputOption="RAW",
-                body={"values": [["日時", "タイトル", "控室トーク内容", "セリフ数"]]}
-            ).execute()
+        # シートがなければ作成
+        sheets.ensure_sheet(LOG_SPREADSHEET_ID, GREEN_ROOM_SHEET_NAME,
+                            headers=["日時", "タイトル", "控室トーク内容", "セリフ数"])
 
         # 控室トークをJSON形式で保存
         green_room_json = json.dumps(green_room, ensure_ascii=False)
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        service.spreadsheets().values().append(
-            spreadsheetId=LOG_SPREADSHEET_ID,
-            range=f"{GREEN_ROOM_SHEET_NAME}!A:D",
-            valueInputOption="RAW",
-            insertDataOption="INSERT_ROWS",
-            body={"values": [[now, title, green_room_json, len(green_room)]]}
-        ).execute()
-
-        print(f"  [控室保存] 保存完了: {len(green_room)}セリフ")
+        # 「保存完了」は batchUpdate で実際に送信できてから表示する
+        sheets.append_rows(LOG_SPREADSHEET_ID, GREEN_ROOM_SHEET_NAME,
+                           [[now, title, green_room_json, len(green_room)]],
+                           on_flushed=lambda: print(f"  [控室保存] 保存完了: {len(green_room)}セリフ"))
 
     except Exception as e:
         print(f"  ⚠ 控室トーク保存エラー: {e}")
@@ -1496,62 +1343,15 @@ def fix_script_errors(script: dict, errors: list, key_manager) -> dict:
 
 def triple_fact_check(script: dict, news_data: dict, key_manager) -> dict:
     """3重ファクトチェック - 1つでもNGなら修正"""
-
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        print(f"\n  === ファクトチェック {attempt + 1}回目 ===")
-
-        all_errors = []
-
-        # Step 1: Geminiで自己チェック
-        print("    [1/3] Geminiチェック...")
-        gemini_result = gemini_fact_check(script, news_data, key_manager)
-        if gemini_result.get("has_error"):
-            all_errors.extend(gemini_result.get("errors", []))
-            print(f"    ❌ Gemini: {len(gemini_result.get('errors', []))}件のエラー")
-            for err in gemini_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Gemini: OK")
-
-        # Step 2: Web検索で裏取り
-        print("    [2/3] Web検索チェック...")
-        web_result = web_search_fact_check(script, key_manager)
-        if web_result.get("has_error"):
-            all_errors.extend(web_result.get("errors", []))
-            print(f"    ❌ Web検索: {len(web_result.get('errors', []))}件の不一致")
-            for err in web_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Web検索: OK")
-
-        # Step 3: Claude APIでクロスチェック
-        print("    [3/3] Claudeチェック...")
-        claude_result = claude_fact_check(script, news_data)
-        if claude_result.get("has_error"):
-            all_errors.extend(claude_result.get("errors", []))
-            print(f"    ❌ Claude: {len(claude_result.get('errors', []))}件のエラー")
-            for err in claude_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Claude: OK")
-
-        # 全チェックOKなら終了
-        if not all_errors:
-            print("  🎉 3重ファクトチェック全てOK！")
-            return script
-
-        # 最後の試行でもエラーがあれば警告して続行
-        if attempt == max_retries - 1:
-            print(f"  ⚠️ {len(all_errors)}件のエラーが残っていますが、続行します")
-            return script
-
-        # エラーがあれば修正
-        print(f"  ⚠️ {len(all_errors)}件のエラーを修正中...")
-        script = fix_script_errors(script, all_errors, key_manager)
-
-    return script
+    # 3チェックは互いに独立なので並列で投げる（修正後は入力が変わったチェッカーだけ再実行）
+    checkers = [
+        FactChecker("Gemini", lambda s: gemini_fact_check(s, news_data, key_manager)),
+        # Web検索は台本から抜き出した数字・日付だけを見る
+        FactChecker("Web検索", lambda s: web_search_fact_check(s, key_manager),
+                    inputs=lambda s: extract_facts_from_script(s)[:5]),
+        FactChecker("Claude", lambda s: claude_fact_check(s, news_data)),
+    ]
+    return run_fact_check_rounds(script, checkers, lambda s, errors: fix_script_errors(s, errors, key_manager), max_rounds=3)
 
 
 def save_wav_file(filename: str, pcm_data: bytes, channels: int = 1, rate: int = 24000, sample_width: int = 2):
@@ -1563,14 +1363,17 @@ def save_wav_file(filename: str, pcm_data: bytes, channels: int = 1, rate: int =
         wf.writeframes(pcm_data)
 
 
-def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: str, chunk_index: int,
-                              key_manager: GeminiKeyManager = None, max_retries: int = 3, retry_wait: int = 60) -> bool:
+def generate_gemini_tts_chunk_pcm(dialogue_chunk: list, api_key: str, chunk_index: int,
+                                  key_manager: GeminiKeyManager = None, max_retries: int = 3,
+                                  retry_wait: int = 60) -> bytes:
     """Gemini TTSで対話チャンクの音声を生成（マルチスピーカー）
 
+    Returns:
+        PCM（24kHz/16bit/mono）、失敗時は None
+
     Args:
         dialogue_chunk: 対話リスト
         api_key: 初回使用するAPIキー
-        output_path: 出力パス
         chunk_index: チャンクインデックス
         key_manager: APIキーマネージャー（リトライ時のキーローテーション用）
         max_retries: 最大リトライ回数（デフォルト3回）
@@ -1579,12 +1382,38 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
     # 無音セグメントのみのチャンクは無音音声を生成
     silence_lines = [line for line in dialogue_chunk if line.get("is_silence")]
     if silence_lines and len(silence_lines) == len(dialogue_chunk):
-        from pydub import AudioSegment
         total_silence_ms = sum(line.get("silence_duration_ms", 3000) for line in silence_lines)
-        silence = AudioSegment.silent(duration=total_silence_ms, frame_rate=24000)
-        silence.export(output_path, format="wav")
         print(f"      [チャンク{chunk_index + 1}] 無音セグメント生成 ({total_silence_ms}ms)")
-        return True
+        return b"\x00\x00" * (24000 * total_silence_ms // 1000)
+
+    # 対話テキストを構築（読み方辞書を適用）
+    readings = fix_readings([line['text'] for line in dialogue_chunk])
+    dialogue_text = "\n".join([
+        f"{line['speaker']}: {reading}"
+        for line, reading in zip(dialogue_chunk, readings)
+    ])
+
+    # 台本どおりに読み上げるプロンプト（TTS_INSTRUCTIONを使用）
+    # 環境変数で声質を詳細にカスタマイズ可能
+    instruction = TTS_INSTRUCTION.format(
+        voice_female=TTS_VOICE_FEMALE,
+        voice_male=TTS_VOICE_MALE
+    )
+    tts_prompt = f"""{instruction}
+
+【台本】
+{dialogue_text}"""
+
+    # 同じ台本・ボイス・指示の音声は前回の実行結果を再利用
+    tts_cache = get_tts_cache()
+    cache_key = tts_cache_key(
+        "gemini", f"カツミ={GEMINI_VOICE_KATSUMI},ヒロシ={GEMINI_VOICE_HIROSHI}", dialogue_text,
+        instruction=instruction, model=GEMINI_TTS_MODEL, output="pcm-24000-mono"
+    )
+    cached_audio = tts_cache.get(cache_key)
+    if cached_audio is not None:
+        print(f"      ✓ チャンク{chunk_index + 1} キャッシュから復元 ({len(cached_audio) / 1024:.1f}KB)")
+        return cached_audio
 
     current_key = api_key
     tried_keys = set()
@@ -1594,12 +1423,6 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
             client = genai_tts.Client(api_key=current_key)
             key_index = key_manager.keys.index(current_key) if key_manager and current_key in key_manager.keys else "?"
 
-            # 対話テキストを構築（読み方辞書を適用）
-            dialogue_text = "\n".join([
-                f"{line['speaker']}: {fix_reading(line['text'])}"
-                for line in dialogue_chunk
-            ])
-
             # デバッグ: チャンクの最初と最後のspeakerをログ出力
             if dialogue_chunk:
                 first_line = dialogue_chunk[0]
@@ -1633,17 +1456,6 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
                 # 最初のチャンクでボイス設定をログ出力
                 print(f"      [ボイス設定] カツミ={GEMINI_VOICE_KATSUMI}, ヒロシ={GEMINI_VOICE_HIROSHI}")
 
-            # 台本どおりに読み上げるプロンプト（TTS_INSTRUCTIONを使用）
-            # 環境変数で声質を詳細にカスタマイズ可能
-            instruction = TTS_INSTRUCTION.format(
-                voice_female=TTS_VOICE_FEMALE,
-                voice_male=TTS_VOICE_MALE
-            )
-            tts_prompt = f"""{instruction}
-
-【台本】
-{dialogue_text}"""
-
             response = client.models.generate_content(
                 model=GEMINI_TTS_MODEL,
                 contents=tts_prompt,
@@ -1660,15 +1472,15 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
             # 音声データを取得
             if response.candidates and response.candidates[0].content.parts:
                 audio_data = response.candidates[0].content.parts[0].inline_data.data
-                save_wav_file(output_path, audio_data)
+                tts_cache.put(cache_key, audio_data)
                 # 音声品質確認用ログ（サイズ）
                 audio_size_kb = len(audio_data) / 1024
                 print(f"      ✓ チャンク{chunk_index + 1} 生成完了 (KEY_{key_index}, {audio_size_kb:.1f}KB)")
-                return True
+                return audio_data
 
         except Exception as e:
             error_str = str(e)
-            is_429 = "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+            is_429 = is_rate_limit_error(e)
             is_500 = "500" in error_str or "INTERNAL" in error_str
 
             if is_429 or is_500:
@@ -1677,7 +1489,7 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
 
                 # エラーを記録
                 if key_manager and is_429:
-                    key_manager.mark_429_error(current_key)
+                    key_manager.mark_429_error(current_key, e)
                 tried_keys.add(current_key)
 
                 # リトライ可能か確認
@@ -1705,7 +1517,17 @@ def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: s
                 else:
                     break
 
-    return False
+    return None
+
+
+def generate_gemini_tts_chunk(dialogue_chunk: list, api_key: str, output_path: str, chunk_index: int,
+                              key_manager: GeminiKeyManager = None, max_retries: int = 3, retry_wait: int = 60) -> bool:
+    """Gemini TTSで対話チャンクの音声を生成してWAVに保存（generate_gemini_tts_chunk_pcm のファイル版）"""
+    pcm = generate_gemini_tts_chunk_pcm(dialogue_chunk, api_key, chunk_index, key_manager, max_retries, retry_wait)
+    if pcm is None:
+        return False
+    save_wav_file(output_path, pcm)
+    return True
 
 
 def generate_gemini_tts_single(text: str, voice: str, api_key: str, output_path: str) -> bool:
@@ -1771,19 +1593,17 @@ def generate_unified_audio_with_stt(dialogue: list, output_path: str, temp_dir:
     Returns:
         tuple: (output_path, segments, total_duration)
     """
-    from faster_whisper import WhisperModel
-    import difflib
-
     print("    [統合TTS] 全台本を1回で生成開始...")
 
     # 1. 全対話テキストを構築
+    spoken = [line for line in dialogue if not line.get("is_silence")]
     dialogue_text = "\n".join([
-        f"{line['speaker']}: {fix_reading(line['text'])}"
-        for line in dialogue if not line.get("is_silence")
+        f"{line['speaker']}: {reading}"
+        for line, reading in zip(spoken, fix_readings([line['text'] for line in spoken]))
     ])
 
     # 2. Gemini TTSで一括生成
-    api_key = key_manager.get_working_key()
+    api_key, _ = key_manager.get_working_key()
     print(f"    [統合TTS] 全{len(dialogue)}セリフを生成...")
 
     tts_success = False
@@ -1844,12 +1664,11 @@ def generate_unified_audio_with_stt(dialogue: list, output_path: str, temp_dir:
                 break
 
         except Exception as e:
-            error_str = str(e)
-            is_429 = "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+            is_429 = is_rate_limit_error(e)
 
             if is_429:
                 print(f"    ⚠ 429エラー (attempt {attempt + 1}/{max_retries})")
-                key_manager.mark_429_error(api_key)
+                key_manager.mark_429_error(api_key, e)
                 api_key, _ = key_manager.get_key_with_least_failures({api_key})
                 time.sleep(5)
             else:
@@ -1860,7 +1679,7 @@ def generate_unified_audio_with_stt(dialogue: list, output_path: str, temp_dir:
 
     if not tts_success:
         print("    ❌ TTS生成失敗、gTTSフォールバック...")
-        all_text = "。".join([fix_reading(line["text"]) for line in dialogue if not line.get("is_silence")])
+        all_text = "。".join(fix_readings([line["text"] for line in dialogue if not line.get("is_silence")]))
         if not generate_gtts_fallback(all_text, output_path):
             return None, [], 0.0
 
@@ -1875,16 +1694,12 @@ def generate_unified_audio_with_stt(dialogue: list, output_path: str, temp_dir:
     # 4. Whisper STTでタイミング取得
     print("    [STT] faster-whisperで音声解析...")
     try:
-        # baseモデルを使用（速度と精度のバランス）
-        model = WhisperModel("base", device="cpu", compute_type="int8")
-        whisper_segments_raw, info = model.transcribe(
+        # baseモデルを使用（速度と精度のバランス、ロード済みなら再利用）
+        _, whisper_segments = transcribe_words(
             output_path,
-            language="ja",
-            word_timestamps=True,
-            vad_filter=True,
+            model_size="base",
             vad_parameters=dict(min_silence_duration_ms=300)
         )
-        whisper_segments = list(whisper_segments_raw)
         print(f"    [STT] {len(whisper_segments)}セグメント検出")
 
     except Exception as e:
@@ -1910,6 +1725,9 @@ def generate_unified_audio_with_stt(dialogue: list, output_path: str, temp_dir:
 def match_stt_to_script(whisper_segments: list, dialogue: list, total_duration: float) -> list:
     """Whisper STT結果と台本をマッチングして正確なタイミングを取得
 
+    単語タイムスタンプと台本全体を1回のDPで対応付ける（whisper_align.align_lines）。
+    対応付けできなかったセリフは前後のセリフの間にテキスト長比例で割り振る。
+
     Args:
         whisper_segments: Whisperのセグメントリスト
         dialogue: 台本の対話リスト
@@ -1918,27 +1736,20 @@ def match_stt_to_script(whisper_segments: list, dialogue: list, total_duration:
     Returns:
         list: タイミング付きセグメントリスト
     """
-    import difflib
+    normal_lines = [line for line in dialogue if not line.get("is_silence")]
+    words = words_from_segments(whisper_segments)
+    # TTSに渡したのと同じ読みで比べる（漢字と読みの表記ゆれを吸収）
+    timings = iter(align_lines([line["text"] for line in normal_lines], words, total_duration,
+                               reading=fix_reading))
 
     segments = []
-    current_whisper_idx = 0
     current_time = 0.0
+    matched = 0
 
-    # Whisperセグメントのテキストを結合して検索用に準備
-    whisper_texts = []
-    whisper_timings = []
-    for seg in whisper_segments:
-        whisper_texts.append(seg.text.strip())
-        whisper_timings.append((seg.start, seg.end))
-
-    # 全Whisperテキストを結合（マッチング用）
-    all_whisper_text = "".join(whisper_texts)
-
-    for i, line in enumerate(dialogue):
+    for line in dialogue:
         speaker = line["speaker"]
         text = line["text"]
         section = line.get("section", "")
-        color = CHARACTERS.get(speaker, {}).get("color", "#FFFFFF")
 
         if line.get("is_silence"):
             # 無音セグメント
@@ -1955,56 +1766,21 @@ def match_stt_to_script(whisper_segments: list, dialogue: list, total_duration:
             current_time += silence_duration
             continue
 
-        # 台本テキストとWhisperテキストをマッチング
-        # 最も類似するWhisperセグメントを探す
-        best_match_idx = current_whisper_idx
-        best_ratio = 0.0
-
-        # 現在位置から前後5セグメントを検索
-        search_start = max(0, current_whisper_idx - 2)
-        search_end = min(len(whisper_texts), current_whisper_idx + 8)
-
-        for j in range(search_start, search_end):
-            # セグメント単体またはセグメント結合でマッチング
-            for k in range(j, min(j + 3, search_end)):
-                combined = "".join(whisper_texts[j:k+1])
-                # 読み方修正を除いた比較用テキスト
-                clean_text = text.replace("、", "").replace("。", "").replace("！", "").replace("？", "")
-                clean_combined = combined.replace("、", "").replace("。", "").replace("！", "").replace("？", "")
-
-                ratio = difflib.SequenceMatcher(None, clean_text, clean_combined).ratio()
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match_idx = j
-                    best_match_end = k
-
-        # タイミングを取得（閾値0.5に引き上げて精度向上）
-        if best_ratio > 0.5 and best_match_idx < len(whisper_timings):
-            start_time = whisper_timings[best_match_idx][0]
-            end_time = whisper_timings[min(best_match_end, len(whisper_timings) - 1)][1]
-            current_whisper_idx = best_match_end + 1
-        else:
-            # マッチしない場合は現在位置から推定
-            if current_whisper_idx < len(whisper_timings):
-                start_time = whisper_timings[current_whisper_idx][0]
-                # テキスト長から終了時間を推定
-                avg_chars_per_sec = 5.0  # 日本語の平均読み上げ速度
-                estimated_duration = len(text) / avg_chars_per_sec
-                end_time = min(start_time + estimated_duration, total_duration)
-                current_whisper_idx += 1
-            else:
-                start_time = current_time
-                end_time = current_time + len(text) / 5.0
+        timing = next(timings)
+        if timing.score > 0:
+            matched += 1
 
         segments.append({
             "speaker": speaker,
             "text": text,
-            "start": start_time,
-            "end": end_time,
-            "color": color,
+            "start": timing.start,
+            "end": timing.end,
+            "color": CHARACTERS.get(speaker, {}).get("color", "#FFFFFF"),
             "section": section,
         })
-        current_time = end_time
+        current_time = timing.end
+
+    print(f"    [STT] 台本と対応付け: {matched}/{len(normal_lines)}セリフ（残りは補間）")
 
     # 字幕重なり修正: end時間が次のstart時間を超えている場合は調整
     segments = fix_subtitle_overlap(segments)
@@ -2298,7 +2074,7 @@ def detect_timing_with_whisper(audio_path: str, script_lines: list) -> list:
         list: 各セリフの (start, end) タプルのリスト
     """
     try:
-        from faster_whisper import WhisperModel
+        import faster_whisper  # noqa: F401
     except ImportError:
         print("    [Whisper] faster-whisper未インストール、フォールバック使用")
         return detect_silence_points_fallback(audio_path, len(script_lines))
@@ -2315,18 +2091,12 @@ def detect_timing_with_whisper(audio_path: str, script_lines: list) -> list:
         return [(0.0, total_duration)] if num_lines <= 1 else [(0.0, total_duration)]
 
     try:
-        # Whisperモデルをロード（small = 高精度かつ高速）
-        # int8量子化でメモリ節約 & 高速化
-        print("    [Whisper] モデルロード中 (small)...")
-        model = WhisperModel("small", device="cpu", compute_type="int8")
-
+        # Whisperモデル（small = 高精度かつ高速、int8量子化）はプロセス内で使い回す
         # 音声を文字起こし（word_timestamps=True で単語レベルのタイミング取得）
         print("    [Whisper] 音声解析中...")
-        segments, info = model.transcribe(
+        words, segments = transcribe_words(
             audio_path,
-            language="ja",
-            word_timestamps=True,
-            vad_filter=True,  # 音声区間検出で精度向上
+            model_size="small",
             vad_parameters=dict(
                 min_silence_duration_ms=200,  # 200ms以上の無音で区切り
                 speech_pad_ms=100,  # 発話前後に100msのパディング
@@ -2345,10 +2115,16 @@ def detect_timing_with_whisper(audio_path: str, script_lines: list) -> list:
 
         print(f"    [Whisper] {len(whisper_segments)}セグメント検出")
 
-        # Whisperセグメントをスクリプトのセリフ数に合わせてマッピング
-        timings = _map_whisper_to_script(whisper_segments, script_lines, total_duration)
+        # 単語タイムスタンプと台本を文字単位で対応付け
+        aligned = align_lines([line.get("text", "") for line in script_lines], words, total_duration,
+                              reading=fix_reading)
+        matched = sum(1 for t in aligned if t.score > 0)
+        print(f"    [Whisper] 台本と対応付け: {matched}/{num_lines}セリフ")
+        if matched * 2 >= num_lines:
+            return [(t.start, t.end) for t in aligned]
 
-        return timings
+        # 文字起こしが台本とほとんど一致しない場合は、セグメント数ベースでマッピング
+        return _map_whisper_to_script(whisper_segments, script_lines, total_duration)
 
     except Exception as e:
         print(f"    [Whisper] エラー: {e}、フォールバック使用")
@@ -2584,6 +2360,8 @@ def _process_chunk_parallel(args: tuple) -> dict:
     argsの形式:
     - 従来形式: (chunk, api_key, chunk_path, chunk_index, key_manager)
     - 新形式: (chunk, api_key, chunk_path, chunk_index, key_manager, jingle_path)
+
+    chunk_path は互換性のため残しているが、音声はファイルに書かずPCM配列で返す。
     """
     # 引数を展開（互換性維持）
     if len(args) == 6:
@@ -2598,46 +2376,39 @@ def _process_chunk_parallel(args: tuple) -> dict:
     if stagger_delay > 0:
         time.sleep(min(stagger_delay, 5.0))  # 最大5秒
 
-    success = generate_gemini_tts_chunk(
-        chunk, api_key, chunk_path, chunk_index,
+    pcm = generate_gemini_tts_chunk_pcm(
+        chunk, api_key, chunk_index,
         key_manager=key_manager,
         max_retries=3,
         retry_wait=30  # パラレル処理では短めに
     )
+    success = pcm is not None
 
+    samples = None
     duration = 0.0
     speech_duration = 0.0  # 実際の音声部分の長さ
     jingle_duration = 0.0  # ジングルの長さ
 
-    if success and os.path.exists(chunk_path):
-        try:
-            from pydub import AudioSegment
-            audio = AudioSegment.from_file(chunk_path)
-            speech_duration = len(audio) / 1000.0  # 実際の音声長（秒）
-
-            # チャンク末尾にジングルを追加
-            if jingle_path and os.path.exists(jingle_path):
-                jingle = AudioSegment.from_file(jingle_path)
-                jingle = jingle + 3  # +3dB
-                jingle_duration = len(jingle) / 1000.0
-                audio = audio + jingle
-
-            audio.export(chunk_path, format="wav")
-            duration = len(audio) / 1000.0  # ミリ秒→秒
-        except Exception as e:
-            print(f"    ⚠ チャンク処理エラー: {e}")
-            # フォールバック: ffprobe
-            result = subprocess.run([
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', chunk_path
-            ], capture_output=True, text=True)
-            duration = float(result.stdout.strip()) if result.stdout.strip() else 0.0
-            speech_duration = duration  # フォールバック時は同じ
+    if success:
+        speech = pcm_to_array(pcm)
+        speech_duration = samples_duration(speech)  # 実際の音声長（秒）
+        samples = [speech]
+
+        # チャンク末尾にジングルを追加（+3dB、デコードは1回だけ）
+        if jingle_path and os.path.exists(jingle_path):
+            try:
+                jingle = load_clip(jingle_path, gain_db=3.0)
+                jingle_duration = samples_duration(jingle)
+                samples.append(jingle)
+            except Exception as e:
+                print(f"    ⚠ ジングル読み込みエラー: {e}")
+
+        duration = speech_duration + jingle_duration
 
     return {
         "index": chunk_index,
         "success": success,
-        "path": chunk_path if success else None,
+        "samples": samples,  # [セリフ, ジングル] のPCM配列
         "duration": duration,
         "speech_duration": speech_duration,  # ジングルを除いた実際の音声長
         "jingle_duration": jingle_duration,  # ジングルの長さ
@@ -2663,8 +2434,6 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
     current_time = 0.0
 
     # ジングルをダウンロード
-    NORMAL_JINGLE_ID = "18JF1p4Maea9SPcZ6y0wCHnxI1FMAfyfT"
-    GREEN_ROOM_JINGLE_ID = "1zaJf-Oq7gzR26k33y2ccTS0yO_n5gY83"
     normal_jingle_path = str(temp_dir / "normal_jingle.mp3")
     green_room_jingle_path = str(temp_dir / "green_room_jingle.mp3")
 
@@ -2704,7 +2473,7 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
         tasks.append((chunk, api_key, chunk_path, i, key_manager, jingle_path))
 
     # ThreadPoolExecutorでパラレル処理
-    chunk_files = [None] * len(chunks)
+    chunk_samples = [None] * len(chunks)
     chunk_durations = [0.0] * len(chunks)
     chunk_speech_durations = [0.0] * len(chunks)  # セリフ部分の長さ（ジングル除く）
     successful_chunk_indices = []
@@ -2719,7 +2488,7 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
             try:
                 result = future.result()
                 if result["success"]:
-                    chunk_files[result["index"]] = result["path"]
+                    chunk_samples[result["index"]] = result["samples"]
                     chunk_durations[result["index"]] = result["duration"]
                     chunk_speech_durations[result["index"]] = result.get("speech_duration", result["duration"])
                     successful_chunk_indices.append(result["index"])
@@ -2731,7 +2500,7 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
                 print(f"    ✗ セクション {chunk_index + 1}/{len(chunks)} 例外: {e}")
 
     # 成功したチャンクを確認
-    successful_chunks = [f for f in chunk_files if f is not None]
+    successful_chunks = [c for c in chunk_samples if c is not None]
     failed_count = len(chunks) - len(successful_chunks)
     print(f"    [Gemini TTS] {len(successful_chunks)}/{len(chunks)} チャンク成功")
 
@@ -2739,7 +2508,7 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
     print(f"    [デバッグ] チャンク詳細:")
     for idx, dur in enumerate(chunk_durations):
         speech_dur = chunk_speech_durations[idx] if idx < len(chunk_speech_durations) else 0
-        status = "✓" if chunk_files[idx] else "✗"
+        status = "✓" if chunk_samples[idx] is not None else "✗"
         print(f"      {status} チャンク{idx + 1}: 音声={speech_dur:.1f}秒, ジングル含む={dur:.1f}秒")
 
     # エラーサマリーを表示
@@ -2754,56 +2523,31 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
             print(f"    [フォールバック] {failed_count}チャンク失敗のため、声の統一のためgTTSで全音声を再生成")
         else:
             print("    [フォールバック] gTTSで音声生成")
-        all_text = "。".join([fix_reading(line["text"]) for line in dialogue])
+        all_text = "。".join(fix_readings([line["text"] for line in dialogue]))
         fallback_path = str(temp_dir / "fallback.wav")
         if generate_gtts_fallback(all_text, fallback_path):
-            successful_chunks = [fallback_path]
+            fallback_samples = read_wav(fallback_path)
+            successful_chunks = [[fallback_samples]]
             # gTTSは全セリフを生成するので、全チャンクを成功扱い
             successful_chunk_indices = list(range(len(chunks)))
-            # gTTS全体の長さを取得して各チャンクに均等分配
-            result = subprocess.run([
-                'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', fallback_path
-            ], capture_output=True, text=True)
-            gtts_duration = float(result.stdout.strip()) if result.stdout.strip() else 0.0
+            # gTTS全体の長さを各チャンクに均等分配
+            gtts_duration = samples_duration(fallback_samples)
             per_chunk = gtts_duration / len(chunks) if len(chunks) > 0 else 0.0
             chunk_durations = [per_chunk] * len(chunks)
         else:
             return None, [], 0.0
 
-    # 音声を結合
-    combined_path = str(temp_dir / "combined.wav")
-    if len(successful_chunks) == 1:
-        # 1つだけなら結合不要
-        import shutil
-        shutil.copy(successful_chunks[0], combined_path)
-    else:
-        # ffmpegで結合
-        list_file = temp_dir / "concat.txt"
-        with open(list_file, 'w') as f:
-            for af in successful_chunks:
-                f.write(f"file '{af}'\n")
-
-        subprocess.run([
-            'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', str(list_file),
-            '-acodec', 'pcm_s16le', '-ar', '24000', '-ac', '1', combined_path
-        ], capture_output=True)
-
+    # 音声を結合（メモリ上で1本のPCMにまとめ、WAVは1回だけ書き出す）
     # 速度調整なし（Gemini TTSは自然な速度で生成）
-    # combined.wav をそのまま output_path にコピー
-    import shutil
-    shutil.copy(combined_path, output_path)
-
-    # 一時ファイル削除
-    if os.path.exists(combined_path):
-        os.remove(combined_path)
-
-    # 長さ取得
-    result = subprocess.run([
-        'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1', output_path
-    ], capture_output=True, text=True)
-    total_duration = float(result.stdout.strip()) if result.stdout.strip() else 0.0
+    total_samples = sum(len(part) for parts in successful_chunks for part in parts)
+    track = PCMTrack(expected_seconds=total_samples / 24000)
+    for parts in successful_chunks:
+        for part in parts:
+            track.append(part)
+    track.write_wav(output_path)
+
+    # 長さはサンプル数から計算
+    total_duration = track.duration
     print(f"    [音声長] {total_duration:.1f}秒")
 
     # セクション単位のタイミングを計算（セリフ部分のみ、ジングルは除外）
@@ -2880,14 +2624,6 @@ def generate_dialogue_audio_parallel(dialogue: list, output_path: str, temp_dir:
 
     print(f"    [字幕] 成功したセリフ数: {successful_dialogue_count}/{len(dialogue)}")
 
-    # 一時ファイル削除
-    for af in successful_chunks:
-        if af and os.path.exists(af):
-            try:
-                os.remove(af)
-            except:
-                pass
-
     return output_path, segments, total_duration
 
 
@@ -2915,27 +2651,17 @@ def upload_audio_to_drive(audio_path: str, folder_id: str = None) -> str:
 
 
 def download_file_from_drive(file_id: str, output_path: str, file_type: str = "ファイル") -> bool:
-    """Google Driveからファイルをダウンロード（汎用）"""
-    try:
-        creds = get_google_credentials()
-        service = build('drive', 'v3', credentials=creds)
-
-        # ファイル情報を取得
-        file_info = service.files().get(fileId=file_id, fields='name,mimeType').execute()
-        print(f"    [{file_type}] ファイル名: {file_info.get('name')}, MIME: {file_info.get('mimeType')}")
-
-        # ダウンロード
-        request = service.files().get_media(fileId=file_id)
-        with open(output_path, 'wb') as f:
-            downloader = request.execute()
-            f.write(downloader)
+    """Google Driveからファイルをダウンロード（汎用、drive_cache 経由で変わっていなければ再取得しない）"""
+    if not get_drive_cache().fetch(file_id, output_path, label=file_type):
+        return False
+    print(f"    ✓ {file_type}を取得")
+    return True
 
-        print(f"    ✓ {file_type}ダウンロード完了")
-        return True
 
-    except Exception as e:
-        print(f"    ⚠ {file_type}ダウンロードエラー: {e}")
-        return False
+def prefetch_drive_assets():
+    """この動画で使う Drive のファイルを並列で取得開始（結果は download_*_from_drive で受け取る）"""
+    get_drive_cache().prefetch([NORMAL_JINGLE_ID, GREEN_ROOM_JINGLE_ID, BACKROOM_BGM_FILE_ID,
+                                os.environ.get("BACKGROUND_IMAGE_ID")])
 
 
 def download_jingle_from_drive(file_id: str, output_path: str) -> bool:
@@ -3170,7 +2896,6 @@ def generate_qr_background(output_path: str):
 
     # フォント設定（50px、太字）
     font_size = 50
-    font = None
     # フォント候補（優先順）
     font_paths = [
         "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
@@ -3178,15 +2903,7 @@ def generate_qr_background(output_path: str):
         "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
         "/System/Library/Fonts/Hiragino Sans GB.ttc",
     ]
-    for fp in font_paths:
-        if os.path.exists(fp):
-            try:
-                font = ImageFont.truetype(fp, font_size)
-                break
-            except Exception:
-                continue
-    if font is None:
-        font = ImageFont.load_default()
+    font = find_font(font_paths, font_size)
 
     shadow_offset = 2
 
@@ -3196,8 +2913,7 @@ def generate_qr_background(output_path: str):
     qr_size = 200  # 少し小さめ
 
     if qr_path.exists():
-        qr_img = Image.open(qr_path)
-        qr_img = qr_img.resize((qr_size, qr_size), Image.LANCZOS)
+        qr_img = load_sprite(qr_path, qr_size, mode=None, resample=Image.LANCZOS)
     else:
         # qrcodeライブラリで生成
         try:
@@ -3231,16 +2947,7 @@ def generate_qr_background(output_path: str):
 
     # 上部にメインメッセージ
     main_font_size = 70
-    main_font = None
-    for fp in font_paths:
-        if os.path.exists(fp):
-            try:
-                main_font = ImageFont.truetype(fp, main_font_size)
-                break
-            except Exception:
-                continue
-    if main_font is None:
-        main_font = font
+    main_font = find_font(font_paths, main_font_size)
 
     main_text = "ご視聴ありがとうございました！"
     main_bbox = draw.textbbox((0, 0), main_text, font=main_font)
@@ -3253,16 +2960,7 @@ def generate_qr_background(output_path: str):
 
     # サブテキスト
     sub_font_size = 40
-    sub_font = None
-    for fp in font_paths:
-        if os.path.exists(fp):
-            try:
-                sub_font = ImageFont.truetype(fp, sub_font_size)
-                break
-            except Exception:
-                continue
-    if sub_font is None:
-        sub_font = font
+    sub_font = find_font(font_paths, sub_font_size)
 
     sub_lines = [
         "チャンネル登録・高評価お願いします",
@@ -3406,16 +3104,8 @@ def draw_topic_overlay(base_img: Image.Image, title: str, date_str: str = "") ->
         "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
     ]
 
-    def load_font(size):
-        for fp in font_paths:
-            try:
-                return ImageFont.truetype(fp, size)
-            except:
-                continue
-        return ImageFont.load_default()
-
-    date_font = load_font(36)
-    title_font = load_font(42)
+    date_font = find_font(font_paths, 36)
+    title_font = find_font(font_paths, 42)
 
     # ボックス設定（右上エリア）
     box_width = 480
@@ -3520,16 +3210,8 @@ def create_topic_overlay_transparent(title: str, date_str: str = "") -> Image.Im
         "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
     ]
 
-    def load_font(size):
-        for fp in font_paths:
-            try:
-                return ImageFont.truetype(fp, size)
-            except:
-                continue
-        return ImageFont.load_default()
-
-    date_font = load_font(36)
-    title_font = load_font(42)
+    date_font = find_font(font_paths, 36)
+    title_font = find_font(font_paths, 42)
 
     # ボックス設定（右上エリア）
     box_width = 480
@@ -3932,7 +3614,6 @@ def create_video(script: dict, temp_dir: Path, key_manager: GeminiKeyManager) ->
     # 追加のジングル挿入処理は不要
 
     # 控え室BGMを追加（オプション）
-    BACKROOM_BGM_FILE_ID = "1wP6bp0a0PlaaqM55b8zdwozxT0XTOvab"
     backroom_bgm_path = str(temp_dir / "backroom_bgm.mp3")
 
     # 控え室セクションの開始位置を検出
@@ -4574,17 +4255,11 @@ def generate_thumbnail(bg_image_path: str, title: str, output_path: str) -> bool
             "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc",
         ]
 
-        font = None
-        font_size = 72
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                    break
-                except:
-                    continue
-
-        if font is None:
+        font_path = find_font_path(font_paths)
+        if font_path:
+            font_size = 72
+            font = load_font(font_path, font_size)
+        else:
             font = ImageFont.load_default()
             font_size = 40
 
@@ -4606,14 +4281,7 @@ def generate_thumbnail(bg_image_path: str, title: str, output_path: str) -> bool
         # 日付を小さく追加
         date_text = datetime.now().strftime('%Y/%m/%d')
         date_font_size = 36
-        date_font = None
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    date_font = ImageFont.truetype(font_path, date_font_size)
-                    break
-                except:
-                    continue
+        date_font = load_font(font_path, date_font_size) if font_path else None
 
         if date_font:
             date_bbox = draw.textbbox((0, 0), date_text, font=date_font)
@@ -4932,7 +4600,7 @@ def generate_community_post(news_data: dict, key_manager: GeminiKeyManager) -> d
         except Exception as e:
             error_str = str(e)
             print(f"  ⚠ 試行{attempt + 1}/{max_retries} 失敗: {error_str[:50]}...")
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+            if is_rate_limit_error(e):
                 api_key, key_name = key_manager.get_working_key()
                 if api_key:
                     genai.configure(api_key=api_key)
@@ -4973,9 +4641,9 @@ def create_community_image(question: str, output_path: str) -> str:
         font_path = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
         if not os.path.exists(font_path):
             font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-        title_font = ImageFont.truetype(font_path, 42)
-        main_font = ImageFont.truetype(font_path, 56)
-        sub_font = ImageFont.truetype(font_path, 32)
+        title_font = load_font(font_path, 42)
+        main_font = load_font(font_path, 56)
+        sub_font = load_font(font_path, 32)
     except:
         title_font = ImageFont.load_default()
         main_font = ImageFont.load_default()
@@ -5140,8 +4808,15 @@ def send_first_comment_to_slack(title: str, topics: list = None):
         print(f"  ⚠ Slack送信エラー: {e}")
 
 
-def main():
+def main(argv=None):
     """メイン処理"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="年金ニュース動画生成")
+    parser.add_argument("--resume", metavar="RUN_ID", default=None,
+                        help="止まった実行を完了済みステージから再開（latest で最新の実行）")
+    args = parser.parse_args(argv)
+
     start_time = time.time()  # 処理開始時刻
 
     print("=" * 50)
@@ -5159,12 +4834,18 @@ def main():
     key_manager = GeminiKeyManager()
     print(f"利用可能なAPIキー: {len(key_manager.get_all_keys())}個")
 
+    # 各ステージの結果を保存（投稿で落ちても --resume で続きから再実行できる）
+    checkpoint = RunCheckpoint("nenkin_news", run_id=args.resume)
+
+    # ジングル・BGM・背景画像は台本を作っている間に取得しておく
+    prefetch_drive_assets()
+
     # 処理開始をログに記録
     log_to_spreadsheet(status="処理開始")
 
     # 1. ニュース検索（Web検索機能付き）
     print("\n[1/4] 年金ニュースを検索中...")
-    news_data = search_pension_news(key_manager)
+    news_data = checkpoint.stage("news", lambda: search_pension_news(key_manager))
 
     # テストモード: ニュースを3件に制限（本番と同じ流れで短縮版）
     if TEST_MODE:
@@ -5183,7 +4864,8 @@ def main():
 
     # 2. 台本生成
     print("\n[2/4] 台本を生成中...")
-    script = generate_script(news_data, key_manager, test_mode=TEST_MODE)
+    script = checkpoint.stage("script", lambda: generate_script(news_data, key_manager, test_mode=TEST_MODE),
+                              inputs=news_data)
     if not script:
         print("❌ 台本生成に失敗しました")
         log_to_spreadsheet(status="エラー", news_count=news_count, error_message="台本生成に失敗しました")
@@ -5191,12 +4873,15 @@ def main():
 
     # 2.5 3重ファクトチェック
     print("\n[2.5/4] 3重ファクトチェック実行中...")
-    script = triple_fact_check(script, news_data, key_manager)
+    script = checkpoint.stage("fact_check", lambda: triple_fact_check(script, news_data, key_manager),
+                              inputs=script)
 
     # 2.6 台本をSlackに送信
     if not TEST_MODE:
         print("\n[2.6/4] 台本をSlackに送信中...")
-        send_slack_script_notification(script, scheduled_time="11:00")
+        checkpoint.stage("slack_script",
+                         lambda: send_slack_script_notification(script, scheduled_time="11:00") or True,
+                         inputs=script)
 
     # セリフ数をカウント
     dialogue_count = len(script.get("opening", []))
@@ -5209,7 +4894,9 @@ def main():
     # 控室トークをスプレッドシートに保存（ショート動画用）
     green_room = script.get("green_room", [])
     if green_room:
-        save_green_room_content(green_room, script.get("title", ""))
+        checkpoint.stage("green_room",
+                         lambda: save_green_room_content(green_room, script.get("title", "")) or True,
+                         inputs=green_room)
 
     # テストモード: 台本を短縮（安全措置として残す）
     if TEST_MODE and dialogue_count > 20:
@@ -5229,7 +4916,20 @@ def main():
 
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_path = Path(temp_dir)
-        video_path, _ = create_video(script, temp_path, key_manager)
+        video_path = str(temp_path / "nenkin_news.mp4")
+
+        def render_video():
+            created_path, _ = create_video(script, temp_path, key_manager)
+            os.replace(created_path, video_path)
+            return True
+
+        # 音声・字幕・背景（サムネイル用）も一緒に保存
+        checkpoint.stage("video", render_video, inputs=script, files={
+            "video": video_path,
+            "audio": str(temp_path / "audio.wav"),
+            "subtitles": str(temp_path / "subtitles.ass"),
+            "background": str(temp_path / "background.png"),
+        })
 
         # 動画の長さを取得
         result = subprocess.run([
@@ -5242,12 +4942,17 @@ def main():
         print("\n[4/7] サムネイルを生成中...")
         thumbnail_path = str(temp_path / "thumbnail.jpg")
         bg_path = str(temp_path / "background.png")
-        thumbnail_title = generate_thumbnail_title(script, key_manager)
-        generate_thumbnail(bg_path, thumbnail_title, thumbnail_path)
+
+        def make_thumbnail():
+            thumbnail_title = generate_thumbnail_title(script, key_manager)
+            generate_thumbnail(bg_path, thumbnail_title, thumbnail_path)
+            return thumbnail_title
+
+        checkpoint.stage("thumbnail", make_thumbnail, inputs=script, files={"thumbnail": thumbnail_path})
 
         # 5. YouTube投稿
         print("\n[5/7] YouTubeに投稿中...")
-        title = generate_video_title(script, key_manager)
+        title = checkpoint.stage("title", lambda: generate_video_title(script, key_manager), inputs=script)
         # タイトルの改行削除・100文字制限
         title = title.replace("\n", " ").replace("\r", "").strip()
         if len(title) > 100:
@@ -5356,9 +5061,14 @@ LINE登録で毎日の年金ニュースも届きます📱
             print(f"  動画ファイル: {output_file}")
             print(f"  タイトル: {title}")
             print("  ✓ Artifactsから動画をダウンロードして確認してください")
+            # 成功したので再開用の保存は不要
+            checkpoint.discard()
         else:
             try:
-                video_url = upload_to_youtube(video_path, title, description, tags)
+                # 投稿済みなら再開時に二重投稿しない
+                # （概要欄は実行日の日付が入るので、日をまたいで再開しても変わらない台本・タイトルで照合する）
+                video_url = checkpoint.stage("upload", lambda: upload_to_youtube(video_path, title, description, tags),
+                                             inputs={"script": script, "title": title, "tags": tags})
 
                 # 動画URL・タイトルをファイルに保存（ワークフロー通知用）
                 with open("video_url.txt", "w") as f:
@@ -5372,50 +5082,71 @@ LINE登録で毎日の年金ニュースも届きます📱
                 # サムネイルを設定
                 if video_id and os.path.exists(thumbnail_path):
                     print("\n[6/7] サムネイルを設定中...")
-                    set_youtube_thumbnail(video_id, thumbnail_path)
+                    thumbnail_set = checkpoint.stage(
+                        "set_thumbnail", lambda: set_youtube_thumbnail(video_id, thumbnail_path) or None,
+                        inputs=video_id)
+                    if not thumbnail_set:
+                        # 下の except でジョブを失敗させる（投稿済みなので再開時はサムネイル設定から）
+                        raise RuntimeError(f"サムネイル設定に失敗しました（再開: --resume {checkpoint.run_id}）")
 
                 # 最初のコメントを生成・投稿（70代老夫婦の視点）
                 first_comment = ""
                 if video_id:
                     print("\n[6.5/7] 最初のコメントを生成・投稿中...")
-                    first_comment = generate_first_comment(script, news_data, key_manager)
-                    if first_comment:
-                        post_youtube_comment(video_id, first_comment)
+
+                    def post_first_comment():
+                        comment = generate_first_comment(script, news_data, key_manager)
+                        if comment:
+                            post_youtube_comment(video_id, comment)
+                        return comment
+
+                    first_comment = checkpoint.stage("first_comment", post_first_comment, inputs=video_id) or ""
 
                 # 処理時間を計算
                 processing_time = time.time() - start_time
 
-                # 成功をログに記録
-                log_to_spreadsheet(
-                    status="成功",
-                    title=title,
-                    url=video_url,
-                    news_count=news_count,
-                    processing_time=processing_time
-                )
+                # ログ・使用済みニュース・コミュニティ投稿案（再開時に二重記録しない）
+                def finalize():
+                    # 成功をログに記録
+                    log_to_spreadsheet(
+                        status="成功",
+                        title=title,
+                        url=video_url,
+                        news_count=news_count,
+                        processing_time=processing_time
+                    )
+
+                    # 使用済みニュースタイトルを保存（重複防止用）
+                    used_news_titles = []
+                    for section in script.get("news_sections", []):
+                        news_title = section.get("news_title", "")
+                        if news_title:
+                            used_news_titles.append(news_title)
+                    if used_news_titles:
+                        save_used_news_titles(used_news_titles)
+
+                    # コメント内容を表示
+                    if first_comment:
+                        print(f"\n📝 最初のコメント: {first_comment}")
+
+                    # コミュニティ投稿案を生成・送信（テストモード以外）
+                    if not TEST_MODE and video_id:
+                        community_post = generate_community_post(news_data, key_manager)
+                        if community_post:
+                            send_community_post_to_slack(community_post, title, video_url)
+
+                        # 初コメント案を送信
+                        topics = news_data.get("news", []) if news_data else []
+                        send_first_comment_to_slack(title, topics)
+
+                    # ログ・使用済みニュースの書き込みを送信できてから完了扱いにする（失敗なら None で記録しない）
+                    return flush_sheets() or None
 
-                # 使用済みニュースタイトルを保存（重複防止用）
-                used_news_titles = []
-                for section in script.get("news_sections", []):
-                    news_title = section.get("news_title", "")
-                    if news_title:
-                        used_news_titles.append(news_title)
-                if used_news_titles:
-                    save_used_news_titles(used_news_titles)
-
-                # コメント内容を表示
-                if first_comment:
-                    print(f"\n📝 最初のコメント: {first_comment}")
-
-                # コミュニティ投稿案を生成・送信（テストモード以外）
-                if not TEST_MODE and video_id:
-                    community_post = generate_community_post(news_data, key_manager)
-                    if community_post:
-                        send_community_post_to_slack(community_post, title, video_url)
-
-                    # 初コメント案を送信
-                    topics = news_data.get("news", []) if news_data else []
-                    send_first_comment_to_slack(title, topics)
+                if not checkpoint.stage("finalize", finalize, inputs=video_url):
+                    # 下の except でジョブを失敗させる（再開時は記録からやり直す）
+                    raise RuntimeError(f"スプレッドシートへの記録に失敗しました（再開: --resume {checkpoint.run_id}）")
+                # 成功したので再開用の保存は不要
+                checkpoint.discard()
 
             except Exception as e:
                 print(f"❌ YouTube投稿エラー: {e}")
@@ -5436,6 +5167,8 @@ LINE登録で毎日の年金ニュースも届きます📱
                 output_file = f"nenkin_news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
                 shutil.copy(video_path, output_file)
                 print(f"   ローカル保存: {output_file}")
+                # ジョブを失敗させる（失敗時だけ実行チェックポイントが保存され、Re-run で投稿から再開できる）
+                sys.exit(1)
 
 
 if __name__ == "__main__":
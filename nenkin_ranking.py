@@ -15,6 +15,7 @@ import time
 import random
 import re
 import tempfile
+import threading
 import subprocess
 import base64
 from datetime import datetime
@@ -27,6 +28,14 @@ from google import genai
 from google.genai import types
 from pydub import AudioSegment
 from gtts import gTTS
+from asset_cache import load_font
+from drive_cache import get_drive_cache
+from pcm_audio import PCMTrack, decode_audio, pcm_to_array, samples_duration
+from tts_cache import get_tts_cache, tts_cache_key
+from tts_scheduler import TTSScheduler
+from fact_check_engine import FactCheckEngine, FactChecker
+from gemini_key_pool import GeminiKeyManager
+from run_checkpoint import RunCheckpoint
 
 # ===== 設定 =====
 TEST_MODE = os.environ.get("TEST_MODE", "false").lower() == "true"
@@ -40,6 +49,8 @@ VIDEO_HEIGHT = 1080
 TTS_MODEL = "gemini-2.5-flash-preview-tts"
 VOICE_KATSUMI = "Kore"  # 女性
 VOICE_HIROSHI = "Puck"  # 男性
+TTS_RPM_PER_KEY = int(os.environ.get("TTS_RPM_PER_KEY", "3"))  # 1キーあたりのRPM
+TTS_MAX_WORKERS = int(os.environ.get("TTS_MAX_WORKERS", "8"))  # 同時合成数
 
 # Google Drive背景画像ID
 BACKGROUND_IMAGE_ID = "1DyjuCeNZRVPgZiiqfw7ik3TZ-2loq-ah"
@@ -268,51 +279,6 @@ DUMMY_SCRIPT = {
 }
 
 
-class GeminiKeyManager:
-    """Gemini APIキー管理"""
-    def __init__(self):
-        self.keys = []
-        self.key_names = []
-        self.current_index = 0
-        self._load_keys()
-
-    def _load_keys(self):
-        """環境変数からAPIキーを読み込み"""
-        # メインキー
-        main_key = os.environ.get("GEMINI_API_KEY")
-        if main_key:
-            self.keys.append(main_key)
-            self.key_names.append("MAIN")
-
-        # 番号付きキー（1-42）
-        for i in range(1, 43):
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-                self.key_names.append(f"KEY_{i}")
-
-        if not self.keys:
-            print("  ⚠ Gemini APIキーが見つかりません")
-
-        print(f"  [APIキー] {len(self.keys)}個のキーを読み込みました")
-
-    def get_key(self) -> str:
-        """現在のAPIキーを取得"""
-        if not self.keys:
-            return ""
-        return self.keys[self.current_index]
-
-    def next_key(self):
-        """次のAPIキーに切り替え"""
-        if len(self.keys) > 1:
-            self.current_index = (self.current_index + 1) % len(self.keys)
-            print(f"  [APIキー] {self.key_names[self.current_index]}に切り替え")
-
-    def get_all_keys(self) -> list:
-        """全APIキーを取得（TTS並列処理用）"""
-        return list(zip(self.keys, self.key_names))
-
-
 def select_random_theme() -> dict:
     """ランダムにテーマを選択"""
     theme = random.choice(RANKING_THEMES)
@@ -530,18 +496,21 @@ def generate_script(theme: dict, key_manager: GeminiKeyManager) -> dict:
 """
 
     max_retries = 3
+    failed_keys = set()  # 失敗したキーは次の試行で避ける
     for attempt in range(max_retries):
+        api_key = None
         try:
-            client = genai.Client(api_key=key_manager.get_key())
-
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.8,
-                    response_mime_type="application/json"
+            with key_manager.lease(exclude=failed_keys) as lease:
+                api_key = lease.api_key
+                client = genai.Client(api_key=api_key)
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=0.8,
+                        response_mime_type="application/json"
+                    )
                 )
-            )
 
             result_text = response.text.strip()
             if "```json" in result_text:
@@ -560,7 +529,8 @@ def generate_script(theme: dict, key_manager: GeminiKeyManager) -> dict:
 
         except Exception as e:
             print(f"  ⚠ 試行{attempt + 1}/{max_retries} 失敗: {str(e)[:50]}...")
-            key_manager.next_key()
+            if api_key:
+                failed_keys.add(api_key)
             time.sleep(3)
 
     print("  ❌ 台本生成失敗、ダミー台本を使用")
@@ -637,102 +607,84 @@ def generate_chapters(script: dict, timings: list) -> str:
     return "\n".join(chapters)
 
 
-def _process_tts_line_parallel(args: tuple) -> dict:
-    """TTS処理用の1セリフ処理関数（順次処理用）"""
-    line, api_key, key_name, line_index, temp_dir, total_lines = args
+def _gemini_tts_pcm(text: str, voice: str, api_key: str) -> bytes:
+    """Gemini TTSでPCM（24kHz/16bit/mono）を取得（同じテキスト・ボイスは前回の結果を再利用）"""
+    def synthesize():
+        client = genai.Client(api_key=api_key)
+        response = client.models.generate_content(
+            model=TTS_MODEL,
+            contents=text,
+            config=types.GenerateContentConfig(
+                response_modalities=["AUDIO"],
+                speech_config=types.SpeechConfig(
+                    voice_config=types.VoiceConfig(
+                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                            voice_name=voice
+                        )
+                    )
+                )
+            )
+        )
+        return response.candidates[0].content.parts[0].inline_data.data
 
+    cache_key = tts_cache_key("gemini", voice, text, model=TTS_MODEL, output="pcm-24000-mono")
+    return get_tts_cache().fetch(cache_key, synthesize)
+
+
+def _synthesize_tts_line(line_index: int, line: dict, api_key: str, key_name: str) -> dict:
+    """Gemini TTSで1セリフを合成（失敗時は例外。リトライ・キー割り当てはスケジューラー側）"""
     speaker = line["speaker"]
     text = line["text"]
     voice = VOICE_HIROSHI if speaker == "ヒロシ" else VOICE_KATSUMI
 
-    # Note: 遅延は呼び出し元で制御（順次処理のため関数内では遅延なし）
+    # PCMのままメモリに保持（WAVへの書き出しは結合後の1回だけ）
+    samples = pcm_to_array(_gemini_tts_pcm(text, voice, api_key))
 
-    audio_path = str(temp_dir / f"line_{line_index:04d}.wav")
-    max_retries = 2  # 早めにgTTSフォールバック（90秒→10秒に短縮）
-
-    for attempt in range(max_retries):
-        try:
-            client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model=TTS_MODEL,
-                contents=text,
-                config=types.GenerateContentConfig(
-                    response_modalities=["AUDIO"],
-                    speech_config=types.SpeechConfig(
-                        voice_config=types.VoiceConfig(
-                            prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                voice_name=voice
-                            )
-                        )
-                    )
-                )
-            )
-
-            # 音声データを取得
-            audio_data = response.candidates[0].content.parts[0].inline_data.data
-            audio_segment = AudioSegment(
-                data=audio_data,
-                sample_width=2,
-                frame_rate=24000,
-                channels=1
-            )
+    return {
+        "index": line_index,
+        "success": True,
+        "samples": samples,
+        "duration": samples_duration(samples),
+        "speaker": speaker,
+        "text": text
+    }
 
-            # ファイルに保存
-            audio_segment.export(audio_path, format="wav")
-            duration = len(audio_segment) / 1000.0
-
-            return {
-                "index": line_index,
-                "success": True,
-                "path": audio_path,
-                "duration": duration,
-                "speaker": speaker,
-                "text": text
-            }
 
-        except Exception as e:
-            if attempt < max_retries - 1:
-                wait_time = 10 * (attempt + 1)  # 短縮待機（10秒）→すぐgTTSへ
-                print(f"    [リトライ] {key_name} セリフ{line_index+1}: {wait_time}秒待機...")
-                time.sleep(wait_time)
-            else:
-                # gTTSフォールバック
-                try:
-                    gtts_path = str(temp_dir / f"gtts_{line_index:04d}.mp3")
-                    tts = gTTS(text=text, lang='ja')
-                    tts.save(gtts_path)
-                    # mp3をwavに変換
-                    gtts_audio = AudioSegment.from_mp3(gtts_path)
-                    gtts_audio.export(audio_path, format="wav")
-                    duration = len(gtts_audio) / 1000.0
-                    return {
-                        "index": line_index,
-                        "success": True,  # gTTS成功
-                        "path": audio_path,
-                        "duration": duration,
-                        "speaker": speaker,
-                        "text": text,
-                        "fallback": "gtts"
-                    }
-                except Exception as gtts_e:
-                    # gTTSも失敗なら無音で代替
-                    silence = AudioSegment.silent(duration=1000)
-                    silence.export(audio_path, format="wav")
-                    return {
-                        "index": line_index,
-                        "success": False,
-                        "path": audio_path,
-                        "duration": 1.0,
-                        "speaker": speaker,
-                        "text": text,
-                        "error": f"Gemini:{str(e)[:30]}, gTTS:{str(gtts_e)[:20]}"
-                    }
+def _fallback_tts_line(line_index: int, line: dict, temp_dir: Path, error: Exception) -> dict:
+    """Gemini TTSがリトライ上限に達したセリフをgTTS（失敗時は無音）で代替"""
+    speaker = line["speaker"]
+    text = line["text"]
 
-    return {"index": line_index, "success": False, "path": None, "duration": 0}
+    try:
+        gtts_path = str(temp_dir / f"gtts_{line_index:04d}.mp3")
+        tts = gTTS(text=text, lang='ja')
+        tts.save(gtts_path)
+        # mp3を24kHz/monoのPCMにデコード
+        samples = decode_audio(gtts_path)
+        return {
+            "index": line_index,
+            "success": True,  # gTTS成功
+            "samples": samples,
+            "duration": samples_duration(samples),
+            "speaker": speaker,
+            "text": text,
+            "fallback": "gtts"
+        }
+    except Exception as gtts_e:
+        # gTTSも失敗なら無音（1秒）で代替
+        return {
+            "index": line_index,
+            "success": False,
+            "samples": pcm_to_array(b"\x00\x00" * 24000),
+            "duration": 1.0,
+            "speaker": speaker,
+            "text": text,
+            "error": f"Gemini:{str(error)[:30]}, gTTS:{str(gtts_e)[:20]}"
+        }
 
 
 def generate_tts_audio(dialogue: list, output_path: str, key_manager: GeminiKeyManager) -> tuple:
-    """TTS音声を並列生成（29キー対応）"""
+    """TTS音声を並列生成（29キー対応、キーごとにレート制限）"""
     print("\n[3/7] TTS音声を生成中...")
 
     if SKIP_API:
@@ -758,99 +710,84 @@ def generate_tts_audio(dialogue: list, output_path: str, key_manager: GeminiKeyM
         print(f"  ✓ ダミー音声 {duration}秒、{len(timings)}件のタイミング生成")
         return duration, timings
 
-    all_keys = key_manager.get_all_keys()
+    all_keys = key_manager.get_named_keys()
     if not all_keys:
         raise RuntimeError("APIキーがありません")
 
     total_lines = len(dialogue)
-    print(f"  合計 {total_lines} セリフを{len(all_keys)}個のAPIキーで順次生成")
+    print(f"  合計 {total_lines} セリフを{len(all_keys)}個のAPIキーで並列生成")
 
     # 一時ディレクトリを作成
-    temp_dir = Path(tempfile.mkdtemp(prefix="tts_sequential_"))
-
-    # 順次処理で各セリフを処理（429エラー対策）
-    results = [None] * total_lines
-    success_count = 0
-    fail_count = 0
-
-    # セリフ間の遅延（秒）- レート制限回避用
-    DELAY_BETWEEN_LINES = 3.0
-
-    print(f"  [順次処理] {len(all_keys)}キー使用、{DELAY_BETWEEN_LINES}秒間隔")
+    temp_dir = Path(tempfile.mkdtemp(prefix="tts_parallel_"))
+
+    # TTS専用のキープールでキーごとのレート制限を守りつつ並列処理
+    # （TTSのクォータはテキスト生成と別枠なので key_manager のプールとは分ける。
+    #   429を返したキーだけクールダウン、結果は台本順）
+    scheduler = TTSScheduler(
+        all_keys,
+        requests_per_minute=TTS_RPM_PER_KEY,
+        max_workers=TTS_MAX_WORKERS,
+    )
+    print(f"  [並列処理] {len(all_keys)}キー使用、{TTS_MAX_WORKERS}並列、1キー{TTS_RPM_PER_KEY}RPM")
 
-    for i, line in enumerate(dialogue):
-        # APIキーをローテーション
-        api_key, key_name = all_keys[i % len(all_keys)]
-        task = (line, api_key, key_name, i, temp_dir, total_lines)
+    counts = {"success": 0, "fail": 0}
+    done = [0]
+    progress_lock = threading.Lock()
 
-        try:
-            result = _process_tts_line_parallel(task)
-            results[result["index"]] = result
+    def report(i, result):
+        with progress_lock:
+            done[0] += 1
             if result["success"]:
-                success_count += 1
+                counts["success"] += 1
                 fallback_info = " (gTTS)" if result.get("fallback") == "gtts" else ""
-                print(f"  ✓ [{i+1}/{total_lines}] {result['speaker']}: {len(result.get('text', '')[:20])}文字{fallback_info}")
+                print(f"  ✓ [{done[0]}/{total_lines}] セリフ{i+1} {result['speaker']}: {len(result.get('text', '')[:20])}文字{fallback_info}")
             else:
-                fail_count += 1
+                counts["fail"] += 1
                 if "error" in result:
                     # エラー詳細を短く表示
                     error_short = result['error'][:60] if len(result['error']) > 60 else result['error']
-                    print(f"  ✗ [{i+1}/{total_lines}] {result['speaker']}: {error_short}")
-        except Exception as e:
-            fail_count += 1
-            print(f"  ✗ 例外 [{i+1}]: {str(e)[:50]}")
-            results[i] = {"success": False, "index": i, "speaker": line["speaker"], "text": line["text"]}
+                    print(f"  ✗ [{done[0]}/{total_lines}] セリフ{i+1} {result['speaker']}: {error_short}")
 
-        # 次のリクエストまで待機（最後以外）
-        if i < total_lines - 1:
-            time.sleep(DELAY_BETWEEN_LINES)
+    results = scheduler.map(
+        _synthesize_tts_line,
+        dialogue,
+        fallback=lambda i, line, error: _fallback_tts_line(i, line, temp_dir, error),
+        on_result=report,
+    )
 
-    print(f"  [順次処理完了] {success_count}/{total_lines} 成功")
+    print(f"  [並列処理完了] {counts['success']}/{total_lines} 成功")
 
-    # 音声を順番に結合してタイミングを計算
-    combined = AudioSegment.empty()
+    # 音声を順番に結合してタイミングを計算（メモリ上で追記、長さはサンプル数から）
+    pause_seconds = 0.3  # セリフ間の間隔
+    expected = sum(r["samples"].shape[0] for r in results if r and r.get("samples") is not None)
+    track = PCMTrack(expected_seconds=expected / 24000 + pause_seconds * total_lines + 1.0)
     timings = []
-    current_time = 0.0
 
     for i, result in enumerate(results):
-        if result and result["path"] and os.path.exists(result["path"]):
-            try:
-                audio_segment = AudioSegment.from_file(result["path"])
-                duration = len(audio_segment) / 1000.0
-
-                timings.append({
-                    "speaker": result["speaker"],
-                    "text": result["text"],
-                    "start": current_time,
-                    "end": current_time + duration
-                })
-
-                combined += audio_segment
-                current_time += duration
-
-                # 間隔を追加（0.3秒）
-                pause = AudioSegment.silent(duration=300)
-                combined += pause
-                current_time += 0.3
-
-            except Exception as e:
-                print(f"  ⚠ 音声結合エラー [{i+1}]: {e}")
+        if result and result.get("samples") is not None:
+            start, end = track.append(result["samples"])
+            timings.append({
+                "speaker": result["speaker"],
+                "text": result["text"],
+                "start": start,
+                "end": end
+            })
+            # 間隔を追加（0.3秒）
+            track.append_silence(pause_seconds)
         else:
             # 失敗したセリフは無音1秒で代替
-            silence = AudioSegment.silent(duration=1000)
-            combined += silence
+            start, end = track.append_silence(1.0)
             if i < len(dialogue):
                 timings.append({
                     "speaker": dialogue[i]["speaker"],
                     "text": dialogue[i]["text"],
-                    "start": current_time,
-                    "end": current_time + 1.0
+                    "start": start,
+                    "end": end
                 })
-            current_time += 1.0
 
-    # 出力
-    combined.export(output_path, format="wav")
-    total_duration = len(combined) / 1000.0
+    # 出力（WAV書き出しはここで1回だけ）
+    track.write_wav(output_path)
+    total_duration = track.duration
     print(f"  ✓ TTS生成完了: {total_duration:.1f}秒")
 
     # 一時ファイルを削除
@@ -1130,11 +1067,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 def download_background_image(file_id: str, output_path: str) -> bool:
     """Google Driveから背景画像をダウンロード"""
     try:
-        import gdown
-        url = f"https://drive.google.com/uc?id={file_id}"
-        gdown.download(url, output_path, quiet=True)
-
-        if os.path.exists(output_path):
+        if get_drive_cache().fetch(file_id, output_path, label="背景画像"):
             # リサイズ
             from PIL import Image
             img = Image.open(output_path)
@@ -1148,14 +1081,7 @@ def download_background_image(file_id: str, output_path: str) -> bool:
 
 def download_bgm(file_id: str, output_path: str) -> bool:
     """Google DriveからBGMをダウンロード"""
-    try:
-        import gdown
-        url = f"https://drive.google.com/uc?id={file_id}"
-        gdown.download(url, output_path, quiet=True)
-        return os.path.exists(output_path)
-    except Exception as e:
-        print(f"  ⚠ BGMダウンロード失敗: {e}")
-    return False
+    return get_drive_cache().fetch(file_id, output_path, label="BGM") is not None
 
 
 def generate_summary_table_image(script: dict, output_path: str):
@@ -1200,19 +1126,19 @@ def generate_summary_table_image(script: dict, output_path: str):
         font_path = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
         if not os.path.exists(font_path):
             font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-        title_font = ImageFont.truetype(font_path, 72)
-        rank_font = ImageFont.truetype(font_path, 100)
-        item_font = ImageFont.truetype(font_path, 60)
-        pos_font = ImageFont.truetype(font_path, 48)
-        percent_fonts = {r: ImageFont.truetype(font_path, s) for r, s in percent_sizes.items()}
+        title_font = load_font(font_path, 72)
+        rank_font = load_font(font_path, 100)
+        item_font = load_font(font_path, 60)
+        pos_font = load_font(font_path, 48)
+        percent_fonts = {r: load_font(font_path, s) for r, s in percent_sizes.items()}
     except:
         try:
             font_path = "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc"
-            title_font = ImageFont.truetype(font_path, 72)
-            rank_font = ImageFont.truetype(font_path, 100)
-            item_font = ImageFont.truetype(font_path, 60)
-            pos_font = ImageFont.truetype(font_path, 48)
-            percent_fonts = {r: ImageFont.truetype(font_path, s) for r, s in percent_sizes.items()}
+            title_font = load_font(font_path, 72)
+            rank_font = load_font(font_path, 100)
+            item_font = load_font(font_path, 60)
+            pos_font = load_font(font_path, 48)
+            percent_fonts = {r: load_font(font_path, s) for r, s in percent_sizes.items()}
         except:
             title_font = ImageFont.load_default()
             rank_font = ImageFont.load_default()
@@ -1406,7 +1332,7 @@ def generate_summary_table_image(script: dict, output_path: str):
         # 誘導文（QRコードの右横）
         draw = ImageDraw.Draw(img)
         try:
-            guide_font = ImageFont.truetype(font_path, 28)
+            guide_font = load_font(font_path, 28)
         except:
             guide_font = ImageFont.load_default()
 
@@ -1446,26 +1372,11 @@ def generate_summary_segment(script: dict, output_path: str, key_manager, bgm_pa
 
         # Gemini TTSを試す
         tts_success = False
-        api_key = key_manager.get_key()
 
-        if api_key and not SKIP_API:
+        if len(key_manager) and not SKIP_API:
             try:
-                client = genai.Client(api_key=api_key)
-                response = client.models.generate_content(
-                    model=TTS_MODEL,
-                    contents=summary_text,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=types.SpeechConfig(
-                            voice_config=types.VoiceConfig(
-                                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                    voice_name=VOICE_KATSUMI
-                                )
-                            )
-                        )
-                    )
-                )
-                audio_data = response.candidates[0].content.parts[0].inline_data.data
+                with key_manager.lease() as lease:
+                    audio_data = _gemini_tts_pcm(summary_text, VOICE_KATSUMI, lease.api_key)
                 audio_segment = AudioSegment(
                     data=audio_data,
                     sample_width=2,
@@ -1851,8 +1762,7 @@ def generate_community_post_ranking(title: str, key_manager: GeminiKeyManager) -
         print("  [SKIP_API] スキップ")
         return None
 
-    api_key = key_manager.get_key()
-    if not api_key:
+    if not len(key_manager):
         print("  ⚠ APIキーがないためスキップ")
         return None
 
@@ -1879,12 +1789,13 @@ def generate_community_post_ranking(title: str, key_manager: GeminiKeyManager) -
 3. ▲▲▲"""
 
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(temperature=0.7)
-        )
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt,
+                config=types.GenerateContentConfig(temperature=0.7)
+            )
         text = response.text.strip()
 
         # パース
@@ -1949,9 +1860,9 @@ def create_community_image(question: str, output_path: str) -> str:
         font_path = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
         if not os.path.exists(font_path):
             font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-        title_font = ImageFont.truetype(font_path, 42)
-        main_font = ImageFont.truetype(font_path, 56)
-        sub_font = ImageFont.truetype(font_path, 32)
+        title_font = load_font(font_path, 42)
+        main_font = load_font(font_path, 56)
+        sub_font = load_font(font_path, 32)
     except:
         title_font = ImageFont.load_default()
         main_font = ImageFont.load_default()
@@ -2157,16 +2068,17 @@ def gemini_fact_check_ranking(script: dict, key_manager) -> dict:
 誤りがなければ空配列を返してください。"""
 
     try:
-        client = genai.Client(api_key=key_manager.get_key())
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.1,
-                response_mime_type="application/json",
-                tools=[types.Tool(google_search=types.GoogleSearch())]
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=0.1,
+                    response_mime_type="application/json",
+                    tools=[types.Tool(google_search=types.GoogleSearch())]
+                )
             )
-        )
 
         result_text = response.text.strip()
         if "```json" in result_text:
@@ -2222,16 +2134,17 @@ def web_search_fact_check_ranking(script: dict, key_manager) -> dict:
 }}"""
 
     try:
-        client = genai.Client(api_key=key_manager.get_key())
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.1,
-                response_mime_type="application/json",
-                tools=[types.Tool(google_search=types.GoogleSearch())]
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=0.1,
+                    response_mime_type="application/json",
+                    tools=[types.Tool(google_search=types.GoogleSearch())]
+                )
             )
-        )
 
         result_text = response.text.strip()
         if "```json" in result_text:
@@ -2353,15 +2266,16 @@ def fix_script_errors_ranking(script: dict, errors: list, key_manager) -> dict:
 - 修正後の完全な台本をJSONで出力"""
 
     try:
-        client = genai.Client(api_key=key_manager.get_key())
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.3,
-                response_mime_type="application/json"
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=0.3,
+                    response_mime_type="application/json"
+                )
             )
-        )
 
         result_text = response.text.strip()
         if "```json" in result_text:
@@ -2386,19 +2300,20 @@ def triple_fact_check_ranking(script: dict, key_manager) -> dict:
         print("  [SKIP_API] ファクトチェックをスキップ")
         return script
 
-    all_errors = []
-
-    # 1. Gemini ファクトチェック
-    gemini_result = gemini_fact_check_ranking(script, key_manager)
-    all_errors.extend(gemini_result.get("errors", []))
-
-    # 2. Web検索 ファクトチェック
-    web_result = web_search_fact_check_ranking(script, key_manager)
-    all_errors.extend(web_result.get("errors", []))
+    # 3チェックは互いに独立なので並列で投げる（遅いチェッカーはタイムアウトでスキップ）
+    engine = FactCheckEngine([
+        FactChecker("Gemini", lambda s: gemini_fact_check_ranking(s, key_manager)),
+        FactChecker("Web検索", lambda s: web_search_fact_check_ranking(s, key_manager)),
+        FactChecker("Claude", claude_fact_check_ranking),
+    ], verbose=False)
+    try:
+        results = engine.run(script)
+    finally:
+        engine.close()
 
-    # 3. Claude ファクトチェック
-    claude_result = claude_fact_check_ranking(script)
-    all_errors.extend(claude_result.get("errors", []))
+    all_errors = []
+    for result in results.values():
+        all_errors.extend(result.get("errors", []))
 
     # 重複を除去（originalが同じものを除外）
     seen = set()
@@ -2425,8 +2340,15 @@ def triple_fact_check_ranking(script: dict, key_manager) -> dict:
     return script
 
 
-def main():
+def main(argv=None):
     """メイン処理"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="年金ランキング動画生成")
+    parser.add_argument("--resume", metavar="RUN_ID", default=None,
+                        help="止まった実行を完了済みステージから再開（latest で最新の実行）")
+    args = parser.parse_args(argv)
+
     print("=" * 50)
     print("年金ランキング動画生成システム")
     print("=" * 50)
@@ -2439,36 +2361,49 @@ def main():
     start_time = time.time()
     title = ""
 
+    # 各ステージの結果を保存（投稿で落ちても --resume で続きから再実行できる）
+    checkpoint = RunCheckpoint("nenkin_ranking", run_id=args.resume)
+
+    # 背景画像・BGMは台本・音声を作っている間に取得しておく
+    get_drive_cache().prefetch([BACKGROUND_IMAGE_ID, BGM_FILE_ID])
+
     try:
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_path = Path(temp_dir)
 
             # STEP1: テーマ選択
             print("\n[1/7] テーマを選択中...")
-            theme = select_random_theme()
+            theme = checkpoint.stage("theme", select_random_theme)
 
             # STEP2: 台本生成
             key_manager = GeminiKeyManager()
-            script = generate_script(theme, key_manager)
+            script = checkpoint.stage("script", lambda: generate_script(theme, key_manager), inputs=theme)
             first_comment = script.get("first_comment", "")
             title = script.get("title", "")
 
             # STEP2.3: 3重ファクトチェック
             print("\n[2.3/7] 3重ファクトチェック実行中...")
-            script = triple_fact_check_ranking(script, key_manager)
+            script = checkpoint.stage("fact_check", lambda: triple_fact_check_ranking(script, key_manager),
+                                      inputs=script)
 
             # STEP2.5: 台本をSlackに送信
             if not TEST_MODE:
-                send_slack_script_notification(script, scheduled_time="12:00")
+                checkpoint.stage("slack_script",
+                                 lambda: send_slack_script_notification(script, scheduled_time="12:00") or True,
+                                 inputs=script)
 
             # STEP3: セリフ抽出 & TTS生成
             dialogue = extract_all_dialogue(script)
             audio_path = str(temp_path / "audio.wav")
-            duration, timings = generate_tts_audio(dialogue, audio_path, key_manager)
+            duration, timings = checkpoint.stage(
+                "tts", lambda: generate_tts_audio(dialogue, audio_path, key_manager),
+                inputs=dialogue, files={"audio": audio_path})
 
             # STEP4: 字幕生成（新レイアウト対応）
             subtitle_path = str(temp_path / "subtitles.ass")
-            generate_subtitles(dialogue, duration, subtitle_path, timings, script)
+            checkpoint.stage("subtitles",
+                             lambda: generate_subtitles(dialogue, duration, subtitle_path, timings, script) or True,
+                             inputs={"script": script, "timings": timings}, files={"subtitles": subtitle_path})
 
             # STEP5: 背景画像ダウンロード
             bg_path = str(temp_path / "background.png")
@@ -2489,27 +2424,34 @@ def main():
                 bgm_path = None
                 print("  ⚠ BGMダウンロード失敗、BGMなしで続行")
 
-            # STEP6: 動画生成
-            main_video_path = str(temp_path / "main_ranking.mp4")
-            generate_video(audio_path, subtitle_path, bg_path, main_video_path, duration, bgm_path)
-
-            # STEP6.5: まとめセグメント生成と結合
             video_path = str(temp_path / "ranking.mp4")
-            summary_video_path = str(temp_path / "summary_segment.mp4")
-            summary_duration = generate_summary_segment(script, summary_video_path, key_manager, bgm_path)
 
-            if summary_duration > 0:
-                # メイン動画とまとめを結合
-                if concatenate_videos(main_video_path, summary_video_path, video_path):
-                    duration += summary_duration
+            def render_video():
+                video_duration = duration
+                # STEP6: 動画生成
+                main_video_path = str(temp_path / "main_ranking.mp4")
+                generate_video(audio_path, subtitle_path, bg_path, main_video_path, duration, bgm_path)
+
+                # STEP6.5: まとめセグメント生成と結合
+                summary_video_path = str(temp_path / "summary_segment.mp4")
+                summary_duration = generate_summary_segment(script, summary_video_path, key_manager, bgm_path)
+
+                if summary_duration > 0:
+                    # メイン動画とまとめを結合
+                    if concatenate_videos(main_video_path, summary_video_path, video_path):
+                        video_duration += summary_duration
+                    else:
+                        # 結合失敗時はメイン動画をそのまま使用
+                        import shutil
+                        shutil.copy(main_video_path, video_path)
                 else:
-                    # 結合失敗時はメイン動画をそのまま使用
+                    # まとめセグメント生成失敗時はメイン動画をそのまま使用
                     import shutil
                     shutil.copy(main_video_path, video_path)
-            else:
-                # まとめセグメント生成失敗時はメイン動画をそのまま使用
-                import shutil
-                shutil.copy(main_video_path, video_path)
+                return video_duration
+
+            duration = checkpoint.stage("video", render_video, inputs={"script": script, "duration": duration},
+                                        files={"video": video_path})
 
             # チャプター生成
             chapters = generate_chapters(script, timings)
@@ -2571,7 +2513,15 @@ https://konkon034034.github.io/nenkin-shindan/
                 video_url = f"file://{output_video}"
                 print("  ✓ Artifactsから動画をダウンロードして確認してください")
             else:
-                video_url = upload_to_youtube(video_path, title, description, first_comment)
+                # 投稿済みなら再開時に二重投稿しない
+                video_url = checkpoint.stage(
+                    "upload", lambda: upload_to_youtube(video_path, title, description, first_comment) or None,
+                    inputs={"title": title, "description": description}) or ""
+                if not video_url:
+                    # ジョブを失敗させる（失敗時だけ実行チェックポイントが保存され、Re-run で投稿から再開できる）
+                    print(f"\n❌ エラー: YouTubeアップロードに失敗しました（再開: --resume {checkpoint.run_id}）")
+                    send_discord_error_notification("YouTubeアップロード失敗", title)
+                    sys.exit(1)
 
             # 完了
             elapsed = time.time() - start_time
@@ -2596,6 +2546,9 @@ https://konkon034034.github.io/nenkin-shindan/
                 theme_name = script.get("title", "") if script else title
                 send_first_comment_to_slack_ranking(title, theme_name)
 
+            # 成功したので再開用の保存は不要
+            checkpoint.discard()
+
     except Exception as e:
         print(f"\n❌ エラー: {e}")
         if not TEST_MODE:
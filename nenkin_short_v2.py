@@ -14,7 +14,6 @@ import time
 import tempfile
 import requests
 import subprocess
-import io
 import random
 from datetime import datetime
 from pathlib import Path
@@ -24,6 +23,11 @@ from google import genai
 from google.genai import types
 from pydub import AudioSegment
 from PIL import Image, ImageDraw, ImageFont
+from asset_cache import load_font
+from fact_check_engine import FactChecker, run_fact_check_rounds
+from gemini_key_pool import GeminiKeyManager, is_rate_limit_error
+from pcm_audio import PCMTrack
+from tts_cache import get_tts_cache, tts_cache_key
 import qrcode
 import anthropic
 from googleapiclient.discovery import build
@@ -413,48 +417,6 @@ DUMMY_SCRIPT = {
 }
 
 
-class GeminiKeyManager:
-    """Gemini APIキー管理"""
-    def __init__(self):
-        self.keys = []
-        self.key_names = []
-
-        base_key = os.environ.get("GEMINI_API_KEY")
-        if base_key:
-            self.keys.append(base_key)
-            self.key_names.append("GEMINI_API_KEY")
-
-        for i in range(1, 43):
-            key = os.environ.get(f"GEMINI_API_KEY_{i}")
-            if key:
-                self.keys.append(key)
-                self.key_names.append(f"GEMINI_API_KEY_{i}")
-
-        self.current_index = 0
-        print(f"  利用可能なAPIキー: {len(self.keys)}個")
-
-    def get_key(self):
-        if not self.keys:
-            raise ValueError("APIキーがありません")
-        return self.keys[self.current_index]
-
-    def get_key_name(self):
-        return self.key_names[self.current_index]
-
-    def next_key(self):
-        self.current_index = (self.current_index + 1) % len(self.keys)
-        return self.get_key()
-
-    def get_key_for_index(self, index):
-        """指定インデックス用のキーを取得（ラウンドロビン）"""
-        idx = index % len(self.keys)
-        return self.keys[idx], self.key_names[idx]
-
-    def get_working_key(self):
-        """動作中のキーを取得（get_keyのエイリアス）"""
-        return self.get_key()
-
-
 def download_from_drive(file_id: str, output_path: str) -> bool:
     """Google Driveからファイルをダウンロード（gdown使用）"""
     try:
@@ -560,24 +522,20 @@ def generate_table_data(theme: dict, key_manager: GeminiKeyManager) -> dict:
     failed_keys = set()  # 失敗したキーを記録
 
     for attempt in range(max_retries):
+        api_key = None
         try:
-            # 失敗したキーを避けて次のキーを選択
-            for _ in range(len(key_manager.keys)):
-                current_key = key_manager.get_key()
-                if current_key not in failed_keys:
-                    break
-                key_manager.next_key()
-
-            client = genai.Client(api_key=key_manager.get_key())
-
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.7,
-                    response_mime_type="application/json"
+            # 失敗したキーを避けて借りる（レート上限のキーは空くまで待つ）
+            with key_manager.lease(exclude=failed_keys) as lease:
+                api_key = lease.api_key
+                client = genai.Client(api_key=api_key)
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=0.7,
+                        response_mime_type="application/json"
+                    )
                 )
-            )
 
             result_text = response.text.strip()
             # JSON抽出
@@ -593,17 +551,16 @@ def generate_table_data(theme: dict, key_manager: GeminiKeyManager) -> dict:
 
         except Exception as e:
             error_str = str(e)
-            failed_keys.add(key_manager.get_key())  # 失敗したキーを記録
+            if api_key:
+                failed_keys.add(api_key)  # 失敗したキーを記録
             print(f"  ⚠ 試行{attempt + 1}/{max_retries} 失敗: {error_str[:50]}...")
 
-            # 429エラーの場合は長めに待機
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+            # 429エラーの場合は長めに待機（キーのクールダウンは lease が記録済み）
+            if is_rate_limit_error(e):
                 wait_time = 60  # 429エラーは60秒待機
             else:
                 wait_time = 30  # その他のエラーは30秒待機
 
-            key_manager.next_key()
-
             if attempt < max_retries - 1:
                 print(f"    {wait_time}秒待機後にリトライ...")
                 time.sleep(wait_time)
@@ -638,11 +595,11 @@ def generate_table_image(table_data: dict, output_path: str):
         if not os.path.exists(font_path):
             font_path = "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc"
 
-        title_font = ImageFont.truetype(font_path, 70)
-        subtitle_font = ImageFont.truetype(font_path, 50)
-        header_font = ImageFont.truetype(font_path, 36)
-        cell_font = ImageFont.truetype(font_path, 32)
-        footer_font = ImageFont.truetype(font_path, 24)
+        title_font = load_font(font_path, 70)
+        subtitle_font = load_font(font_path, 50)
+        header_font = load_font(font_path, 36)
+        cell_font = load_font(font_path, 32)
+        footer_font = load_font(font_path, 24)
     except:
         title_font = ImageFont.load_default()
         subtitle_font = title_font
@@ -911,24 +868,20 @@ def generate_script(table_data: dict, key_manager: GeminiKeyManager, theme: dict
     failed_keys = set()  # 失敗したキーを記録
 
     for attempt in range(max_retries):
+        api_key = None
         try:
-            # 失敗したキーを避けて次のキーを選択
-            for _ in range(len(key_manager.keys)):
-                current_key = key_manager.get_key()
-                if current_key not in failed_keys:
-                    break
-                key_manager.next_key()
-
-            client = genai.Client(api_key=key_manager.get_key())
-
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.8,
-                    response_mime_type="application/json"
+            # 失敗したキーを避けて借りる（レート上限のキーは空くまで待つ）
+            with key_manager.lease(exclude=failed_keys) as lease:
+                api_key = lease.api_key
+                client = genai.Client(api_key=api_key)
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=prompt,
+                    config=types.GenerateContentConfig(
+                        temperature=0.8,
+                        response_mime_type="application/json"
+                    )
                 )
-            )
 
             result_text = response.text.strip()
             if "```json" in result_text:
@@ -954,17 +907,16 @@ def generate_script(table_data: dict, key_manager: GeminiKeyManager, theme: dict
 
         except Exception as e:
             error_str = str(e)
-            failed_keys.add(key_manager.get_key())  # 失敗したキーを記録
+            if api_key:
+                failed_keys.add(api_key)  # 失敗したキーを記録
             print(f"  ⚠ 試行{attempt + 1}/{max_retries} 失敗: {error_str[:50]}...")
 
-            # 429エラーの場合は長めに待機
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+            # 429エラーの場合は長めに待機（キーのクールダウンは lease が記録済み）
+            if is_rate_limit_error(e):
                 wait_time = 60
             else:
                 wait_time = 30
 
-            key_manager.next_key()
-
             if attempt < max_retries - 1:
                 print(f"    {wait_time}秒待機後にリトライ...")
                 time.sleep(wait_time)
@@ -981,6 +933,13 @@ def _generate_single_tts(args: tuple) -> dict:
     text = apply_reading_dict(line["text"])  # 読み方辞書を適用
     voice = VOICE_HIROSHI if speaker == "ヒロシ" else VOICE_KATSUMI
 
+    # 同じテキスト・ボイスの音声は前回の実行結果を再利用
+    tts_cache = get_tts_cache()
+    cache_key = tts_cache_key("gemini", voice, text, model=TTS_MODEL, output="pcm-24000-mono")
+    audio_data = tts_cache.get(cache_key)
+    if audio_data is not None:
+        return {"index": index, "success": True, "audio_data": audio_data, "speaker": speaker, "key_name": "CACHE"}
+
     max_retries = 3
     for attempt in range(max_retries):
         try:
@@ -1000,6 +959,7 @@ def _generate_single_tts(args: tuple) -> dict:
                 )
             )
             audio_data = response.candidates[0].content.parts[0].inline_data.data
+            tts_cache.put(cache_key, audio_data)
             return {"index": index, "success": True, "audio_data": audio_data, "speaker": speaker, "key_name": key_name}
         except Exception as e:
             if attempt < max_retries - 1:
@@ -1055,29 +1015,23 @@ def generate_tts_audio(script: list, output_path: str, key_manager: GeminiKeyMan
                     results[idx] = retry_result
                     break
 
-    # 結合
-    combined = AudioSegment.empty()
-    timings = []
-    current_time = 0.0
-    gap_duration = 200
-
+    # 結合（メモリ上で追記、長さはサンプル数から）
     for result in results:
         if not result["success"]:
             raise RuntimeError(f"TTS生成失敗: {script[result['index']]}")
 
-        audio_segment = AudioSegment.from_raw(
-            io.BytesIO(result["audio_data"]),
-            sample_width=2, frame_rate=24000, channels=1
-        )
-        segment_duration = len(audio_segment) / 1000.0
-        timings.append({"start": current_time, "end": current_time + segment_duration})
-        current_time += segment_duration
-        combined += audio_segment
-        combined += AudioSegment.silent(duration=gap_duration)
-        current_time += gap_duration / 1000.0
-
-    combined.export(output_path, format="wav")
-    duration = len(combined) / 1000.0
+    gap_seconds = 0.2
+    expected = sum(len(r["audio_data"]) // 2 for r in results) / 24000 + gap_seconds * len(results)
+    track = PCMTrack(expected_seconds=expected)
+    timings = []
+
+    for result in results:
+        start, end = track.append(result["audio_data"])
+        timings.append({"start": start, "end": end})
+        track.append_silence(gap_seconds)
+
+    track.write_wav(output_path)
+    duration = track.duration
     print(f"  ✓ 音声生成完了: {duration:.1f}秒")
     return duration, timings
 
@@ -1292,7 +1246,7 @@ def generate_line_qr_overlay(output_path: str) -> str:
         font_path = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
         if not os.path.exists(font_path):
             font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-        font = ImageFont.truetype(font_path, 28)
+        font = load_font(font_path, 28)
     except:
         font = ImageFont.load_default()
 
@@ -1617,8 +1571,7 @@ def generate_community_post_short(theme_name: str, key_manager: GeminiKeyManager
         print("  [SKIP_API] スキップ")
         return None
 
-    api_key = key_manager.get_key()
-    if not api_key:
+    if not len(key_manager):
         print("  ⚠ APIキーがないためスキップ")
         return None
 
@@ -1645,12 +1598,13 @@ def generate_community_post_short(theme_name: str, key_manager: GeminiKeyManager
 3. ▲▲▲"""
 
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config=types.GenerateContentConfig(temperature=0.7)
-        )
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt,
+                config=types.GenerateContentConfig(temperature=0.7)
+            )
         text = response.text.strip()
 
         # パース
@@ -1713,9 +1667,9 @@ def create_community_image(question: str, output_path: str) -> str:
         font_path = "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc"
         if not os.path.exists(font_path):
             font_path = "/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc"
-        title_font = ImageFont.truetype(font_path, 42)
-        main_font = ImageFont.truetype(font_path, 56)
-        sub_font = ImageFont.truetype(font_path, 32)
+        title_font = load_font(font_path, 42)
+        main_font = load_font(font_path, 56)
+        sub_font = load_font(font_path, 32)
     except:
         title_font = ImageFont.load_default()
         main_font = ImageFont.load_default()
@@ -1837,15 +1791,9 @@ def extract_facts_from_script_short(script: list) -> list:
 
 def gemini_fact_check_short(script: list, table_data: dict, key_manager) -> dict:
     """Geminiによるファクトチェック（ショート用）"""
-    api_key = key_manager.get_working_key()
-    if not api_key:
+    if not len(key_manager):
         return {"has_error": False, "errors": [], "message": "APIキーなし（スキップ）"}
 
-    if isinstance(api_key, tuple):
-        api_key = api_key[0]
-
-    client = genai.Client(api_key=api_key)
-
     # 台本をテキスト化
     script_text = json.dumps(script, ensure_ascii=False, indent=2)
     table_text = json.dumps(table_data, ensure_ascii=False, indent=2)
@@ -1882,10 +1830,12 @@ def gemini_fact_check_short(script: list, table_data: dict, key_manager) -> dict
 """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=prompt
+            )
         text = response.text
 
         json_match = re.search(r'\{[\s\S]*\}', text)
@@ -1900,13 +1850,9 @@ def gemini_fact_check_short(script: list, table_data: dict, key_manager) -> dict
 
 def web_search_fact_check_short(script: list, key_manager) -> dict:
     """Web検索で数字・日付を裏取り（ショート用）"""
-    api_key = key_manager.get_working_key()
-    if not api_key:
+    if not len(key_manager):
         return {"has_error": False, "errors": [], "message": "APIキーなし（スキップ）"}
 
-    if isinstance(api_key, tuple):
-        api_key = api_key[0]
-
     # 台本から事実を抽出
     facts = extract_facts_from_script_short(script)
     if not facts:
@@ -1915,7 +1861,6 @@ def web_search_fact_check_short(script: list, key_manager) -> dict:
     # 重要な事実のみ検証（最大3件）
     important_facts = facts[:3]
 
-    client = genai.Client(api_key=api_key)
     errors = []
 
     for fact in important_facts:
@@ -1936,13 +1881,16 @@ def web_search_fact_check_short(script: list, key_manager) -> dict:
 """
 
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=search_prompt,
-                config=types.GenerateContentConfig(
-                    tools=[types.Tool(google_search=types.GoogleSearch())],
+            # 1件ごとにキーを借りる（RPM を数えるため）
+            with key_manager.lease() as lease:
+                client = genai.Client(api_key=lease.api_key)
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=search_prompt,
+                    config=types.GenerateContentConfig(
+                        tools=[types.Tool(google_search=types.GoogleSearch())],
+                    )
                 )
-            )
 
             json_match = re.search(r'\{[\s\S]*?\}', response.text)
             if json_match:
@@ -2025,15 +1973,9 @@ def claude_fact_check_short(script: list, table_data: dict) -> dict:
 
 def fix_script_errors_short(script: list, errors: list, key_manager) -> list:
     """エラーを修正した台本を生成（ショート用）"""
-    api_key = key_manager.get_working_key()
-    if not api_key:
+    if not len(key_manager):
         return script
 
-    if isinstance(api_key, tuple):
-        api_key = api_key[0]
-
-    client = genai.Client(api_key=api_key)
-
     script_text = json.dumps(script, ensure_ascii=False, indent=2)
     errors_text = json.dumps(errors, ensure_ascii=False, indent=2)
 
@@ -2053,10 +1995,12 @@ def fix_script_errors_short(script: list, errors: list, key_manager) -> list:
 """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=fix_prompt
-        )
+        with key_manager.lease() as lease:
+            client = genai.Client(api_key=lease.api_key)
+            response = client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=fix_prompt
+            )
         text = response.text
 
         json_match = re.search(r'\[[\s\S]*\]', text)
@@ -2072,62 +2016,14 @@ def fix_script_errors_short(script: list, errors: list, key_manager) -> list:
 
 def triple_fact_check_short(script: list, table_data: dict, key_manager) -> list:
     """3重ファクトチェック - 1つでもNGなら修正（ショート用）"""
-
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        print(f"\n  === ファクトチェック {attempt + 1}回目 ===")
-
-        all_errors = []
-
-        # Step 1: Geminiで自己チェック
-        print("    [1/3] Geminiチェック...")
-        gemini_result = gemini_fact_check_short(script, table_data, key_manager)
-        if gemini_result.get("has_error"):
-            all_errors.extend(gemini_result.get("errors", []))
-            print(f"    ❌ Gemini: {len(gemini_result.get('errors', []))}件のエラー")
-            for err in gemini_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Gemini: OK")
-
-        # Step 2: Web検索で裏取り
-        print("    [2/3] Web検索チェック...")
-        web_result = web_search_fact_check_short(script, key_manager)
-        if web_result.get("has_error"):
-            all_errors.extend(web_result.get("errors", []))
-            print(f"    ❌ Web検索: {len(web_result.get('errors', []))}件の不一致")
-            for err in web_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Web検索: OK")
-
-        # Step 3: Claude APIでクロスチェック
-        print("    [3/3] Claudeチェック...")
-        claude_result = claude_fact_check_short(script, table_data)
-        if claude_result.get("has_error"):
-            all_errors.extend(claude_result.get("errors", []))
-            print(f"    ❌ Claude: {len(claude_result.get('errors', []))}件のエラー")
-            for err in claude_result.get("errors", [])[:3]:
-                print(f"       - {err.get('箇所', '')}: {err.get('問題', '')}")
-        else:
-            print("    ✅ Claude: OK")
-
-        # 全チェックOKなら終了
-        if not all_errors:
-            print("  🎉 3重ファクトチェック全てOK！")
-            return script
-
-        # 最後の試行でもエラーがあれば警告して続行
-        if attempt == max_retries - 1:
-            print(f"  ⚠️ {len(all_errors)}件のエラーが残っていますが、続行します")
-            return script
-
-        # エラーがあれば修正
-        print(f"  ⚠️ {len(all_errors)}件のエラーを修正中...")
-        script = fix_script_errors_short(script, all_errors, key_manager)
-
-    return script
+    checkers = [
+        FactChecker("Gemini", lambda s: gemini_fact_check_short(s, table_data, key_manager)),
+        # Web検索は台本から抜き出した数字・日付だけを見る
+        FactChecker("Web検索", lambda s: web_search_fact_check_short(s, key_manager),
+                    inputs=lambda s: extract_facts_from_script_short(s)[:3]),
+        FactChecker("Claude", lambda s: claude_fact_check_short(s, table_data)),
+    ]
+    return run_fact_check_rounds(script, checkers, lambda s, errors: fix_script_errors_short(s, errors, key_manager), max_rounds=3)
 
 
 def send_first_comment_to_slack_short(title: str, topic: str = ""):
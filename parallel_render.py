@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+プロセス並列フレームレンダリング（MoviePy write_videofile 互換）
+
+MoviePyの write_videofile はフレームを1枚ずつ1コアで生成する。
+各フレームは時刻 t の純粋関数なので、タイムラインを連続したチャンクに分割して
+ProcessPoolExecutor でフレームを並列生成し、順番通りに1本の ffmpeg エンコーダへ流す。
+
+- フレーム時刻・音声書き出し・ffmpeg引数は write_videofile と同一 → 出力はバイト単位で一致
+- ワーカーは fork で起動し、親プロセスのクリップをそのまま引き継ぐ（クロージャのpickle不要）
+- チャンク単位で連続した時刻を担当するので、各ワーカー内でレイヤーキャッシュが効く
+- fork が使えない環境や workers <= 1 の場合は通常の write_videofile にフォールバック
+
+使い方:
+    from parallel_render import write_videofile_parallel
+    write_videofile_parallel(final_video, "out.mp4", fps=24, codec="libx264",
+                             audio_codec="aac", workers=4)
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import proglog
+from moviepy.Clip import Clip
+from moviepy.tools import find_extension
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+
+# 1タスクあたりのフレーム数（フルHD 1フレーム ≒ 6MB）
+DEFAULT_CHUNK_FRAMES = 8
+
+# ワーカーが参照するクリップ（fork 前に親プロセスで設定）
+_render_clip = None
+
+
+def _render_chunk(frame_indices, fps):
+    """ワーカー: 指定フレームを順番に生成して返す"""
+    clip = _render_clip
+    frames = []
+    for frame_index in frame_indices:
+        # iter_frames と同じ時刻計算（浮動小数の誤差も一致させる）
+        t = frame_index / fps
+        frame = clip.get_frame(t)
+        if frame.dtype != "uint8":
+            frame = frame.astype("uint8")
+        if clip.mask is not None:
+            mask = 255 * clip.mask.get_frame(t)
+            if mask.dtype != "uint8":
+                mask = mask.astype("uint8")
+            frame = np.dstack([frame, mask])
+        frames.append(frame)
+    return frames
+
+
+def _fork_context():
+    """fork コンテキストを取得（使えなければ None）"""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def write_videofile_parallel(clip, filename, fps=24, codec="libx264", audio_codec=None,
+                             temp_audiofile=None, remove_temp=True, preset="medium",
+                             threads=None, ffmpeg_params=None, workers=None,
+                             chunk_frames=DEFAULT_CHUNK_FRAMES, logger="bar"):
+    """write_videofile と同じ出力をフレーム並列生成で書き出す
+
+    Args:
+        clip: MoviePy VideoClip
+        filename: 出力パス
+        fps, codec, audio_codec, temp_audiofile, remove_temp, preset, threads, ffmpeg_params:
+            VideoClip.write_videofile と同じ
+        workers: フレーム生成プロセス数（None なら CPU コア数）
+        chunk_frames: 1タスクあたりのフレーム数
+        logger: "bar" または None
+    """
+    filename = str(filename)
+    workers = workers or os.cpu_count() or 1
+    context = _fork_context()
+
+    if workers <= 1 or context is None:
+        clip.write_videofile(
+            filename, fps=fps, codec=codec, audio_codec=audio_codec,
+            temp_audiofile=temp_audiofile, remove_temp=remove_temp, preset=preset,
+            threads=threads, ffmpeg_params=ffmpeg_params, logger=logger
+        )
+        return filename
+
+    logger = proglog.default_bar_logger(logger)
+
+    # === 音声（write_videofile と同じ手順で先に書き出す）===
+    if audio_codec is None:
+        audio_codec = "libmp3lame"
+    audiofile = None
+    if clip.audio is not None:
+        if temp_audiofile:
+            audiofile = str(temp_audiofile)
+        else:
+            name = os.path.splitext(os.path.basename(filename))[0]
+            audiofile = name + Clip._TEMP_FILES_PREFIX + "wvf_snd.%s" % find_extension(audio_codec)
+        clip.audio.write_audiofile(audiofile, 44100, 4, 2000, audio_codec, logger=logger)
+        # エンコード済みなので結合時はコピー
+        audio_codec = "copy"
+
+    # === 映像（フレーム生成のみ並列、エンコーダは1本）===
+    global _render_clip
+    _render_clip = clip
+
+    frame_indices = np.arange(0, int(clip.duration * fps))
+    chunks = [frame_indices[i:i + chunk_frames] for i in range(0, len(frame_indices), chunk_frames)]
+    # 同時に保持するチャンク数を制限してメモリを抑える
+    max_in_flight = workers * 2
+
+    logger(message=f"MoviePy - Writing video {filename} ({workers}プロセス並列)\n")
+    try:
+        with FFMPEG_VideoWriter(
+            filename, clip.size, fps, codec=codec, preset=preset,
+            with_mask=clip.mask is not None, audiofile=audiofile,
+            audio_codec=audio_codec, threads=threads, ffmpeg_params=ffmpeg_params,
+        ) as writer, ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = []
+            next_chunk = 0
+            written = 0
+            bar = logger.iter_bar(chunk=range(len(chunks)))
+            for _ in bar:
+                while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                    pending.append(pool.submit(_render_chunk, chunks[next_chunk], fps))
+                    next_chunk += 1
+                # 先頭から順番に受け取ってエンコーダへ流す
+                for frame in pending.pop(0).result():
+                    writer.write_frame(frame)
+                    written += 1
+    finally:
+        _render_clip = None
+        if remove_temp and audiofile and os.path.exists(audiofile):
+            os.remove(audiofile)
+
+    logger(message=f"MoviePy - video ready {filename} ({written}フレーム)")
+    return filename
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+メモリ上でのPCM結合（TTS音声の組み立て用）
+
+Gemini TTS が返す生PCM（int16）を、WAV書き出し → pydub で読み直し → ffmpeg で結合、
+という往復なしに1本の配列へ追記していく。
+- 配列は事前確保（足りなければ倍々で拡張）するので、AudioSegment += のような二乗コピーにならない
+- 長さはサンプル数から計算（ffprobe 不要）
+- 最後に1回だけ WAV を書き出す
+
+使い方:
+    track = PCMTrack(sample_rate=24000)
+    start, end = track.append(pcm_bytes)
+    track.append_silence(0.3)
+    track.write_wav("output.wav")
+"""
+
+import subprocess
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import miniaudio  # MP3等をプロセス内でデコード（なければ ffmpeg）
+except ImportError:
+    miniaudio = None
+
+
+DEFAULT_SAMPLE_RATE = 24000  # Gemini TTS の出力
+
+
+def pcm_to_array(pcm, channels: int = 1) -> np.ndarray:
+    """int16 PCM（bytes / 配列）を (サンプル数, チャンネル数) の配列に変換"""
+    if isinstance(pcm, np.ndarray):
+        samples = pcm.astype(np.int16, copy=False)
+    else:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+    return samples.reshape(-1, channels)
+
+
+def apply_gain(samples: np.ndarray, gain_db: float) -> np.ndarray:
+    """音量を変更（int16 の範囲でクリップ）"""
+    if not gain_db:
+        return samples
+    scaled = samples.astype(np.float32) * (10 ** (gain_db / 20))
+    return np.clip(scaled, -32768, 32767).astype(np.int16)
+
+
+def read_wav(path, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """WAVを読み込み（形式が違う場合は ffmpeg で変換）"""
+    try:
+        with wave.open(str(path), "rb") as wf:
+            if (wf.getframerate() == sample_rate and wf.getnchannels() == channels
+                    and wf.getsampwidth() == 2):
+                return pcm_to_array(wf.readframes(wf.getnframes()), channels)
+    except (wave.Error, EOFError):
+        pass
+    return decode_audio(path, sample_rate, channels)
+
+
+def decode_audio(path, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """任意の音声ファイル（mp3等）を ffmpeg で int16 PCM にデコード"""
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", str(path),
+         "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", str(channels), "-"],
+        capture_output=True, check=True
+    )
+    return pcm_to_array(result.stdout, channels)
+
+
+def decode_audio_bytes(data: bytes, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """メモリ上の音声（gTTS の mp3 等）を int16 PCM にデコード
+
+    miniaudio があればプロセス内で、なければ ffmpeg にパイプで渡す（一時ファイルなし）。
+    """
+    if miniaudio is not None:
+        decoded = miniaudio.decode(data, output_format=miniaudio.SampleFormat.SIGNED16,
+                                   nchannels=channels, sample_rate=sample_rate)
+        return pcm_to_array(decoded.samples.tobytes(), channels)
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", "pipe:0",
+         "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", str(channels), "-"],
+        input=data, capture_output=True, check=True
+    )
+    return pcm_to_array(result.stdout, channels)
+
+
+def write_wav(path, samples, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1):
+    """int16 PCM（bytes / 配列）をWAVとして書き出し"""
+    if isinstance(samples, np.ndarray):
+        samples = samples.astype(np.int16, copy=False).tobytes()
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples)
+
+
+@lru_cache(maxsize=16)
+def _load_clip(path, sample_rate, channels, gain_db):
+    samples = apply_gain(read_wav(path, sample_rate, channels), gain_db)
+    samples.flags.writeable = False
+    return samples
+
+
+def load_clip(path, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1, gain_db: float = 0.0) -> np.ndarray:
+    """ジングル等の繰り返し使う音声をデコードしてキャッシュ（読み取り専用配列）"""
+    return _load_clip(str(path), sample_rate, channels, float(gain_db))
+
+
+class PCMTrack:
+    """int16 PCM を1本の配列に追記していくトラック
+
+    Args:
+        sample_rate: サンプリングレート
+        channels: チャンネル数
+        expected_seconds: 想定の長さ（事前確保量。超えたら自動で拡張）
+    """
+
+    def __init__(self, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1, expected_seconds: float = 60.0):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._buffer = np.zeros((max(1, int(expected_seconds * sample_rate)), channels), dtype=np.int16)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def duration(self) -> float:
+        """現在の長さ（秒）"""
+        return self._length / self.sample_rate
+
+    def _reserve(self, extra: int):
+        needed = self._length + extra
+        if needed > len(self._buffer):
+            capacity = max(needed, len(self._buffer) * 2)
+            grown = np.zeros((capacity, self.channels), dtype=np.int16)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+
+    def append(self, pcm) -> tuple:
+        """PCM（bytes / int16配列）を追記し、(開始秒, 終了秒) を返す"""
+        samples = pcm_to_array(pcm, self.channels)
+        start = self._length
+        self._reserve(len(samples))
+        self._buffer[start:start + len(samples)] = samples
+        self._length += len(samples)
+        return start / self.sample_rate, self._length / self.sample_rate
+
+    def append_silence(self, seconds: float) -> tuple:
+        """無音を追記（バッファは0初期化済みなので長さを進めるだけ）"""
+        count = int(round(seconds * self.sample_rate))
+        start = self._length
+        self._reserve(count)
+        self._buffer[start:start + count] = 0
+        self._length += count
+        return start / self.sample_rate, self._length / self.sample_rate
+
+    def samples(self) -> np.ndarray:
+        """現在の内容（コピーなしのビュー）"""
+        return self._buffer[:self._length]
+
+    def to_bytes(self) -> bytes:
+        return self.samples().tobytes()
+
+    def write_wav(self, path):
+        """WAVとして書き出し"""
+        write_wav(path, self.samples(), self.sample_rate, self.channels)
+
+
+def samples_duration(samples, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1) -> float:
+    """PCM（bytes / 配列）の長さ（秒）"""
+    if isinstance(samples, np.ndarray):
+        return len(samples) / sample_rate
+    return len(samples) // (2 * channels) / sample_rate
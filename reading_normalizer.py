@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+読み方辞書の一括置換（Aho-Corasick オートマトン）
+
+辞書のキーを1回だけオートマトンにコンパイルし、テキストを左から1回なめるだけで変換する。
+- 辞書を1件ずつ str.replace するのと違い、辞書の件数が増えても変換時間はほぼ変わらない
+- 同じ位置から始まるキーは最長のものを採用（「確定」より「確定申告」、「NISA」より「新NISA」）
+- 置換後の文字列を別のキーで再置換しない（辞書の並び順で結果が変わらない）
+
+使い方:
+    normalizer = ReadingNormalizer(READING_DICT, sheet_dict)
+    text = normalizer.normalize("新NISAの確定申告")
+    texts = normalizer.normalize_many([line["text"] for line in dialogue])
+
+ベンチマーク:
+    python reading_normalizer.py --bench
+"""
+
+import argparse
+import random
+import time
+from collections import deque
+from functools import lru_cache
+
+
+# normalize_many でテキストをつなぐ区切り（辞書のキーには含まれない）
+_SEPARATOR = "\x00"
+
+
+class ReadingNormalizer:
+    """読み方辞書をコンパイルした置換器
+
+    Args:
+        dicts: 読み方辞書（後の辞書ほど優先。同じキーは上書き）
+    """
+
+    def __init__(self, *dicts):
+        self.mapping = {}
+        for d in dicts:
+            if d:
+                self.mapping.update({k: v for k, v in d.items() if k and _SEPARATOR not in k})
+
+        # ノードごとの遷移・失敗リンク・そのノードで終わるキーの長さ（出力リンクをたどる）
+        self._goto = [{}]
+        self._fail = [0]
+        self._length = [0]  # このノードがキーの終端ならその長さ、違えば0
+        self._output = [0]  # 失敗リンクをたどって最初に見つかる終端ノード（なければ0）
+        for key in self.mapping:
+            self._add(key)
+        self._build()
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def _add(self, key: str):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._length.append(0)
+                self._output.append(0)
+            node = nxt
+        self._length[node] = len(key)
+
+    def _build(self):
+        """幅優先で失敗リンクと出力リンクを張る"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = target if self._length[target] else self._output[target]
+                queue.append(child)
+
+    def _longest_matches(self, text: str) -> dict:
+        """開始位置 → その位置から始まる最長キーの長さ"""
+        goto, fail, length, output = self._goto, self._fail, self._length, self._output
+        best = {}
+        node = 0
+        for end, ch in enumerate(text, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            match = node if length[node] else output[node]
+            while match:
+                size = length[match]
+                start = end - size
+                if size > best.get(start, 0):
+                    best[start] = size
+                match = output[match]
+        return best
+
+    def normalize(self, text: str) -> str:
+        """テキストを1回の走査で変換（左から、同じ位置なら最長一致）"""
+        if not text or not self.mapping:
+            return text
+        best = self._longest_matches(text)
+        if not best:
+            return text
+
+        parts = []
+        pos = 0
+        i = 0
+        n = len(text)
+        while i < n:
+            size = best.get(i)
+            if size:
+                parts.append(text[pos:i])
+                parts.append(self.mapping[text[i:i + size]])
+                i += size
+                pos = i
+            else:
+                i += 1
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def normalize_many(self, texts: list) -> list:
+        """複数のテキストをまとめて変換（台本全体を1回の走査で）"""
+        texts = list(texts)
+        if not texts:
+            return []
+        joined = _SEPARATOR.join(text or "" for text in texts)
+        converted = self.normalize(joined).split(_SEPARATOR)
+        return [converted[k] if texts[k] else texts[k] for k in range(len(texts))]
+
+    def __call__(self, text: str) -> str:
+        return self.normalize(text)
+
+
+@lru_cache(maxsize=8)
+def _compiled(items: frozenset) -> ReadingNormalizer:
+    return ReadingNormalizer(dict(items))
+
+
+def compile_reading_dict(*dicts) -> ReadingNormalizer:
+    """辞書をマージしてコンパイル（同じ内容なら使い回す）"""
+    merged = {}
+    for d in dicts:
+        if d:
+            merged.update(d)
+    return _compiled(frozenset(merged.items()))
+
+
+def _replace_baseline(text: str, reading_dict: dict) -> str:
+    """旧方式（長いキーから順に str.replace）"""
+    for key in sorted(reading_dict.keys(), key=len, reverse=True):
+        text = text.replace(key, reading_dict[key])
+    return text
+
+
+def run_benchmark(entries: int = 3000, lines: int = 150):
+    """辞書の件数を増やしたときの旧方式との比較"""
+    rng = random.Random(0)
+    kanji = "年金受給額制度確定申告厚労省機構所得保険料支給開始繰下繰上遺族障害老齢基礎厚生"
+    reading_dict = {}
+    while len(reading_dict) < entries:
+        key = "".join(rng.choice(kanji) for _ in range(rng.randint(2, 5)))
+        reading_dict[key] = f"よみ{len(reading_dict)}"
+    script = ["".join(rng.choice(kanji + "のがはをにでもです、。") for _ in range(40)) for _ in range(lines)]
+
+    start = time.perf_counter()
+    baseline = [_replace_baseline(text, reading_dict) for text in script]
+    baseline_time = time.perf_counter() - start
+    print(f"str.replace方式: {baseline_time:.2f}秒（{entries}件 × {lines}行）")
+
+    start = time.perf_counter()
+    normalizer = ReadingNormalizer(reading_dict)
+    compile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    converted = normalizer.normalize_many(script)
+    elapsed = time.perf_counter() - start
+    print(f"オートマトン方式: コンパイル {compile_time:.2f}秒 + 変換 {elapsed:.3f}秒")
+
+    same = sum(1 for a, b in zip(baseline, converted) if a == b)
+    print(f"旧方式と同じ結果: {same}/{lines}行（差分は旧方式が長いキーを先に全文置換するため）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="読み方辞書の一括置換")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク")
+    parser.add_argument("--entries", type=int, default=3000)
+    parser.add_argument("--lines", type=int, default=150)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(entries=args.entries, lines=args.lines)
+    else:
+        parser.print_help()
@@ -19,7 +19,6 @@ import wave
 import shutil
 import pickle
 import argparse
-import subprocess
 import traceback
 from io import BytesIO
 from pathlib import Path
@@ -29,10 +28,13 @@ from typing import List, Dict, Optional
 import requests
 from PIL import Image, ImageDraw
 from dotenv import load_dotenv
-from youtube_transcript_api import YouTubeTranscriptApi
 from google import genai
 from google.genai import types
 
+from gemini_key_pool import is_rate_limit_error
+from still_video import StillSegment, render_stills
+from transcript_cache import get_transcript_service
+
 # 環境変数を読み込み
 load_dotenv(Path(__file__).parent / ".env")
 
@@ -92,7 +94,7 @@ class TranscriptFetcher:
     """YouTube字幕取得"""
 
     def __init__(self):
-        self.api = YouTubeTranscriptApi()
+        self.service = get_transcript_service()
 
     def extract_video_id(self, url: str) -> str:
         """URLから動画IDを抽出"""
@@ -112,7 +114,7 @@ class TranscriptFetcher:
             video_id = self.extract_video_id(video_url)
             print(f"   動画ID: {video_id}")
 
-            transcript_list = self.api.fetch(video_id, languages=['ja', 'jp'])
+            transcript_list = self.service.get(video_id, languages=['ja', 'jp'])
 
             if not transcript_list:
                 print("   ❌ 字幕が見つかりません")
@@ -146,9 +148,9 @@ class ScriptRewriter:
 
         # 字幕テキストを結合
         transcript_text = "\n".join([
-            f"[{item.start:.1f}s] {item.text}"
+            f"[{item['start']:.1f}s] {item['text']}"
             for item in transcript
-            if hasattr(item, 'text') and item.text
+            if item.get('text')
         ])
 
         prompt = f"""以下の年金ニュース動画の字幕を、カツミ（63歳女性・年金専門家）とヒロシ（47歳男性・視聴者代表）の掛け合い形式の台本にリライトしてください。
@@ -448,8 +450,7 @@ class TTSGenerator:
                         break
 
                 except Exception as e:
-                    error_str = str(e)
-                    if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+                    if is_rate_limit_error(e):
                         if attempt < len(self.api_keys) - 1:
                             self._switch_api_key()
                             continue
@@ -493,10 +494,10 @@ class VideoEncoder:
     """動画エンコード"""
 
     def encode(self, script: Dict, images: List[Dict], audio_data: Dict) -> Optional[Path]:
-        """画像と音声から動画を生成"""
+        """画像と音声から動画を生成（シーンごとの静止画と音声を1回の ffmpeg でつなぐ）"""
         print(f"\n🎬 動画をエンコード中...")
 
-        video_segments = []
+        segments = []
 
         for scene in script["scenes"]:
             scene_id = scene["scene_id"]
@@ -508,64 +509,20 @@ class VideoEncoder:
                 print(f"   ⚠️ シーン{scene_id}: 画像または音声が見つかりません")
                 continue
 
-            segment_path = Config.TEMP_DIR / "video" / f"segment_{scene_id:03d}.mp4"
-
-            # ffmpegでセグメントを作成
-            cmd = [
-                "ffmpeg", "-y",
-                "-loop", "1",
-                "-i", str(image["path"]),
-                "-i", str(audio["path"]),
-                "-c:v", "libx264",
-                "-tune", "stillimage",
-                "-c:a", "aac",
-                "-b:a", Config.AUDIO_BITRATE,
-                "-pix_fmt", "yuv420p",
-                "-shortest",
-                "-t", str(audio["duration"]),
-                str(segment_path)
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            if result.returncode == 0:
-                video_segments.append(segment_path)
-                print(f"   シーン{scene_id}: ✓ ({audio['duration']:.1f}秒)")
-            else:
-                print(f"   シーン{scene_id}: ❌ ffmpegエラー")
+            segments.append(StillSegment(image["path"], audio["duration"], audio=audio["path"]))
+            print(f"   シーン{scene_id}: ✓ ({audio['duration']:.1f}秒)")
 
-        if not video_segments:
+        if not segments:
             print("   ❌ 動画セグメントが作成されませんでした")
             return None
 
-        # セグメントを結合
         final_path = Config.TEMP_DIR / "video" / f"{script['title'][:20]}.mp4"
 
-        concat_file = Config.TEMP_DIR / "concat_list.txt"
-        with open(concat_file, "w") as f:
-            for segment in video_segments:
-                f.write(f"file '{segment.absolute()}'\n")
-
-        cmd = [
-            "ffmpeg", "-y",
-            "-f", "concat",
-            "-safe", "0",
-            "-i", str(concat_file),
-            "-c", "copy",
-            str(final_path)
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            print("   ❌ 動画結合エラー")
+        if not render_stills(segments, final_path, fps=25, size=(Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT),
+                             audio_bitrate=Config.AUDIO_BITRATE):
+            print("   ❌ 動画エンコードエラー")
             return None
 
-        # クリーンアップ
-        concat_file.unlink()
-        for segment in video_segments:
-            segment.unlink()
-
         print(f"   ✓ 動画エンコード完了: {final_path.name}")
 
         return final_path
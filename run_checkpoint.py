@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+パイプライン実行のチェックポイント（途中から再開できるようにする）
+
+ニュース検索 → 台本 → ファクトチェック → TTS → エンコード → 投稿 を1プロセスで回していると、
+最後の YouTube 投稿やサムネイル設定で落ちただけで、LLM・TTS の処理を全部やり直すことになる。
+各ステージの結果（JSON）と成果物（音声・字幕・動画）を実行ディレクトリに保存し、
+同じ実行IDで再実行したときは完了済みのステージを飛ばす。
+
+- ステージの保存先は「ステージ名-入力のハッシュ」。入力（前のステージの結果）が変われば自動でやり直す
+  （やり直したら前の入力の保存先は消す）
+- 成果物は呼び出し側のパスにそのまま書き戻すので、後続の処理は変更不要
+- GitHub Actions では実行ID = GITHUB_RUN_ID。「Re-run failed jobs」で同じ実行の続きから再開する
+  （workflow で ~/.cache/pipeline-runs を actions/cache で復元し、失敗・キャンセル時だけ保存）
+- 最後まで成功したら discard() で実行ディレクトリを消す（動画・音声を次の実行に持ち越さない）
+
+環境変数:
+    PIPELINE_CHECKPOINT=false   チェックポイントを無効化
+    PIPELINE_RUNS_DIR=...       保存先
+
+使い方:
+    checkpoint = RunCheckpoint("nenkin_news", run_id=args.resume)
+    script = checkpoint.stage("script", lambda: generate_script(news_data), inputs=news_data)
+    duration, timings = checkpoint.stage("tts", lambda: generate_tts_audio(dialogue, audio_path),
+                                         inputs=dialogue, files={"audio": audio_path})
+
+    python nenkin_news.py --resume 20250101_110000   # 止まった実行を再開
+    python run_checkpoint.py --list nenkin_news      # 実行IDの一覧
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+
+PIPELINE_CHECKPOINT_ENABLED = os.environ.get("PIPELINE_CHECKPOINT", "true").lower() == "true"
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_RUNS_DIR = Path.home() / ".cache" / "pipeline-runs"
+LOCAL_RUNS_DIR = Path.home() / ".cache" / "jinsei-soudan" / "runs"
+
+
+def default_runs_dir() -> Path:
+    root = os.environ.get("PIPELINE_RUNS_DIR")
+    if root:
+        return Path(root)
+    return GITHUB_ACTIONS_RUNS_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_RUNS_DIR
+
+
+def new_run_id() -> str:
+    """新しい実行ID（GitHub Actions では再実行しても変わらない GITHUB_RUN_ID）"""
+    github_run_id = os.environ.get("GITHUB_RUN_ID")
+    if github_run_id:
+        return f"gh{github_run_id}"
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def content_hash(value) -> str:
+    """ステージの入力のハッシュ（JSONにできない値は str で代用）"""
+    blob = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def list_runs(pipeline: str, root=None) -> list:
+    """実行ディレクトリの一覧（新しい順）: [(run_id, 完了ステージのリスト), ...]"""
+    base = Path(root or default_runs_dir()) / pipeline
+    runs = []
+    if base.exists():
+        for manifest_path in base.glob("*/manifest.json"):
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            runs.append((manifest_path.stat().st_mtime, manifest_path.parent.name, list(manifest.get("stages", {}))))
+    runs.sort(reverse=True)
+    return [(run_id, stages) for _, run_id, stages in runs]
+
+
+def _copy(src: Path, dest: Path):
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if src.is_dir():
+        shutil.copytree(src, dest, dirs_exist_ok=True)
+    else:
+        shutil.copy2(src, dest)
+
+
+class RunCheckpoint:
+    """1回のパイプライン実行のチェックポイント
+
+    Args:
+        pipeline: パイプライン名（"nenkin_news" など）
+        run_id: 再開する実行ID（None なら新規、"latest" なら最新の実行）
+        root: 保存先（None なら default_runs_dir()）
+        enabled: False ならステージを毎回実行するだけ
+    """
+
+    def __init__(self, pipeline: str, run_id: str = None, root=None, enabled: bool = PIPELINE_CHECKPOINT_ENABLED):
+        self.pipeline = pipeline
+        self.root = Path(root or default_runs_dir())
+        self.enabled = enabled
+        self.resumed = bool(run_id)
+
+        if run_id == "latest":
+            runs = list_runs(pipeline, self.root)
+            if not runs:
+                raise ValueError(f"{pipeline} の再開できる実行がありません")
+            run_id = runs[0][0]
+        self.run_id = run_id or new_run_id()
+        self.run_dir = self.root / pipeline / self.run_id
+        self._manifest_path = self.run_dir / "manifest.json"
+
+        if self.resumed and self.enabled and not self._manifest_path.exists():
+            print(f"  [チェックポイント] ⚠ 実行 {self.run_id} が見つかりません、最初から実行")
+        self._manifest = self._load_manifest()
+
+        if self.enabled:
+            print(f"  [チェックポイント] 実行ID: {self.run_id}（再開: --resume {self.run_id}）")
+
+    def _load_manifest(self) -> dict:
+        try:
+            return json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"pipeline": self.pipeline, "run_id": self.run_id,
+                    "created": datetime.now().isoformat(timespec="seconds"), "stages": {}}
+
+    def _save_manifest(self):
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        # 途中で落ちても壊れないように一時ファイル経由で置き換え
+        fd, tmp = tempfile.mkstemp(dir=self.run_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._manifest_path)
+
+    def completed(self, name: str, inputs=None) -> bool:
+        """ステージが同じ入力で完了済みか"""
+        entry = self._manifest["stages"].get(name)
+        return bool(self.enabled and entry and entry.get("inputs") == content_hash(inputs))
+
+    def stage(self, name: str, func, inputs=None, files: dict = None):
+        """ステージを実行（同じ入力で完了済みなら保存した結果を返す）
+
+        Args:
+            name: ステージ名
+            func: 引数なしで呼ぶ処理。戻り値はJSONで保存する（タプルはリストになる、None は保存しない）
+            inputs: ステージの入力（ハッシュが変わったらやり直す）
+            files: 成果物 {ラベル: パス}。完了時に保存し、スキップ時は同じパスに書き戻す
+
+        Returns:
+            func() の戻り値（スキップ時は保存した値）
+        """
+        if not self.enabled:
+            return func()
+
+        files = files or {}
+        key = content_hash(inputs)
+        stage_dir = self.run_dir / f"{name}-{key[:12]}"
+
+        if self.completed(name, inputs):
+            entry = self._manifest["stages"][name]
+            for label, path in files.items():
+                stored = stage_dir / "files" / label
+                if label in entry.get("files", []) and stored.exists():
+                    _copy(stored, Path(path))
+            print(f"  [チェックポイント] ✓ {name}: 完了済み、スキップ")
+            return entry.get("value")
+
+        value = func()
+        if value is None:
+            # None は失敗扱い（保存せず、次の実行でやり直す）
+            return value
+
+        # 前の入力で保存した成果物は使わないので消す（実行ディレクトリとキャッシュに溜めない）
+        previous = self._manifest["stages"].get(name)
+        if previous and previous.get("dir") and previous["dir"] != stage_dir.name:
+            shutil.rmtree(self.run_dir / previous["dir"], ignore_errors=True)
+
+        saved_files = []
+        for label, path in files.items():
+            if path and Path(path).exists():
+                _copy(Path(path), stage_dir / "files" / label)
+                saved_files.append(label)
+        # JSONにできない値（Path など）は文字列にして保存
+        value = json.loads(json.dumps(value, ensure_ascii=False, default=str))
+        self._manifest["stages"][name] = {
+            "inputs": key,
+            "dir": stage_dir.name,
+            "value": value,
+            "files": saved_files,
+            "done_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save_manifest()
+        return value
+
+    def discard(self):
+        """実行ディレクトリを削除（成功して再開の必要がなくなったとき）"""
+        if self.run_dir.exists():
+            shutil.rmtree(self.run_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="パイプライン実行のチェックポイント")
+    parser.add_argument("--list", metavar="PIPELINE", help="実行IDの一覧を表示")
+    args = parser.parse_args()
+
+    if args.list:
+        for run_id, stages in list_runs(args.list):
+            print(f"{run_id}: {', '.join(stages) or '（完了ステージなし）'}")
+    else:
+        parser.print_help()
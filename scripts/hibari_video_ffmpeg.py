@@ -9,10 +9,12 @@
 import os
 import sys
 import json
-import subprocess
 import requests
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from still_video import StillSegment, render_stills
+
 # .env読み込み
 def load_env():
     env_path = Path(__file__).parent.parent / '.env'
@@ -129,8 +131,11 @@ def generate_voice(text, filepath):
 
 
 # === 動画シーン生成（ffmpeg） ===
-def create_scene(bg_image, text, duration, output_path, voice_path=None):
-    """1シーンの動画を生成"""
+SCENE_FPS = 24
+
+
+def render_scene_image(bg_image, text):
+    """背景画像に字幕を描いた1シーン分の静止画"""
     from PIL import Image, ImageDraw, ImageFont
 
     # 背景画像を読み込んでテキストを直接描画
@@ -165,31 +170,20 @@ def create_scene(bg_image, text, duration, output_path, voice_path=None):
         draw.text((x, y_offset), line, font=font, fill=(255, 255, 255))
         y_offset += 80
 
-    # 一時画像保存
-    temp_img = output_path.with_suffix('.png')
-    bg.save(temp_img)
-
-    # ffmpegで動画化
-    cmd = [
-        'ffmpeg', '-y',
-        '-loop', '1', '-i', str(temp_img),
-        '-t', str(duration),
-        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
-        '-r', '24'
-    ]
+    return bg
 
-    if voice_path and Path(voice_path).exists():
-        cmd.extend(['-i', str(voice_path), '-c:a', 'aac', '-shortest'])
 
-    cmd.append(str(output_path))
+def scene_segment(bg_image, text, duration, voice_path=None):
+    """1シーン分の StillSegment（音声がなければ無音）"""
+    if not (voice_path and Path(voice_path).exists()):
+        voice_path = None
+    return StillSegment(render_scene_image(bg_image, text), duration, audio=voice_path)
 
-    result = subprocess.run(cmd, capture_output=True)
 
-    # 一時ファイル削除
-    if temp_img.exists():
-        temp_img.unlink()
-
-    return result.returncode == 0
+def create_scene(bg_image, text, duration, output_path, voice_path=None):
+    """1シーンの動画を生成"""
+    return render_stills([scene_segment(bg_image, text, duration, voice_path)], output_path,
+                         fps=SCENE_FPS, verbose=False)
 
 
 # === メイン ===
@@ -247,11 +241,10 @@ def main():
         else:
             voice_files.append(None)
 
-    # 4. シーン動画生成
-    print("\n[4/5] シーン動画を生成中...")
-    scene_files = []
+    # 4. シーン画像生成
+    print("\n[4/5] シーン画像を生成中...")
+    segments = []
     for i, item in enumerate(SCRIPT):
-        scene_path = OUTPUT_DIR / f"scene_{i:02d}.mp4"
         print(f"  シーン{i}: {item['text'][:15]}...")
 
         # 背景画像を決定
@@ -264,27 +257,12 @@ def main():
             if not bg.exists():
                 bg = op_path
 
-        create_scene(bg, item['text'], item['duration'], scene_path, voice_files[i])
-        scene_files.append(scene_path)
-
-    # 5. 結合
-    print("\n[5/5] 動画を結合中...")
-
-    # ファイルリスト作成
-    list_path = OUTPUT_DIR / "filelist.txt"
-    with open(list_path, 'w') as f:
-        for scene in scene_files:
-            f.write(f"file '{scene}'\n")
+        segments.append(scene_segment(bg, item['text'], item['duration'], voice_files[i]))
 
-    # 結合
+    # 5. 動画化（シーンごとに mp4 を作って結合せず、静止画と音声を1回でエンコード）
+    print("\n[5/5] 動画をエンコード中...")
     output_path = OUTPUT_DIR / "hibari_best3.mp4"
-    subprocess.run([
-        'ffmpeg', '-y',
-        '-f', 'concat', '-safe', '0',
-        '-i', str(list_path),
-        '-c', 'copy',
-        str(output_path)
-    ], capture_output=True)
+    render_stills(segments, output_path, fps=SCENE_FPS)
 
     print("\n" + "=" * 60)
     print("完了!")
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部サービスの記録・再生（Gemini / YouTube / Drive / Sheets / Slack / Discord をオフラインで再現）
+
+パイプラインを最後まで動かすには本物のサービスが必要で、SKIP_API は無音を出すだけなので、
+高速化の効果を同じ条件で測り直すことができなかった。
+HTTP の送信口（requests / httplib2 / httpx）を差し替えて、
+- record: 本物に送り、リクエストとレスポンスをカセット（ディレクトリ）に保存
+- replay: カセットから同じレスポンスを返す（ネットワークに出ない）
+
+googleapiclient（YouTube / Drive / Sheets）は httplib2、google.genai（TTS）と anthropic は httpx、
+google.generativeai（テキスト生成）は REST トランスポートに切り替えて requests、
+Slack / Discord の Webhook・OAuth のトークン更新は requests を通るので、全部ここで捕まえる。
+
+再生の照合:
+- まず (メソッド, URL, 本文) が同じ記録を、記録された順に返す（同じリクエストが何度も来たら次の記録）
+- 本文が違う（プロンプトに日時が入る・JWT の発行時刻など）ときは、同じエンドポイントの
+  未使用の記録を順番に返す
+- 記録を使い切ったら最後の記録を返し続ける
+
+再生の条件:
+- 遅延: 記録したときの所要時間 × 倍率、または固定秒数
+- 429 の注入: 指定した割合でランダム（シード固定で毎回同じ位置）に 429 を返す
+
+カセットに秘密情報は残さない（リクエストのヘッダーは保存しない。APIキーなどのクエリ、
+Webhook URL のパス、トークン応答の中身は伏せる）。
+
+環境変数:
+    REPLAY_LATENCY=recorded   再生時の遅延（recorded = 記録時の所要時間、数値なら固定秒数）
+    REPLAY_429_RATE=0         429 を注入する割合（0〜1）
+    REPLAY_SEED=0             429 注入・random のシード
+
+使い方:
+    python service_replay.py record nenkin_news --cassette cassettes/nenkin_news
+    python service_replay.py replay nenkin_news --cassette cassettes/nenkin_news --latency 0 --rate-limit 0.1
+    python service_replay.py replay senior_kuchikomi_ranking --cassette ... -- --theme 2
+
+ベンチマーク:
+    python service_replay.py --bench
+"""
+
+import argparse
+import base64
+import hashlib
+import http.client
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+try:
+    import requests
+    import requests.adapters
+    from requests.structures import CaseInsensitiveDict
+except ImportError:
+    requests = None
+
+try:
+    import httplib2
+except ImportError:
+    httplib2 = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+REPLAY_LATENCY = os.environ.get("REPLAY_LATENCY", "recorded")
+REPLAY_429_RATE = float(os.environ.get("REPLAY_429_RATE", "0"))
+REPLAY_SEED = int(os.environ.get("REPLAY_SEED", "0"))
+
+PIPELINES = ("nenkin_news", "nenkin_ranking", "senior_kuchikomi_ranking")
+
+# キーに含めない（毎回変わる・秘密）クエリパラメータ
+VOLATILE_PARAMS = {"key", "access_token", "upload_id", "quotaUser", "prettyPrint", "$.xgafv"}
+# パスに秘密が入る Webhook（ホスト → 残すパスの先頭）
+WEBHOOK_PREFIXES = {"hooks.slack.com": "/services", "discord.com": "/api/webhooks",
+                    "discordapp.com": "/api/webhooks"}
+TOKEN_HOSTS = {"oauth2.googleapis.com", "accounts.google.com", "www.googleapis.com/oauth2"}
+SECRET_FIELDS = {"access_token", "id_token", "refresh_token"}
+# 記録も再生もしない（モデルのダウンロードなど）
+PASSTHROUGH_HOSTS = ("huggingface.co", "cdn-lfs.huggingface.co")
+# 記録時の環境変数のうち、名前だけ残すもの（再生時にダミー値で埋める）
+SECRET_ENV_MARKERS = ("KEY", "TOKEN", "SECRET", "WEBHOOK", "_ID", "PASSWORD", "CLIENT")
+DROP_RESPONSE_HEADERS = {"set-cookie", "content-encoding", "transfer-encoding", "content-length", "alt-svc"}
+
+
+class ReplayMiss(RuntimeError):
+    """カセットに対応する記録がない"""
+
+
+def _endpoint(method: str, url: str) -> str:
+    """照合用のエンドポイント名（Webhook のパスは伏せる）"""
+    parts = urlsplit(url)
+    path = parts.path
+    prefix = WEBHOOK_PREFIXES.get(parts.hostname or "")
+    if prefix and path.startswith(prefix):
+        path = prefix + "/*"
+    return f"{method.upper()} {parts.hostname}{path}"
+
+
+def _query(url: str) -> str:
+    params = [(k, v) for k, v in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+              if k not in VOLATILE_PARAMS]
+    return urlencode(sorted(params))
+
+
+def _body_bytes(body) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    return b""  # ストリーム（アップロードのファイルなど）は本文を照合に使わない
+
+
+def _body_hash(body: bytes) -> str:
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def request_key(method: str, url: str, body=None) -> str:
+    return f"{_endpoint(method, url)}?{_query(url)}#{_body_hash(_body_bytes(body))}"
+
+
+def _is_token_endpoint(url: str) -> bool:
+    parts = urlsplit(url)
+    return any(f"{parts.hostname}{parts.path}".startswith(host) for host in TOKEN_HOSTS)
+
+
+def _redact_token_response(content: bytes) -> bytes:
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content
+    if isinstance(data, dict):
+        for field in SECRET_FIELDS & set(data):
+            data[field] = "replay-token"
+    return json.dumps(data).encode("utf-8")
+
+
+class ServiceReplay:
+    """HTTP の記録・再生
+
+    Args:
+        cassette: カセットのディレクトリ
+        mode: "record" / "replay"
+        latency: 再生時の遅延（"recorded" なら記録時の所要時間、数値なら固定秒数）
+        latency_scale: latency="recorded" のときの倍率
+        rate_limit: 429 を注入する割合（0〜1）
+        retry_after: 注入した 429 の Retry-After（秒）
+        seed: 429 注入のシード
+        passthrough_hosts: 記録も再生もせず本物に送るホスト
+    """
+
+    def __init__(self, cassette, mode: str = "replay", latency=REPLAY_LATENCY, latency_scale: float = 1.0,
+                 rate_limit: float = REPLAY_429_RATE, retry_after: float = 1.0, seed: int = REPLAY_SEED,
+                 passthrough_hosts=PASSTHROUGH_HOSTS):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode は record / replay: {mode}")
+        self.cassette = Path(cassette)
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.passthrough_hosts = tuple(passthrough_hosts)
+        self.meta = {}
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._originals = []
+        self._entries = []
+        if mode == "replay":
+            self._load()
+
+    # ---- カセット ----
+
+    @property
+    def _interactions_path(self) -> Path:
+        return self.cassette / "interactions.jsonl"
+
+    def _load(self):
+        if not self._interactions_path.exists():
+            raise FileNotFoundError(f"カセットがありません: {self._interactions_path}")
+        with open(self._interactions_path, encoding="utf-8") as f:
+            self._entries = [json.loads(line) for line in f if line.strip()]
+        for entry in self._entries:
+            entry["used"] = False
+        meta_path = self.cassette / "meta.json"
+        if meta_path.exists():
+            self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+
+    def save(self, **meta):
+        """記録したやりとりを書き出す（record のみ）"""
+        if self.mode != "record":
+            return
+        self.cassette.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            entries = list(self._entries)
+        with open(self._interactions_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.meta.update(meta, interactions=len(entries), recorded_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        (self.cassette / "meta.json").write_text(json.dumps(self.meta, ensure_ascii=False, indent=2),
+                                                 encoding="utf-8")
+
+    # ---- 記録・再生の本体 ----
+
+    def _passthrough(self, url: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        return host in self.passthrough_hosts
+
+    def _record(self, method: str, url: str, body, status: int, headers: dict, content: bytes, elapsed: float):
+        if _is_token_endpoint(url):
+            content = _redact_token_response(content)
+        parts = urlsplit(url)
+        entry = {
+            "key": request_key(method, url, body),
+            "endpoint": _endpoint(method, url),
+            "url": f"{parts.scheme}://{_endpoint(method, url).split(' ', 1)[1]}",
+            "status": status,
+            "headers": {k.lower(): v for k, v in headers.items() if k.lower() not in DROP_RESPONSE_HEADERS},
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            entry["body"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(content).decode("ascii")
+        with self._lock:
+            self._entries.append(entry)
+            self.stats[f"記録 {urlsplit(url).hostname}"] += 1
+
+    def _find(self, key: str, endpoint: str) -> dict:
+        # 呼び出し側で self._lock を取っていること
+        for field, value in (("key", key), ("endpoint", endpoint)):
+            last = None
+            for entry in self._entries:
+                if entry[field] != value:
+                    continue
+                if not entry["used"]:
+                    entry["used"] = True
+                    return entry
+                last = entry
+            if last is not None:
+                return last
+        return None
+
+    def _replay(self, method: str, url: str, body) -> tuple:
+        """(ステータス, ヘッダー, 本文, 遅延秒数) を返す"""
+        host = urlsplit(url).hostname
+        with self._lock:
+            if self.rate_limit and not _is_token_endpoint(url) and self._rng.random() < self.rate_limit:
+                self.stats[f"429注入 {host}"] += 1
+                error = {"error": {"code": 429, "message": "Resource has been exhausted (replay)",
+                                   "status": "RESOURCE_EXHAUSTED"}}
+                return 429, {"content-type": "application/json", "retry-after": str(self.retry_after)}, \
+                    json.dumps(error).encode("utf-8"), 0.0
+            entry = self._find(request_key(method, url, body), _endpoint(method, url))
+            if entry is None:
+                self.stats[f"記録なし {host}"] += 1
+                raise ReplayMiss(f"カセットに記録がありません: {_endpoint(method, url)}")
+            self.stats[f"再生 {host}"] += 1
+
+        if "body_b64" in entry:
+            content = base64.b64decode(entry["body_b64"])
+        else:
+            content = entry.get("body", "").encode("utf-8")
+        if self.latency == "recorded":
+            delay = entry.get("elapsed", 0.0) * self.latency_scale
+        else:
+            delay = float(self.latency)
+        return entry["status"], dict(entry.get("headers", {})), content, delay
+
+    def _handle(self, method: str, url: str, body, send):
+        """send() -> (ステータス, ヘッダー, 本文, 元のレスポンス) を記録・再生で包む"""
+        if self._passthrough(url):
+            return None
+        if self.mode == "replay":
+            status, headers, content, delay = self._replay(method, url, body)
+            if delay > 0:
+                time.sleep(delay)
+            return status, headers, content, None
+        start = time.perf_counter()
+        status, headers, content, original = send()
+        self._record(method, url, body, status, headers, content, time.perf_counter() - start)
+        return status, headers, content, original
+
+    # ---- 送信口の差し替え ----
+
+    def _patch(self, owner, name, replacement):
+        self._originals.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def install(self):
+        """requests / httplib2 / httpx の送信口を差し替える（インストールされているものだけ）"""
+        replay = self
+
+        if requests is not None:
+            original_send = requests.adapters.HTTPAdapter.send
+
+            def adapter_send(adapter, request, **kwargs):
+                def send():
+                    response = original_send(adapter, request, **kwargs)
+                    return response.status_code, dict(response.headers), response.content, response
+                result = replay._handle(request.method, request.url, request.body, send)
+                if result is None:
+                    return original_send(adapter, request, **kwargs)
+                status, headers, content, original = result
+                if original is not None:
+                    return original
+                response = requests.Response()
+                response.status_code = status
+                response.reason = http.client.responses.get(status, "")
+                response.headers = CaseInsensitiveDict(headers)
+                response._content = content
+                response.url = request.url
+                response.request = request
+                response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+                response.connection = adapter
+                return response
+
+            self._patch(requests.adapters.HTTPAdapter, "send", adapter_send)
+
+        if httplib2 is not None:
+            original_request = httplib2.Http.request
+
+            def http_request(http, uri, method="GET", body=None, headers=None, *args, **kwargs):
+                def send():
+                    response, content = original_request(http, uri, method, body, headers, *args, **kwargs)
+                    return response.status, dict(response), content, (response, content)
+                result = replay._handle(method, uri, body, send)
+                if result is None:
+                    return original_request(http, uri, method, body, headers, *args, **kwargs)
+                status, headers_out, content, original = result
+                if original is not None:
+                    return original
+                info = {k: v for k, v in headers_out.items() if k != "status"}
+                info["status"] = str(status)
+                return httplib2.Response(info), content
+
+            self._patch(httplib2.Http, "request", http_request)
+
+        if httpx is not None:
+            original_client_send = httpx.Client.send
+
+            def client_send(client, request, **kwargs):
+                def send():
+                    response = original_client_send(client, request, **kwargs)
+                    response.read()
+                    return response.status_code, dict(response.headers), response.content, response
+                body = request.read() if hasattr(request, "read") else None
+                result = replay._handle(request.method, str(request.url), body, send)
+                if result is None:
+                    return original_client_send(client, request, **kwargs)
+                status, headers, content, original = result
+                if original is not None:
+                    return original
+                return httpx.Response(status, headers=headers, content=content, request=request)
+
+            self._patch(httpx.Client, "send", client_send)
+
+        # google.generativeai は既定が gRPC なので、REST（requests）に切り替えて捕まえる
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            genai = None
+        if genai is not None:
+            original_configure = genai.configure
+
+            def configure(*args, **kwargs):
+                kwargs.setdefault("transport", "rest")
+                return original_configure(*args, **kwargs)
+
+            self._patch(genai, "configure", configure)
+        return self
+
+    def uninstall(self):
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        self.save()
+
+    def summary(self) -> str:
+        with self._lock:
+            items = sorted(self.stats.items())
+        return "\n".join(f"  {name}: {count}回" for name, count in items) or "  （通信なし）"
+
+
+def dummy_service_account_key() -> str:
+    """再生用のサービスアカウント鍵（形式だけ正しい使い捨ての鍵。トークン取得も再生される）"""
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode("ascii")
+    except ImportError:
+        import rsa as pyrsa
+        _, private_key = pyrsa.newkeys(2048)
+        pem = private_key.save_pkcs1().decode("ascii")
+    return json.dumps({
+        "type": "service_account", "project_id": "replay", "private_key_id": "replay",
+        "private_key": pem, "client_email": "replay@replay.iam.gserviceaccount.com", "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    })
+
+
+def run_pipeline(name: str, argv: list, replay: ServiceReplay, warm: bool = False, seed: int = REPLAY_SEED):
+    """パイプラインの main() を記録・再生つきで実行
+
+    Args:
+        name: nenkin_news / nenkin_ranking / senior_kuchikomi_ranking
+        argv: パイプラインに渡す引数
+        warm: True なら TTS・Drive のキャッシュとチェックポイントをふだんの場所のまま使う
+            （False なら毎回空の一時ディレクトリで、キャッシュなしの実行を測る）
+    """
+    env = {"USE_MODAL_GPU": "false"}  # エンコードはローカルの ffmpeg
+    if replay.mode == "record":
+        names = sorted(k for k in os.environ if k.isupper() and any(m in k for m in SECRET_ENV_MARKERS))
+        replay.meta.update(pipeline=name, argv=argv, env_names=names)
+    else:
+        # 記録時にあった秘密の環境変数はダミー値で埋める（値は記録していない）
+        for env_name in replay.meta.get("env_names", []):
+            if not os.environ.get(env_name):
+                env[env_name] = "replay-dummy"
+        if not os.environ.get("GOOGLE_SERVICE_ACCOUNT_KEY"):
+            env["GOOGLE_SERVICE_ACCOUNT_KEY"] = dummy_service_account_key()
+
+    with tempfile.TemporaryDirectory(prefix="replay-") as tmp:
+        if not warm:
+            env.update(TTS_CACHE_DIR=f"{tmp}/tts", DRIVE_CACHE_DIR=f"{tmp}/drive", PIPELINE_RUNS_DIR=f"{tmp}/runs")
+        saved_env = {k: os.environ.get(k) for k in env}
+        saved_argv = sys.argv
+        os.environ.update(env)
+        sys.argv = [f"{name}.py"] + list(argv)
+        random.seed(seed)
+
+        start = time.perf_counter()
+        status = "成功"
+        try:
+            with replay:
+                # 環境変数を読み込み時に見るので、差し替えたあとで import する
+                module = importlib.import_module(name)
+                module.main()
+        except SystemExit as e:
+            status = f"終了コード {e.code}"
+        except Exception as e:
+            status = f"エラー: {type(e).__name__}: {e}"
+        finally:
+            sys.argv = saved_argv
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        elapsed = time.perf_counter() - start
+
+    print(f"\n[{replay.mode}] {name}: {status}（{elapsed:.1f}秒）")
+    print(replay.summary())
+    return elapsed
+
+
+def run_benchmark(lines: int = 40, latency: float = 0.05):
+    """Fish Audio の代用サーバーとの通信を記録し、サーバーを止めてから再生する"""
+    from fish_audio_client import FakeFishAudioServer, FishAudioClient
+    from tts_cache import TTSCache
+
+    jobs = [(f"セリフ{i}です。", ("voice-katsumi", "voice-hiroshi")[i % 2]) for i in range(lines)]
+
+    def synthesize(url):
+        client = FishAudioClient("fake", api_url=url, max_workers=4, requests_per_minute=6000,
+                                 cache=TTSCache(), sleep=lambda s: time.sleep(min(s, 0.05)), verbose=False)
+        try:
+            start = time.perf_counter()
+            results = client.map(jobs)
+            return results, time.perf_counter() - start, client.rate_limited
+        finally:
+            client.close()
+
+    with tempfile.TemporaryDirectory() as cassette:
+        with FakeFishAudioServer(latency=latency) as server:
+            url = server.url
+            with ServiceReplay(cassette, "record", passthrough_hosts=()):
+                recorded, elapsed, _ = synthesize(url)
+        print(f"記録（代用サーバーあり）: {elapsed:.2f}秒, {sum(r is not None for r in recorded)}/{lines}件")
+
+        # ここから先はサーバーが止まっている
+        for label, options in (("再生（記録時の遅延）", {}),
+                               ("再生（遅延なし）", {"latency": 0}),
+                               ("再生（遅延なし + 429を20%注入）", {"latency": 0, "rate_limit": 0.2, "retry_after": 0.01})):
+            replay = ServiceReplay(cassette, "replay", passthrough_hosts=(), **options)
+            with replay:
+                results, elapsed, limited = synthesize(url)
+            same = results == recorded
+            print(f"{label}: {elapsed:.2f}秒, 429={limited}回, 記録と{'一致 ✓' if same else '不一致 ✗'}")
+
+        # 429 の位置はシードで決まる
+        counts = []
+        for _ in range(2):
+            replay = ServiceReplay(cassette, "replay", latency=0, rate_limit=0.2, seed=7, passthrough_hosts=())
+            with replay:
+                for text, voice in jobs[:20]:
+                    requests.post(url, json={"text": text, "reference_id": voice, "format": "wav"}, timeout=5)
+            counts.append(sum(v for k, v in replay.stats.items() if k.startswith("429")))
+        print(f"同じシードでの429注入回数: {counts} {'✓ 再現' if counts[0] == counts[1] else '✗'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="外部サービスの記録・再生")
+    parser.add_argument("mode", nargs="?", choices=["record", "replay"])
+    parser.add_argument("pipeline", nargs="?", choices=PIPELINES)
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="パイプラインに渡す引数（-- のあと）")
+    parser.add_argument("--cassette", help="カセットのディレクトリ（既定: cassettes/<pipeline>）")
+    parser.add_argument("--latency", default=REPLAY_LATENCY, help="recorded または固定秒数")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--rate-limit", type=float, default=REPLAY_429_RATE, help="429 を注入する割合")
+    parser.add_argument("--seed", type=int, default=REPLAY_SEED)
+    parser.add_argument("--warm", action="store_true", help="TTS・Drive キャッシュとチェックポイントを使う")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（代用サーバーで記録・再生）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark()
+    elif args.mode and args.pipeline:
+        pipeline_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+        replay = ServiceReplay(args.cassette or f"cassettes/{args.pipeline}", args.mode,
+                               latency=args.latency, latency_scale=args.latency_scale,
+                               rate_limit=args.rate_limit, seed=args.seed)
+        run_pipeline(args.pipeline, pipeline_args, replay, warm=args.warm, seed=args.seed)
+    else:
+        parser.print_help()
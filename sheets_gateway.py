@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Google スプレッドシートの共通アクセス層（クライアント使い回し + 読み取りキャッシュ + 書き込みまとめ）
+
+ログ記録・使用済みニュース・控室トーク・読み方辞書・コメント処理ログが、それぞれ
+build('sheets', 'v4') → spreadsheets().get（シート存在確認）→ 読み書き を毎回やっていて、
+1回の実行で数十回のAPI呼び出しになり、毎時のコメントジョブでクォータに当たっていた。
+- discovery クライアントは1プロセス1つ
+- シート一覧（タイトル → sheetId）は1スプレッドシートにつき1回だけ取得
+- 読み取りは TTL つきでキャッシュ（同じ範囲を何度読んでもAPIは1回）
+- 追記・更新はキューにためて、flush() で spreadsheets().batchUpdate 1回にまとめる
+  （プロセス終了時にも自動で flush。読み取り前には同じシートの未送信分を先に送る）
+
+オフライン検証用に、メモリ上で動く Sheets API の代用（FakeSheetsService）を同梱。
+
+環境変数:
+    SHEETS_CACHE_TTL=300     読み取りキャッシュの有効期間（秒）
+    SHEETS_FLUSH_ROWS=200    これだけ書き込みがたまったら自動で flush
+
+使い方:
+    sheets = get_sheets_gateway()
+    sheets.ensure_sheet(SPREADSHEET_ID, "実行ログ", headers=["日時", "ステータス"])
+    sheets.append_rows(SPREADSHEET_ID, "実行ログ", [[now, "成功"]])
+    rows = sheets.get_values(SPREADSHEET_ID, "実行ログ!A2:B1000")
+    sheets.flush()
+
+ベンチマーク:
+    python sheets_gateway.py --bench
+"""
+
+import argparse
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+try:
+    from google.oauth2.service_account import Credentials
+    from googleapiclient.discovery import build
+except ImportError:
+    Credentials = None
+    build = None
+
+
+SHEETS_CACHE_TTL = float(os.environ.get("SHEETS_CACHE_TTL", "300"))
+SHEETS_FLUSH_ROWS = int(os.environ.get("SHEETS_FLUSH_ROWS", "200"))
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+def _column_index(letters: str) -> int:
+    """列名（A, B, ..., AA）→ 0始まりの列番号"""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index - 1
+
+
+def split_range(a1_range: str) -> tuple:
+    """"シート名!A2:B10" → (シート名, "A2:B10")"""
+    if "!" not in a1_range:
+        return a1_range.strip("'"), ""
+    sheet, cells = a1_range.rsplit("!", 1)
+    return sheet.strip("'"), cells
+
+
+def parse_cells(cells: str) -> tuple:
+    """"A2:B10" → (開始行, 開始列, 終了行, 終了列)（0始まり、終了は含む。省略は None）"""
+    bounds = []
+    for part in (cells.split(":") + [None])[:2] if cells else []:
+        if part is None:
+            bounds.append((None, None))
+            continue
+        match = re.fullmatch(r"([A-Za-z]*)(\d*)", part)
+        if not match:
+            raise ValueError(f"範囲の形式が不正です: {cells}")
+        letters, digits = match.groups()
+        bounds.append((int(digits) - 1 if digits else None, _column_index(letters) if letters else None))
+    if not bounds:
+        return None, None, None, None
+    (start_row, start_col), (end_row, end_col) = bounds
+    if ":" not in cells:
+        end_row, end_col = start_row, start_col
+    return start_row, start_col, end_row, end_col
+
+
+def _cell_data(value) -> dict:
+    """Python の値 → CellData（valueInputOption=RAW 相当）"""
+    if value is None or value == "":
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def _row_data(rows: list) -> list:
+    return [{"values": [_cell_data(value) for value in row]} for row in rows]
+
+
+class SheetsGateway:
+    """Sheets API の共通アクセス層
+
+    Args:
+        service: build('sheets', 'v4') のクライアント（FakeSheetsService でも可）
+        cache_ttl: 読み取りキャッシュの有効期間（秒）
+        flush_rows: これだけ書き込みがたまったら自動で flush
+    """
+
+    def __init__(self, service, cache_ttl: float = SHEETS_CACHE_TTL, flush_rows: int = SHEETS_FLUSH_ROWS,
+                 clock=time.monotonic):
+        self.service = service
+        self.cache_ttl = cache_ttl
+        self.flush_rows = flush_rows
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._sheet_ids = {}  # spreadsheet_id → {シート名: sheetId}
+        self._values = {}  # (spreadsheet_id, 範囲) → (取得時刻, values)
+        self._pending = {}  # spreadsheet_id → [(シート名, request, 送信後のコールバック), ...]
+        self._pending_rows = 0
+
+    # ===== シート情報 =====
+
+    def sheet_ids(self, spreadsheet_id: str) -> dict:
+        """{シート名: sheetId}（1スプレッドシートにつき1回だけ取得）"""
+        with self._lock:
+            if spreadsheet_id not in self._sheet_ids:
+                spreadsheet = self.service.spreadsheets().get(
+                    spreadsheetId=spreadsheet_id,
+                    fields="sheets.properties(sheetId,title)"
+                ).execute()
+                self._sheet_ids[spreadsheet_id] = {
+                    s["properties"]["title"]: s["properties"]["sheetId"]
+                    for s in spreadsheet.get("sheets", [])
+                }
+            return self._sheet_ids[spreadsheet_id]
+
+    def has_sheet(self, spreadsheet_id: str, title: str) -> bool:
+        return title in self.sheet_ids(spreadsheet_id)
+
+    def ensure_sheet(self, spreadsheet_id: str, title: str, headers: list = None) -> bool:
+        """シートがなければ作成（ヘッダー行つき）。作成したら True"""
+        with self._lock:
+            if self.has_sheet(spreadsheet_id, title):
+                return False
+            response = self.service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={"requests": [{"addSheet": {"properties": {"title": title}}}]}
+            ).execute()
+            sheet_id = response["replies"][0]["addSheet"]["properties"]["sheetId"]
+            self._sheet_ids[spreadsheet_id][title] = sheet_id
+            if headers:
+                self.update_values(spreadsheet_id, f"{title}!A1", [headers])
+            return True
+
+    # ===== 読み取り =====
+
+    def get_values(self, spreadsheet_id: str, a1_range: str, ttl: float = None) -> list:
+        """範囲の値（TTL 以内に同じ範囲を読んでいればキャッシュから）"""
+        ttl = self.cache_ttl if ttl is None else ttl
+        sheet, _ = split_range(a1_range)
+        key = (spreadsheet_id, a1_range)
+        with self._lock:
+            # 同じシートへの未送信の書き込みがあれば先に送る（書いた内容を読めるように）
+            if any(pending[0] == sheet for pending in self._pending.get(spreadsheet_id, [])):
+                self.flush()
+            cached = self._values.get(key)
+            if cached is not None and self.clock() - cached[0] < ttl:
+                return cached[1]
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=spreadsheet_id,
+                range=a1_range
+            ).execute()
+            values = result.get("values", [])
+            self._values[key] = (self.clock(), values)
+            return values
+
+    def invalidate(self, spreadsheet_id: str, sheet: str = None):
+        """読み取りキャッシュを破棄（sheet 指定ならそのシートだけ）"""
+        with self._lock:
+            for key in list(self._values):
+                if key[0] == spreadsheet_id and (sheet is None or split_range(key[1])[0] == sheet):
+                    del self._values[key]
+
+    # ===== 書き込み（キューにためて flush でまとめて送信） =====
+
+    def append_rows(self, spreadsheet_id: str, sheet: str, rows: list, on_flushed=None):
+        """シートの末尾に行を追加（flush まで送信しない。送信できたら on_flushed() を呼ぶ）"""
+        if not rows:
+            return
+        with self._lock:
+            sheet_id = self.sheet_ids(spreadsheet_id).get(sheet)
+            if sheet_id is None:
+                raise ValueError(f"シート '{sheet}' がありません（先に ensure_sheet を呼んでください）")
+            self._enqueue(spreadsheet_id, sheet, {
+                "appendCells": {"sheetId": sheet_id, "rows": _row_data(rows), "fields": "userEnteredValue"}
+            }, len(rows), on_flushed)
+
+    def update_values(self, spreadsheet_id: str, a1_range: str, values: list, on_flushed=None):
+        """範囲の左上から値を書き込む（flush まで送信しない。送信できたら on_flushed() を呼ぶ）"""
+        if not values:
+            return
+        sheet, cells = split_range(a1_range)
+        start_row, start_col, _, _ = parse_cells(cells)
+        with self._lock:
+            sheet_id = self.sheet_ids(spreadsheet_id).get(sheet)
+            if sheet_id is None:
+                raise ValueError(f"シート '{sheet}' がありません（先に ensure_sheet を呼んでください）")
+            self._enqueue(spreadsheet_id, sheet, {
+                "updateCells": {
+                    "start": {"sheetId": sheet_id, "rowIndex": start_row or 0, "columnIndex": start_col or 0},
+                    "rows": _row_data(values),
+                    "fields": "userEnteredValue",
+                }
+            }, len(values), on_flushed)
+
+    def _enqueue(self, spreadsheet_id: str, sheet: str, request: dict, rows: int, on_flushed=None):
+        self._pending.setdefault(spreadsheet_id, []).append((sheet, request, on_flushed))
+        self._pending_rows += rows
+        if self._pending_rows >= self.flush_rows:
+            self.flush()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(requests) for requests in self._pending.values())
+
+    def flush(self):
+        """たまった書き込みをスプレッドシートごとに batchUpdate 1回で送信"""
+        with self._lock:
+            while self._pending:
+                spreadsheet_id, pending = next(iter(self._pending.items()))
+                self.service.spreadsheets().batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body={"requests": [request for _, request, _ in pending]}
+                ).execute()
+                del self._pending[spreadsheet_id]
+                for sheet in {sheet for sheet, _, _ in pending}:
+                    self.invalidate(spreadsheet_id, sheet)
+                for _, _, on_flushed in pending:
+                    if on_flushed:
+                        on_flushed()
+            self._pending_rows = 0
+
+    def close(self) -> bool:
+        """プロセス終了時の flush（失敗しても例外は出さない）→ 全件送信できたか"""
+        try:
+            self.flush()
+            return True
+        except Exception as e:
+            print(f"  ⚠ スプレッドシート書き込みエラー（{self.pending_count()}件未送信）: {e}")
+            return False
+
+
+@lru_cache(maxsize=None)
+def _sheets_service(key_json: str):
+    if build is None:
+        raise ImportError("google-api-python-client が必要です")
+    creds = Credentials.from_service_account_info(json.loads(key_json), scopes=SHEETS_SCOPES)
+    return build("sheets", "v4", credentials=creds, cache_discovery=False)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_sheets_gateway() -> SheetsGateway:
+    """プロセス共通の SheetsGateway（GOOGLE_SERVICE_ACCOUNT_KEY で認証、終了時に自動 flush）"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            key_json = os.environ.get("GOOGLE_SERVICE_ACCOUNT_KEY")
+            if not key_json:
+                raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY が設定されていません")
+            _gateway = SheetsGateway(_sheets_service(key_json))
+            atexit.register(_gateway.close)
+        return _gateway
+
+
+def flush_sheets() -> bool:
+    """共通の SheetsGateway にたまった書き込みを今すぐ送信 → 全件送信できたか（未作成なら何もしない）"""
+    if _gateway is None:
+        return True
+    return _gateway.close()
+
+
+class _Request:
+    def __init__(self, func):
+        self._func = func
+
+    def execute(self):
+        return self._func()
+
+
+class FakeSheetsService:
+    """Sheets API の代用（メモリ上、API呼び出し回数を数える）
+
+    spreadsheets().get / batchUpdate（addSheet, appendCells, updateCells）と
+    values().get / append / update に対応。
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.books = {}  # spreadsheet_id → {シート名: {"sheetId": int, "rows": [[...], ...]}}
+        self._lock = threading.Lock()
+
+    def _book(self, spreadsheet_id: str) -> dict:
+        return self.books.setdefault(spreadsheet_id, {})
+
+    def _call(self, func):
+        def run():
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.latency)
+            with self._lock:
+                return func()
+        return _Request(run)
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return _FakeValues(self)
+
+    def get(self, spreadsheetId, fields=None):
+        def run():
+            return {"sheets": [{"properties": {"sheetId": sheet["sheetId"], "title": title}}
+                               for title, sheet in self._book(spreadsheetId).items()]}
+        return self._call(run)
+
+    def batchUpdate(self, spreadsheetId, body):
+        def run():
+            book = self._book(spreadsheetId)
+            by_id = {sheet["sheetId"]: sheet for sheet in book.values()}
+            replies = []
+            for request in body["requests"]:
+                if "addSheet" in request:
+                    title = request["addSheet"]["properties"]["title"]
+                    if title in book:
+                        raise ValueError(f"シート '{title}' は既にあります")
+                    book[title] = {"sheetId": len(book) + 1, "rows": []}
+                    replies.append({"addSheet": {"properties": {"sheetId": book[title]["sheetId"], "title": title}}})
+                elif "appendCells" in request:
+                    spec = request["appendCells"]
+                    by_id[spec["sheetId"]]["rows"].extend(_plain_rows(spec["rows"]))
+                    replies.append({})
+                elif "updateCells" in request:
+                    spec = request["updateCells"]
+                    start = spec["start"]
+                    _write_grid(by_id[start["sheetId"]]["rows"], start.get("rowIndex", 0),
+                                start.get("columnIndex", 0), _plain_rows(spec["rows"]))
+                    replies.append({})
+                else:
+                    raise ValueError(f"未対応のリクエスト: {list(request)}")
+            return {"replies": replies}
+        return self._call(run)
+
+    def read(self, spreadsheet_id: str, a1_range: str) -> list:
+        """範囲の値（API の values.get と同じく末尾の空セル・空行は詰める）"""
+        sheet, cells = split_range(a1_range)
+        rows = self._book(spreadsheet_id)[sheet]["rows"]
+        start_row, start_col, end_row, end_col = parse_cells(cells)
+        start_row, start_col = start_row or 0, start_col or 0
+        end_row = len(rows) - 1 if end_row is None else end_row
+        values = []
+        for row in rows[start_row:end_row + 1]:
+            cells_ = row[start_col:None if end_col is None else end_col + 1]
+            while cells_ and cells_[-1] == "":
+                cells_ = cells_[:-1]
+            values.append(cells_)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+
+class _FakeValues:
+    def __init__(self, fake: FakeSheetsService):
+        self.fake = fake
+
+    def get(self, spreadsheetId, range):
+        return self.fake._call(lambda: {"range": range, "values": self.fake.read(spreadsheetId, range)})
+
+    def append(self, spreadsheetId, range, body, valueInputOption="RAW", insertDataOption=None):
+        def run():
+            sheet, _ = split_range(range)
+            self.fake._book(spreadsheetId)[sheet]["rows"].extend(
+                [["" if v is None else v for v in row] for row in body["values"]])
+            return {}
+        return self.fake._call(run)
+
+    def update(self, spreadsheetId, range, body, valueInputOption="RAW"):
+        def run():
+            sheet, cells = split_range(range)
+            start_row, start_col, _, _ = parse_cells(cells)
+            _write_grid(self.fake._book(spreadsheetId)[sheet]["rows"], start_row or 0, start_col or 0,
+                        [["" if v is None else v for v in row] for row in body["values"]])
+            return {}
+        return self.fake._call(run)
+
+
+def _plain_rows(row_data: list) -> list:
+    rows = []
+    for row in row_data:
+        values = []
+        for cell in row.get("values", []):
+            entered = cell.get("userEnteredValue", {})
+            values.append(next(iter(entered.values()), ""))
+        rows.append(values)
+    return rows
+
+
+def _write_grid(rows: list, start_row: int, start_col: int, values: list):
+    for offset, row_values in enumerate(values):
+        index = start_row + offset
+        while len(rows) <= index:
+            rows.append([])
+        row = rows[index]
+        while len(row) < start_col + len(row_values):
+            row.append("")
+        row[start_col:start_col + len(row_values)] = row_values
+
+
+def run_benchmark(comments: int = 30, latency: float = 0.05):
+    """コメントジョブ相当の処理で、従来の呼び出し方とAPI呼び出し回数を比較"""
+    spreadsheet_id = "bench"
+    sheet = "コメント処理ログ"
+    headers = ["コメントID", "処理日時", "投稿者", "いいね済み", "返信通知済み"]
+    rows = [[f"c{i}", "2025-01-01 10:00:00", f"user{i}", "", f"返信案{i}"] for i in range(comments)]
+
+    # 従来: build → get（存在確認）→ 作成 → 1件ずつ append、読み取りも毎回 API
+    baseline = FakeSheetsService(latency=latency)
+    start = time.perf_counter()
+    baseline.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
+    baseline.spreadsheets().batchUpdate(
+        spreadsheetId=spreadsheet_id, body={"requests": [{"addSheet": {"properties": {"title": sheet}}}]}
+    ).execute()
+    baseline.spreadsheets().values().update(spreadsheetId=spreadsheet_id, range=f"{sheet}!A1:E1",
+                                            body={"values": [headers]}).execute()
+    for _ in range(3):
+        baseline.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=f"{sheet}!A:A").execute()
+    for row in rows:
+        baseline.spreadsheets().values().append(spreadsheetId=spreadsheet_id, range=f"{sheet}!A:E",
+                                                body={"values": [row]}).execute()
+    baseline_time = time.perf_counter() - start
+    print(f"従来: API {baseline.calls}回, {baseline_time:.2f}秒")
+
+    fake = FakeSheetsService(latency=latency)
+    gateway = SheetsGateway(fake)
+    start = time.perf_counter()
+    gateway.ensure_sheet(spreadsheet_id, sheet, headers=headers)
+    for _ in range(3):
+        gateway.get_values(spreadsheet_id, f"{sheet}!A:A")
+    for row in rows:
+        gateway.append_rows(spreadsheet_id, sheet, [row])
+    gateway.flush()
+    elapsed = time.perf_counter() - start
+    print(f"ゲートウェイ: API {fake.calls}回, {elapsed:.2f}秒")
+
+    assert fake.read(spreadsheet_id, f"{sheet}!A1:E") == baseline.read(spreadsheet_id, f"{sheet}!A1:E")
+    # 書き込み後の読み取りは最新の内容を返す
+    ids = [row[0] for row in gateway.get_values(spreadsheet_id, f"{sheet}!A:A")[1:]]
+    assert ids == [row[0] for row in rows]
+    print("✓ 書き込み結果・読み取り結果とも従来方式と一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Google スプレッドシートの共通アクセス層")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（ローカルの代用APIで比較）")
+    parser.add_argument("--comments", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="代用APIの1呼び出しの遅延（秒）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(comments=args.comments, latency=args.latency)
+    else:
+        parser.print_help()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静止画の動画化（1枚につき1回だけ書き出し、表示時間は concat リストで指定）
+
+セリフごとに1枚の絵を出すだけの動画で、同じPNGを (表示秒数 × 30) 回ディスクに保存し、
+ffmpeg がそれを全部デコードしていた（10分で約18,000枚）。シーンごとに -loop 1 で
+別々の mp4 を作ってから結合する実装も、静止画を毎フレーム読み直している。
+- 同じ絵は1回だけ保存し（内容のハッシュで重複を除く）、ffconcat リストに表示時間を書く
+- ffmpeg は1回だけ起動して、出力側で -r により一定フレームレートにする（複製はメモリ上）
+- 音声は1本の音声ファイル、またはシーンごとの音声（足りない分は無音で埋める）
+
+使い方:
+    segments = [StillSegment(frame, duration=3.2), StillSegment("op.png", 5.0, audio="voice_00.mp3")]
+    render_stills(segments, "output.mp4", fps=30, audio_path="combined.wav")
+
+ベンチマーク:
+    python still_video.py --bench
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+
+AUDIO_SAMPLE_RATE = 44100
+
+
+class StillSegment:
+    """静止画1枚分
+
+    Args:
+        image: PIL.Image または画像ファイルのパス
+        duration: 表示秒数
+        audio: このシーンの音声ファイル（シーンごとに音声を付ける場合。なければ無音）
+    """
+
+    def __init__(self, image, duration: float, audio: Optional[str] = None):
+        self.image = image
+        self.duration = duration
+        self.audio = str(audio) if audio else None
+
+
+def _image_digest(image) -> str:
+    if isinstance(image, Image.Image):
+        h = hashlib.sha1(f"{image.mode}{image.size}".encode())
+        h.update(image.tobytes())
+        return h.hexdigest()
+    return "file:" + str(Path(image).resolve())
+
+
+def write_still_timeline(segments: list, work_dir, image_format: str = "png") -> tuple:
+    """重複を除いた静止画と ffconcat リストを書き出す → (リストのパス, 書き出した枚数)"""
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    files = {}  # 画像のハッシュ → パス
+    written = 0
+    lines = ["ffconcat version 1.0"]
+    last = None
+    for segment in segments:
+        if segment.duration <= 0:
+            continue
+        digest = _image_digest(segment.image)
+        path = files.get(digest)
+        if path is None:
+            if isinstance(segment.image, Image.Image):
+                path = work_dir / f"still_{len(files):04d}.{image_format}"
+                segment.image.save(path)
+                written += 1
+            else:
+                path = Path(segment.image).resolve()
+            files[digest] = path
+        escaped = str(path).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+        lines.append(f"duration {segment.duration:.6f}")
+        last = escaped
+    if last is None:
+        raise ValueError("表示する静止画がありません")
+    # concat demuxer は最後の duration を無視するので、最後の絵をもう一度並べる
+    lines.append(f"file '{last}'")
+
+    list_path = work_dir / "stills.ffconcat"
+    list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return list_path, written
+
+
+def build_stills_command(list_path, segments: list, output_path, fps: int = 30, audio_path=None,
+                         size: tuple = None, preset: str = "fast", crf: int = 23,
+                         audio_bitrate: str = "192k") -> list:
+    """ffmpeg のコマンドを作る（音声は audio_path 1本、またはシーンごとの segment.audio）"""
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    filters = []
+    audio_map = None
+
+    if audio_path:
+        cmd += ["-i", str(audio_path)]
+        audio_map = "1:a"
+    elif any(segment.audio for segment in segments):
+        # シーンごとの音声を表示時間ちょうどに切りそろえて（足りなければ無音を足して）つなぐ
+        labels = []
+        input_index = 1
+        for i, segment in enumerate(s for s in segments if s.duration > 0):
+            fmt = f"aresample={AUDIO_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo"
+            if segment.audio and os.path.exists(segment.audio):
+                cmd += ["-i", str(segment.audio)]
+                filters.append(f"[{input_index}:a]{fmt},apad,atrim=0:{segment.duration:.6f},"
+                               f"asetpts=N/SR/TB[a{i}]")
+                input_index += 1
+            else:
+                filters.append(f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl=stereo,atrim=0:{segment.duration:.6f},"
+                               f"{fmt}[a{i}]")
+            labels.append(f"[a{i}]")
+        filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[aout]")
+        audio_map = "[aout]"
+
+    video_filter = "format=yuv420p"
+    if size:
+        video_filter = (f"scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease,"
+                        f"pad={size[0]}:{size[1]}:(ow-iw)/2:(oh-ih)/2,setsar=1,{video_filter}")
+    filters.insert(0, f"[0:v]{video_filter}[vout]")
+
+    cmd += ["-filter_complex", ";".join(filters), "-map", "[vout]"]
+    if audio_map:
+        cmd += ["-map", audio_map, "-c:a", "aac", "-b:a", audio_bitrate]
+    # concat demuxer は最後に並べ直した絵の分だけ長くなるので、表示時間の合計で打ち切る
+    total = sum(segment.duration for segment in segments if segment.duration > 0)
+    cmd += ["-r", str(fps), "-c:v", "libx264", "-preset", preset, "-tune", "stillimage",
+            "-crf", str(crf), "-pix_fmt", "yuv420p", "-t", f"{total:.6f}"]
+    if audio_path:
+        cmd.append("-shortest")
+    cmd.append(str(output_path))
+    return cmd
+
+
+def render_stills(segments: list, output_path, fps: int = 30, audio_path=None, size: tuple = None,
+                  work_dir=None, preset: str = "fast", crf: int = 23, audio_bitrate: str = "192k",
+                  verbose: bool = True) -> bool:
+    """静止画の並びを1回の ffmpeg で動画にする
+
+    Args:
+        segments: StillSegment のリスト（表示順）
+        output_path: 出力する mp4
+        fps: 出力のフレームレート
+        audio_path: 動画全体の音声（なければ segment.audio をつなぐ）
+        size: (幅, 高さ)。画像の大きさがそろっていない場合に指定
+        work_dir: 静止画・リストの置き場所（省略時は一時ディレクトリ、終わったら削除）
+    """
+    own_dir = work_dir is None
+    work_dir = Path(tempfile.mkdtemp(prefix="stills-") if own_dir else work_dir)
+    try:
+        list_path, written = write_still_timeline(segments, work_dir)
+        total = sum(s.duration for s in segments if s.duration > 0)
+        if verbose:
+            print(f"    [静止画] {len(segments)}シーン / 書き出し{written}枚 / {total:.1f}秒")
+        cmd = build_stills_command(list_path, segments, output_path, fps=fps, audio_path=audio_path,
+                                   size=size, preset=preset, crf=crf, audio_bitrate=audio_bitrate)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"    ❌ ffmpegエラー: {result.stderr[-500:]}")
+            return False
+        return True
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_benchmark(lines: int = 60, seconds_per_line: float = 5.0, fps: int = 30):
+    """1フレーム1枚のPNGを書き出す方式と、重複なしの書き出しを比較（ffmpeg があればエンコードも）"""
+    from PIL import ImageDraw
+
+    frames = []
+    for i in range(lines):
+        image = Image.new("RGB", (1280, 720), (30 + i % 40, 40, 70))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((80, 520, 1200, 680), fill=(250, 250, 250))
+        draw.text((120, 580), f"line {i}", fill=(0, 0, 0))
+        frames.append(image)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_dir = Path(tmp) / "old"
+        old_dir.mkdir()
+        start = time.perf_counter()
+        count = 0
+        for frame in frames:
+            for _ in range(int(seconds_per_line * fps)):
+                frame.save(old_dir / f"frame_{count:05d}.png")
+                count += 1
+        old_time = time.perf_counter() - start
+        old_bytes = sum(p.stat().st_size for p in old_dir.iterdir())
+        print(f"従来（毎フレームPNG）: {count}枚 {old_bytes / 1024 / 1024:.0f}MB, 書き出し {old_time:.1f}秒")
+        shutil.rmtree(old_dir)
+
+        segments = [StillSegment(frame, seconds_per_line) for frame in frames]
+        new_dir = Path(tmp) / "new"
+        start = time.perf_counter()
+        list_path, written = write_still_timeline(segments, new_dir)
+        new_time = time.perf_counter() - start
+        new_bytes = sum(p.stat().st_size for p in new_dir.iterdir())
+        print(f"静止画タイムライン: {written}枚 {new_bytes / 1024 / 1024:.1f}MB, 書き出し {new_time:.2f}秒")
+
+        if shutil.which("ffmpeg"):
+            output = Path(tmp) / "stills.mp4"
+            start = time.perf_counter()
+            ok = render_stills(segments, output, fps=fps, work_dir=Path(tmp) / "render", verbose=False)
+            print(f"エンコード（1回の ffmpeg）: {time.perf_counter() - start:.1f}秒 {'✓' if ok else '✗'}")
+        else:
+            print("（ffmpeg がないのでエンコードは省略）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="静止画の動画化")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク")
+    parser.add_argument("--lines", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines)
+    else:
+        parser.print_help()
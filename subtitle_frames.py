@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+動画フレームからの字幕読み取り（字幕帯の切り出し + 知覚ハッシュで重複除去 + まとめてOCR）
+
+3秒ごとのフレームを1枚ずつ Gemini Vision に投げていたが、同じ字幕が何フレームも続くので
+ほとんどの呼び出しは前のフレームと同じ結果を返すだけだった。
+- フレームを字幕帯（画面下部）だけに切り出し、差分ハッシュ（dHash）が直前に採用した
+  フレームとほぼ同じなら捨てる（字幕が変わったフレームだけ残る）
+- 残ったフレームは複数枚を1リクエストにまとめて読み取る（結果は画像の順番のJSON配列）
+- 読み取った字幕はハッシュ集合で完全一致を、直近の字幕との類似度で表記ゆれ・途中表示を
+  まとめる（長い方を残す）
+
+環境変数:
+    SUBTITLE_OCR_BATCH=8        1リクエストにまとめる画像数
+    FRAME_HASH_THRESHOLD=6      これ以下のハミング距離は同じ字幕とみなす（256ビット中）
+
+使い方:
+    texts = extract_subtitles(frame_paths, ocr_batch)   # ocr_batch(list[bytes]) -> list[str]
+
+ベンチマーク:
+    python subtitle_frames.py --bench
+"""
+
+import argparse
+import difflib
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+import unicodedata
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+SUBTITLE_OCR_BATCH = int(os.environ.get("SUBTITLE_OCR_BATCH", "8"))
+FRAME_HASH_THRESHOLD = int(os.environ.get("FRAME_HASH_THRESHOLD", "6"))
+SUBTITLE_BAND = (0.65, 1.0)  # 字幕帯（画面の高さに対する上端・下端の割合）
+NO_SUBTITLE = "なし"
+
+
+def crop_subtitle_band(image: Image.Image, band: tuple = SUBTITLE_BAND) -> Image.Image:
+    """画面下部の字幕帯だけを切り出す"""
+    width, height = image.size
+    top, bottom = int(height * band[0]), int(height * band[1])
+    return image.crop((0, top, width, max(bottom, top + 1)))
+
+
+def dhash(image: Image.Image, width: int = 32, height: int = 8) -> int:
+    """差分ハッシュ（隣り合う画素の明暗の並び、width*height ビット）
+
+    字幕帯は横長なので横方向を細かく取る（正方形の8x8だと1文字違いを拾えない）
+    """
+    small = image.convert("L").resize((width + 1, height), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(height):
+        offset = row * (width + 1)
+        for col in range(width):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def select_caption_frames(frame_paths: list, band: tuple = SUBTITLE_BAND,
+                          threshold: int = FRAME_HASH_THRESHOLD) -> list:
+    """字幕帯が直前に採用したフレームと変わったフレームだけ残す → [(フレーム番号, 字幕帯の画像), ...]"""
+    selected = []
+    last_hash = None
+    for index, path in enumerate(frame_paths):
+        with Image.open(path) as image:
+            strip = crop_subtitle_band(image.convert("RGB"), band)
+        frame_hash = dhash(strip)
+        if last_hash is not None and hamming(frame_hash, last_hash) <= threshold:
+            continue
+        last_hash = frame_hash
+        selected.append((index, strip))
+    return selected
+
+
+def encode_jpeg(image: Image.Image, quality: int = 85) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def normalize_caption(text: str) -> str:
+    """比較用の正規化（全角半角・空白・記号の違いを無視）"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"[\s、。,.!?！？「」『』…・ー\-]", "", text)
+
+
+def merge_captions(texts: list, similarity: float = 0.85, window: int = 3) -> list:
+    """字幕の重複をまとめる（出てきた順）
+
+    - 正規化して同じものはハッシュ集合で除外
+    - 直近 window 件と似ている（類似度 similarity 以上、または一方が他方の書き出し）ものは
+      同じ字幕の読み違い・途中表示とみなし、長い方を残す
+    """
+    merged = []
+    seen = set()
+    for text in texts:
+        text = (text or "").strip()
+        key = normalize_caption(text)
+        if not key or text == NO_SUBTITLE or key in seen:
+            continue
+        seen.add(key)
+
+        duplicate = False
+        for k in range(max(0, len(merged) - window), len(merged)):
+            other = normalize_caption(merged[k])
+            if key.startswith(other) or other.startswith(key) or \
+                    difflib.SequenceMatcher(None, key, other, autojunk=False).ratio() >= similarity:
+                if len(key) > len(other):
+                    merged[k] = text
+                duplicate = True
+                break
+        if not duplicate:
+            merged.append(text)
+    return merged
+
+
+def extract_subtitles(frame_paths: list, ocr_batch, batch_size: int = SUBTITLE_OCR_BATCH,
+                      band: tuple = SUBTITLE_BAND, threshold: int = FRAME_HASH_THRESHOLD,
+                      verbose: bool = True) -> list:
+    """フレームから字幕を読み取り、重複をまとめたリストを返す
+
+    Args:
+        frame_paths: フレーム画像のパス（時間順）
+        ocr_batch: ocr_batch(list[JPEG bytes]) -> list[str]（画像ごとの字幕、字幕なしは "なし"）
+        batch_size: 1リクエストにまとめる画像数
+    """
+    selected = select_caption_frames(frame_paths, band=band, threshold=threshold)
+    if verbose:
+        print(f"  [字幕] {len(frame_paths)}フレーム → 字幕が変わったフレーム {len(selected)}枚")
+
+    texts = []
+    batch_size = max(1, batch_size)
+    for start in range(0, len(selected), batch_size):
+        batch = selected[start:start + batch_size]
+        images = [encode_jpeg(strip) for _, strip in batch]
+        try:
+            results = ocr_batch(images)
+        except Exception as e:
+            print(f"  ⚠ 字幕読み取りエラー（フレーム {batch[0][0]}〜{batch[-1][0]}）: {e}")
+            if len(batch) == 1:
+                continue
+            # まとめて捨てず、1枚ずつ読み直す（失敗した画像だけ飛ばす）
+            results = []
+            for (index, _), image in zip(batch, images):
+                try:
+                    results.extend(ocr_batch([image]))
+                except Exception as e:
+                    print(f"  ⚠ 字幕読み取りエラー（フレーム {index}）: {e}")
+        texts.extend(results)
+        if verbose:
+            print(f"  [字幕] {min(start + batch_size, len(selected))}/{len(selected)}枚 読み取り完了")
+
+    return merge_captions(texts)
+
+
+def run_benchmark(captions: int = 40, hold_frames: int = 4, batch_size: int = SUBTITLE_OCR_BATCH,
+                  latency: float = 0.05):
+    """字幕つきの合成フレームで、1枚ずつ読む方式と比較（OCRは正解を返す代用）"""
+    font = ImageFont.load_default(size=28)
+    subjects = ["My husband", "The pension office", "Our neighbour", "My daughter", "The bank clerk"]
+    verbs = ["retired early", "sent a letter", "asked about savings", "changed the plan",
+             "forgot the form", "called again", "was surprised", "made a mistake"]
+    truth = {}  # フレーム番号 → 字幕
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for c in range(captions):
+            caption = f"{subjects[c % len(subjects)]} {verbs[c // len(subjects) % len(verbs)]} at {c + 60}"
+            for h in range(hold_frames):
+                # 背景（人物など）はフレームごとに動き、字幕帯だけが字幕ごとに変わる
+                image = Image.new("RGB", (640, 360), (40 + (c * 7 + h * 13) % 120, 60, 90))
+                draw = ImageDraw.Draw(image)
+                draw.ellipse((200 + h * 10, 40, 320 + h * 10, 160), fill=(200, 170, 150))
+                draw.rectangle((0, 270, 640, 360), fill=(0, 0, 0))
+                draw.text((30, 295), caption, fill=(255, 255, 255), font=font)
+                path = os.path.join(tmp, f"frame_{len(paths):04d}.jpg")
+                image.save(path, quality=90)
+                paths.append(path)
+                truth[len(paths) - 1] = caption
+
+        calls = {"single": 0, "batch": 0}
+
+        # 従来: 全フレームを1枚ずつ
+        start = time.perf_counter()
+        baseline = []
+        for index in range(len(paths)):
+            calls["single"] += 1
+            time.sleep(latency)
+            if truth[index] not in baseline:
+                baseline.append(truth[index])
+        baseline_time = time.perf_counter() - start
+
+        # 代用OCR: 採用されたフレームの字幕帯から正解を引く
+        strips = {hashlib.md5(encode_jpeg(strip)).hexdigest(): truth[index]
+                  for index, strip in select_caption_frames(paths)}
+
+        def fake_ocr_batch(images):
+            calls["batch"] += 1
+            time.sleep(latency)
+            return [strips[hashlib.md5(image).hexdigest()] for image in images]
+
+        start = time.perf_counter()
+        merged = extract_subtitles(paths, fake_ocr_batch, batch_size=batch_size, verbose=False)
+        elapsed = time.perf_counter() - start
+
+        print(f"従来: Vision {calls['single']}回, {baseline_time:.2f}秒")
+        print(f"ハッシュ除去+まとめ読み: Vision {calls['batch']}回, {elapsed:.2f}秒（ハッシュ計算込み）")
+        print(f"字幕: {len(merged)}件（正解 {len(baseline)}件）{'✓ 一致' if merged == baseline else '✗ 不一致'}")
+
+    # 読み違い・途中表示のまとめ
+    sample = ["年金の相談です", "年金の相談です。", "年金の相談で", "夫が定年退職して", "夫が定年退職Lて", "なし"]
+    print(f"重複まとめ: {sample} → {merge_captions(sample)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="動画フレームからの字幕読み取り")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（合成フレームで比較）")
+    parser.add_argument("--batch-size", type=int, default=SUBTITLE_OCR_BATCH)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(batch_size=args.batch_size)
+    else:
+        parser.print_help()
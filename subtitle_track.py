@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字幕トラック（字幕画像を事前に作っておき、時刻から表示中の字幕を二分探索で引いて背景に直接合成）
+
+セリフごとに ImageClip を作って1つの CompositeVideoClip に重ねると、MoviePy は毎フレーム
+全クリップについて表示中かどうかを確認・合成するので、セリフが多い台本ほど遅くなる（200行超で顕著）。
+- 字幕画像は RGBA から透明な余白を切り詰め、アルファを掛けた色を事前計算しておく（SubtitleBitmap）
+  背景に直接描いていた字幕は from_drawing で黒・白の背景に描いた差から作る（見た目は直接描いた場合と同じ）
+- 表示区間は開始時刻の配列に対する bisect で O(log n) に引く
+- 同じ字幕が続く間は合成済みのフレームを使い回す（合成は字幕が切り替わったときだけ）
+- 字幕の切り替わりごとに1枚の静止画になるので、still_video で ffmpeg 1回に渡す経路もある
+  （MoviePy を通さない。見た目は同じ画像なので同一）
+
+使い方:
+    track = SubtitleTrack(background, [SubtitleCue(0.0, 2.5, [(bitmap, x, y)]), ...])
+    clip = track.to_clip(duration).with_audio(audio_clip)        # MoviePy で書き出す場合
+    track.render(output_path, duration, audio_path=audio_path)   # 静止画として ffmpeg 1回で書き出す場合
+
+ベンチマーク:
+    python subtitle_track.py --bench
+"""
+
+import argparse
+import bisect
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+class SubtitleBitmap:
+    """合成用に前処理した字幕画像
+
+    Args:
+        image: 字幕画像（RGBA。透明部分は背景が見える）
+    """
+
+    def __init__(self, image: Image.Image):
+        rgba = image.convert("RGBA")
+        bbox = rgba.getchannel("A").getbbox() or (0, 0, 1, 1)
+        pixels = np.asarray(rgba.crop(bbox), dtype=np.uint16)
+        alpha = pixels[:, :, 3:4]
+        self._set(bbox[:2], pixels[:, :, :3] * alpha, 255 - alpha)
+
+    def _set(self, offset: tuple, premultiplied: np.ndarray, inverse_alpha: np.ndarray):
+        self.offset = offset  # 元画像の左上からのずれ
+        self.premultiplied = premultiplied
+        self.inverse_alpha = inverse_alpha
+        self.height, self.width = premultiplied.shape[:2]
+
+    @classmethod
+    def from_drawing(cls, size: tuple, draw_fn) -> "SubtitleBitmap":
+        """RGB 画像に ImageDraw(mode="RGBA") で直接描くのと同じ結果になる字幕
+
+        draw_fn(draw) を黒と白の背景に描き、その差から画素ごとの透明度を求める
+        （Pillow の半透明描画は下地に対して一次式なので、どの背景に合成しても直接描いた場合と同じになる）。
+
+        Args:
+            size: (幅, 高さ)
+            draw_fn: ImageDraw.Draw を受け取って描画する関数
+        """
+        on_black = Image.new("RGB", size, (0, 0, 0))
+        on_white = Image.new("RGB", size, (255, 255, 255))
+        draw_fn(ImageDraw.Draw(on_black, "RGBA"))
+        draw_fn(ImageDraw.Draw(on_white, "RGBA"))
+        black = np.asarray(on_black, dtype=np.int16)
+        white = np.asarray(on_white, dtype=np.int16)
+        inverse_alpha = np.clip(white - black, 0, 255)
+        # 下地が透けずにそのまま残る画素（白と黒の差が 255）の外側を切り詰める
+        mask = Image.fromarray(((inverse_alpha.min(axis=2) < 255) | (black.max(axis=2) > 0)).astype(np.uint8) * 255)
+        x0, y0, x1, y1 = mask.getbbox() or (0, 0, 1, 1)
+        bitmap = cls.__new__(cls)
+        bitmap._set((x0, y0), black[y0:y1, x0:x1].astype(np.uint16) * 255,
+                    inverse_alpha[y0:y1, x0:x1].astype(np.uint16))
+        return bitmap
+
+    def blit(self, frame: np.ndarray, x: int, y: int):
+        """frame（RGB, uint8）の (x, y) に元画像の左上が来るように合成する（はみ出しは切り捨て）"""
+        x += self.offset[0]
+        y += self.offset[1]
+        frame_h, frame_w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, frame_w), min(y + self.height, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        region = frame[y0:y1, x0:x1]
+        blended = (region * self.inverse_alpha[sy:sy + y1 - y0, sx:sx + x1 - x0]
+                   + self.premultiplied[sy:sy + y1 - y0, sx:sx + x1 - x0] + 127) // 255
+        region[:] = blended
+
+
+class SubtitleCue:
+    """表示区間1つ分
+
+    Args:
+        start: 開始秒
+        end: 終了秒（この時刻は含まない）
+        layers: [(SubtitleBitmap, x, y), ...]（下から順に重ねる）
+    """
+
+    def __init__(self, start: float, end: float, layers: list):
+        self.start = start
+        self.end = end
+        self.layers = layers
+
+
+class SubtitleTrack:
+    """背景 + 時刻ごとの字幕
+
+    Args:
+        background: 背景（PIL.Image または (高さ, 幅, 3) の uint8 配列）
+        cues: SubtitleCue のリスト（区間は重ならないこと。開始時刻順に並べ替える）
+    """
+
+    def __init__(self, background, cues: list):
+        self.background = np.ascontiguousarray(np.asarray(
+            background.convert("RGB") if isinstance(background, Image.Image) else background, dtype=np.uint8))
+        self.cues = sorted((c for c in cues if c.end > c.start), key=lambda c: c.start)
+        self._starts = [c.start for c in self.cues]
+        self._last_index = -2
+        self._last_frame = None
+        self.compositions = 0
+
+    @property
+    def size(self) -> tuple:
+        return self.background.shape[1], self.background.shape[0]
+
+    def active_index(self, t: float) -> Optional[int]:
+        """時刻 t に表示中の区間の番号（なければ None）"""
+        i = bisect.bisect_right(self._starts, t) - 1
+        if i >= 0 and t < self.cues[i].end:
+            return i
+        return None
+
+    def compose(self, index: Optional[int]) -> np.ndarray:
+        """区間 index の字幕を背景に合成したフレーム（None なら背景だけ）"""
+        frame = self.background.copy()
+        if index is not None:
+            for bitmap, x, y in self.cues[index].layers:
+                bitmap.blit(frame, x, y)
+        self.compositions += 1
+        return frame
+
+    def frame(self, t: float) -> np.ndarray:
+        """時刻 t のフレーム（同じ区間が続く間は前回の合成結果を返す）"""
+        index = self.active_index(t)
+        if index != self._last_index:
+            self._last_frame = self.compose(index)
+            self._last_index = index
+        return self._last_frame
+
+    def to_clip(self, duration: float):
+        """MoviePy の VideoClip にする"""
+        from moviepy import VideoClip
+        return VideoClip(self.frame, duration=duration)
+
+    def still_segments(self, duration: float) -> list:
+        """字幕が切り替わるごとの静止画 → still_video.StillSegment のリスト（字幕のない時間は背景）"""
+        from still_video import StillSegment
+
+        segments = []
+        background = None
+        cursor = 0.0
+        for index, cue in enumerate(self.cues):
+            if cue.start >= duration:
+                break
+            if cue.start > cursor:
+                if background is None:
+                    background = Image.fromarray(self.background)
+                segments.append(StillSegment(background, cue.start - cursor))
+            end = min(cue.end, duration)
+            segments.append(StillSegment(Image.fromarray(self.compose(index)), end - max(cue.start, cursor)))
+            cursor = end
+        if cursor < duration:
+            segments.append(StillSegment(background or Image.fromarray(self.background), duration - cursor))
+        return segments
+
+    def render(self, output_path, duration: float, audio_path=None, fps: int = 30) -> bool:
+        """静止画として ffmpeg 1回で書き出す（MoviePy を通さない）"""
+        from still_video import render_stills
+        return render_stills(self.still_segments(duration), output_path, fps=fps, audio_path=audio_path)
+
+
+def run_benchmark(lines: int = 240, seconds_per_line: float = 4.0, fps: int = 30, sample_seconds: float = 60.0,
+                  size: tuple = (1280, 720)):
+    """CompositeVideoClip にセリフごとの ImageClip を重ねる方式と、フレーム取得の速さを比較"""
+    from moviepy import CompositeVideoClip, ImageClip
+
+    width, height = size
+    background = np.full((height, width, 3), (30, 30, 30), dtype=np.uint8)
+    images = []
+    for i in range(lines):
+        image = Image.new("RGBA", (width, 200), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        draw.rounded_rectangle((200, 20, width - 200, 180), radius=15, fill=(184, 134, 11, 240))
+        draw.text((260, 80), f"line {i}", fill=(255, 255, 255))
+        images.append(image)
+    y = height - 200 - 40
+    times = np.arange(0, min(sample_seconds, lines * seconds_per_line), 1 / fps)
+
+    # 従来: セリフごとの ImageClip を CompositeVideoClip に重ねる
+    bg_clip = ImageClip(background).with_duration(lines * seconds_per_line)
+    clips = [ImageClip(np.array(image)).with_duration(seconds_per_line).with_start(i * seconds_per_line)
+             .with_position(("center", y)) for i, image in enumerate(images)]
+    composite = CompositeVideoClip([bg_clip] + clips, size=size)
+    start = time.perf_counter()
+    old_frames = [composite.get_frame(t) for t in times]
+    old_time = time.perf_counter() - start
+
+    # 字幕トラック
+    start = time.perf_counter()
+    cues = [SubtitleCue(i * seconds_per_line, (i + 1) * seconds_per_line, [(SubtitleBitmap(image), 0, y)])
+            for i, image in enumerate(images)]
+    track = SubtitleTrack(background, cues)
+    prepare = time.perf_counter() - start
+    clip = track.to_clip(lines * seconds_per_line)
+    start = time.perf_counter()
+    new_frames = [clip.get_frame(t) for t in times]
+    new_time = time.perf_counter() - start
+
+    diff = max(int(np.abs(a.astype(int) - b.astype(int)).max()) for a, b in zip(old_frames, new_frames))
+    print(f"{lines}行, {len(times)}フレーム（{size[0]}x{size[1]}）")
+    print(f"従来（CompositeVideoClip）: {old_time:.2f}秒（{len(times) / old_time:.0f} fps）")
+    print(f"字幕トラック: {new_time:.2f}秒（{len(times) / new_time:.0f} fps）, 前処理 {prepare:.2f}秒, "
+          f"合成 {track.compositions}回, 画素の最大差 {diff}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="字幕トラック")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（CompositeVideoClip と比較）")
+    parser.add_argument("--lines", type=int, default=240)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines)
+    else:
+        parser.print_help()
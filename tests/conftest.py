@@ -0,0 +1,280 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# リポジトリ直下のモジュールを import できるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeClock:
+    """仮想時計（sleep で進む。レート制限やTTLの窓を実時間なしで確かめる）"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.now += max(0.0, seconds)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+# ===== tts_scheduler =====
+
+TTS_PERIOD = 0.2  # クォータの窓（短くして時間を縮める）
+TTS_QUOTA = 2
+
+
+@pytest.fixture
+def gemini_keys():
+    return [(f"fake-key-{i}", f"KEY_{i}") for i in range(3)]
+
+
+@pytest.fixture
+def dialogue():
+    return [{"speaker": "カツミ", "text": f"セリフ{i}"} for i in range(12)]
+
+
+@pytest.fixture
+def fake_tts(clock):
+    """スケジューラーと同じ仮想時計・同じ窓でクォータを数える FakeTTS"""
+    from tts_scheduler import FakeTTS
+    return FakeTTS(quota=TTS_QUOTA, latency=0.0, period=TTS_PERIOD, clock=clock)
+
+
+@pytest.fixture
+def tts_scheduler(gemini_keys, clock):
+    """1並列のスケジューラー（キーを借りた時刻と FakeTTS が呼ばれた時刻が一致する）"""
+    from tts_scheduler import TTSScheduler
+    return TTSScheduler(gemini_keys, requests_per_minute=TTS_QUOTA, period=TTS_PERIOD, max_workers=1,
+                        backoff_base=TTS_PERIOD, backoff_max=TTS_PERIOD * 2, verbose=False,
+                        clock=clock, sleep=clock.sleep)
+
+
+# ===== fish_audio_client =====
+
+FISH_VOICES = ["voice-katsumi", "voice-hiroshi"]
+
+
+@pytest.fixture
+def fish_jobs():
+    """(テキスト, ボイスID) のセリフ12件（長さがセリフごとに違う）"""
+    return [(f"セリフ{i}です。" * (i % 3 + 1), FISH_VOICES[i % 2]) for i in range(12)]
+
+
+@pytest.fixture
+def fish_server():
+    """待ち時間なしの Fish Audio 代用サーバー（quota / period はテストで書き換える）"""
+    pytest.importorskip("requests")
+    from fish_audio_client import FakeFishAudioServer
+    with FakeFishAudioServer(latency=0.0, handshake=0.0) as server:
+        yield server
+
+
+@pytest.fixture
+def fish_client(fish_server):
+    """代用サーバー向けのクライアント（レート制限は実質なし、キャッシュはメモリ上）"""
+    from fish_audio_client import FishAudioClient
+    from tts_cache import TTSCache
+    with FishAudioClient("fake", api_url=fish_server.url, requests_per_minute=6000, burst=10,
+                         cache=TTSCache(), verbose=False) as client:
+        yield client
+
+
+# ===== sheets_gateway =====
+
+@pytest.fixture
+def sheets_service():
+    from sheets_gateway import FakeSheetsService
+    return FakeSheetsService()
+
+
+@pytest.fixture
+def sheets_gateway(sheets_service, clock):
+    """代用サービス向けのゲートウェイ（読み取りキャッシュの期限は仮想時計で数える）"""
+    from sheets_gateway import SheetsGateway
+    return SheetsGateway(sheets_service, clock=clock)
+
+
+# ===== competitor_scanner =====
+
+def publish_videos(data, channel_id, start, count):
+    """代用フィードのチャンネルに新着動画を count 件追加（新しい順の先頭に入る）"""
+    for i in range(start, start + count):
+        data[channel_id].insert(0, {"video_id": f"{channel_id}-{i}", "title": f"動画{i}",
+                                    "published": f"2025-01-01T{i % 24:02d}:00:00+00:00"})
+
+
+class FakePlaylist:
+    """yt-dlp の代用（/videos と同じくショートは返さない。呼ばれた回数を数える）"""
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def __call__(self, channel_url, max_videos):
+        self.calls += 1
+        channel_id = channel_url.rsplit("/", 1)[-1]
+        videos = [v for v in self.data[channel_id] if not v.get("short")]
+        return channel_id, [{"video_id": v["video_id"], "title": v["title"]} for v in videos[:max_videos]]
+
+
+@pytest.fixture
+def video_store(tmp_path):
+    pytest.importorskip("requests")
+    from competitor_scanner import VideoStore
+    return VideoStore(tmp_path / "videos.jsonl")
+
+
+@pytest.fixture
+def feed_data():
+    """チャンネルID → 新しい順の動画（2チャンネル x 5件）"""
+    data = {"UC0": [], "UC1": []}
+    for channel_id in data:
+        publish_videos(data, channel_id, 0, 5)
+    return data
+
+
+@pytest.fixture
+def feed_server(feed_data):
+    """RSSフィードの代用サーバー（フィードに載るのは新しい5件だけ）"""
+    pytest.importorskip("requests")
+    from competitor_scanner import FakeFeedServer
+    server = FakeFeedServer(feed_data, latency=0.0, feed_size=5)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def publish(feed_data):
+    """publish(channel_id, start, count): 代用フィードに新着を追加する"""
+    return lambda channel_id, start, count: publish_videos(feed_data, channel_id, start, count)
+
+
+@pytest.fixture
+def playlist(feed_data):
+    return FakePlaylist(feed_data)
+
+
+@pytest.fixture
+def open_scanner(video_store, tmp_path, feed_server, playlist):
+    """スキャナーを開く関数（呼ぶたびに別の実行として状態ファイルから読み直す）"""
+    from competitor_scanner import ChannelScanner
+
+    def open_scanner():
+        return ChannelScanner(video_store, tmp_path / "channels.json", max_videos=10, max_workers=2,
+                              feed_url=feed_server.url, playlist_fetcher=playlist)
+    return open_scanner
+
+
+# ===== service_replay =====
+
+class EchoServer:
+    """本文とクエリをそのまま JSON で返すローカルサーバー（呼ばれた回数を数える）"""
+
+    def __init__(self):
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, body=b""):
+                server.requests += 1
+                data = json.dumps({"path": self.path.split("?")[0], "n": server.requests,
+                                   "body": body.decode("utf-8")}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Set-Cookie", "session=secret")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply()
+
+            def do_POST(self):
+                self._reply(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def echo_server():
+    server = EchoServer()
+    yield server
+    server.close()
+
+
+# ===== youtube_metadata =====
+
+class RecordingYouTube:
+    """Data API の代用を包み、videos.list に渡された ID の数を記録する"""
+
+    def __init__(self, fake):
+        self._fake = fake
+        self.video_batches = []
+
+    def __getattr__(self, name):
+        return getattr(self._fake, name)
+
+    def videos(self):
+        resource = self._fake.videos()
+        batches = self.video_batches
+
+        class Resource:
+            def list(self, **kwargs):
+                batches.append(len(kwargs["id"].split(",")))
+                return resource.list(**kwargs)
+        return Resource()
+
+
+@pytest.fixture
+def youtube_channels():
+    """ハンドル → (チャンネルID, [(動画ID, タイトル, 再生数), ...])（3チャンネル x 120本、再生数は新しいほど多い）"""
+    return {f"channel{c}": (f"UC{c:04d}", [(f"v{c}_{i}", f"動画{c}-{i}", 1000 * (i + 1)) for i in range(120)])
+            for c in range(3)}
+
+
+@pytest.fixture
+def youtube_fake(youtube_channels):
+    """Data API の代用（videos.list に渡された ID の数を video_batches に記録する）"""
+    from youtube_metadata import FakeYouTubeMetadata
+    return RecordingYouTube(FakeYouTubeMetadata(youtube_channels))
+
+
+@pytest.fixture
+def open_youtube_client(youtube_fake, clock, tmp_path):
+    """tmp_path のキャッシュを使うクライアントを開く関数（呼ぶたびに別の実行としてキャッシュを読み直す）"""
+    from youtube_metadata import YouTubeMetadataClient
+
+    def open_youtube_client():
+        return YouTubeMetadataClient(lambda: youtube_fake, cache_path=tmp_path / "metadata.json", clock=clock)
+    return open_youtube_client
+
+
+@pytest.fixture
+def youtube_client(youtube_fake, clock):
+    """キャッシュファイルなしのクライアント"""
+    from youtube_metadata import YouTubeMetadataClient
+    return YouTubeMetadataClient(lambda: youtube_fake, clock=clock)
@@ -0,0 +1,180 @@
+"""competitor_scanner: VideoStore の索引・旧形式の取り込みと、FakeFeedServer を相手にした差分スキャンの確認"""
+
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+from competitor_scanner import VideoStore
+
+
+def make_videos(prefix, count):
+    """新しい順の動画リスト"""
+    return [{"video_id": f"{prefix}-{i}", "title": f"動画{i}"} for i in reversed(range(count))]
+
+
+def test_add_videos_skips_known_ids(video_store):
+    assert len(video_store.add_videos("a", make_videos("a", 3))) == 3
+    added = video_store.add_videos("a", make_videos("a", 5))
+    assert [v["video_id"] for v in added] == ["a-4", "a-3"]
+    assert video_store.known_ids() == {f"a-{i}" for i in range(5)}
+
+
+def test_find_reads_the_stored_video(video_store):
+    video_store.add_videos("a", make_videos("a", 3))
+    video = video_store.find("a-1")
+    assert video["title"] == "動画1"
+    assert video["channel"] == "a"
+    assert video_store.find("missing") is None
+
+
+def test_mark_used_hides_video_from_unused(video_store):
+    video_store.add_videos("a", make_videos("a", 3))
+    video_store.add_videos("b", make_videos("b", 2))
+    assert video_store.mark_used("a-2")
+    assert not video_store.mark_used("missing")
+
+    unused = video_store.unused_videos()
+    assert [v["video_id"] for v in unused["a"]] == ["a-1", "a-0"]
+    assert [v["video_id"] for v in unused["b"]] == ["b-1", "b-0"]
+
+
+def test_mark_used_checks_the_channel(video_store):
+    video_store.add_videos("a", make_videos("a", 1))
+    assert not video_store.mark_used("a-0", channel_key="b")
+    assert video_store.mark_used("a-0", channel_key="a")
+
+
+def test_unused_videos_newest_first_with_limit(video_store):
+    video_store.add_videos("a", make_videos("a", 3))
+    video_store.add_videos("a", make_videos("a", 6))
+    unused = video_store.unused_videos(limit_per_channel=2)
+    assert [v["video_id"] for v in unused["a"]] == ["a-5", "a-4"]
+
+
+def test_channel_with_everything_used_is_listed_empty(video_store):
+    video_store.add_videos("a", make_videos("a", 1))
+    video_store.mark_used("a-0")
+    assert video_store.unused_videos() == {"a": []}
+
+
+def test_index_picks_up_lines_appended_by_another_store(tmp_path):
+    path = tmp_path / "videos.jsonl"
+    first = VideoStore(path)
+    first.add_videos("a", make_videos("a", 2))
+    assert first.known_ids() == {"a-0", "a-1"}
+
+    other = VideoStore(path)
+    other.add_videos("a", make_videos("a", 3))
+    other.mark_used("a-0")
+
+    assert first.known_ids() == {"a-0", "a-1", "a-2"}
+    assert [v["video_id"] for v in first.unused_videos()["a"]] == ["a-2", "a-1"]
+
+
+def test_incomplete_last_line_is_read_later(tmp_path):
+    path = tmp_path / "videos.jsonl"
+    store = VideoStore(path)
+    store.add_videos("a", make_videos("a", 1))
+    line = json.dumps({"op": "video", "channel": "a", "video_id": "a-9", "title": "書きかけ"}, ensure_ascii=False)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line[:10])
+    assert store.known_ids() == {"a-0"}
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line[10:] + "\n")
+    assert store.known_ids() == {"a-0", "a-9"}
+    assert store.find("a-9")["title"] == "書きかけ"
+
+
+def test_import_legacy_keeps_order_and_used_flags(tmp_path, video_store):
+    legacy_path = tmp_path / "competitor_videos.json"
+    legacy_path.write_text(json.dumps({
+        "channels": {
+            "a": {"last_updated": "2025-01-01T00:00:00", "videos": [
+                {"video_id": "a-2", "title": "新しい", "used": False},
+                {"video_id": "a-1", "title": "使用済み", "used": True},
+                {"video_id": "a-0", "title": "古い"},
+            ]},
+            "b": {"videos": [{"video_id": "b-0", "title": "B"}]},
+        }
+    }, ensure_ascii=False), encoding="utf-8")
+
+    assert video_store.import_legacy(legacy_path) == 4
+    unused = video_store.unused_videos()
+    assert [v["video_id"] for v in unused["a"]] == ["a-2", "a-0"]
+    assert [v["video_id"] for v in unused["b"]] == ["b-0"]
+    assert "used" not in video_store.find("a-1")
+
+    # 2回目は何も増えない
+    assert video_store.import_legacy(legacy_path) == 0
+
+
+@pytest.fixture
+def watch_list(feed_data):
+    return {cid: {"name": cid, "url": f"https://www.youtube.com/{cid}"} for cid in feed_data}
+
+
+def test_scan_uses_feed_and_etag_after_first_run(open_scanner, feed_server, playlist, watch_list):
+    # 1回目: チャンネルIDが未解決なので yt-dlp
+    new_videos = open_scanner().scan(watch_list)
+    assert playlist.calls == 2
+    assert {k: len(v) for k, v in new_videos.items()} == {"UC0": 5, "UC1": 5}
+
+    # 2回目: フィードの先頭が前回と同じなので変化なし（ETag を覚える）
+    scanner = open_scanner()
+    assert scanner.scan(watch_list) == {}
+    assert scanner.stats["unchanged"] == 2
+    assert feed_server.not_modified == 0
+
+    # 3回目: 304
+    scanner = open_scanner()
+    assert scanner.scan(watch_list) == {}
+    assert feed_server.not_modified == 2
+    assert playlist.calls == 2
+
+
+def test_scan_reads_new_videos_from_feed(open_scanner, publish, playlist, watch_list):
+    open_scanner().scan(watch_list)
+
+    publish("UC0", 5, 2)
+    scanner = open_scanner()
+    new_videos = scanner.scan(watch_list)
+    assert [v["video_id"] for v in new_videos["UC0"]] == ["UC0-6", "UC0-5"]
+    assert scanner.stats["feed"] == 1
+    assert playlist.calls == 2
+
+
+def test_scan_falls_back_to_playlist_when_feed_overflows(open_scanner, publish, playlist, watch_list):
+    watch_list = {"UC0": watch_list["UC0"]}
+    open_scanner().scan(watch_list)
+
+    # フィード（5件）に収まらない新着
+    publish("UC0", 5, 7)
+    scanner = open_scanner()
+    new_videos = scanner.scan(watch_list)
+    assert len(new_videos["UC0"]) == 7
+    assert scanner.stats["playlist"] == 1
+    assert playlist.calls == 2
+
+
+def test_scan_ignores_shorts_in_feed(open_scanner, feed_data, publish, playlist, watch_list):
+    open_scanner().scan(watch_list)
+
+    # ショートだけの新着は変化なし
+    feed_data["UC0"].insert(0, {"video_id": "UC0-short-0", "title": "ショート", "published": "2025-01-02T00:00:00+00:00",
+                                "short": True})
+    scanner = open_scanner()
+    assert scanner.scan(watch_list) == {}
+    assert scanner.stats["unchanged"] == 2
+
+    # ショートの下に通常の新着があれば、そちらだけ拾う
+    publish("UC0", 5, 1)
+    feed_data["UC0"].insert(0, {"video_id": "UC0-short-1", "title": "ショート", "published": "2025-01-03T00:00:00+00:00",
+                                "short": True})
+    scanner = open_scanner()
+    new_videos = scanner.scan(watch_list)
+    assert [v["video_id"] for v in new_videos["UC0"]] == ["UC0-5"]
+    assert scanner.stats["feed"] == 1
+    assert playlist.calls == 2
@@ -0,0 +1,77 @@
+"""fish_audio_client: FakeFishAudioServer を相手にした合成・keep-alive・429・キャッシュの確認"""
+
+import io
+import wave
+
+import pytest
+
+pytest.importorskip("requests")
+
+from fish_audio_client import FishAudioClient
+from tts_cache import LocalDirBackend, TTSCache
+
+
+def wav_seconds(data):
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def test_map_returns_results_in_script_order(fish_server, fish_client, fish_jobs):
+    fish_server.latency = 0.01
+    fish_client.max_workers = 4
+    results = fish_client.map(fish_jobs)
+    # 代用サーバーはテキスト長に比例した長さの無音を返すので、長さで順番を確かめられる
+    assert [round(wav_seconds(r), 2) for r in results] == [round(len(text) * 0.01, 2) for text, _ in fish_jobs]
+
+
+def test_on_result_is_called_for_every_line(fish_client, fish_jobs):
+    seen = []
+    fish_client.max_workers = 3
+    fish_client.map(fish_jobs[:6], on_result=lambda index, audio: seen.append(index))
+    assert sorted(seen) == list(range(6))
+
+
+def test_sessions_are_reused_across_requests(fish_server, fish_client, fish_jobs):
+    fish_server.latency = 0.01
+    fish_client.max_workers = 2
+    fish_client.map(fish_jobs[:10])
+    assert fish_server.requests == 10
+    assert fish_server.connections <= 2
+
+
+def test_rate_limited_voice_is_retried_after_retry_after(fish_server, fish_client):
+    fish_server.quota, fish_server.period = 2, 0.3
+    fish_client.max_workers = 1
+    results = fish_client.map([(f"セリフ{i}", "voice-katsumi") for i in range(4)], max_retries=5)
+    assert fish_server.rate_limited >= 1
+    assert all(r is not None for r in results)
+    assert fish_client.rate_limited == fish_server.rate_limited
+
+
+def test_gives_up_after_max_retries(fish_server, fish_client):
+    fish_server.quota, fish_server.period = 1, 60.0
+    fish_client.max_workers = 1
+    fish_client.sleep = lambda seconds: None
+    first, second = fish_client.map([("一つ目", "voice-katsumi"), ("二つ目", "voice-katsumi")], max_retries=2)
+    assert fish_server.requests == 3
+    assert first is not None
+    assert second is None
+
+
+def test_cache_hits_skip_the_api(tmp_path, fish_server, fish_jobs):
+    jobs = fish_jobs[:6]
+
+    def run():
+        cache = TTSCache(LocalDirBackend(tmp_path))
+        with FishAudioClient("fake", api_url=fish_server.url, requests_per_minute=6000, burst=10,
+                             cache=cache, verbose=False) as client:
+            return client.map(jobs), cache
+
+    first, _ = run()
+    assert fish_server.requests == 6
+
+    # 別プロセスの再実行相当: 同じディレクトリを新しいキャッシュで開く
+    second, cache = run()
+    assert fish_server.requests == 6
+    assert second == first
+    assert cache.hits == 6 and cache.misses == 0
@@ -0,0 +1,34 @@
+"""gemini_key_pool: 429 の判定（レート制限だけをクールダウンし、それ以外はすぐ失敗させる）"""
+
+import pytest
+
+from gemini_key_pool import is_rate_limit_error
+
+
+class StatusError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.parametrize("error", [
+    StatusError("Too Many Requests", code=429),
+    Exception("429 RESOURCE_EXHAUSTED. {'error': {'code': 429}}"),
+    Exception("Resource has been exhausted (e.g. check quota). RESOURCE_EXHAUSTED"),
+    Exception("HTTP 429: Too Many Requests"),
+    Exception("Error code: 429."),
+])
+def test_rate_limits_are_detected(error):
+    assert is_rate_limit_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    StatusError("400 User project quota-project-x is not set up for billing", code=400),
+    Exception("400 INVALID_ARGUMENT: quota project not found"),
+    Exception("500 INTERNAL: request req-4291 failed"),
+    Exception("file /tmp/429/out.wav not found"),
+    Exception("video ID abc429xyz is private"),
+    StatusError("429 in the message but a 403 status", code=403),
+])
+def test_other_errors_are_not_rate_limits(error):
+    assert not is_rate_limit_error(error)
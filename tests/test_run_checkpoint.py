@@ -0,0 +1,107 @@
+"""run_checkpoint: 同じ実行IDで再実行したときのスキップ・やり直し・成果物の書き戻しの確認"""
+
+import os
+
+import pytest
+
+from run_checkpoint import RunCheckpoint
+
+
+class CountingStage:
+    """呼ばれた回数を数えるステージ処理"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def open_run(tmp_path):
+    def open_run(run_id="run1", pipeline="nenkin_news"):
+        return RunCheckpoint(pipeline, run_id=run_id, root=tmp_path, enabled=True)
+    return open_run
+
+
+def test_same_inputs_are_skipped_on_resume(open_run):
+    func = CountingStage({"title": "台本"})
+    assert open_run().stage("script", func, inputs=["ニュース"]) == {"title": "台本"}
+    assert open_run().stage("script", func, inputs=["ニュース"]) == {"title": "台本"}
+    assert func.calls == 1
+
+
+def test_changed_inputs_rerun_the_stage(open_run):
+    func = CountingStage("台本")
+    open_run().stage("script", func, inputs=["ニュースA"])
+    open_run().stage("script", func, inputs=["ニュースB"])
+    assert func.calls == 2
+
+
+def test_rerun_prunes_the_previous_stage_dir(open_run, tmp_path):
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(b"A")
+    checkpoint = open_run()
+    checkpoint.stage("tts", CountingStage(1.0), inputs="A", files={"audio": audio})
+    checkpoint.stage("tts", CountingStage(2.0), inputs="B", files={"audio": audio})
+    stage_dirs = [p.name for p in checkpoint.run_dir.iterdir() if p.is_dir()]
+    assert len(stage_dirs) == 1
+    assert stage_dirs[0].startswith("tts-")
+
+
+def test_files_are_restored_to_the_callers_path(open_run, tmp_path):
+    audio = tmp_path / "out" / "audio.wav"
+    audio.parent.mkdir()
+
+    def synthesize():
+        audio.write_bytes(b"RIFF")
+        return 1.5
+
+    open_run().stage("tts", synthesize, inputs="台本", files={"audio": audio})
+    audio.unlink()
+
+    func = CountingStage(9.9)
+    assert open_run().stage("tts", func, inputs="台本", files={"audio": audio}) == 1.5
+    assert func.calls == 0
+    assert audio.read_bytes() == b"RIFF"
+
+
+def test_none_is_not_persisted(open_run):
+    failed = CountingStage(None)
+    assert open_run().stage("upload", failed, inputs="動画") is None
+    retry = CountingStage("https://youtu.be/x")
+    assert open_run().stage("upload", retry, inputs="動画") == "https://youtu.be/x"
+    assert retry.calls == 1
+
+
+def test_tuples_round_trip_as_unpackable_lists(open_run):
+    open_run().stage("tts", CountingStage((12.5, [{"start": 0.0}])), inputs="台本")
+    duration, timings = open_run().stage("tts", CountingStage(None), inputs="台本")
+    assert duration == 12.5
+    assert timings == [{"start": 0.0}]
+
+
+def test_latest_resumes_the_newest_run(open_run):
+    old = open_run("old")
+    old.stage("script", CountingStage("古い"), inputs="x")
+    new = open_run("new")
+    new.stage("script", CountingStage("新しい"), inputs="x")
+    os.utime(old.run_dir / "manifest.json", (1, 1))
+
+    latest = open_run("latest")
+    assert latest.run_id == "new"
+    assert latest.stage("script", CountingStage(None), inputs="x") == "新しい"
+
+
+def test_latest_without_runs_raises(open_run):
+    with pytest.raises(ValueError):
+        open_run("latest")
+
+
+def test_discard_removes_the_run_dir(open_run):
+    checkpoint = open_run()
+    checkpoint.stage("script", CountingStage("台本"), inputs="x")
+    checkpoint.discard()
+    assert not checkpoint.run_dir.exists()
@@ -0,0 +1,129 @@
+"""service_replay: ローカルHTTPサーバーとの通信を記録し、サーバーなしで再生できることの確認"""
+
+import json
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from service_replay import ReplayMiss, ServiceReplay, request_key
+
+
+SECRET = "AIzaSy-secret-value"
+
+
+def record(cassette, server, calls):
+    """calls: [(method, path, json本文), ...] を記録し、レスポンスの JSON のリストを返す"""
+    with ServiceReplay(cassette, "record", passthrough_hosts=()):
+        return [requests.request(method, server.url + path, json=body, timeout=5).json()
+                for method, path, body in calls]
+
+
+def replay_calls(replay, server, calls):
+    """記録を再生する（代用サーバーには届かない）"""
+    before = server.requests
+    with replay:
+        responses = [requests.request(method, server.url + path, json=body, timeout=5)
+                     for method, path, body in calls]
+    assert server.requests == before
+    return responses
+
+
+def test_replays_recorded_responses_without_the_server(tmp_path, echo_server):
+    calls = [("GET", "/v1/items", None), ("POST", "/v1/tts", {"text": "一つ目"}), ("POST", "/v1/tts", {"text": "二つ目"})]
+    recorded = record(tmp_path, echo_server, calls)
+
+    replay = ServiceReplay(tmp_path, "replay", latency=0, passthrough_hosts=())
+    responses = replay_calls(replay, echo_server, calls)
+    assert [r.json() for r in responses] == recorded
+    assert replay.meta["interactions"] == 3
+
+
+def test_same_request_returns_recordings_in_order(tmp_path, echo_server):
+    calls = [("GET", "/v1/poll", None)] * 2
+    recorded = record(tmp_path, echo_server, calls)
+
+    replay = ServiceReplay(tmp_path, "replay", latency=0, passthrough_hosts=())
+    responses = replay_calls(replay, echo_server, calls + [("GET", "/v1/poll", None)])
+    # 使い切ったら最後の記録を返し続ける
+    assert [r.json()["n"] for r in responses] == [1, 2, 2]
+
+
+def test_different_body_falls_back_to_same_endpoint(tmp_path, echo_server):
+    recorded = record(tmp_path, echo_server, [("POST", "/v1/generate", {"prompt": "2025-01-01 のニュース"})])
+
+    replay = ServiceReplay(tmp_path, "replay", latency=0, passthrough_hosts=())
+    responses = replay_calls(replay, echo_server, [("POST", "/v1/generate", {"prompt": "2025-01-02 のニュース"})])
+    assert responses[0].json() == recorded[0]
+
+
+def test_unknown_endpoint_raises_replay_miss(tmp_path, echo_server):
+    record(tmp_path, echo_server, [("GET", "/v1/items", None)])
+
+    replay = ServiceReplay(tmp_path, "replay", latency=0, passthrough_hosts=())
+    with replay:
+        with pytest.raises(ReplayMiss):
+            requests.get(echo_server.url + "/v1/other", timeout=5)
+
+
+def test_injected_429_rate_is_reproducible_with_seed(tmp_path, echo_server):
+    record(tmp_path, echo_server, [("GET", "/v1/items", None)])
+    calls = [("GET", "/v1/items", None)] * 200
+
+    statuses = []
+    for _ in range(2):
+        replay = ServiceReplay(tmp_path, "replay", latency=0, rate_limit=0.25, retry_after=3, seed=7,
+                               passthrough_hosts=())
+        responses = replay_calls(replay, echo_server, calls)
+        statuses.append([r.status_code for r in responses])
+
+    assert statuses[0] == statuses[1]
+    limited = [r for r in responses if r.status_code == 429]
+    assert 20 <= len(limited) <= 80
+    assert limited[0].headers["Retry-After"] == "3"
+    assert limited[0].json()["error"]["status"] == "RESOURCE_EXHAUSTED"
+
+
+def test_cassette_does_not_keep_secrets(tmp_path, echo_server):
+    with ServiceReplay(tmp_path, "record", passthrough_hosts=()):
+        requests.get(f"{echo_server.url}/v1/models?key={SECRET}&alt=json", timeout=5,
+                     headers={"Authorization": f"Bearer {SECRET}"})
+
+    text = (tmp_path / "interactions.jsonl").read_text(encoding="utf-8")
+    assert SECRET not in text
+    assert "session=secret" not in text
+
+    # キーが違っても同じ記録に当たる
+    assert request_key("GET", f"{echo_server.url}/v1/models?key=other&alt=json") == \
+        json.loads(text)["key"]
+
+
+def test_token_responses_and_webhook_paths_are_redacted(tmp_path):
+    replay = ServiceReplay(tmp_path, "record", passthrough_hosts=())
+    token = json.dumps({"access_token": SECRET, "expires_in": 3599}).encode("utf-8")
+    replay._record("POST", "https://oauth2.googleapis.com/token", b"assertion=jwt", 200, {}, token, 0.1)
+    replay._record("POST", "https://hooks.slack.com/services/T000/B000/" + SECRET, b"{}", 200, {}, b"ok", 0.1)
+    replay.save()
+
+    text = (tmp_path / "interactions.jsonl").read_text(encoding="utf-8")
+    assert SECRET not in text
+    entries = [json.loads(line) for line in text.splitlines()]
+    assert json.loads(entries[0]["body"])["access_token"] == "replay-token"
+    assert entries[1]["endpoint"] == "POST hooks.slack.com/services/*"
+
+
+def test_token_endpoint_is_never_rate_limited(tmp_path):
+    replay = ServiceReplay(tmp_path, "record", passthrough_hosts=())
+    replay._record("POST", "https://oauth2.googleapis.com/token", b"", 200, {}, b"{}", 0.0)
+    replay.save()
+
+    replay = ServiceReplay(tmp_path, "replay", latency=0, rate_limit=1.0, passthrough_hosts=())
+    status, _, _, _ = replay._replay("POST", "https://oauth2.googleapis.com/token", b"")
+    assert status == 200
+
+
+def test_invalid_mode_and_missing_cassette(tmp_path):
+    with pytest.raises(ValueError):
+        ServiceReplay(tmp_path, "live")
+    with pytest.raises(FileNotFoundError):
+        ServiceReplay(tmp_path / "missing", "replay")
@@ -0,0 +1,108 @@
+"""sheets_gateway: FakeSheetsService を相手にした書き込みまとめ・読み取りキャッシュの確認"""
+
+import pytest
+
+
+BOOK = "book"
+SHEET = "実行ログ"
+HEADERS = ["日時", "ステータス"]
+
+
+@pytest.fixture
+def gateway(sheets_service, sheets_gateway):
+    """実行ログのシートを用意したゲートウェイ（用意に使った呼び出しは数えない）"""
+    sheets_gateway.ensure_sheet(BOOK, SHEET, headers=HEADERS)
+    sheets_gateway.flush()
+    sheets_service.calls = 0
+    return sheets_gateway
+
+
+def test_appends_are_sent_in_one_batch_update(sheets_service, gateway):
+    for i in range(10):
+        gateway.append_rows(BOOK, SHEET, [[f"2025-01-01 10:{i:02d}", "成功"]])
+    assert sheets_service.calls == 0
+    assert gateway.pending_count() == 10
+
+    gateway.flush()
+    assert sheets_service.calls == 1
+    assert gateway.pending_count() == 0
+    assert sheets_service.read(BOOK, f"{SHEET}!A1:B") == [HEADERS] + [[f"2025-01-01 10:{i:02d}", "成功"] for i in range(10)]
+
+
+def test_sheet_list_is_fetched_once(sheets_service, sheets_gateway):
+    sheets_gateway.ensure_sheet(BOOK, SHEET)
+    assert not sheets_gateway.ensure_sheet(BOOK, SHEET)
+    assert sheets_gateway.has_sheet(BOOK, SHEET)
+    assert sheets_service.calls == 2  # spreadsheets().get と addSheet の batchUpdate だけ
+
+
+def test_reads_are_cached_until_ttl_expires(sheets_service, gateway, clock):
+    gateway.cache_ttl = 60
+    for _ in range(3):
+        assert gateway.get_values(BOOK, f"{SHEET}!A1:B1") == [HEADERS]
+    assert sheets_service.calls == 1
+
+    clock.now = 61
+    gateway.get_values(BOOK, f"{SHEET}!A1:B1")
+    assert sheets_service.calls == 2
+
+
+def test_pending_writes_are_flushed_before_reading_the_sheet(gateway):
+    assert gateway.get_values(BOOK, f"{SHEET}!A:A") == [["日時"]]
+    gateway.append_rows(BOOK, SHEET, [["2025-01-01", "成功"]])
+
+    # 書いた内容が読める（キャッシュは flush で捨てられている）
+    assert gateway.get_values(BOOK, f"{SHEET}!A:A") == [["日時"], ["2025-01-01"]]
+    assert gateway.pending_count() == 0
+
+
+def test_update_values_writes_at_the_range_origin(sheets_service, gateway):
+    gateway.update_values(BOOK, f"{SHEET}!B1", [["結果"]])
+    gateway.flush()
+    assert sheets_service.read(BOOK, f"{SHEET}!A1:B1") == [["日時", "結果"]]
+
+
+def test_on_flushed_is_called_only_after_the_batch_is_sent(gateway):
+    recorded = []
+    gateway.append_rows(BOOK, SHEET, [["2025-01-01", "成功"]], on_flushed=lambda: recorded.append("成功"))
+    assert recorded == []
+
+    gateway.flush()
+    assert recorded == ["成功"]
+
+
+def test_on_flushed_is_not_called_when_the_batch_fails(sheets_service, gateway):
+    recorded = []
+    gateway.append_rows(BOOK, SHEET, [["2025-01-01", "成功"]], on_flushed=lambda: recorded.append("成功"))
+    del sheets_service.books[BOOK][SHEET]  # 送信先のシートが消えて batchUpdate が失敗する
+
+    with pytest.raises(KeyError):
+        gateway.flush()
+    assert recorded == []
+    assert gateway.pending_count() == 1
+
+
+def test_flushes_automatically_at_flush_rows(sheets_service, gateway):
+    gateway.flush_rows = 5
+    for i in range(4):
+        gateway.append_rows(BOOK, SHEET, [[f"行{i}", ""]])
+    assert sheets_service.calls == 0
+
+    gateway.append_rows(BOOK, SHEET, [["行4", ""]])
+    assert sheets_service.calls == 1
+    assert gateway.pending_count() == 0
+
+
+def test_append_to_missing_sheet_raises(gateway):
+    with pytest.raises(ValueError):
+        gateway.append_rows(BOOK, "存在しないシート", [["x"]])
+
+
+def test_close_reports_whether_everything_was_sent(sheets_service, gateway):
+    gateway.append_rows(BOOK, SHEET, [["2025-01-01", "成功"]])
+    assert gateway.close()
+
+    gateway.append_rows(BOOK, SHEET, [["2025-01-02", "成功"]])
+    del sheets_service.books[BOOK][SHEET]
+    assert not gateway.close()
+    assert gateway.pending_count() == 1
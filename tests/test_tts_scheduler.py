@@ -0,0 +1,73 @@
+"""tts_scheduler: FakeTTS を相手にしたディスパッチの確認（スケジューラーと FakeTTS は同じ仮想時計で数える）"""
+
+import time
+
+import pytest
+
+from tts_scheduler import FakeRateLimitError, TTSScheduler
+
+
+def test_results_in_script_order(gemini_keys, dialogue):
+    def synthesize(index, line, api_key, key_name):
+        # 後のセリフほど早く終わる
+        time.sleep(0.001 * (len(dialogue) - index))
+        return index
+
+    scheduler = TTSScheduler(gemini_keys, requests_per_minute=len(dialogue), max_workers=4, verbose=False)
+    assert scheduler.map(synthesize, dialogue) == list(range(len(dialogue)))
+
+
+def test_stays_within_per_key_quota(tts_scheduler, fake_tts, dialogue, clock):
+    results = tts_scheduler.map(fake_tts, dialogue)
+    assert fake_tts.rate_limited == 0
+    assert [r["index"] for r in results] == list(range(len(dialogue)))
+    # 3キー x 2回/窓 で12セリフ → 窓を1つ待つだけで2窓目に収まる
+    assert clock.now == pytest.approx(fake_tts.period)
+
+
+def test_rate_limited_key_is_cooled_down_and_others_take_over(tts_scheduler, fake_tts, dialogue):
+    fake_tts.exhausted_keys = {"KEY_0"}
+    results = tts_scheduler.map(fake_tts, dialogue)
+    assert all(r is not None for r in results)
+    assert all(r["key"] != "KEY_0" for r in results)
+    # 429 を受けたキーはクールダウンされ、何度も選ばれない
+    assert tts_scheduler.stats()["KEY_0"]["rate_limited"] <= 2
+    # 正常なキーは窓を守っているので 429 を受けない
+    assert fake_tts.rate_limited == tts_scheduler.stats()["KEY_0"]["rate_limited"]
+
+
+def test_other_errors_retry_on_a_different_key(tts_scheduler, dialogue):
+    keys_used = []
+
+    def flaky(index, line, api_key, key_name):
+        keys_used.append(key_name)
+        if len(keys_used) == 1:
+            raise RuntimeError("500 internal")
+        return key_name
+
+    results = tts_scheduler.map(flaky, dialogue[:1])
+    assert keys_used[0] != keys_used[1]
+    assert results == [keys_used[1]]
+
+
+def test_fallback_after_retries_exhausted(tts_scheduler, dialogue):
+    def always_fails(index, line, api_key, key_name):
+        raise RuntimeError("boom")
+
+    tts_scheduler.max_retries = 1
+    results = tts_scheduler.map(always_fails, dialogue[:3], fallback=lambda i, line, e: f"fallback-{i}")
+    assert results == ["fallback-0", "fallback-1", "fallback-2"]
+
+
+def test_raises_without_fallback(tts_scheduler, dialogue):
+    def rate_limited(index, line, api_key, key_name):
+        raise FakeRateLimitError("429 RESOURCE_EXHAUSTED")
+
+    tts_scheduler.max_rate_limits = 0
+    with pytest.raises(FakeRateLimitError):
+        tts_scheduler.map(rate_limited, dialogue[:1])
+
+
+def test_requires_keys():
+    with pytest.raises(ValueError):
+        TTSScheduler([])
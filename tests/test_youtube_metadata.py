@@ -0,0 +1,111 @@
+"""youtube_metadata: FakeYouTubeMetadata を相手にしたまとめ問い合わせ・キャッシュ・並列処理の確認"""
+
+import pytest
+
+from youtube_metadata import limit_channels
+
+
+def channel_video_ids(channels, handle="channel0"):
+    return [video_id for video_id, _, _ in channels[handle][1]]
+
+
+def test_video_stats_are_fetched_in_batches_of_50(youtube_client, youtube_fake, youtube_channels):
+    ids = channel_video_ids(youtube_channels)
+
+    stats = youtube_client.video_stats(ids + ids[:10])  # 重複は1回だけ問い合わせる
+    assert youtube_fake.video_batches == [50, 50, 20]
+    assert len(stats) == 120
+    assert stats["v0_119"]["view_count"] == 120000
+
+
+def test_video_stats_are_cached_within_ttl(youtube_client, youtube_fake, youtube_channels, clock):
+    youtube_client.stats_ttl = 3600
+    ids = channel_video_ids(youtube_channels)[:10]
+
+    youtube_client.video_stats(ids[:5])
+    youtube_client.video_stats(ids)  # 残りの5件だけ問い合わせる
+    assert youtube_fake.video_batches == [5, 5]
+
+    youtube_client.video_stats(ids)
+    assert youtube_fake.calls["videos"] == 2
+
+    clock.now += 3601
+    youtube_client.video_stats(ids)
+    assert youtube_fake.video_batches == [5, 5, 10]
+
+
+def test_handle_is_resolved_once_and_expires_after_ttl(youtube_client, youtube_fake, clock):
+    youtube_client.handle_ttl = 86400
+
+    assert youtube_client.channel_id_for_handle("@channel1") == "UC0001"
+    assert youtube_client.channel_id_for_handle("@Channel1") == "UC0001"
+    assert youtube_fake.calls["channels"] == 1
+
+    clock.now += 86401
+    youtube_client.channel_id_for_handle("@channel1")
+    assert youtube_fake.calls["channels"] == 2
+
+
+def test_unknown_handle_falls_back_to_search_and_is_not_cached(youtube_client, youtube_fake):
+    assert youtube_client.channel_id_for_handle("@missing") is None
+    assert youtube_client.channel_id_for_handle("@missing") is None
+    assert youtube_fake.calls["channels"] == 2
+    assert youtube_fake.calls["search"] == 2
+
+
+def test_popular_videos_sorted_by_views_with_one_stats_call(youtube_client, youtube_fake):
+    videos = youtube_client.popular_videos("UC0000", max_results=5)
+    assert [v["view_count"] for v in videos] == [120000, 119000, 118000, 117000, 116000]
+    assert youtube_fake.calls["search"] == 1
+    assert youtube_fake.calls["videos"] == 1
+    assert youtube_client.quota_used == 101
+
+
+def test_cache_is_persisted_and_warm_run_uses_fewer_calls(open_youtube_client, youtube_fake, youtube_channels):
+    handles = [f"@{handle}" for handle in youtube_channels]
+
+    def run():
+        youtube_fake.calls.clear()
+        meta = open_youtube_client()
+        meta.max_workers = 3
+        results = meta.map_channels(
+            lambda handle: [v["video_id"] for v in meta.popular_videos(meta.channel_id_for_handle(handle), 3)],
+            handles)
+        meta.save()
+        return results, dict(youtube_fake.calls)
+
+    cold, cold_calls = run()
+    warm, warm_calls = run()
+    assert warm == cold
+    assert cold_calls == {"channels": 3, "search": 3, "videos": 3}
+    # 2回目はハンドルも統計もキャッシュから（人気動画の検索だけ）
+    assert warm_calls == {"search": 3}
+
+
+def test_save_drops_expired_entries(open_youtube_client, clock):
+    meta = open_youtube_client()
+    meta.stats_ttl = 3600
+    meta.channel_id_for_handle("@channel0")
+    meta.video_stats(["v0_0", "v0_1"])
+
+    clock.now += 3601
+    meta.save()
+    reloaded = open_youtube_client()
+    assert reloaded._cache["videos"] == {}
+    assert "channel0" in reloaded._cache["handles"]
+
+
+def test_map_channels_keeps_order_and_turns_errors_into_none(youtube_client):
+    youtube_client.max_workers = 4
+
+    def process(channel):
+        if channel == "bad":
+            raise RuntimeError("失敗")
+        return channel.upper()
+
+    assert youtube_client.map_channels(process, ["a", "bad", "c", "d"]) == ["A", None, "C", "D"]
+
+
+@pytest.mark.parametrize("max_channels, expected", [(2, ["a", "b"]), (0, ["a", "b", "c"]), (5, ["a", "b", "c"])])
+def test_limit_channels(max_channels, expected):
+    assert limit_channels(["a", "b", "c"], max_channels) == expected
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YouTube字幕の取得サービス（圧縮ディスクキャッシュ + 字幕なしの記録 + 並列取得）
+
+口コミ台本スクレイパー・ネタ元動画・動画リメイクがそれぞれ youtube-transcript-api を直接呼んでいて、
+毎日スキャンし直す競合・ネタ元の動画について、同じ字幕を毎回ダウンロードしていた。
+- (動画ID, 言語の優先順) をキーに [{"text", "start", "duration"}, ...] を gzip JSON で保存
+  （公開済み動画の字幕はほぼ変わらないので期限なし）
+- 字幕がない・無効な動画も記録し、TRANSCRIPT_NEGATIVE_TTL_HOURS の間は問い合わせない
+  （あとから自動生成字幕が付くことがあるので期限つき）
+- 通信エラーなど一時的な失敗は記録しない（次の実行で取り直す）
+- prefetch() / get_many() で複数の動画を並列数を絞って取得する（同じ動画の取得は1回にまとめる）
+
+環境変数:
+    TRANSCRIPT_CACHE=false              キャッシュを無効化（毎回取得）
+    TRANSCRIPT_CACHE_DIR=...            保存先
+    TRANSCRIPT_NEGATIVE_TTL_HOURS=24    字幕なしの記録を使う時間
+    TRANSCRIPT_FETCH_WORKERS=4          並列取得数
+
+使い方:
+    service = get_transcript_service()
+    service.prefetch(video_ids)
+    items = service.get(video_id)          # [{"text", "start", "duration"}, ...] / 字幕なしは None
+    text = transcript_text(items)
+
+ベンチマーク:
+    python transcript_cache.py --bench
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+try:
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+    NO_TRANSCRIPT_ERRORS = (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable)
+except ImportError:
+    YouTubeTranscriptApi = None
+    NO_TRANSCRIPT_ERRORS = ()
+
+
+TRANSCRIPT_CACHE_ENABLED = os.environ.get("TRANSCRIPT_CACHE", "true").lower() == "true"
+TRANSCRIPT_NEGATIVE_TTL_HOURS = float(os.environ.get("TRANSCRIPT_NEGATIVE_TTL_HOURS", "24"))
+TRANSCRIPT_FETCH_WORKERS = int(os.environ.get("TRANSCRIPT_FETCH_WORKERS", "4"))
+DEFAULT_LANGUAGES = ("ja", "ja-JP", "en")
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_CACHE_DIR = Path.home() / ".cache" / "youtube-transcripts"
+LOCAL_CACHE_DIR = Path.home() / ".cache" / "jinsei-soudan" / "transcripts"
+
+
+def default_transcript_dir() -> Path:
+    root = os.environ.get("TRANSCRIPT_CACHE_DIR")
+    if root:
+        return Path(root)
+    return GITHUB_ACTIONS_CACHE_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_CACHE_DIR
+
+
+class TranscriptUnavailable(Exception):
+    """字幕がない・無効（記録して、しばらく問い合わせない）"""
+
+
+def transcript_text(items: Optional[list], sep: str = " ") -> str:
+    """字幕を1つの文字列にする"""
+    return sep.join(item["text"] for item in items or [])
+
+
+def youtube_transcript_fetch(video_id: str, languages: tuple) -> dict:
+    """youtube-transcript-api で取得（優先順の言語ごとに手動字幕 → 自動生成）
+
+    字幕がなければ TranscriptUnavailable、通信エラーなどはそのまま送出する。
+    """
+    if YouTubeTranscriptApi is None:
+        raise RuntimeError("youtube-transcript-api がインストールされていません")
+    try:
+        transcript = YouTubeTranscriptApi().list(video_id).find_transcript(list(languages))
+        fetched = transcript.fetch()
+    except NO_TRANSCRIPT_ERRORS as e:
+        raise TranscriptUnavailable(type(e).__name__) from e
+    return {
+        "language": transcript.language_code,
+        "is_generated": transcript.is_generated,
+        "items": [{"text": s.text, "start": s.start, "duration": s.duration} for s in fetched],
+    }
+
+
+class TranscriptService:
+    """字幕の取得とキャッシュ
+
+    Args:
+        root: 保存先ディレクトリ
+        fetcher: fetcher(video_id, languages) -> {"language", "is_generated", "items"}
+            （字幕がなければ TranscriptUnavailable）。既定は youtube-transcript-api
+        max_workers: 並列取得数
+        negative_ttl_hours: 字幕なしの記録を使う時間
+        enabled: False なら毎回取得（保存先は一時ディレクトリ）
+    """
+
+    def __init__(self, root=None, fetcher=None, max_workers: int = TRANSCRIPT_FETCH_WORKERS,
+                 negative_ttl_hours: float = TRANSCRIPT_NEGATIVE_TTL_HOURS, enabled: bool = TRANSCRIPT_CACHE_ENABLED):
+        if not enabled:
+            root = tempfile.mkdtemp(prefix="transcripts-")
+        self.root = Path(root or default_transcript_dir())
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fetcher = fetcher or youtube_transcript_fetch
+        self.max_workers = max(1, max_workers)
+        self.negative_ttl = negative_ttl_hours * 3600
+        self.hits = 0
+        self.fetches = 0
+        self.missing = 0
+        self._futures = {}  # キャッシュのパス → Future（この実行で取得中・取得済み）
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _path(self, video_id: str, languages: tuple) -> Path:
+        lang_key = re.sub(r"[^A-Za-z0-9_-]", "_", "+".join(languages))
+        return self.root / lang_key / f"{video_id}.json.gz"
+
+    def _read(self, path: Path) -> Optional[dict]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def _write(self, path: Path, record: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def _load(self, video_id: str, languages: tuple) -> Optional[list]:
+        """キャッシュを確認し、なければ取得して保存 → 字幕（字幕なしは None）"""
+        path = self._path(video_id, languages)
+        record = self._read(path) if path.exists() else None
+        if record is not None:
+            if not record.get("missing"):
+                with self._lock:
+                    self.hits += 1
+                return record["items"]
+            if time.time() - record.get("fetched_at", 0) < self.negative_ttl:
+                with self._lock:
+                    self.hits += 1
+                    self.missing += 1
+                return None
+
+        with self._lock:
+            self.fetches += 1
+        try:
+            result = self.fetcher(video_id, languages)
+        except TranscriptUnavailable as e:
+            self._write(path, {"video_id": video_id, "missing": True, "reason": str(e), "fetched_at": time.time()})
+            with self._lock:
+                self.missing += 1
+            return None
+        self._write(path, {"video_id": video_id, "language": result.get("language", ""),
+                           "is_generated": result.get("is_generated", False),
+                           "items": result["items"], "fetched_at": time.time()})
+        return result["items"]
+
+    def _future(self, video_id: str, languages: tuple):
+        key = self._path(video_id, languages)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="transcripts")
+                future = self._futures[key] = self._executor.submit(self._load, video_id, languages)
+            return future
+
+    def prefetch(self, video_ids, languages=DEFAULT_LANGUAGES):
+        """まとめて並列で取得開始（待たない）"""
+        for video_id in video_ids:
+            if video_id:
+                self._future(video_id, tuple(languages))
+
+    def get(self, video_id: str, languages=DEFAULT_LANGUAGES) -> Optional[list]:
+        """字幕 [{"text", "start", "duration"}, ...] を返す（字幕なしは None、一時的なエラーは送出）"""
+        languages = tuple(languages)
+        future = self._future(video_id, languages)
+        try:
+            return future.result()
+        except Exception:
+            with self._lock:
+                if self._futures.get(self._path(video_id, languages)) is future:
+                    del self._futures[self._path(video_id, languages)]  # 次の get で取り直す
+            raise
+
+    def get_many(self, video_ids: list, languages=DEFAULT_LANGUAGES) -> dict:
+        """複数の動画を並列で取得 → {video_id: 字幕 or None}（エラーになった動画も None）"""
+        self.prefetch(video_ids, languages)
+        results = {}
+        for video_id in dict.fromkeys(video_ids):
+            try:
+                results[video_id] = self.get(video_id, languages)
+            except Exception as e:
+                print(f"  ⚠ 字幕取得エラー: {video_id}: {e}")
+                results[video_id] = None
+        return results
+
+    def summary(self) -> str:
+        return f"キャッシュ使用 {self.hits}件 / 取得 {self.fetches}件 / 字幕なし {self.missing}件"
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_transcript_service() -> TranscriptService:
+    """プロセス共通の字幕サービス"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TranscriptService()
+            atexit.register(_service.close)
+        return _service
+
+
+class FakeTranscriptApi:
+    """youtube-transcript-api の代用（fetcher として渡す。呼び出し回数を数える）"""
+
+    def __init__(self, transcripts: dict, latency: float = 0.0):
+        self.transcripts = transcripts  # video_id → [text, ...]（None は字幕なし）
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, video_id: str, languages: tuple) -> dict:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        lines = self.transcripts[video_id]
+        if lines is None:
+            raise TranscriptUnavailable("TranscriptsDisabled")
+        return {"language": languages[0], "is_generated": True,
+                "items": [{"text": text, "start": i * 3.0, "duration": 3.0} for i, text in enumerate(lines)]}
+
+
+def run_benchmark(videos: int = 20, lines: int = 300, latency: float = 0.2):
+    """代用 API で、1本ずつ毎回取得する方式と比較"""
+    transcripts = {f"vid{i:08d}": None if i % 5 == 0 else [f"{i}番目の動画の{n}行目です" for n in range(lines)]
+                   for i in range(videos)}
+    video_ids = list(transcripts)
+
+    fake = FakeTranscriptApi(transcripts, latency=latency)
+    start = time.perf_counter()
+    baseline = {}
+    for video_id in video_ids:
+        try:
+            baseline[video_id] = fake(video_id, DEFAULT_LANGUAGES)["items"]
+        except TranscriptUnavailable:
+            baseline[video_id] = None
+    print(f"従来（1本ずつ毎回取得）: {time.perf_counter() - start:.2f}秒, 取得 {fake.calls}回")
+
+    with tempfile.TemporaryDirectory() as root:
+        for label in ("1回目（キャッシュなし・並列）", "2回目（キャッシュあり）"):
+            fake = FakeTranscriptApi(transcripts, latency=latency)
+            service = TranscriptService(root, fetcher=fake)  # 実行ごとに新しいプロセスの想定
+            start = time.perf_counter()
+            results = service.get_many(video_ids)
+            elapsed = time.perf_counter() - start
+            service.close()
+            print(f"{label}: {elapsed:.2f}秒, 取得 {fake.calls}回, {service.summary()} "
+                  f"{'✓' if results == baseline else '✗'}")
+
+        stored = sum(p.stat().st_size for p in Path(root).rglob("*.json.gz"))
+        raw = sum(len(json.dumps(items, ensure_ascii=False).encode()) for items in baseline.values() if items)
+        print(f"保存サイズ: {stored / 1024:.0f}KB（非圧縮 {raw / 1024:.0f}KB）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YouTube字幕の取得サービス")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（代用 API で比較）")
+    parser.add_argument("--clear", action="store_true", help="キャッシュを削除")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark()
+    elif args.clear:
+        root = default_transcript_dir()
+        if root.exists():
+            shutil.rmtree(root)
+        print(f"削除しました: {root}")
+    else:
+        parser.print_help()
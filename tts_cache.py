@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTS音声キャッシュ（実行をまたいで同じセリフを再合成しない）
+
+キーは (エンジン, ボイス, 指示文, 読み方変換後のテキスト, その他パラメータ) のSHA-256。
+定型フレーズ（「最後に今日のランキングをまとめてみました」など）や、
+アップロード失敗後の再実行ではAPIを呼ばずにキャッシュから音声を返す。
+
+- 保存先はバックエンドを差し替え可能（ローカルディレクトリ / GitHub Actions のキャッシュパス）
+- 合計サイズが上限を超えたら、最後に使われたのが古いものから削除（LRU）
+
+環境変数:
+    TTS_CACHE=false        キャッシュを無効化
+    TTS_CACHE_DIR=...      保存先（GitHub Actions では actions/cache で復元・保存するパス）
+    TTS_CACHE_MAX_MB=512   合計サイズの上限
+
+使い方:
+    cache = get_tts_cache()
+    key = tts_cache_key("gemini", voice, text, model=TTS_MODEL)
+    audio_data = cache.fetch(key, lambda: synthesize(text))
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE", "true").lower() == "true"
+TTS_CACHE_MAX_MB = int(os.environ.get("TTS_CACHE_MAX_MB", "512"))
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_CACHE_DIR = Path.home() / ".cache" / "tts-audio"
+LOCAL_CACHE_DIR = Path.home() / ".cache" / "jinsei-soudan" / "tts"
+
+
+def normalize_tts_text(text: str) -> str:
+    """キー用にテキストを正規化（前後の空白除去・連続空白を1つに）
+
+    読み方変換（fix_reading / apply_reading_dict）は呼び出し側で済ませておくこと。
+    """
+    return re.sub(r"\s+", " ", text.strip())
+
+
+def tts_cache_key(engine: str, voice: str, text: str, instruction: str = "", **params) -> str:
+    """キャッシュキーを生成
+
+    Args:
+        engine: "gemini" / "fish" など
+        voice: ボイス名（マルチスピーカーなら "カツミ=Kore,ヒロシ=Puck" など）
+        text: 読み方変換後のテキスト
+        instruction: 読み上げ指示（プロンプト）
+        params: モデル名・出力形式など音声に影響するその他の値
+    """
+    payload = {
+        "engine": engine,
+        "voice": voice,
+        "instruction": normalize_tts_text(instruction),
+        "text": normalize_tts_text(text),
+        "params": {k: str(v) for k, v in sorted(params.items())},
+    }
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+class NullBackend:
+    """何も保存しないバックエンド（TTS_CACHE=false）"""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, data):
+        pass
+
+
+class LocalDirBackend:
+    """ディレクトリに1エントリ1ファイルで保存（サイズ上限つきLRU）
+
+    最終利用時刻はファイルの mtime で管理するので、
+    actions/cache で復元したディレクトリでもそのままLRUが効く。
+    """
+
+    def __init__(self, root, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index = None  # key -> (mtime, size)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    def _scan(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total = 0
+        if self.root.exists():
+            for path in self.root.glob("*/*.bin"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                self._index[path.stem] = (stat.st_mtime, stat.st_size)
+                self._total += stat.st_size
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # 最終利用時刻を更新
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._index[key] = (path.stat().st_mtime, len(data))
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 途中で落ちても壊れたエントリが残らないように一時ファイル経由で置き換え
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._scan()
+            old = self._index.get(key)
+            if old:
+                self._total -= old[1]
+            self._index[key] = (path.stat().st_mtime, len(data))
+            self._total += len(data)
+            self._evict()
+
+    def _evict(self):
+        """上限を超えた分を最終利用が古い順に削除"""
+        if self._total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            del self._index[key]
+            self._total -= size
+
+
+class TTSCache:
+    """TTS音声キャッシュ（バックエンドに委譲し、ヒット率を集計）"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or NullBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        if data:
+            self.backend.put(key, data)
+
+    def fetch(self, key: str, synthesize):
+        """キャッシュにあれば返し、なければ synthesize() の結果を保存して返す"""
+        data = self.get(key)
+        if data is None:
+            data = synthesize()
+            self.put(key, data)
+        return data
+
+    def get_file(self, key: str, output_path) -> bool:
+        """キャッシュにあれば output_path に書き出して True"""
+        data = self.get(key)
+        if data is None:
+            return False
+        with open(output_path, "wb") as f:
+            f.write(data)
+        return True
+
+    def put_file(self, key: str, path):
+        """生成済みの音声ファイルを保存"""
+        try:
+            with open(path, "rb") as f:
+                self.put(key, f.read())
+        except OSError:
+            pass
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"ヒット {self.hits}/{total}（{rate:.0f}%）"
+
+
+def default_backend():
+    """環境に応じたバックエンド"""
+    if not TTS_CACHE_ENABLED:
+        return NullBackend()
+    root = os.environ.get("TTS_CACHE_DIR")
+    if not root:
+        root = GITHUB_ACTIONS_CACHE_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_CACHE_DIR
+    return LocalDirBackend(root)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """プロセス共通のキャッシュ"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache(default_backend())
+        return _cache
+
+
+def set_tts_cache(cache: TTSCache):
+    """キャッシュを差し替え（テスト・別バックエンド用）"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def clear_tts_cache(root=None):
+    """ローカルのキャッシュディレクトリを削除"""
+    backend = get_tts_cache().backend
+    root = Path(root) if root else getattr(backend, "root", None)
+    if root and root.exists():
+        shutil.rmtree(root)
+    if isinstance(backend, LocalDirBackend):
+        backend._index = None
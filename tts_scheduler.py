@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TTSスケジューラー（APIキーごとのレート制限を守って並列ディスパッチ）
+
+Gemini TTS はAPIキーごとにレート制限（RPM）がある。
+固定スリープで1行ずつ回すのではなく、
+- キーごとのレート制限は GeminiKeyPool に任せ、空いているキーへ即座に割り当て
+- 複数キーにまたがって並列に合成
+- 429（RESOURCE_EXHAUSTED）を返したキーだけをクールダウン（他のキーは止めない）
+- 結果は台本の順番通りに返す
+
+TTS モデルのクォータはテキスト生成とは別枠なので、既定ではTTS専用のプールを作る
+（テキスト用の GeminiKeyManager と同じプールを使うと、TTSの少ないRPMでテキスト生成まで止まる）。
+キーごとのレート制限はこのプール1つだけで、スケジューラー自身は持たない。
+
+オフライン検証用に、キーごとのクォータを再現する FakeTTS を同梱。
+
+使い方:
+    scheduler = TTSScheduler(key_manager.get_named_keys(), requests_per_minute=3)
+    results = scheduler.map(synthesize, dialogue, fallback=fallback)
+
+ベンチマーク:
+    python tts_scheduler.py --bench
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gemini_key_pool import GeminiKeyPool, is_rate_limit_error
+
+
+# ===== デフォルト設定 =====
+DEFAULT_REQUESTS_PER_MINUTE = 3  # 1キーあたりのRPM
+DEFAULT_MAX_WORKERS = 8  # 同時に合成するセリフ数
+DEFAULT_MAX_RETRIES = 2  # 429以外のエラーでのリトライ上限（キーを変えて再試行）
+DEFAULT_MAX_RATE_LIMITS = 6  # 1セリフあたり429を受け入れる上限
+BACKOFF_BASE = 30.0  # 429後のクールダウン（秒、連続するたびに倍）
+BACKOFF_MAX = 120.0
+
+
+class TTSScheduler:
+    """APIキーごとのレート制限を守りながらTTSを並列実行
+
+    Args:
+        keys: [(api_key, key_name), ...]（GeminiKeyManager.get_named_keys() の戻り値）
+        requests_per_minute: 1キーあたりのリクエスト上限
+        max_workers: 同時実行数
+        max_retries: 429以外のエラーのリトライ上限
+        max_rate_limits: 1セリフあたり429を受け入れる上限
+        period: レートの単位秒（ベンチマークで時間を縮めるとき以外は60）
+        pool: 使う GeminiKeyPool（None なら keys からTTS専用のプールを作る）
+        clock, sleep: TTS専用プールの時計と待機関数（FakeTTS と同じ仮想時計で検証するとき用）
+    """
+
+    def __init__(self, keys=None, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 max_workers=DEFAULT_MAX_WORKERS, max_retries=DEFAULT_MAX_RETRIES,
+                 max_rate_limits=DEFAULT_MAX_RATE_LIMITS, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, period=60.0, pool=None, verbose=True,
+                 clock=time.time, sleep=None):
+        if pool is None:
+            if not keys:
+                raise ValueError("APIキーがありません")
+            # 429クールダウンは別プロセスと共有しない（テキスト生成のクォータとは別枠のため）
+            pool = GeminiKeyPool(keys, requests_per_minute=requests_per_minute, tokens_per_minute=0,
+                                 window=period, cooldown=backoff_base, max_cooldown=backoff_max,
+                                 state_file="", verbose=False, clock=clock, sleep=sleep)
+        elif not len(pool):
+            raise ValueError("APIキーがありません")
+        self.pool = pool
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.max_rate_limits = max_rate_limits
+        self.verbose = verbose
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _run_one(self, task, index, item, fallback):
+        errors = 0
+        rate_limits = 0
+        last_key = None
+        while True:
+            # 429以外で失敗したときは別のキーで再試行
+            lease = self.pool.acquire(exclude=(last_key,) if errors and last_key else ())
+            last_key = lease.api_key
+            try:
+                result = task(index, item, lease.api_key, lease.key_name)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    lease.report_429(e)
+                    self._log(f"    [429] {lease.key_name}: クールダウン")
+                    rate_limits += 1
+                    if rate_limits <= self.max_rate_limits:
+                        continue
+                else:
+                    errors += 1
+                    if errors <= self.max_retries:
+                        self._log(f"    [リトライ] {lease.key_name} セリフ{index + 1}: {str(e)[:50]}")
+                        continue
+                if fallback is None:
+                    raise
+                return fallback(index, item, e)
+            finally:
+                lease.release()
+            self.pool.report_success(lease.api_key)
+            return result
+
+    def map(self, task, items, fallback=None, on_result=None) -> list:
+        """全アイテムを並列処理し、入力順の結果リストを返す
+
+        Args:
+            task: task(index, item, api_key, key_name) -> 結果
+            items: 入力（セリフのリストなど）
+            fallback: fallback(index, item, error) -> 結果（リトライ上限を超えたとき）
+            on_result: on_result(index, result) 完了ごとのコールバック（進捗表示用）
+        """
+        items = list(items)
+        results = [None] * len(items)
+        workers = min(self.max_workers, len(items)) or 1
+
+        def run(index):
+            result = self._run_one(task, index, items[index], fallback)
+            results[index] = result
+            if on_result:
+                on_result(index, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 例外はここで再送出（fallback なしの場合）
+            for future in [pool.submit(run, i) for i in range(len(items))]:
+                future.result()
+        return results
+
+    def stats(self) -> dict:
+        """キーごとのリクエスト数・429回数"""
+        return {name: {"requests": v["requests"], "rate_limited": v["rate_limited"]}
+                for name, v in self.pool.stats().items()}
+
+
+# ===== オフライン検証用 =====
+
+class FakeRateLimitError(Exception):
+    """FakeTTS のクォータ超過（Gemini の 429 と同じ判定になるメッセージ）"""
+    code = 429
+
+
+class FakeTTS:
+    """キーごとのクォータを再現するTTSスタンドイン
+
+    直近 period 秒のリクエスト数が quota を超えると 429 を投げる。
+    合成結果は文字数に比例した長さの無音PCM（24kHz/16bit/mono）。
+
+    Args:
+        quota: period 秒あたりの1キーのリクエスト上限
+        latency: 1リクエストの所要秒
+        period: クォータの窓（秒）
+        exhausted_keys: 常に429を返すキー名（クォータ切れのキーを再現）
+        clock: クォータを数える時計（スケジューラーと同じ仮想時計を渡すと窓を正確に比べられる）
+    """
+
+    SAMPLE_RATE = 24000
+
+    def __init__(self, quota=DEFAULT_REQUESTS_PER_MINUTE, latency=0.5, period=60.0,
+                 exhausted_keys=(), clock=time.monotonic):
+        self.quota = quota
+        self.latency = latency
+        self.period = period
+        self.exhausted_keys = set(exhausted_keys)
+        self.clock = clock
+        self._history = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rate_limited = 0
+
+    def __call__(self, index, line, api_key, key_name):
+        with self._lock:
+            self.calls += 1
+            now = self.clock()
+            history = [t for t in self._history.get(key_name, []) if now - t < self.period]
+            if key_name in self.exhausted_keys or len(history) >= self.quota:
+                self._history[key_name] = history
+                self.rate_limited += 1
+                raise FakeRateLimitError(f"429 RESOURCE_EXHAUSTED: {key_name}")
+            history.append(now)
+            self._history[key_name] = history
+        time.sleep(self.latency)
+        text = line["text"] if isinstance(line, dict) else str(line)
+        samples = int(self.SAMPLE_RATE * 0.15 * max(1, len(text)))
+        return {"index": index, "key": key_name, "pcm": b"\x00\x00" * samples}
+
+
+def _sequential_baseline(fake, keys, lines, delay):
+    """旧実装相当: キーをローテーションしながら1行ずつ、固定間隔で処理"""
+    results = []
+    for i, line in enumerate(lines):
+        api_key, key_name = keys[i % len(keys)]
+        try:
+            results.append(fake(i, line, api_key, key_name))
+        except FakeRateLimitError:
+            results.append(None)
+        if i < len(lines) - 1:
+            time.sleep(delay)
+    return results
+
+
+def run_benchmark(lines=150, keys=29, quota=3, latency=0.02, scale=0.02, workers=DEFAULT_MAX_WORKERS):
+    """FakeTTS で旧順次処理とスケジューラーを比較（時間は scale 倍に縮めて実行）"""
+    key_list = [(f"fake-key-{i}", f"KEY_{i}") for i in range(keys)]
+    dialogue = [{"speaker": "カツミ" if i % 2 == 0 else "ヒロシ", "text": f"セリフ{i}です"} for i in range(lines)]
+    period = 60.0 * scale
+
+    fake = FakeTTS(quota=quota, latency=latency, period=period)
+    start = time.perf_counter()
+    baseline = _sequential_baseline(fake, key_list, dialogue, delay=3.0 * scale)
+    baseline_time = time.perf_counter() - start
+    print(f"順次処理（3秒間隔）: {baseline_time / scale:.0f}秒相当  成功 {sum(r is not None for r in baseline)}/{lines}")
+
+    # キー2本は常に429（クォータ切れのキー）
+    fake = FakeTTS(quota=quota, latency=latency, period=period, exhausted_keys={"KEY_0", "KEY_1"})
+    scheduler = TTSScheduler(key_list, requests_per_minute=quota, max_workers=workers,
+                             backoff_base=30.0 * scale, backoff_max=120.0 * scale,
+                             period=period, verbose=False)
+    start = time.perf_counter()
+    results = scheduler.map(fake, dialogue, fallback=lambda i, line, e: None)
+    elapsed = time.perf_counter() - start
+    in_order = all(r is not None and r["index"] == i for i, r in enumerate(results))
+    stats = scheduler.stats()
+    print(f"スケジューラー（{workers}並列）: {elapsed / scale:.0f}秒相当  成功 {sum(r is not None for r in results)}/{lines}  "
+          f"順番一致={in_order}  429={fake.rate_limited}回")
+    print(f"  クォータ切れキー: KEY_0 {stats['KEY_0']}  KEY_1 {stats['KEY_1']}")
+    print(f"  正常キー例: KEY_2 {stats['KEY_2']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTSスケジューラー")
+    parser.add_argument("--bench", action="store_true", help="FakeTTSでベンチマーク")
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--keys", type=int, default=29)
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines, keys=args.keys, workers=args.workers)
+    else:
+        parser.print_help()
@@ -24,17 +24,11 @@ from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
-from janome.tokenizer import Tokenizer
 
-# 形態素解析器（シングルトン）
-_tokenizer = None
+from asset_cache import load_font
+from bunsetsu_segmenter import preload as preload_tokenizer, segment_script, tokenize_to_bunsetsu
+from subtitle_track import SubtitleBitmap, SubtitleCue, SubtitleTrack
 
-def get_tokenizer():
-    """形態素解析器を取得（遅延初期化）"""
-    global _tokenizer
-    if _tokenizer is None:
-        _tokenizer = Tokenizer()
-    return _tokenizer
 
 # ffmpegパス設定
 os.environ["PATH"] = os.path.expanduser("~/bin") + ":" + os.environ.get("PATH", "")
@@ -42,8 +36,6 @@ os.environ["PATH"] = os.path.expanduser("~/bin") + ":" + os.environ.get("PATH",
 from moviepy import (
     VideoClip,
     AudioFileClip,
-    ImageClip,
-    CompositeVideoClip,
     concatenate_videoclips,
 )
 from pydub import AudioSegment
@@ -64,6 +56,7 @@ BACKGROUND_COLOR = (30, 30, 30)  # ダークグレー
 
 # 字幕設定
 SUBTITLE_FONT_PATH = "/System/Library/Fonts/ヒラギノ丸ゴ ProN W4.ttc"
+SUBTITLE_FONT_PATH_FALLBACK = "/System/Library/Fonts/AppleSDGothicNeo.ttc"
 SUBTITLE_FONT_SIZE = 52
 SUBTITLE_RUBY_FONT_SIZE = 20  # ルビ用フォントサイズ
 SUBTITLE_MAX_CHARS_PER_LINE = 26  # 1行の最大文字数
@@ -188,71 +181,6 @@ def parse_script(script: str) -> List[Dict]:
     return lines
 
 
-def is_dependent_pos(part_of_speech: str) -> bool:
-    """
-    付属語（前の語にくっつけるべき品詞）かどうか判定
-
-    Args:
-        part_of_speech: 品詞情報（カンマ区切り）
-
-    Returns:
-        付属語ならTrue
-    """
-    pos_parts = part_of_speech.split(',')
-    main_pos = pos_parts[0]
-    sub_pos = pos_parts[1] if len(pos_parts) > 1 else ''
-
-    # 付属語: 助詞、助動詞、接尾辞、非自立（動詞・名詞）、記号
-    if main_pos in ['助詞', '助動詞']:
-        return True
-    if main_pos == '動詞' and sub_pos == '非自立':
-        return True
-    if main_pos == '名詞' and sub_pos == '非自立':
-        return True
-    if main_pos == '名詞' and sub_pos == '接尾':
-        return True
-    if main_pos == '記号':
-        return True
-
-    return False
-
-
-def tokenize_to_bunsetsu(text: str) -> List[str]:
-    """
-    テキストを文節単位に分割
-
-    Args:
-        text: 分割するテキスト
-
-    Returns:
-        文節のリスト
-    """
-    tokenizer = get_tokenizer()
-    tokens = list(tokenizer.tokenize(text))
-
-    bunsetsu_list = []
-    current_bunsetsu = ""
-
-    for token in tokens:
-        word = token.surface
-        pos = token.part_of_speech
-
-        if is_dependent_pos(pos):
-            # 付属語は現在の文節に追加
-            current_bunsetsu += word
-        else:
-            # 自立語の場合、前の文節を保存して新しい文節を開始
-            if current_bunsetsu:
-                bunsetsu_list.append(current_bunsetsu)
-            current_bunsetsu = word
-
-    # 最後の文節を追加
-    if current_bunsetsu:
-        bunsetsu_list.append(current_bunsetsu)
-
-    return bunsetsu_list
-
-
 def wrap_text(text: str, max_chars: int = SUBTITLE_MAX_CHARS_PER_LINE) -> List[str]:
     """
     テキストを日本語の文節単位で折り返す
@@ -386,14 +314,14 @@ def create_subtitle_image(
     Returns:
         PIL Image（RGBA）
     """
-    # フォントを読み込み
+    # フォントを読み込み（asset_cache でメモ化）
     try:
-        font = ImageFont.truetype(SUBTITLE_FONT_PATH, SUBTITLE_FONT_SIZE)
-        ruby_font = ImageFont.truetype(SUBTITLE_FONT_PATH, SUBTITLE_RUBY_FONT_SIZE)
-    except:
+        font = load_font(SUBTITLE_FONT_PATH, SUBTITLE_FONT_SIZE)
+        ruby_font = load_font(SUBTITLE_FONT_PATH, SUBTITLE_RUBY_FONT_SIZE)
+    except OSError:
         # フォールバック
-        font = ImageFont.truetype("/System/Library/Fonts/AppleSDGothicNeo.ttc", SUBTITLE_FONT_SIZE)
-        ruby_font = ImageFont.truetype("/System/Library/Fonts/AppleSDGothicNeo.ttc", SUBTITLE_RUBY_FONT_SIZE)
+        font = load_font(SUBTITLE_FONT_PATH_FALLBACK, SUBTITLE_FONT_SIZE)
+        ruby_font = load_font(SUBTITLE_FONT_PATH_FALLBACK, SUBTITLE_RUBY_FONT_SIZE)
 
     # テキストを折り返し
     lines = wrap_text(text)
@@ -510,46 +438,37 @@ class VideoGenerator:
     def __init__(self):
         """初期化"""
         ensure_dirs()
+        # 形態素解析の辞書を裏で読み込み始める（音声の読み込みなどと並行）
+        preload_tokenizer()
         print_info("VideoGenerator 初期化完了")
 
-    def create_background_clip(self, duration: float) -> ImageClip:
-        """背景クリップを作成"""
-        bg_array = np.full((VIDEO_HEIGHT, VIDEO_WIDTH, 3), BACKGROUND_COLOR, dtype=np.uint8)
-        return ImageClip(bg_array).with_duration(duration)
-
-    def create_subtitle_clip(
-        self,
-        text: str,
-        character: str,
-        duration: float,
-        start_time: float,
-    ) -> ImageClip:
+    def create_subtitle_track(self, subtitle_timings: List[Dict]) -> SubtitleTrack:
         """
-        字幕クリップを作成
+        字幕トラックを作成（セリフごとの字幕画像を事前に作り、時刻から二分探索で引く）
 
         Args:
-            text: 字幕テキスト
-            character: キャラクター名
-            duration: 表示時間（秒）
-            start_time: 開始時間（秒）
+            subtitle_timings: [{"character", "line", "start", "duration"}, ...]
 
         Returns:
-            ImageClip
+            SubtitleTrack
         """
-        # 字幕画像を生成
-        subtitle_img = create_subtitle_image(text, character)
-        subtitle_array = np.array(subtitle_img)
-
-        # クリップを作成
-        clip = ImageClip(subtitle_array).with_duration(duration)
-
-        # 位置を設定（画面下部）
-        clip = clip.with_position(("center", VIDEO_HEIGHT - subtitle_img.height - SUBTITLE_BOTTOM_MARGIN))
+        background = np.full((VIDEO_HEIGHT, VIDEO_WIDTH, 3), BACKGROUND_COLOR, dtype=np.uint8)
+        cues = []
+        for i, timing in enumerate(subtitle_timings):
+            print_progress(i + 1, len(subtitle_timings), f"{timing['character']}: {timing['line'][:15]}...")
 
-        # 開始時間を設定
-        clip = clip.with_start(start_time)
+            subtitle_img = create_subtitle_image(timing["line"], timing["character"])
+            # 位置は画面下部・中央
+            x = (VIDEO_WIDTH - subtitle_img.width) // 2
+            y = VIDEO_HEIGHT - subtitle_img.height - SUBTITLE_BOTTOM_MARGIN
+            cues.append(SubtitleCue(
+                timing["start"],
+                timing["start"] + timing["duration"],
+                [(SubtitleBitmap(subtitle_img), x, y)],
+            ))
 
-        return clip
+        print()  # 改行
+        return SubtitleTrack(background, cues)
 
     def generate_from_audio_and_script(
         self,
@@ -557,6 +476,7 @@ class VideoGenerator:
         script: str,
         output_filename: str = "output.mp4",
         audio_segments: Optional[List[Tuple[Path, str, float]]] = None,
+        still: bool = False,
     ) -> Optional[Path]:
         """
         音声ファイルと台本から動画を生成
@@ -567,6 +487,8 @@ class VideoGenerator:
             output_filename: 出力ファイル名
             audio_segments: [(セグメント音声パス, キャラクター名, 開始時間), ...]
                            指定しない場合は台本から推定
+            still: True なら字幕の切り替わりごとの静止画として ffmpeg 1回で書き出す
+                   （MoviePy を通さない。見た目は同じ）
 
         Returns:
             生成された動画ファイルのパス（失敗時はNone）
@@ -591,6 +513,9 @@ class VideoGenerator:
 
         print_info(f"セリフ数: {len(lines)}行")
 
+        # 台本全体を先に文節分割しておく（字幕の折り返しはメモから引く）
+        segment_script(item["line"] for item in lines)
+
         # 字幕のタイミングを計算
         # audio_segmentsが指定されていない場合は均等に分割
         if audio_segments is None:
@@ -626,51 +551,33 @@ class VideoGenerator:
                     "duration": duration,
                 })
 
-        # 背景クリップを作成
-        print_info("背景を作成中...")
-        background = self.create_background_clip(total_duration)
-
-        # 字幕クリップを作成
+        # 字幕トラックを作成（背景 + 時刻ごとの字幕）
         print_info("字幕を作成中...")
-        subtitle_clips = []
-        for i, timing in enumerate(subtitle_timings):
-            print_progress(i + 1, len(subtitle_timings), f"{timing['character']}: {timing['line'][:15]}...")
-
-            clip = self.create_subtitle_clip(
-                text=timing["line"],
-                character=timing["character"],
-                duration=timing["duration"],
-                start_time=timing["start"],
-            )
-            subtitle_clips.append(clip)
-
-        print()  # 改行
+        track = self.create_subtitle_track(subtitle_timings)
 
-        # 動画を合成
-        print_info("動画を合成中...")
-        final_video = CompositeVideoClip(
-            [background] + subtitle_clips,
-            size=(VIDEO_WIDTH, VIDEO_HEIGHT)
-        )
-
-        # 音声を追加
-        final_video = final_video.with_audio(audio_clip)
-
-        # 出力
         output_path = OUTPUT_DIR / output_filename
         print_info(f"動画を出力中: {output_path}")
 
-        final_video.write_videofile(
-            str(output_path),
-            fps=VIDEO_FPS,
-            codec="libx264",
-            audio_codec="aac",
-            logger="bar",
-        )
+        if still:
+            audio_clip.close()
+            if not track.render(output_path, total_duration, audio_path=audio_path, fps=VIDEO_FPS):
+                print_error("動画の書き出しに失敗しました")
+                return None
+        else:
+            # 動画を合成（フレームごとに表示中の字幕だけを背景に合成）
+            final_video = track.to_clip(total_duration).with_audio(audio_clip)
+
+            final_video.write_videofile(
+                str(output_path),
+                fps=VIDEO_FPS,
+                codec="libx264",
+                audio_codec="aac",
+                logger="bar",
+            )
 
-        # リソースを解放
-        audio_clip.close()
-        final_video.close()
+            # リソースを解放
+            audio_clip.close()
+            final_video.close()
 
         # ファイルサイズを取得
         file_size = output_path.stat().st_size / (1024 * 1024)
@@ -717,6 +624,7 @@ if __name__ == "__main__":
     parser.add_argument("--audio", type=str, help="音声ファイルパス")
     parser.add_argument("--script", type=str, help="台本ファイルパス")
     parser.add_argument("--output", type=str, default="output.mp4", help="出力ファイル名")
+    parser.add_argument("--still", action="store_true", help="静止画として ffmpeg 1回で書き出す（MoviePy を通さない）")
 
     args = parser.parse_args()
 
@@ -732,6 +640,7 @@ if __name__ == "__main__":
                 audio_path=Path(args.audio),
                 script=script,
                 output_filename=args.output,
+                still=args.still,
             )
         else:
             # デフォルト: テスト実行
@@ -21,9 +21,11 @@ import requests
 import hashlib
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-import numpy as np
-from janome.tokenizer import Tokenizer
+from PIL import Image, ImageDraw, ImageFilter
+
+from asset_cache import find_font
+from bunsetsu_segmenter import preload as preload_tokenizer, segment_script, tokenize_to_bunsetsu
+from subtitle_track import SubtitleBitmap, SubtitleCue, SubtitleTrack
 
 # Unsplash API
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
@@ -34,8 +36,6 @@ os.environ["PATH"] = os.path.expanduser("~/bin") + ":" + os.environ.get("PATH",
 
 from moviepy import (
     AudioFileClip,
-    ImageClip,
-    CompositeVideoClip,
 )
 from pydub import AudioSegment
 
@@ -112,14 +112,6 @@ RUBY_DICT = {
     "諦める": "あきらめる",
 }
 
-# 形態素解析器
-_tokenizer = None
-
-def get_tokenizer():
-    global _tokenizer
-    if _tokenizer is None:
-        _tokenizer = Tokenizer()
-    return _tokenizer
 
 
 # ============================================================
@@ -136,45 +128,6 @@ def ensure_dirs():
     BG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def is_dependent_pos(part_of_speech: str) -> bool:
-    """付属語判定"""
-    pos_parts = part_of_speech.split(',')
-    main_pos = pos_parts[0]
-    sub_pos = pos_parts[1] if len(pos_parts) > 1 else ''
-
-    if main_pos in ['助詞', '助動詞']:
-        return True
-    if main_pos == '動詞' and sub_pos == '非自立':
-        return True
-    if main_pos == '名詞' and sub_pos in ['非自立', '接尾']:
-        return True
-    if main_pos == '記号':
-        return True
-    return False
-
-
-def tokenize_to_bunsetsu(text: str) -> List[str]:
-    """文節単位に分割"""
-    tokenizer = get_tokenizer()
-    tokens = list(tokenizer.tokenize(text))
-
-    bunsetsu_list = []
-    current = ""
-
-    for token in tokens:
-        if is_dependent_pos(token.part_of_speech):
-            current += token.surface
-        else:
-            if current:
-                bunsetsu_list.append(current)
-            current = token.surface
-
-    if current:
-        bunsetsu_list.append(current)
-
-    return bunsetsu_list
-
-
 def wrap_text(text: str, max_chars: int = SUBTITLE_MAX_CHARS) -> List[str]:
     """文節単位で改行"""
     bunsetsu_list = tokenize_to_bunsetsu(text)
@@ -459,6 +412,35 @@ def create_cafe_background():
     return img
 
 
+def get_main_font():
+    """本文フォント（asset_cache でメモ化。読み込めなければ Noto → デフォルトの順）"""
+    return find_font((
+        FONT_PATH,
+        # フォールバック: Ubuntu用のNotoフォント
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJKjp-Regular.otf",
+    ), FONT_SIZE_MAIN)
+
+
+def layout_subtitle_lines(draw, text: str, is_upper: bool, font) -> List[Tuple[int, int, str]]:
+    """上半分/下半分の字幕の各行の位置 [(x, y, 行), ...]（中央揃え）"""
+    line_height = 100  # 行間
+
+    lines = wrap_text(text)[:SUBTITLE_MAX_LINES]
+    total_height = len(lines) * line_height
+    area_top = 0 if is_upper else HALF_HEIGHT + CENTER_GAP // 2
+    area_height = HALF_HEIGHT - CENTER_GAP // 2
+    text_y = area_top + (area_height - total_height) // 2
+    positions = []
+    for line in lines:
+        line_bbox = draw.textbbox((0, 0), line, font=font)
+        line_width = line_bbox[2] - line_bbox[0]
+        positions.append(((VIDEO_WIDTH - line_width) // 2, text_y, line))
+        text_y += line_height
+    return positions
+
+
 def create_frame(
     speaker: str,
     text: str,
@@ -480,61 +462,43 @@ def create_frame(
     # 背景（Unsplash APIから取得）
     img = get_background(bg_query)
     draw = ImageDraw.Draw(img, 'RGBA')
+    font = get_main_font()
 
-    # フォント
-    try:
-        font = ImageFont.truetype(FONT_PATH, FONT_SIZE_MAIN)
-    except:
-        # フォールバック: Ubuntu用のNotoフォント
-        fallback_fonts = [
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/opentype/noto/NotoSansCJKjp-Regular.otf",
-        ]
-        font = None
-        for fb_font in fallback_fonts:
-            if os.path.exists(fb_font):
-                font = ImageFont.truetype(fb_font, FONT_SIZE_MAIN)
-                break
-        if font is None:
-            font = ImageFont.load_default()
+    # 相談者テキストがあれば上半分、回答者テキストがあれば下半分に描画
+    for subtitle_text, is_upper in ((consulter_text, True), (advisor_text, False)):
+        if not subtitle_text:
+            continue
+        draw_subtitle_background(draw, is_upper=is_upper)
+        for line_x, text_y, line in layout_subtitle_lines(draw, subtitle_text, is_upper, font):
+            draw_text_with_shadow(draw, (line_x, text_y), line, font)
 
-    line_height = 100  # 行間
+    return img
 
-    # 相談者テキストがあれば上半分に描画
-    if consulter_text:
-        draw_subtitle_background(draw, is_upper=True)
-        lines = wrap_text(consulter_text)
-        total_lines = min(len(lines), SUBTITLE_MAX_LINES)
-        total_height = total_lines * line_height
-        area_height = HALF_HEIGHT - CENTER_GAP // 2
-        start_y = (area_height - total_height) // 2
-        text_y = start_y
-        for line in lines[:SUBTITLE_MAX_LINES]:
-            line_bbox = draw.textbbox((0, 0), line, font=font)
-            line_width = line_bbox[2] - line_bbox[0]
-            line_x = (VIDEO_WIDTH - line_width) // 2
-            draw_text_with_shadow(draw, (line_x, text_y), line, font)
-            text_y += line_height
-
-    # 回答者テキストがあれば下半分に描画
-    if advisor_text:
-        draw_subtitle_background(draw, is_upper=False)
-        lines = wrap_text(advisor_text)
-        total_lines = min(len(lines), SUBTITLE_MAX_LINES)
-        total_height = total_lines * line_height
-        area_top = HALF_HEIGHT + CENTER_GAP // 2
-        area_height = HALF_HEIGHT - CENTER_GAP // 2
-        start_y = area_top + (area_height - total_height) // 2
-        text_y = start_y
-        for line in lines[:SUBTITLE_MAX_LINES]:
-            line_bbox = draw.textbbox((0, 0), line, font=font)
-            line_width = line_bbox[2] - line_bbox[0]
-            line_x = (VIDEO_WIDTH - line_width) // 2
+
+def create_subtitle_layers(text: str, is_upper: bool) -> List[SubtitleBitmap]:
+    """
+    字幕トラック用の画像 [帯, 文字]（create_frame と同じ順に重ねるので見た目も同じ）
+
+    帯は上下それぞれ1回だけ作って使い回す。文字（影付き）は字幕の範囲だけ切り出す。
+    """
+    font = get_main_font()
+
+    def draw_lines(draw):
+        for line_x, text_y, line in layout_subtitle_lines(draw, text, is_upper, font):
             draw_text_with_shadow(draw, (line_x, text_y), line, font)
-            text_y += line_height
 
-    return img
+    return [get_subtitle_band(is_upper), SubtitleBitmap.from_drawing((VIDEO_WIDTH, VIDEO_HEIGHT), draw_lines)]
+
+
+_subtitle_bands: Dict[bool, SubtitleBitmap] = {}
+
+
+def get_subtitle_band(is_upper: bool) -> SubtitleBitmap:
+    """半透明グレーの帯（上下それぞれ1回だけ作る）"""
+    if is_upper not in _subtitle_bands:
+        _subtitle_bands[is_upper] = SubtitleBitmap.from_drawing(
+            (VIDEO_WIDTH, VIDEO_HEIGHT), lambda draw: draw_subtitle_background(draw, is_upper=is_upper))
+    return _subtitle_bands[is_upper]
 
 
 # ============================================================
@@ -546,6 +510,8 @@ class VideoGeneratorV2:
 
     def __init__(self):
         ensure_dirs()
+        # 形態素解析の辞書を裏で読み込み始める（音声の読み込みなどと並行）
+        preload_tokenizer()
         print_info("VideoGeneratorV2 初期化完了")
 
     def generate_from_audio_and_script(
@@ -554,8 +520,9 @@ class VideoGeneratorV2:
         script: str,
         output_filename: str = "output.mp4",
         consulter_info: Dict = None,
+        still: bool = False,
     ) -> Optional[Path]:
-        """音声と台本から動画生成"""
+        """音声と台本から動画生成（still=True なら静止画として ffmpeg 1回で書き出す）"""
 
         print_info("動画生成を開始...")
 
@@ -575,6 +542,9 @@ class VideoGeneratorV2:
 
         print_info(f"セリフ数: {len(lines)}行")
 
+        # 台本全体を先に文節分割しておく（字幕の折り返しはメモから引く）
+        segment_script(item["line"] for item in lines)
+
         # タイミング計算（文字数ベース）
         total_chars = sum(len(item["line"]) for item in lines)
         current_time = 0.0
@@ -591,55 +561,55 @@ class VideoGeneratorV2:
             })
             current_time += duration
 
-        # 各セリフのクリップを生成（字幕を保持）
-        print_info("フレームを生成中...")
-        clips = []
+        # 字幕トラックを作成（字幕画像はセリフごとに1回だけ作り、直前の相手の字幕は使い回す）
+        print_info("字幕を作成中...")
+        cues = []
 
         # 現在表示中の字幕を追跡
-        current_consulter_text = ""
-        current_advisor_text = ""
+        consulter_layers: List = []
+        advisor_layers: List = []
 
         for i, timing in enumerate(timings):
             print(f"\r  セリフ {i+1}/{len(timings)}", end="", flush=True)
 
             # 話者判定と字幕更新
             if timing["character"] == CHARACTER_CONSULTER:
-                current_consulter_text = timing["line"]
+                consulter_layers = create_subtitle_layers(timing["line"], is_upper=True) if timing["line"] else []
             else:
-                current_advisor_text = timing["line"]
-
-            # フレーム生成（両方の字幕を渡す）
-            frame_img = create_frame(
-                speaker="consulter" if timing["character"] == CHARACTER_CONSULTER else "advisor",
-                text=timing["line"],
-                consulter_text=current_consulter_text,
-                advisor_text=current_advisor_text,
-            )
+                advisor_layers = create_subtitle_layers(timing["line"], is_upper=False) if timing["line"] else []
 
-            frame_array = np.array(frame_img)
-            clip = ImageClip(frame_array).with_duration(timing["duration"]).with_start(timing["start"])
-            clips.append(clip)
+            cues.append(SubtitleCue(
+                timing["start"],
+                timing["start"] + timing["duration"],
+                [(bitmap, 0, 0) for bitmap in consulter_layers + advisor_layers],
+            ))
 
         print()
 
-        # 合成
-        print_info("動画を合成中...")
-        final_video = CompositeVideoClip(clips, size=(VIDEO_WIDTH, VIDEO_HEIGHT))
-        final_video = final_video.with_audio(audio_clip)
+        track = SubtitleTrack(get_background(), cues)
 
         output_path = OUTPUT_DIR / output_filename
         print_info(f"動画を出力中: {output_path}")
 
-        final_video.write_videofile(
-            str(output_path),
-            fps=VIDEO_FPS,
-            codec="libx264",
-            audio_codec="aac",
-            logger="bar",
-        )
+        if still:
+            audio_clip.close()
+            if not track.render(output_path, total_duration, audio_path=audio_path, fps=VIDEO_FPS):
+                print_error("動画の書き出しに失敗")
+                return None
+        else:
+            # 合成（フレームごとに表示中の字幕だけを背景に合成）
+            final_video = track.to_clip(total_duration).with_audio(audio_clip)
+
+            final_video.write_videofile(
+                str(output_path),
+                fps=VIDEO_FPS,
+                codec="libx264",
+                audio_codec="aac",
+                logger="bar",
+            )
 
-        audio_clip.close()
-        final_video.close()
+            audio_clip.close()
+            final_video.close()
 
         file_size = output_path.stat().st_size / (1024 * 1024)
         print_success(f"動画生成完了: {output_path}")
@@ -685,6 +655,7 @@ if __name__ == "__main__":
     parser.add_argument("--audio", type=str, help="音声ファイルパス")
     parser.add_argument("--script", type=str, help="台本ファイルパス")
     parser.add_argument("--output", type=str, default="output.mp4", help="出力ファイル名")
+    parser.add_argument("--still", action="store_true", help="静止画として ffmpeg 1回で書き出す（MoviePy を通さない）")
 
     args = parser.parse_args()
 
@@ -710,6 +681,7 @@ if __name__ == "__main__":
                     audio_path=test_audio,
                     script=test_script,
                     output_filename="test_video_v2.mp4",
+                    still=args.still,
                 )
             else:
                 print_error("テスト音声がありません: output/audio/test_output.mp3")
@@ -720,6 +692,7 @@ if __name__ == "__main__":
                 audio_path=Path(args.audio),
                 script=script,
                 output_filename=args.output,
+                still=args.still,
             )
         else:
             generator.test_frame()
@@ -19,6 +19,8 @@ from google.oauth2 import service_account
 import gspread
 import requests
 
+from subtitle_frames import NO_SUBTITLE, extract_subtitles
+
 # ============================================================
 # 設定
 # ============================================================
@@ -194,50 +196,56 @@ def extract_frames(video_path: str, output_dir: str, interval: int = 3) -> List[
         print_error(f"フレーム抽出エラー: {e}")
         return []
 
+def _vision_read_batch(model, images: List[bytes]) -> List[str]:
+    """字幕帯の画像をまとめて1リクエストで読み取り（画像の順番の字幕リスト）"""
+    import base64
+
+    parts = []
+    for i, image_data in enumerate(images, 1):
+        parts.append(f"画像{i}:")
+        parts.append({'mime_type': 'image/jpeg', 'data': base64.b64encode(image_data).decode('utf-8')})
+
+    prompt = f"""上の{len(images)}枚の画像それぞれに表示されている字幕テキストを読み取ってください。
+字幕がない画像は「なし」としてください。
+画像の順番どおり、{len(images)}要素のJSON配列（文字列のみ）で返してください。説明は不要です。
+例: ["1枚目の字幕", "なし", "3枚目の字幕"]"""
+
+    response = model.generate_content(parts + [prompt])
+    match = re.search(r'\[[\s\S]*\]', response.text)
+    texts = None
+    if match:
+        try:
+            texts = json.loads(match.group())
+        except ValueError:
+            texts = None
+    if isinstance(texts, list) and len(texts) == len(images):
+        return [str(t).strip() for t in texts]
+
+    # JSONが壊れている・枚数が合わないときは1枚ずつ読み直す（まとめて捨てない）
+    if len(images) == 1:
+        return [response.text.strip()]
+    texts = []
+    for i, image_data in enumerate(images, 1):
+        try:
+            texts.extend(_vision_read_batch(model, [image_data]))
+        except Exception as e:
+            # 読めなかった1枚だけ字幕なし扱い（残りの画像は捨てない）
+            print_error(f"字幕読み取りエラー（{i}/{len(images)}枚目）: {e}")
+            texts.append(NO_SUBTITLE)
+    return texts
+
 def read_subtitles_from_frames(frames: List[str]) -> str:
-    """Gemini Vision でフレームから字幕を読み取り"""
+    """Gemini Vision でフレームから字幕を読み取り
+
+    字幕帯が変わったフレームだけを数枚ずつまとめて読む（subtitle_frames.extract_subtitles）
+    """
     
     print_info("Gemini Vision で字幕を読み取り中...")
     
     genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
     model = genai.GenerativeModel('gemini-2.0-flash')
     
-    all_subtitles = []
-    
-    for i, frame_path in enumerate(frames):
-        try:
-            # 画像を読み込み
-            with open(frame_path, 'rb') as f:
-                image_data = f.read()
-            
-            import base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            prompt = """この画像に表示されている字幕テキストを読み取ってください。
-字幕がない場合は「なし」と返してください。
-字幕テキストのみを返してください。説明は不要です。"""
-            
-            response = model.generate_content([
-                {'mime_type': 'image/jpeg', 'data': image_base64},
-                prompt
-            ])
-            
-            subtitle = response.text.strip()
-            if subtitle and subtitle != "なし":
-                all_subtitles.append(subtitle)
-                
-            if (i + 1) % 10 == 0:
-                print_info(f"  {i + 1}/{len(frames)} フレーム処理完了")
-                
-        except Exception as e:
-            print_error(f"フレーム {i} の処理エラー: {e}")
-            continue
-    
-    # 重複を除去して結合
-    unique_subtitles = []
-    for sub in all_subtitles:
-        if sub not in unique_subtitles:
-            unique_subtitles.append(sub)
+    unique_subtitles = extract_subtitles(frames, lambda images: _vision_read_batch(model, images))
     
     full_text = "\n".join(unique_subtitles)
     print_success(f"字幕テキスト取得完了（{len(full_text)}文字）")
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whisperによる字幕タイミング合わせ（モデル共有 + 単語タイムスタンプの強制アライメント）
+
+台本は1本の音声にまとめて合成しているので、各セリフの開始・終了時刻は
+Whisper の文字起こしと台本を突き合わせて求める。
+- WhisperModel はプロセス内で1回だけロード（サイズ・デバイスごとにキャッシュ）
+- 台本全体と文字起こし全体を、正規化した読みの1文字単位で動的計画法（編集距離）で対応付け
+  - 対角線の周り ±band だけを計算するので、計算量は文字数に対して線形
+  - セグメントの組み合わせを総当たりする difflib 方式と違い、ずれが後ろに累積しない
+- 全セリフを1回で対応付けるバッチAPI（align_lines）
+
+使い方:
+    words, _ = transcribe_words(audio_path, model_size="base")
+    timings = align_lines([line["text"] for line in dialogue], words, total_duration)
+    for t in timings:
+        print(t.start, t.end, t.score)
+
+ベンチマーク:
+    python whisper_align.py --bench
+"""
+
+import argparse
+import random
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+
+DEFAULT_BAND = 100  # 対角線からの探索幅（文字数）
+MIN_SCORE = 0.3  # これ未満の一致率のセリフは「対応付けできなかった」扱い
+
+# 1単語（Whisper の word_timestamps の1要素）
+Word = namedtuple("Word", ["start", "end", "text"])
+
+# 1セリフのタイミング（score は一致した文字の割合、補間した場合は 0）
+LineTiming = namedtuple("LineTiming", ["start", "end", "score"])
+
+
+# ===== モデルキャッシュ =====
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_whisper_model(size: str = "base", device: str = "cpu", compute_type: str = "int8"):
+    """WhisperModel を取得（同じ設定なら2回目以降はロード済みのものを返す）"""
+    key = (size, device, compute_type)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            from faster_whisper import WhisperModel
+            print(f"    [Whisper] モデルロード中 ({size})...")
+            model = WhisperModel(size, device=device, compute_type=compute_type)
+            _models[key] = model
+        return model
+
+
+def clear_whisper_models():
+    """キャッシュしたモデルを解放"""
+    with _models_lock:
+        _models.clear()
+
+
+# ===== 文字起こし =====
+
+def words_from_segments(segments) -> list:
+    """Whisperのセグメント（オブジェクト / dict）を Word のリストに変換
+
+    word_timestamps がないセグメントは、セグメント全体を1単語として扱う。
+    """
+    def get(obj, name):
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    words = []
+    for seg in segments:
+        seg_words = get(seg, "words") or []
+        if seg_words:
+            for w in seg_words:
+                words.append(Word(get(w, "start"), get(w, "end"), get(w, "word") or ""))
+        else:
+            words.append(Word(get(seg, "start"), get(seg, "end"), get(seg, "text") or ""))
+    return words
+
+
+def transcribe_words(audio_path: str, model_size: str = "base", language: str = "ja", **kwargs) -> tuple:
+    """音声を文字起こしして (単語リスト, セグメントリスト) を返す
+
+    kwargs は WhisperModel.transcribe にそのまま渡す（vad_parameters など）。
+    """
+    model = get_whisper_model(model_size)
+    options = {"word_timestamps": True, "vad_filter": True}
+    options.update(kwargs)
+    segments_raw, _ = model.transcribe(audio_path, language=language, **options)
+    segments = list(segments_raw)
+    return words_from_segments(segments), segments
+
+
+# ===== 正規化 =====
+
+def normalize_reading(text: str, reading=None) -> str:
+    """対応付け用にテキストを正規化
+
+    NFKC → カタカナをひらがなへ → 文字・数字以外（句読点・空白・記号）を除去。
+    reading を渡すと先に読みへ変換する（漢字と読みの表記ゆれ対策）。
+    """
+    if reading:
+        text = reading(text)
+    text = unicodedata.normalize("NFKC", text)
+    chars = []
+    for ch in text:
+        code = ord(ch)
+        if 0x30A1 <= code <= 0x30F6:  # カタカナ → ひらがな
+            ch = chr(code - 0x60)
+        if unicodedata.category(ch)[0] in ("L", "N"):
+            chars.append(ch)
+    return "".join(chars)
+
+
+def _char_times(words, reading=None) -> tuple:
+    """文字起こしを1文字単位に展開し、(文字列, 各文字の開始時刻, 各文字の終了時刻) を返す
+
+    単語内の時刻は文字数で均等に割り振る。
+    """
+    chars = []
+    starts = []
+    ends = []
+    for w in words:
+        norm = normalize_reading(w.text, reading)
+        if not norm or w.start is None or w.end is None:
+            continue
+        step = max(w.end - w.start, 0.0) / len(norm)
+        for k, ch in enumerate(norm):
+            chars.append(ch)
+            starts.append(w.start + step * k)
+            ends.append(w.start + step * (k + 1))
+    return "".join(chars), starts, ends
+
+
+# ===== 動的計画法 =====
+
+def align_chars(script: str, transcript: str, band: int = DEFAULT_BAND) -> list:
+    """台本の各文字に対応する文字起こしの位置を返す（編集距離の帯DP）
+
+    対角線（i * m / n）の前後 band 文字だけを計算する。
+
+    Returns:
+        list: 台本の各文字について (文字起こしの位置, 完全一致か) / 対応なしは None
+    """
+    n = len(script)
+    m = len(transcript)
+    if n == 0:
+        return []
+    if m == 0:
+        return [None] * n
+
+    band = max(band, m // n + 2)  # 隣り合う行の計算範囲が必ず重なるように
+    inf = float("inf")
+    bounds = []  # 各行の計算範囲 (lo, hi)
+    backs = []  # 各行の戻り方向 0=一致 1=置換 2=台本側スキップ 3=文字起こし側スキップ
+
+    # 0行目: 文字起こしの先頭をスキップ
+    lo, hi = 0, min(m, band)
+    prev = list(range(lo, hi + 1))
+    bounds.append((lo, hi))
+    backs.append(bytearray([3] * (hi - lo + 1)))
+
+    for i in range(1, n + 1):
+        center = i * m // n
+        lo = max(0, center - band)
+        hi = min(m, center + band)
+        prev_lo, prev_hi = bounds[-1]
+        ch = script[i - 1]
+        row = [inf] * (hi - lo + 1)
+        back = bytearray(hi - lo + 1)
+
+        for j in range(lo, hi + 1):
+            best = inf
+            direction = 0
+            if prev_lo <= j - 1 <= prev_hi:
+                if transcript[j - 1] == ch:
+                    best = prev[j - 1 - prev_lo]
+                    direction = 0
+                else:
+                    best = prev[j - 1 - prev_lo] + 1
+                    direction = 1
+            if prev_lo <= j <= prev_hi:
+                cost = prev[j - prev_lo] + 1
+                if cost < best:
+                    best = cost
+                    direction = 2
+            if j > lo:
+                cost = row[j - 1 - lo] + 1
+                if cost < best:
+                    best = cost
+                    direction = 3
+            row[j - lo] = best
+            back[j - lo] = direction
+
+        prev = row
+        bounds.append((lo, hi))
+        backs.append(back)
+
+    # 文字起こしの末尾（BGMの誤認識など）はスキップしてよい
+    lo, hi = bounds[n]
+    j = lo + min(range(hi - lo + 1), key=lambda k: (prev[k], -k))
+
+    mapping = [None] * n
+    i = n
+    while i > 0:
+        lo = bounds[i][0]
+        direction = backs[i][j - lo]
+        if direction <= 1:
+            mapping[i - 1] = (j - 1, direction == 0)
+            i -= 1
+            j -= 1
+        elif direction == 2:
+            i -= 1
+        else:
+            j -= 1
+    return mapping
+
+
+def _fill_gaps(timings: list, weights: list, total_duration: float) -> list:
+    """対応付けできなかったセリフを前後のタイミングの間にテキスト長比例で割り振る"""
+    result = list(timings)
+    n = len(result)
+    i = 0
+    while i < n:
+        if result[i] is not None:
+            i += 1
+            continue
+        j = i
+        while j < n and result[j] is None:
+            j += 1
+        left = result[i - 1].end if i > 0 else 0.0
+        right = result[j].start if j < n else max(total_duration, left)
+        if right < left:
+            right = left
+        span = [max(w, 1) for w in weights[i:j]]
+        cursor = left
+        for k, weight in zip(range(i, j), span):
+            length = (right - left) * weight / sum(span)
+            result[k] = LineTiming(cursor, cursor + length, 0.0)
+            cursor += length
+        i = j
+    return result
+
+
+def align_lines(lines: list, words: list, total_duration: float = None, band: int = DEFAULT_BAND,
+                reading=None, min_score: float = MIN_SCORE) -> list:
+    """台本の全セリフを文字起こしの単語列に一括で対応付ける
+
+    Args:
+        lines: セリフのテキストのリスト
+        words: Word（start, end, text）のリスト（words_from_segments の結果）
+        total_duration: 音声の総長（対応付けできなかった末尾のセリフの割り振りに使う）
+        band: DPの探索幅（文字数）
+        reading: テキストを読みに変換する関数（任意）
+        min_score: 一致率がこれ未満のセリフは補間に回す
+
+    Returns:
+        list: 各セリフの LineTiming。total_duration が None なら対応付けできなかったセリフは None
+    """
+    normalized = [normalize_reading(text, reading) for text in lines]
+    script = "".join(normalized)
+    transcript, starts, ends = _char_times(words, reading)
+    mapping = align_chars(script, transcript, band=band)
+
+    timings = []
+    offset = 0
+    for norm in normalized:
+        matched = [m for m in mapping[offset:offset + len(norm)] if m is not None]
+        offset += len(norm)
+        exact = sum(1 for _, is_exact in matched if is_exact)
+        score = exact / len(norm) if norm else 0.0
+        if not matched or score < min_score:
+            timings.append(None)
+            continue
+        timings.append(LineTiming(starts[matched[0][0]], ends[matched[-1][0]], score))
+
+    # 前後と矛盾する（時間が逆行する）対応付けは捨てて補間に回す
+    last_end = 0.0
+    for k, timing in enumerate(timings):
+        if timing is None:
+            continue
+        if timing.start < last_end - 0.05:
+            timings[k] = None
+            continue
+        last_end = timing.end
+
+    if total_duration is None:
+        return timings
+    return _fill_gaps(timings, [len(norm) for norm in normalized], total_duration)
+
+
+def align_audio(audio_path: str, lines: list, total_duration: float, model_size: str = "base",
+                band: int = DEFAULT_BAND, reading=None, **transcribe_kwargs) -> list:
+    """音声を文字起こしして全セリフのタイミングを返す（transcribe_words + align_lines）"""
+    words, _ = transcribe_words(audio_path, model_size=model_size, **transcribe_kwargs)
+    return align_lines(lines, words, total_duration, band=band, reading=reading)
+
+
+# ===== ベンチマーク =====
+
+def _synthetic_transcript(lines: list, chars_per_sec: float = 7.0, gap: float = 0.4,
+                          error_rate: float = 0.08, seed: int = 0) -> tuple:
+    """台本から「誤認識を含む文字起こし」と正解タイミングを作る"""
+    rng = random.Random(seed)
+    kana = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    words = []
+    truth = []
+    t = 0.0
+    for text in lines:
+        start = t
+        chunk = ""
+        for ch in text:
+            r = rng.random()
+            if r < error_rate / 3:
+                continue  # 脱落
+            if r < error_rate * 2 / 3:
+                ch = rng.choice(kana)  # 誤認識
+            elif r < error_rate:
+                chunk += rng.choice(kana)  # 挿入
+            chunk += ch
+            if len(chunk) >= 4:
+                words.append(Word(t, t + len(chunk) / chars_per_sec, chunk))
+                t += len(chunk) / chars_per_sec
+                chunk = ""
+        if chunk:
+            words.append(Word(t, t + len(chunk) / chars_per_sec, chunk))
+            t += len(chunk) / chars_per_sec
+        truth.append((start, t))
+        t += gap
+    return words, truth, t
+
+
+def _difflib_baseline(lines: list, words: list) -> list:
+    """旧方式（セグメント結合の総当たり + SequenceMatcher）の再現"""
+    import difflib
+
+    # 旧方式はセグメント単位なので、単語を約3語ずつまとめてセグメント扱いにする
+    segments = [Word(words[k].start, words[min(k + 2, len(words) - 1)].end,
+                     "".join(w.text for w in words[k:k + 3])) for k in range(0, len(words), 3)]
+    timings = []
+    idx = 0
+    for text in lines:
+        best_ratio, best = 0.0, None
+        for j in range(max(0, idx - 2), min(len(segments), idx + 8)):
+            for k in range(j, min(j + 3, len(segments))):
+                combined = "".join(s.text for s in segments[j:k + 1])
+                ratio = difflib.SequenceMatcher(None, text, combined).ratio()
+                if ratio > best_ratio:
+                    best_ratio, best = ratio, (j, k)
+        if best and best_ratio > 0.5:
+            timings.append((segments[best[0]].start, segments[best[1]].end))
+            idx = best[1] + 1
+        else:
+            timings.append(None)
+    return timings
+
+
+def run_benchmark(lines: int = 150, band: int = DEFAULT_BAND):
+    """合成した文字起こしで旧方式とDPアライナーを比較"""
+    rng = random.Random(1)
+    vocab = ["年金", "の", "受給", "額", "が", "増え", "ます", "今年", "から", "制度", "変更",
+             "ねんきん", "しんせい", "手続き", "ヒロシ", "カツミ", "さん", "です", "よね"]
+    script = ["".join(rng.choice(vocab) for _ in range(rng.randint(6, 14))) + "。" for _ in range(lines)]
+    words, truth, total = _synthetic_transcript(script)
+
+    def error(timings):
+        errs = [abs(t[0] - s) + abs(t[1] - e) for t, (s, e) in zip(timings, truth) if t is not None]
+        return sum(errs) / max(len(errs), 1) / 2, len(errs)
+
+    start = time.perf_counter()
+    baseline = _difflib_baseline(script, words)
+    baseline_time = time.perf_counter() - start
+    err, count = error(baseline)
+    print(f"difflib方式: {baseline_time:.2f}秒  対応付け {count}/{lines}  平均誤差 {err:.2f}秒")
+
+    start = time.perf_counter()
+    timings = align_lines(script, words, total, band=band)
+    elapsed = time.perf_counter() - start
+    matched = sum(1 for t in timings if t.score > 0)
+    err, _ = error(timings)
+    print(f"DPアライナー: {elapsed:.2f}秒  対応付け {matched}/{lines}  平均誤差 {err:.2f}秒")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whisper字幕タイミング合わせ")
+    parser.add_argument("--bench", action="store_true", help="合成データでベンチマーク")
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--band", type=int, default=DEFAULT_BAND)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(lines=args.lines, band=args.band)
+    else:
+        parser.print_help()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YouTube Data API のメタデータ取得（IDをまとめて問い合わせ + 実行をまたぐキャッシュ + チャンネル並列）
+
+口コミ台本スクレイパーが、検索で見つけた動画1本ごとに videos.list を呼び、
+毎回の実行で同じハンドル（@username）→ チャンネルID を引き直し、チャンネルを1つずつ処理していた。
+- videos.list は最大50件のIDをカンマ区切りで1回にまとめる
+- ハンドル → チャンネルID（変わらない）と動画の統計（再生回数は変わる）を TTL つきで保存
+- クライアントはスレッドごとに1つ作って使い回し、チャンネルを並列に処理する
+
+オフライン検証用に、YouTube Data API の代用（FakeYouTubeMetadata）を同梱。
+
+環境変数:
+    YOUTUBE_METADATA_DIR=...          キャッシュの保存先
+    YOUTUBE_HANDLE_TTL_DAYS=30        ハンドル → チャンネルID を使い回す日数
+    YOUTUBE_STATS_TTL_HOURS=12        動画の統計を使い回す時間
+    KUCHIKOMI_SCAN_WORKERS=4          同時に処理するチャンネル数
+    KUCHIKOMI_MAX_CHANNELS=3          処理するチャンネル数の上限（0 なら全部）
+
+使い方:
+    meta = get_youtube_metadata(YOUTUBE_API_KEY)
+    channel_id = meta.channel_id_for_handle("@example")
+    videos = meta.popular_videos(channel_id, max_results=5)
+    results = meta.map_channels(process_channel, channels)
+    meta.save()
+
+ベンチマーク:
+    python youtube_metadata.py --bench
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+try:
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+except ImportError:
+    build = None
+    HttpError = Exception
+
+
+YOUTUBE_HANDLE_TTL_DAYS = float(os.environ.get("YOUTUBE_HANDLE_TTL_DAYS", "30"))
+YOUTUBE_STATS_TTL_HOURS = float(os.environ.get("YOUTUBE_STATS_TTL_HOURS", "12"))
+KUCHIKOMI_SCAN_WORKERS = int(os.environ.get("KUCHIKOMI_SCAN_WORKERS", "4"))
+KUCHIKOMI_MAX_CHANNELS = int(os.environ.get("KUCHIKOMI_MAX_CHANNELS", "3"))
+VIDEOS_PER_REQUEST = 50  # videos.list の id は最大50件
+# クォータ消費（search.list は100、それ以外は1）
+QUOTA_COST = {"search": 100, "channels": 1, "videos": 1}
+
+# GitHub Actions では workflow の actions/cache と同じパスを使う
+GITHUB_ACTIONS_CACHE_DIR = Path.home() / ".cache" / "youtube-metadata"
+LOCAL_CACHE_DIR = Path.home() / ".cache" / "jinsei-soudan" / "youtube"
+
+
+def default_metadata_dir() -> Path:
+    root = os.environ.get("YOUTUBE_METADATA_DIR")
+    if root:
+        return Path(root)
+    return GITHUB_ACTIONS_CACHE_DIR if os.environ.get("GITHUB_ACTIONS") == "true" else LOCAL_CACHE_DIR
+
+
+def limit_channels(channels: list, max_channels: int = KUCHIKOMI_MAX_CHANNELS) -> list:
+    """処理するチャンネルを上限までに絞る（0 なら全部）"""
+    return channels[:max_channels] if max_channels > 0 else list(channels)
+
+
+class YouTubeMetadataClient:
+    """YouTube のチャンネル・動画メタデータ（キャッシュつき）
+
+    Args:
+        client_factory: YouTube Data API v3 クライアントを作る関数（スレッドごとに1回呼ぶ）
+        cache_path: キャッシュのJSON（None なら保存しない）
+        handle_ttl_days: ハンドル → チャンネルID を使い回す日数
+        stats_ttl_hours: 動画の統計を使い回す時間
+        max_workers: map_channels の並列数
+        clock: 現在時刻（秒）を返す関数（ベンチマーク用）
+    """
+
+    def __init__(self, client_factory, cache_path=None, handle_ttl_days: float = YOUTUBE_HANDLE_TTL_DAYS,
+                 stats_ttl_hours: float = YOUTUBE_STATS_TTL_HOURS, max_workers: int = KUCHIKOMI_SCAN_WORKERS,
+                 clock=time.time):
+        self.client_factory = client_factory
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.handle_ttl = handle_ttl_days * 86400
+        self.stats_ttl = stats_ttl_hours * 3600
+        self.max_workers = max(1, max_workers)
+        self.clock = clock
+        self.calls = Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = self._load()
+
+    def _load(self) -> dict:
+        cache = {"handles": {}, "videos": {}}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    cache.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return cache
+
+    def save(self):
+        """キャッシュを保存（期限切れは捨てる）"""
+        if not self.cache_path:
+            return
+        now = self.clock()
+        with self._lock:
+            cache = {
+                "handles": {k: v for k, v in self._cache["handles"].items()
+                            if now - v.get("fetched_at", 0) < self.handle_ttl},
+                "videos": {k: v for k, v in self._cache["videos"].items()
+                           if now - v.get("fetched_at", 0) < self.stats_ttl},
+            }
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, self.cache_path)
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client_factory()
+        return client
+
+    def _execute(self, resource: str, request):
+        with self._lock:
+            self.calls[resource] += 1
+        return request.execute()
+
+    @property
+    def quota_used(self) -> int:
+        return sum(QUOTA_COST.get(resource, 1) * count for resource, count in self.calls.items())
+
+    # ---- チャンネル ----
+
+    def channel_id_for_handle(self, handle: str) -> Optional[str]:
+        """ハンドル（@username）からチャンネルIDを取得（キャッシュがあればAPIを呼ばない）"""
+        handle_clean = handle.lstrip("@")
+        key = handle_clean.lower()
+        with self._lock:
+            cached = self._cache["handles"].get(key)
+        if cached and self.clock() - cached.get("fetched_at", 0) < self.handle_ttl:
+            return cached["channel_id"]
+
+        youtube = self._client()
+        try:
+            # forHandle パラメータでチャンネルを検索
+            response = self._execute("channels", youtube.channels().list(part="id,snippet", forHandle=handle_clean))
+            if response.get("items"):
+                channel_id = response["items"][0]["id"]
+                print(f"   ✓ チャンネルID取得: {channel_id} ({response['items'][0]['snippet']['title']})")
+            else:
+                # forHandleが効かない場合、検索で試す
+                search_response = self._execute("search", youtube.search().list(
+                    part="snippet", q=handle_clean, type="channel", maxResults=1))
+                if not search_response.get("items"):
+                    return None
+                channel_id = search_response["items"][0]["snippet"]["channelId"]
+                print(f"   ✓ チャンネルID取得（検索）: {channel_id}")
+        except HttpError as e:
+            print(f"   ⚠ チャンネルID取得エラー: {e}")
+            return None
+
+        with self._lock:
+            self._cache["handles"][key] = {"channel_id": channel_id, "fetched_at": self.clock()}
+        return channel_id
+
+    # ---- 動画 ----
+
+    def video_stats(self, video_ids: list) -> dict:
+        """動画の統計 {video_id: {"view_count", "like_count", "duration"}}（未取得分は50件ずつまとめて取得）"""
+        now = self.clock()
+        result = {}
+        missing = []
+        with self._lock:
+            for video_id in dict.fromkeys(video_ids):
+                cached = self._cache["videos"].get(video_id)
+                if cached and now - cached.get("fetched_at", 0) < self.stats_ttl:
+                    result[video_id] = cached
+                else:
+                    missing.append(video_id)
+
+        youtube = self._client()
+        for start in range(0, len(missing), VIDEOS_PER_REQUEST):
+            chunk = missing[start:start + VIDEOS_PER_REQUEST]
+            response = self._execute("videos", youtube.videos().list(
+                part="statistics,contentDetails", id=",".join(chunk), maxResults=len(chunk)))
+            fetched_at = self.clock()
+            for item in response.get("items", []):
+                stats = item.get("statistics", {})
+                entry = {
+                    "view_count": int(stats.get("viewCount", 0)),
+                    "like_count": int(stats.get("likeCount", 0)),
+                    "duration": item.get("contentDetails", {}).get("duration", ""),
+                    "fetched_at": fetched_at,
+                }
+                result[item["id"]] = entry
+                with self._lock:
+                    self._cache["videos"][item["id"]] = entry
+        return result
+
+    def popular_videos(self, channel_id: str, max_results: int = 10, days: int = 365) -> list:
+        """チャンネルの人気動画（再生回数順）。検索1回 + 統計はまとめて1回"""
+        youtube = self._client()
+        try:
+            # チャンネルの動画を検索（再生回数順）
+            search_response = self._execute("search", youtube.search().list(
+                part="id,snippet",
+                channelId=channel_id,
+                type="video",
+                order="viewCount",
+                maxResults=max_results,
+                publishedAfter=(datetime.now() - timedelta(days=days)).isoformat() + "Z",
+            ))
+            items = search_response.get("items", [])
+            stats = self.video_stats([item["id"]["videoId"] for item in items])
+        except HttpError as e:
+            print(f"❌ YouTube API エラー: {e}")
+            return []
+
+        videos = []
+        for item in items:
+            video_id = item["id"]["videoId"]
+            if video_id not in stats:
+                continue
+            snippet = item["snippet"]
+            videos.append({
+                "video_id": video_id,
+                "title": snippet["title"],
+                "channel_title": snippet["channelTitle"],
+                "published_at": snippet["publishedAt"],
+                "view_count": stats[video_id]["view_count"],
+                "like_count": stats[video_id]["like_count"],
+            })
+
+        # 再生回数順にソート
+        videos.sort(key=lambda x: x["view_count"], reverse=True)
+        return videos
+
+    # ---- 並列処理 ----
+
+    def map_channels(self, func, channels: list) -> list:
+        """func(channel) をチャンネルごとに並列実行し、結果をチャンネルの順番で返す（例外は None）"""
+        def run(channel):
+            try:
+                return func(channel)
+            except Exception as e:
+                print(f"   ⚠ チャンネル処理エラー: {e}")
+                return None
+
+        if self.max_workers == 1 or len(channels) <= 1:
+            return [run(channel) for channel in channels]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="youtube-meta") as executor:
+            return list(executor.map(run, channels))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_youtube_metadata(api_key: str) -> YouTubeMetadataClient:
+    """プロセス共通のクライアント（APIキーごと）"""
+    if not api_key:
+        raise ValueError("YOUTUBE_API_KEY が設定されていません")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = YouTubeMetadataClient(
+                lambda: build("youtube", "v3", developerKey=api_key, cache_discovery=False),
+                cache_path=default_metadata_dir() / "metadata.json",
+            )
+        return client
+
+
+class FakeYouTubeMetadata:
+    """YouTube Data API（channels.list / search.list / videos.list）の代用"""
+
+    def __init__(self, channels: dict, latency: float = 0.0):
+        # handle → (channel_id, [(video_id, title, views), ...])
+        self.data = channels
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._views = {video_id: views for _, videos in channels.values() for video_id, _, views in videos}
+
+    def _request(self, resource, result):
+        fake = self
+
+        class Request:
+            def execute(self):
+                with fake._lock:
+                    fake.calls[resource] += 1
+                time.sleep(fake.latency)
+                return result()
+        return Request()
+
+    def _resource(self, resource, handler):
+        fake = self
+
+        class Resource:
+            def list(self, **kwargs):
+                return fake._request(resource, lambda: handler(**kwargs))
+        return Resource()
+
+    def channels(self):
+        def handler(part, forHandle):
+            entry = self.data.get(forHandle)
+            return {"items": [{"id": entry[0], "snippet": {"title": forHandle}}] if entry else []}
+        return self._resource("channels", handler)
+
+    def search(self):
+        def handler(part, channelId=None, maxResults=10, **kwargs):
+            for handle, (channel_id, videos) in self.data.items():
+                if channel_id == channelId:
+                    ranked = sorted(videos, key=lambda v: -v[2])[:maxResults]
+                    return {"items": [{"id": {"videoId": vid}, "snippet": {
+                        "title": title, "channelTitle": handle, "publishedAt": "2026-01-01T00:00:00Z"}}
+                        for vid, title, _ in ranked]}
+            return {"items": []}
+        return self._resource("search", handler)
+
+    def videos(self):
+        def handler(part, id, maxResults=None):
+            return {"items": [{"id": vid, "statistics": {"viewCount": str(self._views[vid]), "likeCount": "0"},
+                               "contentDetails": {"duration": "PT10M"}} for vid in id.split(",")]}
+        return self._resource("videos", handler)
+
+
+def run_benchmark(channel_count: int = 8, videos_per_channel: int = 5, latency: float = 0.05):
+    """従来方式（動画1本ごとに videos.list、毎回ハンドル解決、チャンネル順次）と比較"""
+    import tempfile
+
+    channels = {f"channel{c}": (f"UC{c:04d}", [(f"v{c}_{i}", f"動画{c}-{i}", 1000 * (i + 1))
+                                             for i in range(videos_per_channel * 2)])
+                for c in range(channel_count)}
+    handles = [f"@{h}" for h in channels]
+
+    # 従来: 1チャンネルずつ、動画ごとに videos.list
+    fake = FakeYouTubeMetadata(channels, latency=latency)
+    start = time.perf_counter()
+    baseline = []
+    for handle in handles:
+        channel_id = fake.channels().list(part="id,snippet", forHandle=handle.lstrip("@")).execute()["items"][0]["id"]
+        hits = fake.search().list(part="id,snippet", channelId=channel_id, maxResults=videos_per_channel).execute()
+        views = []
+        for item in hits["items"]:
+            stats = fake.videos().list(part="statistics,contentDetails", id=item["id"]["videoId"]).execute()
+            views.append(int(stats["items"][0]["statistics"]["viewCount"]))
+        baseline.append(sorted(views, reverse=True))
+    elapsed = time.perf_counter() - start
+    quota = sum(QUOTA_COST[r] * n for r, n in fake.calls.items())
+    print(f"従来: {elapsed:.2f}秒, 呼び出し {sum(fake.calls.values())}回 {dict(fake.calls)}, クォータ {quota}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("1回目（キャッシュなし）", "2回目（ハンドル・統計キャッシュあり）"):
+            fake = FakeYouTubeMetadata(channels, latency=latency)
+            meta = YouTubeMetadataClient(lambda: fake, cache_path=Path(tmp) / "metadata.json", max_workers=4)
+
+            def process(handle):
+                channel_id = meta.channel_id_for_handle(handle)
+                return [v["view_count"] for v in meta.popular_videos(channel_id, max_results=videos_per_channel)]
+
+            start = time.perf_counter()
+            import contextlib
+            import io
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = meta.map_channels(process, handles)
+            elapsed = time.perf_counter() - start
+            meta.save()
+            quota = sum(QUOTA_COST[r] * n for r, n in fake.calls.items())
+            print(f"{label}: {elapsed:.2f}秒, 呼び出し {sum(fake.calls.values())}回 {dict(fake.calls)}, "
+                  f"クォータ {quota} {'✓' if results == baseline else '✗'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YouTube メタデータ取得")
+    parser.add_argument("--bench", action="store_true", help="ベンチマーク（代用 API で比較）")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark()
+    else:
+        parser.print_help()